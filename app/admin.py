@@ -17,7 +17,10 @@ from .models import (
     MeuPlanoPreventiva,
     MeuPlanoPreventivaDocumento,
     RoteiroPreventiva,
-    Semana52
+    Semana52,
+    ImportacaoArquivo,
+    CheckpointImportacao,
+    ResumoDiarioPerfilView
 )
 
 
@@ -509,3 +512,41 @@ class Semana52Admin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ImportacaoArquivo)
+class ImportacaoArquivoAdmin(admin.ModelAdmin):
+    """Admin configuration for ImportacaoArquivo model"""
+    list_display = ('id', 'tipo', 'nome_arquivo', 'status', 'registros_criados', 'registros_atualizados', 'total_erros', 'created_at', 'finalizado_em')
+    list_filter = ('tipo', 'status', 'created_at')
+    search_fields = ('nome_arquivo', 'mensagem')
+    readonly_fields = (
+        'tipo', 'arquivo', 'nome_arquivo', 'parametros', 'status', 'registros_criados', 'registros_atualizados',
+        'total_erros', 'erros', 'detalhes', 'mensagem', 'created_at', 'iniciado_em', 'finalizado_em',
+    )
+    list_per_page = 50
+
+
+@admin.register(CheckpointImportacao)
+class CheckpointImportacaoAdmin(admin.ModelAdmin):
+    """Admin configuration for CheckpointImportacao model"""
+    list_display = ('tipo', 'nome_arquivo', 'ultima_linha', 'concluida', 'registros_criados', 'registros_atualizados', 'total_erros', 'updated_at')
+    list_filter = ('tipo', 'concluida', 'updated_at')
+    search_fields = ('nome_arquivo', 'hash_arquivo')
+    readonly_fields = ('hash_arquivo', 'parametros', 'blocos', 'estado', 'erros', 'created_at', 'updated_at')
+    list_per_page = 50
+
+
+@admin.register(ResumoDiarioPerfilView)
+class ResumoDiarioPerfilViewAdmin(admin.ModelAdmin):
+    """Admin configuration for ResumoDiarioPerfilView model"""
+    list_display = ('dia', 'view', 'requisicoes', 'media_consultas', 'max_consultas', 'consultas_repetidas', 'repeticoes_consulta', 'media_tempo_total_ms', 'max_tempo_total_ms')
+    list_filter = ('dia',)
+    search_fields = ('view', 'consulta_mais_repetida')
+    ordering = ('-dia', '-max_consultas')
+    readonly_fields = (
+        'dia', 'view', 'requisicoes', 'consultas', 'consultas_repetidas', 'max_consultas', 'tempo_total_ms',
+        'tempo_db_ms', 'tempo_view_ms', 'tempo_template_ms', 'max_tempo_total_ms', 'consulta_mais_repetida',
+        'repeticoes_consulta', 'updated_at',
+    )
+    list_per_page = 50
@@ -0,0 +1,184 @@
+"""
+Busca textual com FTS5 (SQLite).
+
+Cada modelo pesquisável tem uma tabela virtual FTS5 (tokenizer trigram) com os seus campos
+de texto já normalizados (minúsculas, sem acentos), ligada ao registro pelo rowid = pk. A
+busca por trecho, que antes era um LIKE '%termo%' percorrendo a tabela inteira para cada
+campo, passa a ser uma consulta ao índice trigram.
+
+O índice é atualizado na mesma transação das gravações: pelos sinais post_save/post_delete
+(app.signals) e pelas gravações em lote das importações (_bulk_create_with_fallback e
+BulkUpsert em app.utils). Sem as tabelas FTS5 (outro banco ou SQLite sem o tokenizer
+trigram) ou com termos de menos de 3 caracteres, filtro_busca devolve os mesmos filtros
+__icontains de antes.
+"""
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+# Modelo -> campos de texto indexados (a busca de cada tela usa um subconjunto deles)
+INDICES_BUSCA = {
+    'Maquina': ('descr_maquina', 'cd_setormanut', 'descr_setormanut', 'nome_unid', 'nro_patrimonio'),
+    'ItemEstoque': ('descricao_item', 'descricao_dest_uso', 'unidade_medida', 'classificacao_tempo_sem_consumo'),
+    'MeuPlanoPreventiva': ('descr_maquina', 'descr_tarefa', 'descr_plano', 'nome_funcionario', 'cd_funcionario', 'cd_setor',
+                           'descr_setor', 'nome_unid', 'desc_detalhada_do_roteiro_preventiva', 'descr_seqplamanu'),
+    'NotaFiscal': ('nota', 'emitente', 'nome_fantasia_emitente', 'nome_unidade', 'situacao'),
+}
+
+# O tokenizer trigram só encontra termos com pelo menos 3 caracteres
+TAMANHO_MINIMO_TERMO = 3
+
+# Registros por comando ao gravar no índice (o DELETE usa uma pk por parâmetro)
+LOTE_INDEXACAO = 900
+
+_tabelas_disponiveis = {}
+
+
+def normalizar_busca(valor) -> str:
+    """Texto em minúsculas e sem acentos: a forma gravada no índice e usada nas consultas"""
+    if valor is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor))
+    return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere)).casefold()
+
+
+def campos_indexados(model):
+    """Campos do índice de busca do modelo (None se o modelo não é pesquisável)"""
+    model = model._meta.concrete_model
+    if model._meta.app_label != 'app':
+        return None
+    return INDICES_BUSCA.get(model.__name__)
+
+
+def tabela_busca(model) -> str:
+    """Nome da tabela FTS5 do modelo"""
+    return f'{model._meta.concrete_model._meta.db_table}_busca'
+
+
+def busca_disponivel(model) -> bool:
+    """
+    Indica se a tabela FTS5 do modelo existe (criada pela migração quando o SQLite tem FTS5
+    com trigram). O resultado, positivo ou negativo, fica guardado para o processo.
+    """
+    if connection.vendor != 'sqlite' or not campos_indexados(model):
+        return False
+    chave = (connection.settings_dict['NAME'], tabela_busca(model))
+    if chave not in _tabelas_disponiveis:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [tabela_busca(model)])
+            _tabelas_disponiveis[chave] = cursor.fetchone() is not None
+    return _tabelas_disponiveis[chave]
+
+
+def filtro_busca(model, termo, campos) -> Q:
+    """
+    Q com os registros em que algum dos campos contém o termo.
+
+    Com o índice FTS5 e termo de 3 ou mais caracteres, uma subconsulta ao índice (sem
+    distinção de acentos e maiúsculas); caso contrário, os __icontains dos campos.
+
+    Args:
+        model: Modelo pesquisado
+        termo: Texto digitado na busca
+        campos: Campos de texto em que procurar
+    """
+    indexados = campos_indexados(model)
+    termo_normalizado = normalizar_busca(termo).strip()
+    if indexados and set(campos) <= set(indexados) and len(termo_normalizado) >= TAMANHO_MINIMO_TERMO \
+            and busca_disponivel(model):
+        tabela = tabela_busca(model)
+        # Frase entre aspas restrita às colunas: o trigram encontra o trecho em qualquer posição
+        consulta = '{%s} : "%s"' % (' '.join(campos), termo_normalizado.replace('"', '""'))
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM "{tabela}" WHERE "{tabela}" MATCH %s', [consulta]))
+
+    filtro = Q()
+    for campo in campos:
+        filtro |= Q(**{f'{campo}__icontains': termo})
+    return filtro
+
+
+def _inserir(cursor, tabela, campos, registros):
+    colunas = ', '.join(('rowid',) + campos)
+    marcadores = ', '.join(['%s'] * (len(campos) + 1))
+    cursor.executemany(
+        f'INSERT INTO "{tabela}" ({colunas}) VALUES ({marcadores})',
+        [[pk] + [normalizar_busca(valor) for valor in valores] for pk, *valores in registros],
+    )
+
+
+def indexar_registros(model, objetos) -> None:
+    """
+    Grava (ou regrava) no índice os registros informados, na transação atual.
+
+    Registros sem pk (bulk_create sem RETURNING) fazem o índice do modelo ser
+    reconstruído quando a transação for confirmada.
+    """
+    campos = campos_indexados(model)
+    if not campos or not objetos or not busca_disponivel(model):
+        return
+    if any(objeto.pk is None for objeto in objetos):
+        transaction.on_commit(lambda: reconstruir_indice_busca(model))
+        return
+
+    tabela = tabela_busca(model)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(objetos), LOTE_INDEXACAO):
+            lote = objetos[inicio:inicio + LOTE_INDEXACAO]
+            pks = [objeto.pk for objeto in lote]
+            cursor.execute(f'DELETE FROM "{tabela}" WHERE rowid IN ({", ".join(["%s"] * len(pks))})', pks)
+            _inserir(cursor, tabela, campos, [
+                [objeto.pk] + [getattr(objeto, campo) for campo in campos] for objeto in lote
+            ])
+
+
+def remover_registros(model, pks) -> None:
+    """Remove do índice os registros com as pks informadas"""
+    if not pks or not busca_disponivel(model):
+        return
+    tabela = tabela_busca(model)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(pks), LOTE_INDEXACAO):
+            lote = list(pks[inicio:inicio + LOTE_INDEXACAO])
+            cursor.execute(f'DELETE FROM "{tabela}" WHERE rowid IN ({", ".join(["%s"] * len(lote))})', lote)
+
+
+def limpar_indice_busca(model) -> None:
+    """Esvazia o índice de busca do modelo (tabela excluída inteira), com um único DELETE"""
+    if not busca_disponivel(model):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{tabela_busca(model)}"')
+
+
+def reconstruir_indice_busca(model) -> int:
+    """
+    Refaz o índice de busca do modelo a partir da tabela (uma transação).
+
+    Returns:
+        Quantidade de registros indexados (0 se a busca FTS5 não está disponível)
+    """
+    campos = campos_indexados(model)
+    if not campos or not busca_disponivel(model):
+        return 0
+
+    tabela = tabela_busca(model)
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{tabela}"')
+        registros = model.objects.order_by('pk').values_list('pk', *campos).iterator(chunk_size=LOTE_INDEXACAO)
+        lote = []
+        for registro in registros:
+            lote.append(registro)
+            if len(lote) >= LOTE_INDEXACAO:
+                _inserir(cursor, tabela, campos, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            _inserir(cursor, tabela, campos, lote)
+            total += len(lote)
+        # Compacta os segmentos do índice após a carga completa
+        cursor.execute(f'INSERT INTO "{tabela}"("{tabela}") VALUES (%s)', ['optimize'])
+    return total
@@ -0,0 +1,420 @@
+"""
+Importações em segundo plano.
+
+As telas de importação gravam o arquivo enviado em um ImportacaoArquivo e devolvem a
+resposta na hora; um worker local (threads do próprio processo do servidor, sem broker)
+executa as mesmas funções upload_*_from_file de app.utils e registra o resultado.
+
+Cada importação guarda o hash do conteúdo e a versão das tabelas envolvidas ao terminar:
+reenviar um arquivo idêntico, com as mesmas opções e sem que essas tabelas tenham mudado
+desde então, é concluído na hora, sem ler o arquivo.
+
+Enquanto a importação roda, a transação de gravação segura o lock do SQLite, então o
+progresso parcial (bytes lidos, arquivo atual do lote) fica no cache 'importacoes', que é
+em arquivo e compartilhado entre os processos; o banco só recebe o início e o resultado.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+
+# tipo de ImportacaoArquivo -> função de importação em app.utils
+FUNCOES_IMPORTACAO = {
+    'maquinas': 'upload_maquinas_from_file',
+    'manutentores': 'upload_manutentores_from_file',
+    'ordens_corretivas': 'upload_ordens_corretivas_from_file',
+    'plano_preventiva': 'upload_plano_preventiva_from_file',
+    'roteiro_preventiva': 'upload_roteiro_preventiva_from_file',
+    'semanas_52': 'upload_52_semanas_from_file',
+    'notas_fiscais': 'upload_notas_fiscais_from_file',
+    'requisicoes_almoxarifado': 'upload_requisicoes_almoxarifado_from_file',
+    'requisicoes_almoxarifado_lote': 'upload_requisicoes_almoxarifado_em_lote',
+    'itens_estoque': 'upload_itens_estoque_from_file',
+    'cas': 'upload_cas_from_file',
+}
+
+# Tabelas gravadas (ou consultadas para vincular registros) por tipo de importação:
+# um arquivo idêntico volta a ser importado apenas se alguma delas mudou
+MODELOS_IMPORTACAO = {
+    'maquinas': ('Maquina',),
+    'manutentores': ('Manutentor',),
+    'ordens_corretivas': ('OrdemServicoCorretiva', 'OrdemServicoCorretivaFicha'),
+    'plano_preventiva': ('PlanoPreventiva', 'Maquina'),
+    'roteiro_preventiva': ('RoteiroPreventiva', 'Maquina'),
+    'semanas_52': ('Semana52',),
+    'notas_fiscais': ('NotaFiscal',),
+    'requisicoes_almoxarifado': ('RequisicaoAlmoxarifado',),
+    'requisicoes_almoxarifado_lote': ('RequisicaoAlmoxarifado',),
+    'itens_estoque': ('ItemEstoque',),
+    'cas': ('CentroAtividade',),
+}
+
+# Página de consulta oferecida ao fim da importação (tipos sem entrada: nenhuma)
+PAGINAS_DESTINO = {
+    'manutentores': 'consultar_manutentores',
+    'ordens_corretivas': 'consultar_corretivas_outros',
+}
+
+# Parâmetros gravados como texto ISO (JSONField) que as funções recebem como date
+PARAMETROS_DATA = ('data_requisicao', 'data_padrao')
+
+# Marca de recálculo do perfil de qualidade das ordens agendado (e validade máxima da marca, em segundos)
+CHAVE_ANALISE_QUALIDADE = 'qualidade_ordens:agendada'
+TEMPO_MAXIMO_ANALISE_QUALIDADE = 60 * 60
+
+LIMITE_ERROS_REGISTRADOS = 500
+INTERVALO_PROGRESSO = 0.5  # segundos entre gravações do progresso no cache
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _cache():
+    return caches['importacoes']
+
+
+def _chave_progresso(pk):
+    return f'importacao:{pk}:progresso'
+
+
+def obter_progresso(pk):
+    """Progresso parcial de uma importação em andamento: {'percentual', 'etapa', 'arquivos'}"""
+    return _cache().get(_chave_progresso(pk)) or {}
+
+
+def _gravar_progresso(pk, **valores):
+    progresso = obter_progresso(pk)
+    progresso.update(valores)
+    _cache().set(_chave_progresso(pk), progresso)
+
+
+class _ArquivoComProgresso(io.BufferedReader):
+    """Arquivo local que informa a posição de leitura (percentual do arquivo já lido)"""
+
+    def __init__(self, path, ao_ler):
+        super().__init__(io.FileIO(path, 'rb'))
+        self._tamanho = os.path.getsize(path) or 1
+        self._ao_ler = ao_ler
+        self._ultimo_aviso = 0.0
+
+    def _avisar(self):
+        agora = time.monotonic()
+        if agora - self._ultimo_aviso >= INTERVALO_PROGRESSO:
+            self._ultimo_aviso = agora
+            self._ao_ler(min(self.tell() / self._tamanho, 1.0))
+
+    def read(self, size=-1):
+        dados = super().read(size)
+        self._avisar()
+        return dados
+
+    def read1(self, size=-1):
+        dados = super().read1(size)
+        self._avisar()
+        return dados
+
+    def readinto(self, b):
+        lidos = super().readinto(b)
+        self._avisar()
+        return lidos
+
+
+def _obter_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORTACOES_WORKERS', 1),
+                thread_name_prefix='importacao',
+            )
+        return _executor
+
+
+def _data_iso(valor):
+    return valor.isoformat() if isinstance(valor, date) else valor
+
+
+def criar_importacao(tipo, arquivos, **parametros):
+    """
+    Grava os arquivos enviados e registra a importação como pendente (sem processar).
+
+    Args:
+        tipo: Tipo da importação (ver ImportacaoArquivo.TIPO_CHOICES)
+        arquivos: Arquivo enviado (Django UploadedFile) ou lista deles (apenas no lote
+            de requisições, que recebe todos os arquivos de uma vez)
+        **parametros: Argumentos repassados à função de importação (datas como date)
+
+    Returns:
+        ImportacaoArquivo criada
+    """
+    from app.models import ImportacaoArquivo
+
+    if tipo not in FUNCOES_IMPORTACAO:
+        raise ValueError(f"Tipo de importação desconhecido: {tipo}")
+    if not isinstance(arquivos, (list, tuple)):
+        arquivos = [arquivos]
+
+    parametros = {nome: _data_iso(valor) for nome, valor in parametros.items()}
+    principal, adicionais = arquivos[0], arquivos[1:]
+    if adicionais:
+        # Demais arquivos do lote: gravados ao lado do principal, com o nome original
+        parametros['arquivos_adicionais'] = [
+            {'nome': os.path.basename(arquivo.name),
+             'caminho': default_storage.save(f'importacoes/{timezone.now():%Y/%m}/{os.path.basename(arquivo.name)}', arquivo)}
+            for arquivo in adicionais
+        ]
+
+    importacao = ImportacaoArquivo(
+        tipo=tipo,
+        nome_arquivo=os.path.basename(principal.name)[:255],
+        parametros=parametros,
+    )
+    importacao.arquivo.save(os.path.basename(principal.name), principal, save=False)
+    importacao.save()
+    return importacao
+
+
+def enfileirar_importacao(tipo, arquivos, **parametros):
+    """
+    Registra a importação (ver criar_importacao) e a agenda no worker local quando a
+    transação atual for confirmada: o worker só procura o registro depois de gravado
+    (fora de transação, o envio ao worker é imediato)
+    """
+    importacao = criar_importacao(tipo, arquivos, **parametros)
+    transaction.on_commit(lambda: _obter_executor().submit(executar_importacao, importacao.pk))
+    return importacao
+
+
+def _executar_analise_qualidade_ordens():
+    from app.utils import atualizar_qualidade_ordens
+
+    close_old_connections()
+    try:
+        atualizar_qualidade_ordens()
+    except Exception:
+        import traceback
+        traceback.print_exc()
+    finally:
+        _cache().delete(CHAVE_ANALISE_QUALIDADE)
+        connection.close()
+
+
+def enfileirar_analise_qualidade_ordens():
+    """
+    Agenda no worker local o recálculo do perfil de qualidade de todas as ordens
+    (utils.atualizar_qualidade_ordens), fora do ciclo de requisição. Ignorado se já
+    houver um agendado ou em andamento.
+
+    Returns:
+        True se o recálculo foi agendado
+    """
+    if not _cache().add(CHAVE_ANALISE_QUALIDADE, True, timeout=TEMPO_MAXIMO_ANALISE_QUALIDADE):
+        return False
+    _obter_executor().submit(_executar_analise_qualidade_ordens)
+    return True
+
+
+def _hash_importacao(importacao, adicionais):
+    """Hash do conteúdo enviado; no lote, dos nomes (que trazem a data) e conteúdos de todos os arquivos"""
+    from app.utils import hash_arquivo
+
+    hash_principal = hash_arquivo(importacao.arquivo.path)
+    if not adicionais:
+        return hash_principal
+    sha = hashlib.sha256(f'{importacao.nome_arquivo}\0{hash_principal}'.encode())
+    for adicional in adicionais:
+        sha.update(f'\0{adicional["nome"]}\0{hash_arquivo(default_storage.path(adicional["caminho"]))}'.encode())
+    return sha.hexdigest()
+
+
+def _opcoes(parametros):
+    """Parâmetros que definem o resultado da importação (sem os caminhos dos arquivos gravados)"""
+    return {nome: valor for nome, valor in parametros.items() if nome != 'arquivos_adicionais'}
+
+
+def importacao_identica_anterior(importacao):
+    """
+    Importação concluída anteriormente com o mesmo tipo, conteúdo e opções cujas
+    tabelas não mudaram desde então (reimportar o arquivo não gravaria nada), ou None.
+    """
+    from app.models import ImportacaoArquivo
+    from app.utils import versoes_modelos
+
+    anteriores = ImportacaoArquivo.objects.filter(
+        tipo=importacao.tipo, hash_arquivo=importacao.hash_arquivo, status=ImportacaoArquivo.STATUS_CONCLUIDA,
+    ).exclude(pk=importacao.pk).order_by('-finalizado_em')
+    opcoes = _opcoes(importacao.parametros)
+    for anterior in anteriores[:20]:
+        if anterior.versoes_modelos and _opcoes(anterior.parametros) == opcoes:
+            modelos = [apps.get_model('app', nome) for nome in MODELOS_IMPORTACAO[importacao.tipo]]
+            if anterior.versoes_modelos == versoes_modelos(*modelos):
+                return anterior
+            return None
+    return None
+
+
+def executar_importacao(pk):
+    """
+    Executa uma importação pendente com a função upload_* do tipo e grava o resultado.
+
+    Retorna a ImportacaoArquivo atualizada, ou None se ela já tinha sido iniciada por
+    outro worker. Fecha a conexão com o banco ao terminar (roda fora do ciclo de requisição).
+    """
+    from app import utils
+    from app.models import ImportacaoArquivo
+
+    close_old_connections()
+    try:
+        # Marcar como em processamento apenas se ainda estiver pendente (evita execução dupla)
+        iniciada = ImportacaoArquivo.objects.filter(pk=pk, status=ImportacaoArquivo.STATUS_PENDENTE).update(
+            status=ImportacaoArquivo.STATUS_PROCESSANDO, iniciado_em=timezone.now(),
+        )
+        if not iniciada:
+            return None
+        importacao = ImportacaoArquivo.objects.get(pk=pk)
+        _gravar_progresso(pk, percentual=0, etapa='Lendo arquivo')
+
+        funcao = getattr(utils, FUNCOES_IMPORTACAO[importacao.tipo])
+        parametros = dict(importacao.parametros)
+        adicionais = parametros.pop('arquivos_adicionais', [])
+
+        # Arquivo idêntico a uma importação anterior, sem alterações nas tabelas desde então
+        importacao.hash_arquivo = _hash_importacao(importacao, adicionais)
+        anterior = importacao_identica_anterior(importacao)
+        if anterior is not None:
+            importacao.status = ImportacaoArquivo.STATUS_CONCLUIDA
+            importacao.versoes_modelos = anterior.versoes_modelos
+            importacao.mensagem = (
+                f'Arquivo idêntico ao da importação #{anterior.pk} '
+                f'({timezone.localtime(anterior.finalizado_em):%d/%m/%Y %H:%M}) e os dados não mudaram '
+                f'desde então: nada a importar.'
+            )
+            importacao.finalizado_em = timezone.now()
+            importacao.save()
+            return importacao
+
+        for nome in PARAMETROS_DATA:
+            if parametros.get(nome):
+                parametros[nome] = date.fromisoformat(parametros[nome])
+
+        abertos = []
+        detalhes = []
+        try:
+            if importacao.tipo == 'requisicoes_almoxarifado_lote':
+                # No lote o progresso é por arquivo gravado (os CSVs são lidos todos antes)
+                abertos.append(File(default_storage.open(importacao.arquivo.name, 'rb'), name=importacao.nome_arquivo))
+                for adicional in adicionais:
+                    abertos.append(File(default_storage.open(adicional['caminho'], 'rb'), name=adicional['nome']))
+
+                def progresso_lote(resultado):
+                    detalhes.append({
+                        'arquivo': resultado['arquivo'],
+                        'data_requisicao': _data_iso(resultado['data_requisicao']),
+                        'created': resultado['created'],
+                        'updated': resultado['updated'],
+                        'erros': len(resultado['errors']),
+                    })
+                    _gravar_progresso(
+                        pk,
+                        percentual=round(resultado['indice'] * 100 / resultado['total']),
+                        etapa=f"Arquivo {resultado['indice']} de {resultado['total']}: {resultado['arquivo']}",
+                        arquivos=detalhes,
+                    )
+
+                created_count, updated_count, errors = funcao(abertos, progresso=progresso_lote, **parametros)
+            else:
+                def ao_ler(fracao):
+                    # Leitura e gravação são intercaladas; o fim do arquivo deixa só a gravação final
+                    etapa = 'Gravando registros' if fracao >= 1 else 'Lendo arquivo'
+                    _gravar_progresso(pk, percentual=round(fracao * 100), etapa=etapa)
+
+                abertos.append(File(_ArquivoComProgresso(importacao.arquivo.path, ao_ler), name=importacao.nome_arquivo))
+                created_count, updated_count, errors = funcao(abertos[0], **parametros)
+        finally:
+            for arquivo in abertos:
+                arquivo.close()
+
+        importacao.registros_criados = created_count
+        importacao.registros_atualizados = updated_count
+        importacao.total_erros = len(errors)
+        importacao.erros = errors[:LIMITE_ERROS_REGISTRADOS]
+        importacao.detalhes = detalhes
+        # As funções de importação não levantam exceção: falhou se nada foi gravado e há erros
+        # que não são de linhas específicas (formato não suportado, arquivo inválido, erro geral)
+        falhou = (
+            errors and not created_count and not updated_count
+            and not all('Linha ' in erro for erro in errors)
+        )
+        if falhou:
+            importacao.status = ImportacaoArquivo.STATUS_ERRO
+            importacao.mensagem = errors[0]
+        else:
+            importacao.status = ImportacaoArquivo.STATUS_CONCLUIDA
+            # Depois da importação (gravações já confirmadas): base para reconhecer um reenvio idêntico
+            importacao.versoes_modelos = utils.versoes_modelos(
+                *(apps.get_model('app', nome) for nome in MODELOS_IMPORTACAO[importacao.tipo])
+            )
+        importacao.finalizado_em = timezone.now()
+        importacao.save()
+        return importacao
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        ImportacaoArquivo.objects.filter(pk=pk).update(
+            status=ImportacaoArquivo.STATUS_ERRO,
+            mensagem=f'Erro ao importar arquivo: {str(e)}',
+            finalizado_em=timezone.now(),
+        )
+        return ImportacaoArquivo.objects.filter(pk=pk).first()
+
+    finally:
+        _cache().delete(_chave_progresso(pk))
+        connection.close()
+
+
+def status_importacao(importacao, limite_erros=10):
+    """Dicionário (JSON) com a situação de uma importação, para a consulta de progresso"""
+    from django.urls import reverse
+
+    arquivo = importacao.nome_arquivo
+    adicionais = importacao.parametros.get('arquivos_adicionais')
+    if adicionais:
+        arquivo = f'{arquivo} (+{len(adicionais)} arquivo(s))'
+
+    dados = {
+        'id': importacao.pk,
+        'tipo': importacao.tipo,
+        'tipo_display': importacao.get_tipo_display(),
+        'arquivo': arquivo,
+        'status': importacao.status,
+        'status_display': importacao.get_status_display(),
+        'finalizada': importacao.finalizada,
+        'percentual': 100 if importacao.finalizada else 0,
+        'etapa': '',
+        'created': importacao.registros_criados,
+        'updated': importacao.registros_atualizados,
+        'total_erros': importacao.total_erros,
+        'erros': importacao.erros[:limite_erros],
+        'arquivos': importacao.detalhes,
+        'mensagem': importacao.mensagem,
+        'criado_em': importacao.created_at.isoformat() if importacao.created_at else None,
+        'iniciado_em': importacao.iniciado_em.isoformat() if importacao.iniciado_em else None,
+        'finalizado_em': importacao.finalizado_em.isoformat() if importacao.finalizado_em else None,
+        'url_destino': reverse(PAGINAS_DESTINO[importacao.tipo]) if importacao.tipo in PAGINAS_DESTINO else None,
+    }
+    if importacao.status == importacao.STATUS_PROCESSANDO:
+        dados.update(obter_progresso(importacao.pk))
+    return dados
@@ -0,0 +1,17 @@
+"""
+Management command para recalcular o perfil dos campos e os problemas de qualidade das ordens corretivas
+Usage: python manage.py atualizar_qualidade_ordens
+"""
+from django.core.management.base import BaseCommand
+
+from app.utils import atualizar_qualidade_ordens
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o perfil dos campos das ordens corretivas e os problemas de qualidade de cada ordem'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Analisando a qualidade dos dados das ordens corretivas')
+        total, com_problemas = atualizar_qualidade_ordens()
+        self.stdout.write(f'  {total} ordem(ns) analisada(s), {com_problemas} com problema(s)')
+        self.stdout.write(self.style.SUCCESS('Concluído'))
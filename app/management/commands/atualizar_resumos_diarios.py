@@ -0,0 +1,50 @@
+"""
+Management command para recalcular os resumos diários dos dashboards
+Usage: python manage.py atualizar_resumos_diarios [--desde AAAA-MM-DD] [--ate AAAA-MM-DD]
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.utils import atualizar_resumo_ordens, atualizar_resumo_requisicoes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os resumos diários de requisições, ordens de serviço e paradas (sem datas: recalcula tudo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Primeiro dia a recalcular (AAAA-MM-DD)',
+        )
+        parser.add_argument(
+            '--ate',
+            help='Último dia a recalcular (AAAA-MM-DD, padrão: hoje quando --desde é informado)',
+        )
+
+    def _data(self, valor, opcao):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{opcao} deve estar no formato AAAA-MM-DD')
+
+    def handle(self, *args, **options):
+        dias = None
+        if options['desde'] or options['ate']:
+            if not options['desde']:
+                raise CommandError('--ate exige --desde')
+            desde = self._data(options['desde'], '--desde')
+            ate = self._data(options['ate'], '--ate') if options['ate'] else datetime.now().date()
+            if ate < desde:
+                raise CommandError('--ate deve ser igual ou posterior a --desde')
+            dias = [desde + timedelta(days=n) for n in range((ate - desde).days + 1)]
+            self.stdout.write(f'Recalculando resumos de {desde:%d/%m/%Y} a {ate:%d/%m/%Y} ({len(dias)} dias)')
+        else:
+            self.stdout.write('Recalculando todos os resumos diários')
+
+        linhas_requisicoes = atualizar_resumo_requisicoes(dias)
+        self.stdout.write(f'  Requisições: {linhas_requisicoes} linhas de resumo')
+        linhas_ordens = atualizar_resumo_ordens(dias)
+        self.stdout.write(f'  Ordens de serviço e paradas: {linhas_ordens} linhas de resumo')
+
+        self.stdout.write(self.style.SUCCESS('Concluído'))
@@ -0,0 +1,23 @@
+"""
+Management command para converter agendamentos periódicos gravados uma linha por data em recorrências
+Usage: python manage.py converter_agendamentos_periodicos
+"""
+from django.core.management.base import BaseCommand
+
+from app.models import AgendamentoCronograma
+from app.utils import converter_agendamentos_periodicos
+
+
+class Command(BaseCommand):
+    help = 'Substitui os AgendamentoCronograma periódicos (uma linha por data) por RecorrenciaAgendamento'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Agendamentos periódicos: {AgendamentoCronograma.objects.filter(periodicidade__gt=0).count()}'
+        )
+
+        recorrencias, removidos = converter_agendamentos_periodicos()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {recorrencias} recorrência(s) criada(s), {removidos} agendamento(s) substituído(s)'
+        ))
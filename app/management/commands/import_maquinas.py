@@ -47,11 +47,8 @@ class Command(BaseCommand):
             if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
                 data = read_excel_file(file_path)
             elif file_name.endswith('.csv'):
-                # Tentar diferentes encodings
-                try:
-                    data = read_csv_file(file_path, encoding='utf-8')
-                except UnicodeDecodeError:
-                    data = read_csv_file(file_path, encoding='latin-1')
+                # Encoding detectado pela amostra inicial do arquivo
+                data = read_csv_file(file_path)
             else:
                 raise CommandError("Formato de arquivo não suportado. Use .xlsx, .xls, .xlsm ou .csv")
             
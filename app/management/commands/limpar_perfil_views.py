@@ -0,0 +1,24 @@
+"""
+Management command para descartar os resumos de perfil das views fora da janela de retenção
+Usage: python manage.py limpar_perfil_views [--dias N]
+"""
+from django.core.management.base import BaseCommand
+
+from app.utils import limpar_perfil_views
+
+
+class Command(BaseCommand):
+    help = 'Exclui os resumos diários de perfil das views mais antigos que PERFIL_REQUISICOES_DIAS dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Dias mantidos (padrão: settings.PERFIL_REQUISICOES_DIAS)',
+        )
+
+    def handle(self, *args, **options):
+        excluidos = limpar_perfil_views(options['dias'])
+        self.stdout.write(f'  {excluidos} resumo(s) excluído(s)')
+        self.stdout.write(self.style.SUCCESS('Concluído'))
@@ -0,0 +1,82 @@
+"""
+Management command para preencher as colunas de data tipadas de OrdemServicoCorretiva
+Usage: python manage.py preencher_datas_ordens [--chunk-size 2000] [--todas]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from app.models import OrdemServicoCorretiva, CAMPOS_DATA_ORDEM
+from app.utils import agendar_invalidacao_cache
+
+
+class Command(BaseCommand):
+    help = 'Preenche as colunas de data tipadas (dt_*_dt) das ordens de serviço a partir dos campos texto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Quantidade de ordens processadas e gravadas por lote (padrão: 2000)',
+        )
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Reprocessar todas as ordens, e não apenas as que têm data texto sem data tipada',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0:
+            raise CommandError('--chunk-size deve ser maior que zero')
+
+        campos_texto = [campo for campo, _ in CAMPOS_DATA_ORDEM]
+        campos_tipados = [campo_tipado for _, campo_tipado in CAMPOS_DATA_ORDEM]
+
+        queryset = OrdemServicoCorretiva.objects.all()
+        if not options['todas']:
+            # Apenas ordens com alguma data texto preenchida e a coluna tipada ainda vazia
+            pendentes = Q()
+            for campo, campo_tipado in CAMPOS_DATA_ORDEM:
+                pendentes |= (
+                    Q(**{f'{campo}__isnull': False})
+                    & ~Q(**{campo: ''})
+                    & Q(**{f'{campo_tipado}__isnull': True})
+                )
+            queryset = queryset.filter(pendentes)
+
+        total = queryset.count()
+        self.stdout.write(f'Ordens a processar: {total}')
+
+        processadas = 0
+        sem_data_valida = 0
+        ultimo_id = 0
+        while True:
+            # Paginação por id (keyset) para não depender de OFFSET em tabelas grandes
+            lote = list(
+                queryset.filter(id__gt=ultimo_id)
+                .order_by('id')
+                .only('id', *campos_texto, *campos_tipados)[:chunk_size]
+            )
+            if not lote:
+                break
+
+            for ordem in lote:
+                ordem.preencher_datas_tipadas()
+                if not any(getattr(ordem, campo_tipado) for campo_tipado in campos_tipados):
+                    sem_data_valida += 1
+
+            with transaction.atomic():
+                OrdemServicoCorretiva.objects.bulk_update(lote, campos_tipados)
+                agendar_invalidacao_cache(OrdemServicoCorretiva)
+
+            processadas += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f'  {processadas}/{total} ordens processadas')
+
+        self.stdout.write(self.style.SUCCESS(f'Concluído: {processadas} ordens atualizadas'))
+        if sem_data_valida:
+            self.stdout.write(
+                self.style.WARNING(f'{sem_data_valida} ordens sem nenhuma data em formato reconhecido')
+            )
@@ -0,0 +1,54 @@
+"""
+Management command para processar as importações em segundo plano que ficaram pendentes
+(por exemplo, quando o servidor foi reiniciado antes de o worker executá-las)
+Usage: python manage.py processar_importacoes [--horas-interrompidas N]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.importacoes import executar_importacao
+from app.models import ImportacaoArquivo
+
+
+class Command(BaseCommand):
+    help = 'Executa as importações pendentes e marca como erro as que ficaram interrompidas em processamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas-interrompidas',
+            type=float,
+            default=6,
+            help='Importações em processamento há mais horas que isso são consideradas interrompidas (padrão: 6)',
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas_interrompidas'])
+        interrompidas = ImportacaoArquivo.objects.filter(
+            status=ImportacaoArquivo.STATUS_PROCESSANDO, iniciado_em__lt=limite,
+        ).update(
+            status=ImportacaoArquivo.STATUS_ERRO,
+            mensagem='Importação interrompida (o servidor foi reiniciado durante o processamento). Envie o mesmo arquivo '
+                     'novamente: ordens corretivas e roteiros continuam do último bloco gravado.',
+            finalizado_em=timezone.now(),
+        )
+        if interrompidas:
+            self.stdout.write(self.style.WARNING(f'{interrompidas} importação(ões) interrompida(s) marcada(s) como erro'))
+
+        pendentes = list(ImportacaoArquivo.objects.filter(
+            status=ImportacaoArquivo.STATUS_PENDENTE,
+        ).order_by('created_at').values_list('pk', flat=True))
+        self.stdout.write(f'{len(pendentes)} importação(ões) pendente(s)')
+
+        for pk in pendentes:
+            importacao = executar_importacao(pk)
+            if importacao is None:
+                continue
+            self.stdout.write(
+                f'  #{importacao.pk} {importacao.get_tipo_display()} - {importacao.nome_arquivo}: '
+                f'{importacao.get_status_display()} ({importacao.registros_criados} criado(s), '
+                f'{importacao.registros_atualizados} atualizado(s), {importacao.total_erros} erro(s))'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Concluído'))
@@ -0,0 +1,22 @@
+"""
+Management command para reconstruir a tabela que liga ordens e fichas aos manutentores executores
+Usage: python manage.py reconstruir_execucoes_manutentores
+"""
+from django.core.management.base import BaseCommand
+
+from app.models import Manutentor, OrdemServicoCorretiva, OrdemServicoCorretivaFicha
+from app.utils import reconstruir_execucoes_manutentores
+
+
+class Command(BaseCommand):
+    help = 'Resolve o executor de todas as ordens e fichas (código ou nome) e reconstrói ExecucaoManutentor'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Manutentores: {Manutentor.objects.count()} | Ordens: {OrdemServicoCorretiva.objects.count()} | '
+            f'Fichas: {OrdemServicoCorretivaFicha.objects.count()}'
+        )
+
+        total_execucoes = reconstruir_execucoes_manutentores()
+
+        self.stdout.write(self.style.SUCCESS(f'Concluído: {total_execucoes} ordens/fichas vinculadas a manutentores'))
@@ -0,0 +1,22 @@
+"""
+Management command para refazer os índices FTS5 da busca textual
+Usage: python manage.py reconstruir_indice_busca
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from app.busca import INDICES_BUSCA, busca_disponivel, reconstruir_indice_busca
+
+
+class Command(BaseCommand):
+    help = 'Refaz os índices de busca textual (FTS5) de máquinas, estoque, planos e notas fiscais'
+
+    def handle(self, *args, **options):
+        for nome_modelo in INDICES_BUSCA:
+            model = apps.get_model('app', nome_modelo)
+            if not busca_disponivel(model):
+                self.stdout.write(self.style.WARNING(f'  {nome_modelo}: índice FTS5 indisponível neste banco'))
+                continue
+            total = reconstruir_indice_busca(model)
+            self.stdout.write(f'  {nome_modelo}: {total} registro(s) indexado(s)')
+        self.stdout.write(self.style.SUCCESS('Concluído'))
@@ -0,0 +1,25 @@
+"""
+Management command para reconstruir a tabela de correspondência entre Plano e Roteiro de preventiva
+Usage: python manage.py reconstruir_relacionamentos_preventiva
+"""
+from django.core.management.base import BaseCommand
+
+from app.models import PlanoPreventiva, RoteiroPreventiva, RelacionamentoPlanoRoteiro
+from app.utils import atualizar_relacionamentos_preventiva
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as chaves de relacionamento e reconstrói RelacionamentoPlanoRoteiro para todos os planos e roteiros'
+
+    def handle(self, *args, **options):
+        planos = list(PlanoPreventiva.objects.all())
+        roteiros = list(RoteiroPreventiva.objects.all())
+        self.stdout.write(f'Planos: {len(planos)} | Roteiros: {len(roteiros)}')
+
+        atualizar_relacionamentos_preventiva(planos=planos, roteiros=roteiros)
+
+        total_relacionamentos = RelacionamentoPlanoRoteiro.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {total_relacionamentos} relacionamentos, '
+            f'{len(planos) - total_relacionamentos} planos sem roteiro correspondente'
+        ))
@@ -1,7 +1,21 @@
 """
-Custom middleware to disable caching in development
+Custom middleware to disable caching in development and to profile requests
 """
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
 from django.conf import settings
+from django.db import connections
+
+from app.utils import registrar_perfil_view
+
+# Parâmetro GET que ativa o perfil de uma requisição de usuário staff (ex.: /home/?_perfil=1)
+PARAMETRO_PERFIL = '_perfil'
+
+# Perfil da requisição em andamento na thread (None quando o perfil não está ativo)
+_perfil_local = threading.local()
 
 
 class DisableCacheMiddleware:
@@ -32,3 +46,118 @@ class DisableCacheMiddleware:
         
         return response
 
+
+@contextmanager
+def medir_template():
+    """
+    Soma ao perfil ativo da thread o tempo da renderização mais externa de template
+    (usado pelo backend app.template_backends.DjangoTemplatesMedidos)
+    """
+    perfil = getattr(_perfil_local, 'perfil', None)
+    if perfil is None:
+        yield
+        return
+    perfil.profundidade_template += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        perfil.profundidade_template -= 1
+        if perfil.profundidade_template == 0:
+            # Templates renderizados dentro de outro (render_to_string em tags) já contam no externo
+            perfil.tempo_template += time.perf_counter() - inicio
+
+
+class _PerfilRequisicao:
+    """Consultas SQL e tempos de uma requisição (execute_wrapper das conexões)"""
+
+    def __init__(self):
+        self.consultas = []
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.inicio_view = None
+        self.profundidade_template = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.consultas.append((sql, repr(params)))
+
+    def metricas(self, tempo_total, fim):
+        """Resumo da requisição (tempos em ms)"""
+        repetidas = len(self.consultas) - len(set(self.consultas))
+        # O mesmo SQL com parâmetros diferentes várias vezes é o padrão de N+1
+        consulta_mais_repetida, repeticoes = Counter(
+            sql for sql, _ in self.consultas
+        ).most_common(1)[0] if self.consultas else ('', 0)
+        tempo_view = fim - self.inicio_view if self.inicio_view is not None else 0
+        return {
+            'consultas': len(self.consultas),
+            'consultas_repetidas': repetidas,
+            'tempo_total_ms': round(tempo_total * 1000, 2),
+            'tempo_db_ms': round(self.tempo_db * 1000, 2),
+            'tempo_view_ms': round(tempo_view * 1000, 2),
+            'tempo_template_ms': round(self.tempo_template * 1000, 2),
+            'consulta_mais_repetida': consulta_mais_repetida if repeticoes > 1 else '',
+            'repeticoes_consulta': repeticoes if repeticoes > 1 else 0,
+        }
+
+
+class PerfilRequisicaoMiddleware:
+    """
+    Perfil das requisições: consultas SQL (total e repetidas), tempo no banco, na view e
+    na renderização dos templates.
+
+    Ativo em todas as requisições com settings.PERFIL_REQUISICOES = True, ou em uma
+    requisição de usuário staff com ?_perfil=1. O resultado vai no cabeçalho Server-Timing
+    (aba Rede/Timing do navegador) e é somado por view e dia em ResumoDiarioPerfilView.
+    Deve ficar depois de AuthenticationMiddleware. O tempo dos templates é medido pelo
+    backend app.template_backends.DjangoTemplatesMedidos (settings.TEMPLATES).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _ativo(self, request):
+        if getattr(settings, 'PERFIL_REQUISICOES', False):
+            return True
+        if PARAMETRO_PERFIL not in request.GET:
+            return False
+        usuario = getattr(request, 'user', None)
+        return bool(usuario is not None and usuario.is_staff)
+
+    def __call__(self, request):
+        if not self._ativo(request):
+            return self.get_response(request)
+
+        perfil = _PerfilRequisicao()
+        _perfil_local.perfil = perfil
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as wrappers:
+                for alias in connections:
+                    wrappers.enter_context(connections[alias].execute_wrapper(perfil))
+                response = self.get_response(request)
+        finally:
+            _perfil_local.perfil = None
+        fim = time.perf_counter()
+
+        metricas = perfil.metricas(fim - inicio, fim)
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={metricas["tempo_total_ms"]}',
+            f'view;dur={metricas["tempo_view_ms"]};desc="View (inclui SQL e templates)"',
+            f'db;dur={metricas["tempo_db_ms"]};desc="SQL: {metricas["consultas"]} consultas, '
+            f'{metricas["consultas_repetidas"]} repetidas"',
+            f'tpl;dur={metricas["tempo_template_ms"]};desc="Templates"',
+        ))
+        if request.resolver_match is not None:
+            registrar_perfil_view(request.resolver_match.view_name, metricas)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        perfil = getattr(_perfil_local, 'perfil', None)
+        if perfil is not None:
+            perfil.inicio_view = time.perf_counter()
+        return None
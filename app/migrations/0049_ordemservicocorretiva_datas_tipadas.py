@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0048_add_dia_field_to_requisicao_almoxarifado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_aberordser_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Abertura Ordem Serviço (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_abertura_solicita_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Abertura Solicitação (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_encordmanu_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Encerramento Ordem Manutenção (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_entrada_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Entrada (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_fimparmanu_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Fim Parada Manutenção (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_iniparmanu_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Início Parada Manutenção (tipada)'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='dt_prev_exec_dt',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Prevista Execução (tipada)'),
+        ),
+    ]
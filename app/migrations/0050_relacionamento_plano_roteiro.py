@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0049_ordemservicocorretiva_datas_tipadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planopreventiva',
+            name='chave_relacionamento',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=40, verbose_name='Chave de Relacionamento'),
+        ),
+        migrations.AddField(
+            model_name='roteiropreventiva',
+            name='chave_relacionamento',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=40, verbose_name='Chave de Relacionamento'),
+        ),
+        migrations.CreateModel(
+            name='RelacionamentoPlanoRoteiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(db_index=True, max_length=40, verbose_name='Chave de Relacionamento')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('plano', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='relacionamento_roteiro', to='app.planopreventiva', verbose_name='Plano Preventiva')),
+                ('roteiro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionamentos_plano', to='app.roteiropreventiva', verbose_name='Roteiro Preventiva')),
+            ],
+            options={
+                'verbose_name': 'Relacionamento Plano/Roteiro',
+                'verbose_name_plural': 'Relacionamentos Plano/Roteiro',
+                'ordering': ['plano'],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0050_relacionamento_plano_roteiro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioOrdem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento', models.CharField(choices=[('abertura', 'Abertura da Solicitação'), ('entrada', 'Entrada'), ('encerramento', 'Encerramento')], max_length=20, verbose_name='Evento')),
+                ('dia', models.DateField(blank=True, null=True, verbose_name='Dia')),
+                ('descr_setormanut', models.CharField(blank=True, max_length=255, null=True, verbose_name='Descrição Setor Manutenção')),
+                ('descr_tpordservtv', models.CharField(blank=True, max_length=255, null=True, verbose_name='Descrição Tipo Ordem Serviço')),
+                ('cd_maquina', models.BigIntegerField(blank=True, null=True, verbose_name='Código Máquina')),
+                ('total', models.IntegerField(default=0, verbose_name='Quantidade de Ordens')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Ordens',
+                'verbose_name_plural': 'Resumos Diários de Ordens',
+                'ordering': ['evento', 'dia'],
+                'indexes': [models.Index(fields=['evento', 'dia'], name='app_resumod_evento_3bcfba_idx'), models.Index(fields=['evento', 'cd_maquina'], name='app_resumod_evento_ae1512_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioParada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('cd_maquina', models.BigIntegerField(blank=True, null=True, verbose_name='Código Máquina')),
+                ('horas_parada', models.FloatField(default=0, verbose_name='Horas de Parada')),
+                ('total_ordens', models.IntegerField(default=0, verbose_name='Ordens com Parada no Dia')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Parada',
+                'verbose_name_plural': 'Resumos Diários de Parada',
+                'ordering': ['dia', 'cd_maquina'],
+                'indexes': [models.Index(fields=['dia', 'cd_maquina'], name='app_resumod_dia_106fc1_idx'), models.Index(fields=['cd_maquina', 'dia'], name='app_resumod_cd_maqu_3cee00_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(blank=True, db_index=True, null=True, verbose_name='Dia')),
+                ('cd_centro_ativ', models.IntegerField(blank=True, null=True, verbose_name='Código Centro Atividade')),
+                ('cd_item', models.BigIntegerField(verbose_name='Código Item')),
+                ('total', models.IntegerField(default=0, verbose_name='Quantidade de Requisições')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Valor (com sinal)')),
+                ('valor_absoluto', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Valor Absoluto')),
+                ('quantidade_absoluta', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Quantidade Absoluta')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Requisições',
+                'verbose_name_plural': 'Resumos Diários de Requisições',
+                'ordering': ['dia', 'cd_centro_ativ', 'cd_item'],
+                'indexes': [models.Index(fields=['dia', 'cd_centro_ativ'], name='app_resumod_dia_b987b4_idx'), models.Index(fields=['dia', 'cd_item'], name='app_resumod_dia_600307_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0051_resumos_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('maquinas', 'Máquinas'), ('manutentores', 'Manutentores'), ('ordens_corretivas', 'Ordens Corretivas e Outros'), ('plano_preventiva', 'Plano Preventiva'), ('roteiro_preventiva', 'Roteiro Preventiva'), ('semanas_52', '52 Semanas'), ('notas_fiscais', 'Notas Fiscais'), ('requisicoes_almoxarifado', 'Requisições Almoxarifado'), ('requisicoes_almoxarifado_lote', 'Requisições Almoxarifado (lote)'), ('itens_estoque', 'Estoque'), ('cas', 'Locais e CAs')], max_length=40, verbose_name='Tipo')),
+                ('arquivo', models.FileField(upload_to='importacoes/%Y/%m/', verbose_name='Arquivo')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('erro', 'Erro')], db_index=True, default='pendente', max_length=20, verbose_name='Status')),
+                ('registros_criados', models.IntegerField(default=0, verbose_name='Registros Criados')),
+                ('registros_atualizados', models.IntegerField(default=0, verbose_name='Registros Atualizados')),
+                ('total_erros', models.IntegerField(default=0, verbose_name='Total de Erros')),
+                ('erros', models.JSONField(blank=True, default=list, verbose_name='Erros')),
+                ('detalhes', models.JSONField(blank=True, default=list, verbose_name='Detalhes por Arquivo')),
+                ('mensagem', models.TextField(blank=True, default='', verbose_name='Mensagem')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado em')),
+            ],
+            options={
+                'verbose_name': 'Importação de Arquivo',
+                'verbose_name_plural': 'Importações de Arquivos',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0052_importacao_arquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointImportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=40, verbose_name='Tipo')),
+                ('hash_arquivo', models.CharField(max_length=64, verbose_name='Hash do Arquivo (SHA-256)')),
+                ('nome_arquivo', models.CharField(blank=True, default='', max_length=255, verbose_name='Nome do Arquivo')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('ultima_linha', models.IntegerField(default=0, verbose_name='Última Linha Gravada')),
+                ('registros_criados', models.IntegerField(default=0, verbose_name='Registros Criados')),
+                ('registros_atualizados', models.IntegerField(default=0, verbose_name='Registros Atualizados')),
+                ('total_erros', models.IntegerField(default=0, verbose_name='Total de Erros')),
+                ('erros', models.JSONField(blank=True, default=list, verbose_name='Erros')),
+                ('blocos', models.JSONField(blank=True, default=list, verbose_name='Resumo por Bloco')),
+                ('estado', models.JSONField(blank=True, default=dict, verbose_name='Estado do Importador')),
+                ('concluida', models.BooleanField(default=False, verbose_name='Concluída')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Importação',
+                'verbose_name_plural': 'Checkpoints de Importação',
+                'ordering': ['-updated_at'],
+                'unique_together': {('tipo', 'hash_arquivo')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0053_checkpoint_importacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaoarquivo',
+            name='hash_arquivo',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Hash do Arquivo (SHA-256)'),
+        ),
+        migrations.AddField(
+            model_name='importacaoarquivo',
+            name='versoes_modelos',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Versões dos Modelos'),
+        ),
+    ]
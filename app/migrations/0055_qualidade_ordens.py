@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0054_importacao_hash_arquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilQualidadeOrdens',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_ordens', models.IntegerField(default=0, verbose_name='Ordens Analisadas')),
+                ('total_com_problemas', models.IntegerField(default=0, verbose_name='Ordens com Problemas')),
+                ('campos', models.JSONField(default=dict, verbose_name='Perfil dos Campos')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Qualidade das Ordens',
+                'verbose_name_plural': 'Perfis de Qualidade das Ordens',
+            },
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='problemas_qualidade',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Problemas de Qualidade'),
+        ),
+        migrations.AddField(
+            model_name='ordemservicocorretiva',
+            name='total_problemas_qualidade',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Total de Problemas de Qualidade'),
+        ),
+        migrations.AddIndex(
+            model_name='ordemservicocorretiva',
+            index=models.Index(condition=models.Q(('total_problemas_qualidade__gt', 0)), fields=['cd_ordemserv'], name='ordem_problemas_qualidade_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0055_qualidade_ordens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoManutentor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(help_text='Campo do executor usado na resolução', max_length=20, verbose_name='Campo de Origem')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('ficha', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='execucao_manutentor', to='app.ordemservicocorretivaficha', verbose_name='Ficha de Manutenção')),
+                ('manutentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='execucoes', to='app.manutentor', verbose_name='Manutentor')),
+                ('ordem', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='execucao_manutentor', to='app.ordemservicocorretiva', verbose_name='Ordem de Serviço')),
+            ],
+            options={
+                'verbose_name': 'Execução do Manutentor',
+                'verbose_name_plural': 'Execuções dos Manutentores',
+                'ordering': ['manutentor', 'ordem', 'ficha'],
+            },
+        ),
+    ]
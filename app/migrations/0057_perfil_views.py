@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0056_execucao_manutentor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioPerfilView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('view', models.CharField(max_length=200, verbose_name='View')),
+                ('requisicoes', models.PositiveIntegerField(default=0, verbose_name='Requisições')),
+                ('consultas', models.PositiveIntegerField(default=0, verbose_name='Consultas SQL')),
+                ('consultas_repetidas', models.PositiveIntegerField(default=0, verbose_name='Consultas Repetidas')),
+                ('max_consultas', models.PositiveIntegerField(default=0, verbose_name='Máximo de Consultas')),
+                ('tempo_total_ms', models.FloatField(default=0, verbose_name='Tempo Total (ms)')),
+                ('tempo_db_ms', models.FloatField(default=0, verbose_name='Tempo no Banco (ms)')),
+                ('tempo_view_ms', models.FloatField(default=0, verbose_name='Tempo da View (ms)')),
+                ('tempo_template_ms', models.FloatField(default=0, verbose_name='Tempo dos Templates (ms)')),
+                ('max_tempo_total_ms', models.FloatField(default=0, verbose_name='Maior Tempo Total (ms)')),
+                ('consulta_mais_repetida', models.TextField(blank=True, default='', verbose_name='Consulta Mais Repetida')),
+                ('repeticoes_consulta', models.PositiveIntegerField(default=0, verbose_name='Repetições da Consulta')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário do Perfil das Views',
+                'verbose_name_plural': 'Resumos Diários do Perfil das Views',
+                'ordering': ['-dia', 'view'],
+                'unique_together': {('dia', 'view')},
+            },
+        ),
+    ]
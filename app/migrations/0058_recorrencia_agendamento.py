@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:51
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0057_perfil_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecorrenciaAgendamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_agendamento', models.CharField(choices=[('maquina', 'Máquina'), ('plano', 'Plano Preventiva')], help_text='Tipo de item agendado: Máquina ou Plano Preventiva', max_length=10, verbose_name='Tipo de Agendamento')),
+                ('nome_grupo', models.CharField(blank=True, help_text='Nome identificador para este grupo de agendamentos (ex: "Manutenção Preventiva - Setor A")', max_length=255, null=True, verbose_name='Nome do Grupo')),
+                ('data_inicio', models.DateField(help_text='Data da primeira ocorrência', verbose_name='Data Inicial')),
+                ('periodicidade', models.PositiveIntegerField(help_text='Número de dias entre cada ocorrência', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Periodicidade (dias)')),
+                ('data_fim', models.DateField(help_text='Última data em que pode haver ocorrência', verbose_name='Data Final')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+                ('created_by', models.CharField(blank=True, help_text='Usuário que criou a recorrência', max_length=255, null=True, verbose_name='Criado por')),
+                ('maquina', models.ForeignKey(blank=True, help_text='Máquina agendada (usado quando tipo_agendamento = "maquina")', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recorrencias_cronograma', to='app.maquina', verbose_name='Máquina')),
+                ('plano_preventiva', models.ForeignKey(blank=True, help_text='Plano Preventiva agendado (usado quando tipo_agendamento = "plano")', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recorrencias_cronograma', to='app.meuplanopreventiva', verbose_name='Plano Preventiva')),
+            ],
+            options={
+                'verbose_name': 'Recorrência de Agendamento',
+                'verbose_name_plural': 'Recorrências de Agendamento',
+                'ordering': ['data_inicio', 'tipo_agendamento'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExcecaoRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_original', models.DateField(help_text='Data prevista pela regra da recorrência', verbose_name='Data Original')),
+                ('acao', models.CharField(choices=[('cancelada', 'Cancelada'), ('movida', 'Movida')], max_length=10, verbose_name='Ação')),
+                ('nova_data', models.DateField(blank=True, help_text='Nova data (quando a ocorrência foi movida)', null=True, verbose_name='Nova Data')),
+                ('observacoes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('created_by', models.CharField(blank=True, max_length=255, null=True, verbose_name='Criado por')),
+                ('recorrencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='app.recorrenciaagendamento', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Recorrência',
+                'verbose_name_plural': 'Exceções de Recorrência',
+                'ordering': ['recorrencia', 'data_original'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recorrenciaagendamento',
+            index=models.Index(fields=['data_inicio', 'data_fim'], name='app_recorre_data_in_54031c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recorrenciaagendamento',
+            index=models.Index(fields=['maquina'], name='app_recorre_maquina_33f23d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recorrenciaagendamento',
+            index=models.Index(fields=['plano_preventiva'], name='app_recorre_plano_p_dfdf34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='excecaorecorrencia',
+            index=models.Index(fields=['nova_data'], name='app_excecao_nova_da_546acb_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='excecaorecorrencia',
+            unique_together={('recorrencia', 'data_original')},
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def preencher_data_execucao(apps, schema_editor):
+    """Converte o dt_execucao (texto) dos planos existentes em data_execucao"""
+    MeuPlanoPreventiva = apps.get_model('app', 'MeuPlanoPreventiva')
+    planos = []
+    for plano in MeuPlanoPreventiva.objects.exclude(dt_execucao__isnull=True).exclude(dt_execucao='').only('id', 'dt_execucao'):
+        texto = plano.dt_execucao.strip()[:10]
+        for formato in ('%d/%m/%Y', '%Y-%m-%d', '%Y%m%d'):
+            try:
+                plano.data_execucao = datetime.strptime(texto, formato).date()
+                planos.append(plano)
+                break
+            except ValueError:
+                continue
+    MeuPlanoPreventiva.objects.bulk_update(planos, ['data_execucao'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0058_recorrencia_agendamento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meuplanopreventiva',
+            name='data_execucao',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data Execução (data)'),
+        ),
+        migrations.RunPython(preencher_data_execucao, migrations.RunPython.noop),
+    ]
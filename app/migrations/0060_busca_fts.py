@@ -0,0 +1,65 @@
+import unicodedata
+
+from django.db import OperationalError, migrations
+
+
+# Cópia congelada de app.busca.INDICES_BUSCA no momento desta migração (0060). Não alterar:
+# campos incluídos ou removidos em INDICES_BUSCA exigem uma nova migração que recrie as tabelas.
+INDICES_0060 = {
+    'Maquina': ('descr_maquina', 'cd_setormanut', 'descr_setormanut', 'nome_unid', 'nro_patrimonio'),
+    'ItemEstoque': ('descricao_item', 'descricao_dest_uso', 'unidade_medida', 'classificacao_tempo_sem_consumo'),
+    'MeuPlanoPreventiva': ('descr_maquina', 'descr_tarefa', 'descr_plano', 'nome_funcionario', 'cd_funcionario', 'cd_setor',
+                           'descr_setor', 'nome_unid', 'desc_detalhada_do_roteiro_preventiva', 'descr_seqplamanu'),
+    'NotaFiscal': ('nota', 'emitente', 'nome_fantasia_emitente', 'nome_unidade', 'situacao'),
+}
+
+
+def normalizar_busca(valor):
+    """Cópia congelada de app.busca.normalizar_busca (minúsculas, sem acentos) nesta migração"""
+    if valor is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor))
+    return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere)).casefold()
+
+
+def criar_indices_busca(apps, schema_editor):
+    """Cria e preenche as tabelas FTS5 (trigram); sem suporte no SQLite, a busca continua com LIKE"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome_modelo, campos in INDICES_0060.items():
+            model = apps.get_model('app', nome_modelo)
+            tabela = f'{model._meta.db_table}_busca'
+            try:
+                cursor.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS "{tabela}" USING fts5({', '.join(campos)}, tokenize='trigram')''')
+            except OperationalError:
+                # SQLite sem FTS5 ou sem o tokenizer trigram (anterior à 3.34)
+                return
+            cursor.execute(f'DELETE FROM "{tabela}"')
+            registros = [
+                [pk] + [normalizar_busca(valor) for valor in valores]
+                for pk, *valores in model.objects.values_list('pk', *campos).iterator(chunk_size=2000)
+            ]
+            cursor.executemany(
+                f'INSERT INTO "{tabela}" (rowid, {", ".join(campos)}) VALUES ({", ".join(["%s"] * (len(campos) + 1))})',
+                registros,
+            )
+
+
+def remover_indices_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome_modelo in INDICES_0060:
+            cursor.execute(f'DROP TABLE IF EXISTS "{apps.get_model("app", nome_modelo)._meta.db_table}_busca"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0059_meuplano_data_execucao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_busca, remover_indices_busca),
+    ]
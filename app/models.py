@@ -1,4 +1,10 @@
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 # Choices para o modelo Manutentor
@@ -123,6 +129,72 @@ class MaquinaDocumento(models.Model):
         nome_arquivo = self.arquivo.name.split('/')[-1] if self.arquivo else 'Sem arquivo'
         return f"{self.maquina.cd_maquina} - {nome_arquivo}"
 
+# Campos de data (texto, como vêm do sistema de origem) de OrdemServicoCorretiva
+# e as colunas tipadas/indexadas correspondentes, usadas nos filtros por período
+CAMPOS_DATA_ORDEM = (
+    ('dt_entrada', 'dt_entrada_dt'),
+    ('dt_abertura_solicita', 'dt_abertura_solicita_dt'),
+    ('dt_encordmanu', 'dt_encordmanu_dt'),
+    ('dt_iniparmanu', 'dt_iniparmanu_dt'),
+    ('dt_fimparmanu', 'dt_fimparmanu_dt'),
+    ('dt_prev_exec', 'dt_prev_exec_dt'),
+    ('dt_aberordser', 'dt_aberordser_dt'),
+)
+
+FORMATOS_DATA_ORDEM = (
+    '%d/%m/%Y %H:%M',       # 16/10/2024 15:17 (formato exportado)
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+    '%d-%m-%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%d/%m/%y %H:%M',
+    '%d/%m/%y',
+    '%d-%m-%y',
+)
+
+
+def parse_data_ordem(valor):
+    """
+    Converte uma data em texto de OrdemServicoCorretiva em datetime com fuso horário.
+    Retorna None se o valor estiver vazio ou em formato não reconhecido.
+    """
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        data = valor
+    else:
+        valor = str(valor).strip()
+        data = None
+        for formato in FORMATOS_DATA_ORDEM:
+            try:
+                data = datetime.strptime(valor, formato)
+                break
+            except ValueError:
+                continue
+        if data is None:
+            return None
+    if timezone.is_naive(data):
+        data = timezone.make_aware(data)
+    return data
+
+
+def intervalo_datas_ordem(data_inicio, data_fim):
+    """
+    Retorna os limites (início inclusivo, fim exclusivo) em datetime com fuso para filtrar
+    as colunas tipadas de OrdemServicoCorretiva entre duas datas (inclusive).
+    Ex.: filter(dt_entrada_dt__gte=inicio, dt_entrada_dt__lt=fim)
+    """
+    inicio = timezone.make_aware(datetime.combine(data_inicio, time.min))
+    fim = timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), time.min))
+    return inicio, fim
+
+
 class OrdemServicoCorretiva(models.Model):
     """Modelo para armazenar ordens de serviço corretivas e outros fechadas"""
     # Unidade
@@ -195,6 +267,19 @@ class OrdemServicoCorretiva(models.Model):
     cd_clasorigos = models.IntegerField('Código Classificação Origem OS', blank=True, null=True)
     descr_clasorigos = models.CharField('Descrição Classificação Origem OS', max_length=255, blank=True, null=True)
     
+    # Datas tipadas (derivadas dos campos texto acima, ver CAMPOS_DATA_ORDEM)
+    dt_entrada_dt = models.DateTimeField('Data Entrada (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_abertura_solicita_dt = models.DateTimeField('Data Abertura Solicitação (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_encordmanu_dt = models.DateTimeField('Data Encerramento Ordem Manutenção (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_iniparmanu_dt = models.DateTimeField('Data Início Parada Manutenção (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_fimparmanu_dt = models.DateTimeField('Data Fim Parada Manutenção (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_prev_exec_dt = models.DateTimeField('Data Prevista Execução (tipada)', blank=True, null=True, db_index=True, editable=False)
+    dt_aberordser_dt = models.DateTimeField('Data Abertura Ordem Serviço (tipada)', blank=True, null=True, db_index=True, editable=False)
+    
+    # Análise de qualidade dos dados importados (calculada por atualizar_qualidade_ordens)
+    problemas_qualidade = models.JSONField('Problemas de Qualidade', default=list, blank=True, editable=False)
+    total_problemas_qualidade = models.PositiveSmallIntegerField('Total de Problemas de Qualidade', default=0, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
     updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
@@ -203,6 +288,40 @@ class OrdemServicoCorretiva(models.Model):
         verbose_name = 'Ordem de Serviço Corretiva'
         verbose_name_plural = 'Ordens de Serviço Corretivas'
         ordering = ['-cd_ordemserv']
+        indexes = [
+            # Ordens com problemas de qualidade por intervalo de número (índice parcial)
+            models.Index(
+                fields=['cd_ordemserv'], condition=models.Q(total_problemas_qualidade__gt=0),
+                name='ordem_problemas_qualidade_idx',
+            ),
+        ]
+    
+    @staticmethod
+    def datas_tipadas(dados):
+        """
+        Calcula as colunas tipadas para os campos de data presentes em um dicionário
+        de dados (usado pelos importadores em lote, que não passam pelo save()).
+        """
+        return {
+            campo_tipado: parse_data_ordem(dados[campo])
+            for campo, campo_tipado in CAMPOS_DATA_ORDEM
+            if campo in dados
+        }
+    
+    def preencher_datas_tipadas(self):
+        """Atualiza as colunas tipadas a partir dos campos de data em texto"""
+        for campo, campo_tipado in CAMPOS_DATA_ORDEM:
+            setattr(self, campo_tipado, parse_data_ordem(getattr(self, campo)))
+    
+    def save(self, *args, **kwargs):
+        """Sobrescrever save para manter as datas tipadas sincronizadas"""
+        self.preencher_datas_tipadas()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                campo_tipado for campo, campo_tipado in CAMPOS_DATA_ORDEM if campo in update_fields
+            }
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.cd_ordemserv} - {self.descr_maquina or 'Sem descrição'}"
@@ -314,6 +433,49 @@ class ManutentorMaquina(models.Model):
     def __str__(self):
         return f"{self.manutentor.Matricula} - {self.maquina.cd_maquina}"
 
+class ExecucaoManutentor(models.Model):
+    """
+    Ordem de serviço ou ficha executada por um manutentor.
+
+    O executor é resolvido pelo código (cd_func_exec/cd_func_exec_os = Matrícula) ou,
+    sem código correspondente, pelo nome normalizado (nm_func_exec/nm_func_exec_os = Nome).
+    Mantida pelo importador de ordens corretivas (apenas os registros importados) e
+    reconstruída por completo com o comando reconstruir_execucoes_manutentores.
+    """
+    manutentor = models.ForeignKey(
+        Manutentor,
+        on_delete=models.CASCADE,
+        verbose_name='Manutentor',
+        related_name='execucoes'
+    )
+    ordem = models.OneToOneField(
+        OrdemServicoCorretiva,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Ordem de Serviço',
+        related_name='execucao_manutentor'
+    )
+    ficha = models.OneToOneField(
+        OrdemServicoCorretivaFicha,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Ficha de Manutenção',
+        related_name='execucao_manutentor'
+    )
+    campo = models.CharField('Campo de Origem', max_length=20, help_text='Campo do executor usado na resolução')
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Execução do Manutentor'
+        verbose_name_plural = 'Execuções dos Manutentores'
+        ordering = ['manutentor', 'ordem', 'ficha']
+
+    def __str__(self):
+        registro = f"OS {self.ordem_id}" if self.ordem_id else f"Ficha {self.ficha_id}"
+        return f"{self.manutentor_id} - {registro}"
+
 class ItemEstoque(models.Model):
     """Modelo para armazenar informações de itens de estoque"""
     estante = models.IntegerField('Estante', blank=True, null=True)
@@ -492,6 +654,9 @@ class PlanoPreventiva(models.Model):
         help_text='Roteiro preventiva relacionado que contém a descrição precisa (DESCR_SEQPLAMANU)'
     )
     
+    # Chave composta usada na correspondência exata com RoteiroPreventiva (ver RelacionamentoPlanoRoteiro)
+    chave_relacionamento = models.CharField('Chave de Relacionamento', max_length=40, blank=True, default='', db_index=True, editable=False)
+    
     created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
     updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
 
@@ -504,9 +669,36 @@ class PlanoPreventiva(models.Model):
             models.Index(fields=['cd_unid', 'cd_setor']),
         ]
 
+    # Campos que compõem chave_relacionamento (ver app.utils.chave_relacionamento_plano)
+    CAMPOS_CHAVE_RELACIONAMENTO = ('cd_maquina', 'descr_maquina', 'sequencia_tarefa', 'descr_tarefa', 'sequencia_manutencao')
+
+    def save(self, *args, **kwargs):
+        """Sobrescrever save para manter chave_relacionamento de acordo com os campos da chave"""
+        from app.utils import chave_relacionamento_hash, chave_relacionamento_plano
+        self.chave_relacionamento = chave_relacionamento_hash(chave_relacionamento_plano(self))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_CHAVE_RELACIONAMENTO):
+            kwargs['update_fields'] = {*update_fields, 'chave_relacionamento'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Plano {self.numero_plano} - Máquina {self.cd_maquina} - Seq {self.sequencia_manutencao}"
 
+# Formatos aceitos em dt_execucao dos planos preventiva
+FORMATOS_DATA_EXECUCAO = ('%d/%m/%Y', '%Y-%m-%d', '%Y%m%d')
+
+
+def data_execucao_plano(dt_execucao):
+    """Converte dt_execucao (texto DD/MM/AAAA, AAAA-MM-DD ou AAAAMMDD) em date; None se vazio ou inválido"""
+    texto = (dt_execucao or '').strip()[:10]
+    for formato in FORMATOS_DATA_EXECUCAO:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
 class MeuPlanoPreventiva(models.Model):
     """Modelo para armazenar dados de plano de manutenção preventiva com descrição detalhada do roteiro"""
     # Unidade
@@ -532,6 +724,8 @@ class MeuPlanoPreventiva(models.Model):
     
     # Execução
     dt_execucao = models.CharField('Data Execução', max_length=50, blank=True, null=True, help_text='Data no formato DD/MM/YYYY')
+    # dt_execucao convertida em data (preenchida no save), usada nos filtros por período
+    data_execucao = models.DateField('Data Execução (data)', blank=True, null=True, db_index=True, editable=False)
     quantidade_periodo = models.IntegerField('Quantidade Período', blank=True, null=True, help_text='Período em dias')
     
     # Tarefa
@@ -582,6 +776,14 @@ class MeuPlanoPreventiva(models.Model):
             models.Index(fields=['cd_unid', 'cd_setor']),
         ]
 
+    def save(self, *args, **kwargs):
+        """Sobrescrever save para manter data_execucao de acordo com dt_execucao"""
+        self.data_execucao = data_execucao_plano(self.dt_execucao)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'dt_execucao' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'data_execucao'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Meu Plano {self.numero_plano} - Máquina {self.cd_maquina} - Seq {self.sequencia_manutencao}"
 
@@ -715,24 +917,23 @@ class AgendamentoCronograma(models.Model):
     def clean(self):
         """Validação: deve ter máquina OU plano, dependendo do tipo"""
         if self.tipo_agendamento == 'maquina' and not self.maquina:
-            raise models.ValidationError('Quando o tipo é "maquina", é necessário informar a máquina.')
+            raise ValidationError('Quando o tipo é "maquina", é necessário informar a máquina.')
         if self.tipo_agendamento == 'plano' and not self.plano_preventiva:
-            raise models.ValidationError('Quando o tipo é "plano", é necessário informar o plano preventiva.')
+            raise ValidationError('Quando o tipo é "plano", é necessário informar o plano preventiva.')
         if self.tipo_agendamento == 'maquina' and self.plano_preventiva:
-            raise models.ValidationError('Não é possível ter máquina e plano ao mesmo tempo.')
+            raise ValidationError('Não é possível ter máquina e plano ao mesmo tempo.')
         if self.tipo_agendamento == 'plano' and self.maquina:
-            raise models.ValidationError('Não é possível ter máquina e plano ao mesmo tempo.')
+            raise ValidationError('Não é possível ter máquina e plano ao mesmo tempo.')
     
     def save(self, *args, **kwargs):
         """Sobrescrever save para calcular semana automaticamente"""
-        from app.models import Semana52
+        from app.utils import indice_semanas
         if self.data_planejada:
-            # Tentar encontrar a semana correspondente
-            semana_encontrada = Semana52.objects.filter(
-                inicio__lte=self.data_planejada,
-                fim__gte=self.data_planejada
-            ).first()
-            self.semana = semana_encontrada
+            # Semana já atribuída que contém a data (ex.: resolvida em memória por
+            # ReferenciasImportacao) é mantida; senão, buscar no índice das semanas
+            semana = self.semana if self._meta.get_field('semana').is_cached(self) else None
+            if not (semana and semana.inicio and semana.fim and semana.inicio <= self.data_planejada <= semana.fim):
+                self.semana = indice_semanas().semana(self.data_planejada)
         self.full_clean()
         super().save(*args, **kwargs)
     
@@ -743,6 +944,209 @@ class AgendamentoCronograma(models.Model):
             return f"Plano {self.plano_preventiva.numero_plano} - Máquina {self.plano_preventiva.cd_maquina} - {self.data_planejada.strftime('%d/%m/%Y')}"
         return f"Agendamento {self.tipo_agendamento} - {self.data_planejada.strftime('%d/%m/%Y')}"
 
+class RecorrenciaAgendamento(models.Model):
+    """
+    Agendamento periódico de uma máquina ou plano preventiva no cronograma planejado.
+
+    Guarda apenas a regra (data inicial, periodicidade e data final); as ocorrências são
+    geradas sob demanda para o intervalo consultado (ver ocorrencias). Datas canceladas ou
+    movidas ficam em ExcecaoRecorrencia.
+    """
+    tipo_agendamento = models.CharField(
+        'Tipo de Agendamento',
+        max_length=10,
+        choices=AgendamentoCronograma.TIPO_AGENDAMENTO,
+        help_text='Tipo de item agendado: Máquina ou Plano Preventiva'
+    )
+    maquina = models.ForeignKey(
+        Maquina,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name='Máquina',
+        related_name='recorrencias_cronograma',
+        help_text='Máquina agendada (usado quando tipo_agendamento = "maquina")'
+    )
+    plano_preventiva = models.ForeignKey(
+        MeuPlanoPreventiva,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name='Plano Preventiva',
+        related_name='recorrencias_cronograma',
+        help_text='Plano Preventiva agendado (usado quando tipo_agendamento = "plano")'
+    )
+    nome_grupo = models.CharField(
+        'Nome do Grupo',
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text='Nome identificador para este grupo de agendamentos (ex: "Manutenção Preventiva - Setor A")'
+    )
+    data_inicio = models.DateField('Data Inicial', help_text='Data da primeira ocorrência')
+    periodicidade = models.PositiveIntegerField(
+        'Periodicidade (dias)',
+        validators=[MinValueValidator(1)],
+        help_text='Número de dias entre cada ocorrência'
+    )
+    data_fim = models.DateField('Data Final', help_text='Última data em que pode haver ocorrência')
+    observacoes = models.TextField('Observações', blank=True, null=True)
+
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+    updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
+    created_by = models.CharField('Criado por', max_length=255, blank=True, null=True, help_text='Usuário que criou a recorrência')
+
+    class Meta:
+        verbose_name = 'Recorrência de Agendamento'
+        verbose_name_plural = 'Recorrências de Agendamento'
+        ordering = ['data_inicio', 'tipo_agendamento']
+        indexes = [
+            models.Index(fields=['data_inicio', 'data_fim']),
+            models.Index(fields=['maquina']),
+            models.Index(fields=['plano_preventiva']),
+        ]
+
+    def clean(self):
+        """Validação: mesma regra de máquina OU plano de AgendamentoCronograma e datas em ordem"""
+        if self.tipo_agendamento == 'maquina' and not self.maquina_id:
+            raise ValidationError('Quando o tipo é "maquina", é necessário informar a máquina.')
+        if self.tipo_agendamento == 'plano' and not self.plano_preventiva_id:
+            raise ValidationError('Quando o tipo é "plano", é necessário informar o plano preventiva.')
+        if self.maquina_id and self.plano_preventiva_id:
+            raise ValidationError('Não é possível ter máquina e plano ao mesmo tempo.')
+        if self.data_inicio and self.data_fim and self.data_fim < self.data_inicio:
+            raise ValidationError('A data final não pode ser anterior à data inicial.')
+
+    def _intervalo(self, inicio=None, fim=None):
+        """Intervalo consultado limitado ao da recorrência e primeira data prevista nele"""
+        inicio = max(inicio, self.data_inicio) if inicio else self.data_inicio
+        fim = min(fim, self.data_fim) if fim else self.data_fim
+        passos = -(-(inicio - self.data_inicio).days // self.periodicidade)
+        return self.data_inicio + timedelta(days=passos * self.periodicidade), fim
+
+    def e_data_prevista(self, data):
+        """Indica se a data é uma ocorrência da regra (sem considerar as exceções)"""
+        return (
+            self.data_inicio <= data <= self.data_fim
+            and (data - self.data_inicio).days % self.periodicidade == 0
+        )
+
+    def datas_previstas(self, inicio=None, fim=None):
+        """Gera as datas da regra entre inicio e fim (inclusive), sem considerar as exceções"""
+        data, fim = self._intervalo(inicio, fim)
+        passo = timedelta(days=self.periodicidade)
+        while data <= fim:
+            yield data
+            data += passo
+
+    def _excecoes(self):
+        # Usa excecoes.all() para aproveitar prefetch_related('excecoes')
+        return {excecao.data_original: excecao for excecao in self.excecoes.all()}
+
+    def datas(self, inicio=None, fim=None):
+        """
+        Gera, em ordem, as datas das ocorrências entre inicio e fim (inclusive):
+        as previstas sem exceção e as movidas para dentro do intervalo.
+        """
+        excecoes = self._excecoes()
+        movidas = sorted(
+            excecao.nova_data for excecao in excecoes.values()
+            if excecao.acao == ExcecaoRecorrencia.ACAO_MOVIDA
+            and (inicio is None or excecao.nova_data >= inicio)
+            and (fim is None or excecao.nova_data <= fim)
+        )
+        previstas = (data for data in self.datas_previstas(inicio, fim) if data not in excecoes)
+        return heapq.merge(previstas, movidas)
+
+    def total_datas_previstas(self, inicio=None, fim=None):
+        """Quantidade de datas da regra entre inicio e fim (sem as exceções), sem gerá-las"""
+        primeira, ultima = self._intervalo(inicio, fim)
+        return (ultima - primeira).days // self.periodicidade + 1 if primeira <= ultima else 0
+
+    def total_datas(self, inicio=None, fim=None):
+        """Quantidade de ocorrências entre inicio e fim, calculada sem gerar as datas"""
+        primeira, ultima = self._intervalo(inicio, fim)
+        total = self.total_datas_previstas(inicio, fim)
+        for data_original, excecao in self._excecoes().items():
+            if primeira <= data_original <= ultima:
+                total -= 1
+            if excecao.acao == ExcecaoRecorrencia.ACAO_MOVIDA and \
+                    (inicio is None or excecao.nova_data >= inicio) and (fim is None or excecao.nova_data <= fim):
+                total += 1
+        return total
+
+    def ocorrencias(self, inicio=None, fim=None):
+        """
+        Gera as ocorrências entre inicio e fim como AgendamentoCronograma não salvos
+        (mesmos atributos usados pelas telas do cronograma), com a semana preenchida.
+        """
+        from app.utils import indice_semanas
+        semanas = indice_semanas()
+        for data in self.datas(inicio, fim):
+            ocorrencia = AgendamentoCronograma(
+                tipo_agendamento=self.tipo_agendamento,
+                maquina=self.maquina,
+                plano_preventiva=self.plano_preventiva,
+                nome_grupo=self.nome_grupo,
+                periodicidade=self.periodicidade,
+                data_planejada=data,
+                semana=semanas.semana(data),
+                observacoes=self.observacoes,
+                created_by=self.created_by,
+            )
+            ocorrencia.recorrencia = self
+            yield ocorrencia
+
+    def __str__(self):
+        item = self.maquina or self.plano_preventiva or self.tipo_agendamento
+        return f"{item} - a cada {self.periodicidade} dias de {self.data_inicio.strftime('%d/%m/%Y')} a {self.data_fim.strftime('%d/%m/%Y')}"
+
+class ExcecaoRecorrencia(models.Model):
+    """Ocorrência de uma RecorrenciaAgendamento cancelada ou movida para outra data"""
+    ACAO_CANCELADA = 'cancelada'
+    ACAO_MOVIDA = 'movida'
+    ACOES = (
+        (ACAO_CANCELADA, 'Cancelada'),
+        (ACAO_MOVIDA, 'Movida'),
+    )
+
+    recorrencia = models.ForeignKey(
+        RecorrenciaAgendamento,
+        on_delete=models.CASCADE,
+        related_name='excecoes',
+        verbose_name='Recorrência'
+    )
+    data_original = models.DateField('Data Original', help_text='Data prevista pela regra da recorrência')
+    acao = models.CharField('Ação', max_length=10, choices=ACOES)
+    nova_data = models.DateField('Nova Data', blank=True, null=True, help_text='Nova data (quando a ocorrência foi movida)')
+    observacoes = models.TextField('Observações', blank=True, null=True)
+
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+    created_by = models.CharField('Criado por', max_length=255, blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Exceção de Recorrência'
+        verbose_name_plural = 'Exceções de Recorrência'
+        ordering = ['recorrencia', 'data_original']
+        unique_together = [['recorrencia', 'data_original']]
+        indexes = [
+            models.Index(fields=['nova_data']),
+        ]
+
+    def clean(self):
+        """Validação: a data original deve ser prevista pela regra; nova data apenas quando movida"""
+        if self.recorrencia_id and self.data_original and not self.recorrencia.e_data_prevista(self.data_original):
+            raise ValidationError('A data original não é uma ocorrência desta recorrência.')
+        if self.acao == self.ACAO_MOVIDA and not self.nova_data:
+            raise ValidationError('Informe a nova data da ocorrência movida.')
+        if self.acao == self.ACAO_CANCELADA:
+            self.nova_data = None
+
+    def __str__(self):
+        if self.acao == self.ACAO_MOVIDA:
+            return f"{self.recorrencia} - {self.data_original.strftime('%d/%m/%Y')} movida para {self.nova_data.strftime('%d/%m/%Y')}"
+        return f"{self.recorrencia} - {self.data_original.strftime('%d/%m/%Y')} cancelada"
+
 class PlanoPreventivaDocumento(models.Model):
     """Modelo para armazenar documentos relacionados a planos de manutenção preventiva"""
     plano_preventiva = models.ForeignKey(
@@ -846,6 +1250,9 @@ class RoteiroPreventiva(models.Model):
         help_text='Máquina relacionada baseada no código da máquina'
     )
     
+    # Chave composta usada na correspondência exata com PlanoPreventiva (ver RelacionamentoPlanoRoteiro)
+    chave_relacionamento = models.CharField('Chave de Relacionamento', max_length=40, blank=True, default='', db_index=True, editable=False)
+    
     created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
     updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
 
@@ -860,9 +1267,54 @@ class RoteiroPreventiva(models.Model):
             models.Index(fields=['cd_planmanut']),
         ]
 
+    # Campos que compõem chave_relacionamento (ver app.utils.chave_relacionamento_roteiro)
+    CAMPOS_CHAVE_RELACIONAMENTO = ('cd_maquina', 'descr_maquina', 'cd_tarefamanu', 'descr_tarefamanu', 'seq_seqplamanu')
+
+    def save(self, *args, **kwargs):
+        """Sobrescrever save para manter chave_relacionamento de acordo com os campos da chave"""
+        from app.utils import chave_relacionamento_hash, chave_relacionamento_roteiro
+        # Chave gravada antes da alteração: os planos que a usavam também têm a correspondência refeita
+        self.chave_relacionamento_anterior = self.chave_relacionamento
+        self.chave_relacionamento = chave_relacionamento_hash(chave_relacionamento_roteiro(self))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_CHAVE_RELACIONAMENTO):
+            kwargs['update_fields'] = {*update_fields, 'chave_relacionamento'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Roteiro - Máquina {self.cd_maquina} - Plano {self.cd_planmanut} - Seq {self.seq_seqplamanu}"
 
+class RelacionamentoPlanoRoteiro(models.Model):
+    """
+    Correspondência exata entre PlanoPreventiva e RoteiroPreventiva.
+
+    Mantida pelos importadores de plano e roteiro (apenas para os registros
+    importados) e reconstruída por completo com o comando
+    reconstruir_relacionamentos_preventiva. Cada plano tem no máximo um roteiro.
+    """
+    plano = models.OneToOneField(
+        PlanoPreventiva,
+        on_delete=models.CASCADE,
+        verbose_name='Plano Preventiva',
+        related_name='relacionamento_roteiro'
+    )
+    roteiro = models.ForeignKey(
+        RoteiroPreventiva,
+        on_delete=models.CASCADE,
+        verbose_name='Roteiro Preventiva',
+        related_name='relacionamentos_plano'
+    )
+    chave = models.CharField('Chave de Relacionamento', max_length=40, db_index=True)
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Relacionamento Plano/Roteiro'
+        verbose_name_plural = 'Relacionamentos Plano/Roteiro'
+        ordering = ['plano']
+
+    def __str__(self):
+        return f"Plano {self.plano_id} - Roteiro {self.roteiro_id}"
+
 class RequisicaoAlmoxarifado(models.Model):
     """Modelo para armazenar requisições de itens retirados do almoxarifado"""
     # Data da requisição (fornecida pelo usuário durante a importação)
@@ -1226,4 +1678,259 @@ class DadosOrcamento(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.ano}/{self.mes:02d} - {self.conta_orcamentaria}"
\ No newline at end of file
+        return f"{self.ano}/{self.mes:02d} - {self.conta_orcamentaria}"
+
+
+# Data (coluna tipada de OrdemServicoCorretiva) usada em cada evento do resumo diário de ordens
+EVENTOS_RESUMO_ORDEM = (
+    ('abertura', 'Abertura da Solicitação', 'dt_abertura_solicita_dt'),
+    ('entrada', 'Entrada', 'dt_entrada_dt'),
+    ('encerramento', 'Encerramento', 'dt_encordmanu_dt'),
+)
+
+
+class ResumoDiarioRequisicao(models.Model):
+    """Resumo diário de RequisicaoAlmoxarifado por centro de atividade e item (tabela derivada)"""
+    dia = models.DateField('Dia', blank=True, null=True, db_index=True)
+    cd_centro_ativ = models.IntegerField('Código Centro Atividade', blank=True, null=True)
+    cd_item = models.BigIntegerField('Código Item')
+    total = models.IntegerField('Quantidade de Requisições', default=0)
+    valor = models.DecimalField('Valor (com sinal)', max_digits=18, decimal_places=2, default=0)
+    valor_absoluto = models.DecimalField('Valor Absoluto', max_digits=18, decimal_places=2, default=0)
+    quantidade_absoluta = models.DecimalField('Quantidade Absoluta', max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Requisições'
+        verbose_name_plural = 'Resumos Diários de Requisições'
+        ordering = ['dia', 'cd_centro_ativ', 'cd_item']
+        indexes = [
+            models.Index(fields=['dia', 'cd_centro_ativ']),
+            models.Index(fields=['dia', 'cd_item']),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - CA {self.cd_centro_ativ} - Item {self.cd_item}: {self.total}"
+
+
+class ResumoDiarioOrdem(models.Model):
+    """
+    Resumo diário de OrdemServicoCorretiva por setor, tipo de ordem e máquina (tabela derivada).
+
+    Cada ordem é contada uma vez por evento (ver EVENTOS_RESUMO_ORDEM), no dia local
+    da data correspondente; ordens sem data válida ficam com dia vazio.
+    """
+    EVENTO_CHOICES = [(evento, label) for evento, label, _ in EVENTOS_RESUMO_ORDEM]
+
+    evento = models.CharField('Evento', max_length=20, choices=EVENTO_CHOICES)
+    dia = models.DateField('Dia', blank=True, null=True)
+    descr_setormanut = models.CharField('Descrição Setor Manutenção', max_length=255, blank=True, null=True)
+    descr_tpordservtv = models.CharField('Descrição Tipo Ordem Serviço', max_length=255, blank=True, null=True)
+    cd_maquina = models.BigIntegerField('Código Máquina', blank=True, null=True)
+    total = models.IntegerField('Quantidade de Ordens', default=0)
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Ordens'
+        verbose_name_plural = 'Resumos Diários de Ordens'
+        ordering = ['evento', 'dia']
+        indexes = [
+            models.Index(fields=['evento', 'dia']),
+            models.Index(fields=['evento', 'cd_maquina']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_evento_display()} {self.dia} - Máquina {self.cd_maquina}: {self.total}"
+
+
+class ResumoDiarioParada(models.Model):
+    """Horas de parada por máquina e dia, a partir de dt_iniparmanu/dt_fimparmanu das ordens (tabela derivada)"""
+    dia = models.DateField('Dia')
+    cd_maquina = models.BigIntegerField('Código Máquina', blank=True, null=True)
+    horas_parada = models.FloatField('Horas de Parada', default=0)
+    total_ordens = models.IntegerField('Ordens com Parada no Dia', default=0)
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Parada'
+        verbose_name_plural = 'Resumos Diários de Parada'
+        ordering = ['dia', 'cd_maquina']
+        indexes = [
+            models.Index(fields=['dia', 'cd_maquina']),
+            models.Index(fields=['cd_maquina', 'dia']),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - Máquina {self.cd_maquina}: {self.horas_parada:.1f} h"
+
+
+class PerfilQualidadeOrdens(models.Model):
+    """
+    Perfil dos campos de OrdemServicoCorretiva usado na análise de qualidade (tabela derivada):
+    preenchimento, formatos de data e comprimentos de cada campo analisado.
+
+    Registro único, recalculado junto com os problemas de cada ordem por
+    atualizar_qualidade_ordens (comando ou worker das importações); as importações
+    avaliam apenas as ordens gravadas em relação a este perfil.
+    """
+    total_ordens = models.IntegerField('Ordens Analisadas', default=0)
+    total_com_problemas = models.IntegerField('Ordens com Problemas', default=0)
+    campos = models.JSONField('Perfil dos Campos', default=dict)
+    updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Perfil de Qualidade das Ordens'
+        verbose_name_plural = 'Perfis de Qualidade das Ordens'
+
+    def __str__(self):
+        return f"Perfil de {self.total_ordens} ordens ({self.total_com_problemas} com problemas)"
+
+
+class ResumoDiarioPerfilView(models.Model):
+    """
+    Perfil das requisições somado por view e dia (app.middleware.PerfilRequisicaoMiddleware):
+    consultas SQL, consultas repetidas e tempos. Os dias além de PERFIL_REQUISICOES_DIAS são
+    descartados pelo comando limpar_perfil_views.
+
+    consulta_mais_repetida guarda o SQL repetido mais vezes em uma única requisição da
+    view no dia (indício de N+1), com a quantidade de repetições.
+    """
+    dia = models.DateField('Dia')
+    view = models.CharField('View', max_length=200)
+    requisicoes = models.PositiveIntegerField('Requisições', default=0)
+    consultas = models.PositiveIntegerField('Consultas SQL', default=0)
+    consultas_repetidas = models.PositiveIntegerField('Consultas Repetidas', default=0)
+    max_consultas = models.PositiveIntegerField('Máximo de Consultas', default=0)
+    tempo_total_ms = models.FloatField('Tempo Total (ms)', default=0)
+    tempo_db_ms = models.FloatField('Tempo no Banco (ms)', default=0)
+    tempo_view_ms = models.FloatField('Tempo da View (ms)', default=0)
+    tempo_template_ms = models.FloatField('Tempo dos Templates (ms)', default=0)
+    max_tempo_total_ms = models.FloatField('Maior Tempo Total (ms)', default=0)
+    consulta_mais_repetida = models.TextField('Consulta Mais Repetida', blank=True, default='')
+    repeticoes_consulta = models.PositiveIntegerField('Repetições da Consulta', default=0)
+    updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumo Diário do Perfil das Views'
+        verbose_name_plural = 'Resumos Diários do Perfil das Views'
+        ordering = ['-dia', 'view']
+        unique_together = ['dia', 'view']
+
+    def __str__(self):
+        return f"{self.dia} - {self.view}: {self.requisicoes} requisição(ões)"
+
+    @property
+    def media_consultas(self):
+        return round(self.consultas / self.requisicoes, 1) if self.requisicoes else 0
+
+    @property
+    def media_tempo_total_ms(self):
+        return round(self.tempo_total_ms / self.requisicoes, 1) if self.requisicoes else 0
+
+
+class ImportacaoArquivo(models.Model):
+    """
+    Importação de arquivo processada em segundo plano (ver app.importacoes).
+
+    O arquivo enviado fica gravado em MEDIA_ROOT e é importado pelas mesmas funções
+    upload_*_from_file das telas; o progresso parcial fica no cache 'importacoes'.
+    As importações concluídas servem também de registro (hash do arquivo) para
+    reconhecer o reenvio de um arquivo idêntico.
+    """
+    TIPO_CHOICES = [
+        ('maquinas', 'Máquinas'),
+        ('manutentores', 'Manutentores'),
+        ('ordens_corretivas', 'Ordens Corretivas e Outros'),
+        ('plano_preventiva', 'Plano Preventiva'),
+        ('roteiro_preventiva', 'Roteiro Preventiva'),
+        ('semanas_52', '52 Semanas'),
+        ('notas_fiscais', 'Notas Fiscais'),
+        ('requisicoes_almoxarifado', 'Requisições Almoxarifado'),
+        ('requisicoes_almoxarifado_lote', 'Requisições Almoxarifado (lote)'),
+        ('itens_estoque', 'Estoque'),
+        ('cas', 'Locais e CAs'),
+    ]
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    tipo = models.CharField('Tipo', max_length=40, choices=TIPO_CHOICES)
+    arquivo = models.FileField('Arquivo', upload_to='importacoes/%Y/%m/')
+    nome_arquivo = models.CharField('Nome do Arquivo', max_length=255)
+    hash_arquivo = models.CharField('Hash do Arquivo (SHA-256)', max_length=64, blank=True, default='', db_index=True)
+    parametros = models.JSONField('Parâmetros', default=dict, blank=True)
+    # Versões das tabelas importadas ao fim da importação (ver app.utils.versoes_modelos):
+    # enquanto não mudarem, reenviar o mesmo arquivo não tem o que gravar
+    versoes_modelos = models.JSONField('Versões dos Modelos', default=dict, blank=True)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE, db_index=True)
+    registros_criados = models.IntegerField('Registros Criados', default=0)
+    registros_atualizados = models.IntegerField('Registros Atualizados', default=0)
+    total_erros = models.IntegerField('Total de Erros', default=0)
+    erros = models.JSONField('Erros', default=list, blank=True)
+    detalhes = models.JSONField('Detalhes por Arquivo', default=list, blank=True)
+    mensagem = models.TextField('Mensagem', blank=True, default='')
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+    iniciado_em = models.DateTimeField('Iniciado em', blank=True, null=True)
+    finalizado_em = models.DateTimeField('Finalizado em', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Importação de Arquivo'
+        verbose_name_plural = 'Importações de Arquivos'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.nome_arquivo} ({self.get_status_display()})"
+
+    @property
+    def finalizada(self):
+        return self.status in (self.STATUS_CONCLUIDA, self.STATUS_ERRO)
+
+
+class CheckpointImportacao(models.Model):
+    """
+    Ponto de retomada de uma importação gravada em blocos (ver ImportacaoRetomavel em app.utils).
+
+    Identificado pelo tipo e pelo hash do conteúdo do arquivo: importar de novo o mesmo
+    arquivo, com as mesmas opções, continua depois de ultima_linha em vez de recomeçar.
+    """
+    tipo = models.CharField('Tipo', max_length=40)
+    hash_arquivo = models.CharField('Hash do Arquivo (SHA-256)', max_length=64)
+    nome_arquivo = models.CharField('Nome do Arquivo', max_length=255, blank=True, default='')
+    parametros = models.JSONField('Parâmetros', default=dict, blank=True)
+    ultima_linha = models.IntegerField('Última Linha Gravada', default=0)
+    registros_criados = models.IntegerField('Registros Criados', default=0)
+    registros_atualizados = models.IntegerField('Registros Atualizados', default=0)
+    total_erros = models.IntegerField('Total de Erros', default=0)
+    erros = models.JSONField('Erros', default=list, blank=True)
+    blocos = models.JSONField('Resumo por Bloco', default=list, blank=True)
+    estado = models.JSONField('Estado do Importador', default=dict, blank=True)
+    concluida = models.BooleanField('Concluída', default=False)
+    created_at = models.DateTimeField('Data de Criação', auto_now_add=True)
+    updated_at = models.DateTimeField('Data de Atualização', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Checkpoint de Importação'
+        verbose_name_plural = 'Checkpoints de Importação'
+        ordering = ['-updated_at']
+        unique_together = [['tipo', 'hash_arquivo']]
+
+    def __str__(self):
+        situacao = 'concluída' if self.concluida else f'até a linha {self.ultima_linha}'
+        return f"{self.tipo} - {self.nome_arquivo} ({situacao})"
+
+    def reiniciar(self, parametros):
+        """Volta o checkpoint ao início (nova importação completa do arquivo)"""
+        self.parametros = parametros
+        self.ultima_linha = 0
+        self.registros_criados = 0
+        self.registros_atualizados = 0
+        self.total_erros = 0
+        self.erros = []
+        self.blocos = []
+        self.estado = {}
+        self.concluida = False
@@ -0,0 +1,118 @@
+"""
+Sinais do app: invalidação do cache dos dashboards, atualização dos índices de busca, dos
+resumos diários e da correspondência entre planos e roteiros quando registros são gravados
+ou excluídos
+"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from app.busca import INDICES_BUSCA, campos_indexados, indexar_registros, remover_registros
+from app.utils import (
+    agendar_atualizacao_resumos, agendar_invalidacao_cache, atualizar_relacionamentos_preventiva,
+    dias_resumo_ordem, dias_resumo_requisicao,
+)
+
+
+# Modelos lidos pelos resultados em cache: dashboards (contexto_dashboard_em_cache), calendários
+# (resposta_json_condicional) e o índice das semanas. Somados aos modelos das importações
+# (reconhecimento de reenvio idêntico), são os únicos com receptores de invalidação: nos demais
+# a exclusão continua sendo o DELETE direto do Django. As tabelas gravadas apenas pelas rotinas
+# em lote (relacionamentos, resumos diários, perfil de qualidade) já invalidam o cache nelas.
+MODELOS_EM_CACHE = (
+    'Maquina',
+    'MaquinaPrimariaSecundaria',
+    'PlanoPreventiva',
+    'RoteiroPreventiva',
+    'MeuPlanoPreventiva',
+    'MeuPlanoPreventivaDocumento',
+    'Semana52',
+    'OrdemServicoCorretiva',
+)
+
+
+def modelos_com_invalidacao():
+    """Nomes dos modelos que recebem os sinais de invalidação do cache"""
+    from app.importacoes import MODELOS_IMPORTACAO
+
+    nomes = set(MODELOS_EM_CACHE)
+    for modelos in MODELOS_IMPORTACAO.values():
+        nomes.update(modelos)
+    return nomes
+
+
+def invalidar_cache_dashboards(sender, **kwargs):
+    agendar_invalidacao_cache(sender)
+
+
+def atualizar_indice_busca(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(campos_indexados(sender)):
+        return
+    indexar_registros(sender, [instance])
+
+
+def remover_do_indice_busca(sender, instance, **kwargs):
+    remover_registros(sender, [instance.pk])
+
+
+# Modelo -> (função dos dias de resumo afetados por um registro, argumento de agendar_atualizacao_resumos)
+RESUMOS_POR_MODELO = {
+    'RequisicaoAlmoxarifado': (dias_resumo_requisicao, 'requisicoes'),
+    'OrdemServicoCorretiva': (dias_resumo_ordem, 'ordens'),
+}
+
+
+def guardar_dias_resumo_anteriores(sender, instance, raw=False, **kwargs):
+    # Na edição, os dias em que o registro estava antes também precisam ser recalculados
+    instance._dias_resumo_anteriores = set()
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    anterior = sender._base_manager.filter(pk=instance.pk).first()
+    if anterior is not None:
+        dias_resumo, _ = RESUMOS_POR_MODELO[sender.__name__]
+        instance._dias_resumo_anteriores = dias_resumo(anterior)
+
+
+def atualizar_resumos_diarios(sender, instance, **kwargs):
+    dias_resumo, argumento = RESUMOS_POR_MODELO[sender.__name__]
+    dias = dias_resumo(instance) | getattr(instance, '_dias_resumo_anteriores', set())
+    agendar_atualizacao_resumos(**{argumento: dias})
+
+
+def atualizar_relacionamento_plano(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(sender.CAMPOS_CHAVE_RELACIONAMENTO):
+        return
+    atualizar_relacionamentos_preventiva(planos=[instance])
+
+
+def atualizar_relacionamento_roteiro(sender, instance, update_fields=None, **kwargs):
+    # Na exclusão, os planos com a chave do roteiro passam para o próximo roteiro da mesma chave
+    if update_fields and not set(update_fields) & set(sender.CAMPOS_CHAVE_RELACIONAMENTO):
+        return
+    atualizar_relacionamentos_preventiva(roteiros=[instance])
+
+
+def conectar_sinais():
+    """
+    Conecta post_save e post_delete à invalidação do cache (modelos lidos pelos resultados em
+    cache), aos índices de busca, aos resumos diários e à correspondência entre planos e roteiros. Exclusões de
+    tabelas inteiras devem usar utils.excluir_todos_registros, que não envia sinais por registro.
+    """
+    com_invalidacao = modelos_com_invalidacao()
+    for model in apps.get_app_config('app').get_models():
+        if model.__name__ in com_invalidacao:
+            post_save.connect(invalidar_cache_dashboards, sender=model, dispatch_uid=f'cache_dashboards_save_{model.__name__}')
+            post_delete.connect(invalidar_cache_dashboards, sender=model, dispatch_uid=f'cache_dashboards_delete_{model.__name__}')
+        if model.__name__ in RESUMOS_POR_MODELO:
+            pre_save.connect(guardar_dias_resumo_anteriores, sender=model, dispatch_uid=f'resumos_diarios_pre_save_{model.__name__}')
+            post_save.connect(atualizar_resumos_diarios, sender=model, dispatch_uid=f'resumos_diarios_save_{model.__name__}')
+            post_delete.connect(atualizar_resumos_diarios, sender=model, dispatch_uid=f'resumos_diarios_delete_{model.__name__}')
+        if model.__name__ in INDICES_BUSCA:
+            post_save.connect(atualizar_indice_busca, sender=model, dispatch_uid=f'indice_busca_save_{model.__name__}')
+            post_delete.connect(remover_do_indice_busca, sender=model, dispatch_uid=f'indice_busca_delete_{model.__name__}')
+
+    # Plano excluído: a correspondência (RelacionamentoPlanoRoteiro.plano) é excluída em cascata
+    PlanoPreventiva = apps.get_model('app', 'PlanoPreventiva')
+    RoteiroPreventiva = apps.get_model('app', 'RoteiroPreventiva')
+    post_save.connect(atualizar_relacionamento_plano, sender=PlanoPreventiva, dispatch_uid='relacionamento_plano_save')
+    post_save.connect(atualizar_relacionamento_roteiro, sender=RoteiroPreventiva, dispatch_uid='relacionamento_roteiro_save')
+    post_delete.connect(atualizar_relacionamento_roteiro, sender=RoteiroPreventiva, dispatch_uid='relacionamento_roteiro_delete')
@@ -0,0 +1,29 @@
+"""
+Backend de templates que mede o tempo de renderização para o perfil das requisições
+(app.middleware.PerfilRequisicaoMiddleware). Configurado em settings.TEMPLATES.
+"""
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from app.middleware import medir_template
+
+
+class TemplateMedido(Template):
+    """Template do backend cuja renderização conta no perfil ativo da thread"""
+
+    def render(self, context=None, request=None):
+        with medir_template():
+            return super().render(context, request)
+
+
+class DjangoTemplatesMedidos(DjangoTemplates):
+    """DjangoTemplates que devolve TemplateMedido em vez de Template"""
+
+    def from_string(self, template_code):
+        return TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -1,3 +1,906 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Abs
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.busca import filtro_busca
+from app.importacoes import (
+    criar_importacao, enfileirar_importacao, executar_importacao, obter_progresso,
+)
+from app.models import (
+    AgendamentoCronograma, CheckpointImportacao, ExcecaoRecorrencia, ExecucaoManutentor,
+    ImportacaoArquivo, Manutentor, Maquina, OrdemServicoCorretiva, PlanoPreventiva,
+    RecorrenciaAgendamento, RelacionamentoPlanoRoteiro, RequisicaoAlmoxarifado, ResumoDiarioOrdem,
+    ResumoDiarioRequisicao, RoteiroPreventiva, Semana52, intervalo_datas_ordem,
+)
+from app.utils import (
+    BulkUpsert, ImportacaoRetomavel, IndiceManutentores, IndiceSemanas, atualizar_resumo_ordens,
+    contexto_dashboard_em_cache, excluir_todos_registros, indicadores_parada, intervalos_parada,
+    reconstruir_execucoes_manutentores, resposta_json_condicional,
+    upload_requisicoes_almoxarifado_from_file, versoes_modelos, vincular_execucoes_manutentores,
+)
+from app.views import _contexto_analise_faltantes_pelo_numero
+
+
+# Caches em memória: os testes não leem nem gravam as versões dos modelos do servidor
+CACHES_TESTE = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'testes-{alias}'}
+    for alias in ('default', 'dashboards', 'importacoes')
+}
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class BulkUpsertTests(TestCase):
+    """Mesma semântica dos get_or_create/update_or_create por linha que o BulkUpsert substituiu"""
+
+    def setUp(self):
+        Maquina.objects.create(cd_maquina=1, descr_maquina='PRENSA', nome_unid='MATRIZ')
+
+    def test_cria_e_atualiza(self):
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True)
+        upsert.add(2, {'cd_maquina': 1, 'descr_maquina': 'PRENSA HIDRAULICA'})
+        upsert.add(3, {'cd_maquina': 2, 'descr_maquina': 'TORNO'})
+        upsert.flush()
+
+        self.assertEqual((upsert.created_count, upsert.updated_count), (1, 1))
+        self.assertEqual(upsert.errors, [])
+        self.assertEqual(
+            dict(Maquina.objects.values_list('cd_maquina', 'descr_maquina')),
+            {1: 'PRENSA HIDRAULICA', 2: 'TORNO'},
+        )
+        # Campos ausentes na linha são mantidos
+        self.assertEqual(Maquina.objects.get(cd_maquina=1).nome_unid, 'MATRIZ')
+
+    def test_sem_update_existing_mantem_registros(self):
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=False)
+        upsert.add(2, {'cd_maquina': 1, 'descr_maquina': 'PRENSA HIDRAULICA'})
+        upsert.add(3, {'cd_maquina': 2, 'descr_maquina': 'TORNO'})
+        upsert.flush()
+
+        self.assertEqual((upsert.created_count, upsert.updated_count), (1, 0))
+        self.assertEqual(Maquina.objects.get(cd_maquina=1).descr_maquina, 'PRENSA')
+
+    def test_registro_identico_nao_e_gravado(self):
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True)
+        upsert.add(2, {'cd_maquina': 1, 'descr_maquina': 'PRENSA'})
+        with self.assertNumQueries(1):
+            upsert.flush()
+        self.assertEqual((upsert.updated_count, upsert.unchanged_count), (1, 1))
+
+    def test_chave_repetida_no_arquivo(self):
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True)
+        upsert.add(2, {'cd_maquina': 3, 'descr_maquina': 'FRESA'})
+        upsert.add(3, {'cd_maquina': 3, 'descr_maquina': 'FRESA CNC'})
+        upsert.flush()
+        self.assertEqual((upsert.created_count, upsert.updated_count), (1, 1))
+        self.assertEqual(Maquina.objects.get(cd_maquina=3).descr_maquina, 'FRESA CNC')
+
+        # Sem update_existing a primeira ocorrência prevalece
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=False)
+        upsert.add(2, {'cd_maquina': 4, 'descr_maquina': 'SERRA'})
+        upsert.add(3, {'cd_maquina': 4, 'descr_maquina': 'SERRA FITA'})
+        upsert.flush()
+        self.assertEqual((upsert.created_count, upsert.updated_count), (1, 0))
+        self.assertEqual(Maquina.objects.get(cd_maquina=4).descr_maquina, 'SERRA')
+
+    def test_lotes_menores_que_o_arquivo(self):
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True, batch_size=2)
+        for cd_maquina in range(1, 6):
+            upsert.add(cd_maquina, {'cd_maquina': cd_maquina, 'descr_maquina': f'MAQUINA {cd_maquina}'})
+        upsert.flush()
+        self.assertEqual((upsert.created_count, upsert.updated_count), (4, 1))
+        self.assertEqual(Maquina.objects.count(), 5)
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class RelacionamentoPlanoRoteiroTests(TestCase):
+    """Correspondência plano/roteiro mantida nas gravações e exclusões de um registro"""
+
+    def setUp(self):
+        self.plano = PlanoPreventiva.objects.create(
+            cd_maquina=10, descr_maquina='Prensa ', sequencia_tarefa=1,
+            descr_tarefa='Lubrificar', sequencia_manutencao=3,
+        )
+
+    def criar_roteiro(self, **campos):
+        valores = {
+            'cd_maquina': 10, 'descr_maquina': 'PRENSA', 'cd_tarefamanu': 1,
+            'descr_tarefamanu': 'LUBRIFICAR', 'seq_seqplamanu': 3, 'cd_planmanut': 1,
+        }
+        valores.update(campos)
+        return RoteiroPreventiva.objects.create(**valores)
+
+    def roteiro_do_plano(self):
+        relacionamento = RelacionamentoPlanoRoteiro.objects.filter(plano=self.plano).first()
+        return relacionamento.roteiro if relacionamento else None
+
+    def test_roteiro_gravado_e_relacionado(self):
+        roteiro = self.criar_roteiro()
+        self.assertEqual(roteiro.chave_relacionamento, self.plano.chave_relacionamento)
+        self.assertEqual(self.roteiro_do_plano(), roteiro)
+
+    def test_alteracao_da_chave(self):
+        roteiro = self.criar_roteiro()
+        roteiro.descr_tarefamanu = 'TROCAR OLEO'
+        roteiro.save()
+        self.assertIsNone(self.roteiro_do_plano())
+
+        # update_fields com um campo da chave também grava a chave nova
+        self.plano.descr_tarefa = 'Trocar oleo'
+        self.plano.save(update_fields=['descr_tarefa'])
+        self.plano.refresh_from_db()
+        self.assertEqual(self.plano.chave_relacionamento, roteiro.chave_relacionamento)
+        self.assertEqual(self.roteiro_do_plano(), roteiro)
+
+    def test_exclusao_passa_para_o_proximo_roteiro(self):
+        segundo = self.criar_roteiro(cd_planmanut=2)
+        primeiro = self.criar_roteiro(cd_planmanut=1)
+        # Primeiro roteiro da chave na ordenação padrão
+        self.assertEqual(self.roteiro_do_plano(), primeiro)
+
+        primeiro.delete()
+        self.assertEqual(self.roteiro_do_plano(), segundo)
+        segundo.delete()
+        self.assertIsNone(self.roteiro_do_plano())
+
+    def test_exclusao_do_plano(self):
+        self.criar_roteiro()
+        self.plano.delete()
+        self.assertFalse(RelacionamentoPlanoRoteiro.objects.exists())
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ResumoDiarioRequisicaoTests(TestCase):
+    """Resumo diário das requisições igual à agregação das requisições importadas"""
+
+    CABECALHO = 'CD_ITEM;DESCR_ITEM;CD_CENTRO_ATIV;QTDE_MOVTO_ESTOQ;VLR_MOVTO_ESTOQ\n'
+
+    def importar(self, linhas, dia, update_existing=False):
+        arquivo = SimpleUploadedFile('requisicoes.csv', (self.CABECALHO + linhas).encode('utf-8'))
+        return upload_requisicoes_almoxarifado_from_file(arquivo, dia, update_existing=update_existing)
+
+    def resumo_esperado(self):
+        linhas = (
+            RequisicaoAlmoxarifado.objects.order_by()
+            .values('data_requisicao', 'cd_centro_ativ', 'cd_item')
+            .annotate(
+                total=Count('pk'),
+                valor=Sum('vlr_movto_estoq'),
+                valor_absoluto=Sum(Abs('vlr_movto_estoq')),
+                quantidade_absoluta=Sum(Abs('qtde_movto_estoq')),
+            )
+        )
+        return {
+            (linha['data_requisicao'], linha['cd_centro_ativ'], linha['cd_item']):
+                (linha['total'], linha['valor'], linha['valor_absoluto'], linha['quantidade_absoluta'])
+            for linha in linhas
+        }
+
+    def resumo_gravado(self):
+        return {
+            (resumo.dia, resumo.cd_centro_ativ, resumo.cd_item):
+                (resumo.total, resumo.valor, resumo.valor_absoluto, resumo.quantidade_absoluta)
+            for resumo in ResumoDiarioRequisicao.objects.all()
+        }
+
+    def test_resumo_apos_importacao(self):
+        dia = date(2025, 3, 3)
+        criadas, atualizadas, erros = self.importar(
+            '100;PARAFUSO;501;10;25.50\n200;ARRUELA;501;-4;-8.00\n300;OLEO;502;2;90\n', dia,
+        )
+        self.assertEqual((criadas, atualizadas, erros), (3, 0, []))
+        self.importar('100;PARAFUSO;501;1;2.55\n', dia + timedelta(days=1))
+
+        self.assertEqual(self.resumo_gravado(), self.resumo_esperado())
+        self.assertEqual(
+            self.resumo_gravado()[(dia, 501, 200)],
+            (1, Decimal('-8.00'), Decimal('8.00'), Decimal('4.00')),
+        )
+
+    def test_reimportacao_substitui_o_dia(self):
+        dia = date(2025, 3, 3)
+        self.importar('100;PARAFUSO;501;10;25.50\n', dia)
+        self.importar('100;PARAFUSO;501;3;7.65\n', dia, update_existing=True)
+        self.assertEqual(self.resumo_gravado(), {(dia, 501, 100): (1, Decimal('7.65'), Decimal('7.65'), Decimal('3.00'))})
+
+    def test_edicao_e_exclusao_atualizam_o_resumo(self):
+        dia = date(2025, 3, 3)
+        self.importar('100;PARAFUSO;501;10;25.50\n200;ARRUELA;501;-4;-8.00\n', dia)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            requisicao = RequisicaoAlmoxarifado.objects.get(cd_item=100)
+            requisicao.data_requisicao = dia + timedelta(days=2)
+            requisicao.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            RequisicaoAlmoxarifado.objects.get(cd_item=200).delete()
+
+        self.assertEqual(self.resumo_gravado(), self.resumo_esperado())
+        self.assertEqual(set(self.resumo_gravado()), {(dia + timedelta(days=2), 501, 100)})
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ResumoDiarioOrdemTests(TestCase):
+    """Resumo das ordens atualizado apenas nos dias alterados igual ao recálculo completo"""
+
+    def resumo_gravado(self):
+        return set(ResumoDiarioOrdem.objects.values_list(
+            'evento', 'dia', 'descr_setormanut', 'descr_tpordservtv', 'cd_maquina', 'total',
+        ))
+
+    def assertIgualAoRecalculo(self):
+        parcial = self.resumo_gravado()
+        atualizar_resumo_ordens()
+        self.assertEqual(parcial, self.resumo_gravado())
+
+    def test_gravacoes_atualizam_os_dias_afetados(self):
+        # Horários perto da meia-noite: o dia do resumo é o dia local
+        entradas = ['03/03/2025 23:30', '04/03/2025 00:10', '04/03/2025 12:00', '05/03/2025 08:00', None]
+        with self.captureOnCommitCallbacks(execute=True):
+            for cd_ordemserv, dt_entrada in enumerate(entradas, start=1):
+                OrdemServicoCorretiva.objects.create(
+                    cd_ordemserv=cd_ordemserv, cd_maquina=10, descr_setormanut='MECANICA',
+                    descr_tpordservtv='CORRETIVA', dt_entrada=dt_entrada, dt_encordmanu=dt_entrada,
+                )
+        self.assertEqual(
+            ResumoDiarioOrdem.objects.get(evento='entrada', dia=date(2025, 3, 4)).total, 2,
+        )
+        self.assertIgualAoRecalculo()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ordem = OrdemServicoCorretiva.objects.get(cd_ordemserv=2)
+            ordem.dt_entrada = '05/03/2025 00:00'
+            ordem.save()
+            OrdemServicoCorretiva.objects.get(cd_ordemserv=1).delete()
+        self.assertEqual(
+            dict(ResumoDiarioOrdem.objects.filter(evento='entrada').values_list('dia', 'total')),
+            {date(2025, 3, 4): 1, date(2025, 3, 5): 2, None: 1},
+        )
+        self.assertIgualAoRecalculo()
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class InvalidacaoCacheTests(TestCase):
+    """Versões dos modelos trocadas apenas quando a gravação é confirmada"""
+
+    def test_versao_muda_apos_o_commit(self):
+        versao = versoes_modelos(Maquina)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Maquina.objects.create(cd_maquina=1)
+            Maquina.objects.create(cd_maquina=2)
+            self.assertEqual(versoes_modelos(Maquina), versao)
+        # Várias gravações na transação: uma única invalidação
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(versoes_modelos(Maquina), versao)
+
+    def test_rollback_nao_invalida_e_a_proxima_gravacao_agenda_de_novo(self):
+        versao = versoes_modelos(Maquina)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    Maquina.objects.create(cd_maquina=1)
+                    raise ValueError('desfazer')
+        self.assertEqual(callbacks, [])
+        self.assertEqual(versoes_modelos(Maquina), versao)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Maquina.objects.create(cd_maquina=2)
+        self.assertNotEqual(versoes_modelos(Maquina), versao)
+
+    def test_rollback_de_savepoint_na_mesma_transacao(self):
+        versao = versoes_modelos(Maquina)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    Maquina.objects.create(cd_maquina=1)
+                    raise ValueError('desfazer')
+            Maquina.objects.create(cd_maquina=2)
+        self.assertNotEqual(versoes_modelos(Maquina), versao)
+
+    def test_dashboard_recalculado_apos_gravacao(self):
+        request = RequestFactory().get('/dashboard/?ano=2025&mes=05')
+        chamadas = []
+
+        def calcular(request):
+            chamadas.append(request)
+            return {'maquinas': Maquina.objects.count()}
+
+        self.assertEqual(contexto_dashboard_em_cache(request, 'teste', [Maquina], calcular), {'maquinas': 0})
+        # mes=5 e mes=05 são o mesmo filtro
+        request = RequestFactory().get('/dashboard/?mes=5&ano=2025')
+        self.assertEqual(contexto_dashboard_em_cache(request, 'teste', [Maquina], calcular), {'maquinas': 0})
+        self.assertEqual(len(chamadas), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Maquina.objects.create(cd_maquina=1)
+        self.assertEqual(contexto_dashboard_em_cache(request, 'teste', [Maquina], calcular), {'maquinas': 1})
+        self.assertEqual(len(chamadas), 2)
+
+    def test_excluir_todos_registros(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            maquina = Maquina.objects.create(cd_maquina=1)
+            Maquina.objects.create(cd_maquina=2)
+            AgendamentoCronograma.objects.create(
+                tipo_agendamento='maquina', maquina=maquina, data_planejada=date(2025, 3, 3),
+            )
+        versoes = versoes_modelos(Maquina, AgendamentoCronograma)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(excluir_todos_registros(Maquina), 2)
+        self.assertFalse(Maquina.objects.exists())
+        # Relacionados excluídos em cascata, com o cache invalidado
+        self.assertFalse(AgendamentoCronograma.objects.exists())
+        novas = versoes_modelos(Maquina, AgendamentoCronograma)
+        self.assertEqual([versoes[chave] == novas[chave] for chave in versoes], [False, False])
+
+
+ARQUIVO_REQUISICOES = (
+    'CD_ITEM;DESCR_ITEM;CD_CENTRO_ATIV;QTDE_MOVTO_ESTOQ;VLR_MOVTO_ESTOQ\n'
+    '100;PARAFUSO;501;10;25.50\n'
+    '200;ARRUELA;501;-4;-8.00\n'
+)
+
+
+class MediaTemporariaMixin:
+    """Arquivos enviados gravados em um MEDIA_ROOT temporário, removido ao fim do teste"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=media_root)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def arquivo_requisicoes(self, conteudo=ARQUIVO_REQUISICOES, nome='requisicoes.csv'):
+        return SimpleUploadedFile(nome, conteudo.encode('utf-8'))
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class FilaImportacaoTests(MediaTemporariaMixin, TestCase):
+    """Importação registrada na requisição e executada pelo worker depois do commit"""
+
+    def test_worker_recebe_a_importacao_apos_o_commit(self):
+        with mock.patch('app.importacoes._obter_executor') as obter_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                importacao = enfileirar_importacao(
+                    'requisicoes_almoxarifado', self.arquivo_requisicoes(), data_requisicao=date(2025, 3, 3),
+                )
+                obter_executor.assert_not_called()
+        obter_executor.return_value.submit.assert_called_once_with(executar_importacao, importacao.pk)
+        self.assertEqual(importacao.status, ImportacaoArquivo.STATUS_PENDENTE)
+        self.assertEqual(importacao.parametros, {'data_requisicao': '2025-03-03'})
+
+    def test_execucao_grava_o_resultado(self):
+        importacao = criar_importacao(
+            'requisicoes_almoxarifado', self.arquivo_requisicoes(), data_requisicao=date(2025, 3, 3),
+        )
+        importacao = executar_importacao(importacao.pk)
+
+        self.assertEqual(importacao.status, ImportacaoArquivo.STATUS_CONCLUIDA)
+        self.assertEqual((importacao.registros_criados, importacao.total_erros), (2, 0))
+        self.assertIsNotNone(importacao.finalizado_em)
+        self.assertEqual(obter_progresso(importacao.pk), {})
+        self.assertEqual(
+            set(RequisicaoAlmoxarifado.objects.values_list('cd_item', 'data_requisicao')),
+            {(100, date(2025, 3, 3)), (200, date(2025, 3, 3))},
+        )
+        # Já iniciada: um segundo worker não a executa de novo
+        self.assertIsNone(executar_importacao(importacao.pk))
+
+    def test_formato_nao_suportado_marca_erro(self):
+        importacao = criar_importacao(
+            'requisicoes_almoxarifado', self.arquivo_requisicoes(nome='requisicoes.txt'),
+            data_requisicao=date(2025, 3, 3),
+        )
+        importacao = executar_importacao(importacao.pk)
+        self.assertEqual(importacao.status, ImportacaoArquivo.STATUS_ERRO)
+        self.assertIn('Use .csv', importacao.mensagem)
+        self.assertFalse(RequisicaoAlmoxarifado.objects.exists())
+
+
+class FalhaSimulada(Exception):
+    pass
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ImportacaoRetomavelTests(TestCase):
+    """Importação em blocos retomada a partir do último bloco gravado"""
+
+    def setUp(self):
+        self.arquivo = SimpleUploadedFile('maquinas.txt', b'1\n2\n3\n4\n5\n')
+
+    def importar(self, falhar_na_linha=None, **parametros):
+        """Importa uma máquina por linha (a partir da linha 2, como nos importadores) em blocos de 2 linhas"""
+        retomavel = ImportacaoRetomavel('teste', self.arquivo, tamanho_bloco=2, **parametros)
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True)
+        errors = []
+        linhas = self.arquivo.read().decode('utf-8').splitlines()
+        try:
+            for bloco in retomavel.blocos(enumerate(linhas, start=2)):
+                with transaction.atomic():
+                    for row_num, linha in bloco:
+                        if row_num == falhar_na_linha:
+                            raise FalhaSimulada('conexão perdida')
+                        upsert.add(row_num, {'cd_maquina': int(linha)})
+                    upsert.flush()
+                    retomavel.registrar_bloco(bloco, upsert.created_count, upsert.updated_count, errors)
+        except FalhaSimulada as e:
+            return retomavel, retomavel.interromper(errors, e)
+        return retomavel, retomavel.finalizar(errors)
+
+    def test_retoma_apos_o_ultimo_bloco_gravado(self):
+        retomavel, (criados, atualizados, errors) = self.importar(falhar_na_linha=5)
+        self.assertFalse(retomavel.retomada)
+        # Bloco das linhas 2-3 gravado; o bloco 4-5 foi desfeito
+        self.assertEqual((criados, atualizados), (2, 0))
+        self.assertIn('até a linha 3', errors[-1])
+        self.assertEqual(sorted(Maquina.objects.values_list('cd_maquina', flat=True)), [1, 2])
+
+        retomavel, (criados, atualizados, errors) = self.importar()
+        self.assertTrue(retomavel.retomada)
+        self.assertEqual(retomavel.linha_inicial, 3)
+        self.assertEqual((criados, atualizados, errors), (5, 0, []))
+        self.assertEqual(sorted(Maquina.objects.values_list('cd_maquina', flat=True)), [1, 2, 3, 4, 5])
+        self.assertTrue(CheckpointImportacao.objects.get(tipo='teste').concluida)
+
+    def test_arquivo_concluido_e_importado_desde_o_inicio(self):
+        self.importar()
+        retomavel, (criados, atualizados, errors) = self.importar()
+        self.assertFalse(retomavel.retomada)
+        self.assertEqual((criados, atualizados), (0, 5))
+
+    def test_opcoes_diferentes_nao_retomam(self):
+        self.importar(falhar_na_linha=5, update_existing=False)
+        retomavel, _ = self.importar(update_existing=True)
+        self.assertFalse(retomavel.retomada)
+        self.assertEqual(CheckpointImportacao.objects.filter(tipo='teste').count(), 1)
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ImportacaoRepetidaTests(MediaTemporariaMixin, TransactionTestCase):
+    """
+    Reenvio do mesmo arquivo sem alterações nas tabelas: nada a importar.
+
+    TransactionTestCase: a versão das tabelas só muda quando as gravações são confirmadas.
+    """
+
+    def importar(self, **parametros):
+        importacao = criar_importacao(
+            'requisicoes_almoxarifado', self.arquivo_requisicoes(), data_requisicao=date(2025, 3, 3), **parametros,
+        )
+        return executar_importacao(importacao.pk)
+
+    def test_reenvio_identico_nao_e_importado(self):
+        primeira = self.importar(update_existing=True)
+        self.assertEqual(primeira.registros_criados, 2)
+
+        segunda = self.importar(update_existing=True)
+        self.assertEqual(segunda.status, ImportacaoArquivo.STATUS_CONCLUIDA)
+        self.assertIn(f'idêntico ao da importação #{primeira.pk}', segunda.mensagem)
+        self.assertEqual((segunda.registros_criados, segunda.registros_atualizados), (0, 0))
+        self.assertEqual(segunda.hash_arquivo, primeira.hash_arquivo)
+        self.assertEqual(segunda.versoes_modelos, primeira.versoes_modelos)
+
+    def test_tabela_alterada_e_importada_de_novo(self):
+        self.importar(update_existing=True)
+        requisicao = RequisicaoAlmoxarifado.objects.get(cd_item=200)
+        requisicao.qtde_movto_estoq = 99
+        requisicao.save()
+
+        terceira = self.importar(update_existing=True)
+        self.assertNotIn('idêntico', terceira.mensagem or '')
+        self.assertEqual(terceira.registros_atualizados, 2)
+        self.assertEqual(
+            sorted(RequisicaoAlmoxarifado.objects.values_list('cd_item', 'qtde_movto_estoq')),
+            [(100, 10), (200, -4)],
+        )
+
+    def test_opcoes_diferentes_sao_importadas(self):
+        self.importar(update_existing=False)
+        segunda = self.importar(update_existing=True)
+        self.assertNotIn('idêntico', segunda.mensagem or '')
+        self.assertEqual(segunda.registros_atualizados, 2)
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class AnaliseFaltantesPeloNumeroTests(TestCase):
+    """Lacunas e intervalos calculados no banco iguais à varredura dos números"""
+
+    NUMEROS = [1, 2, 3, 7, 10, 12000, 12002]
+
+    def setUp(self):
+        for numero in self.NUMEROS:
+            OrdemServicoCorretiva.objects.create(cd_ordemserv=numero)
+
+    def test_lacunas_iguais_a_varredura(self):
+        context = _contexto_analise_faltantes_pelo_numero(RequestFactory().get('/'))
+
+        existentes = set(self.NUMEROS)
+        faltantes = [numero for numero in range(min(existentes), max(existentes)) if numero not in existentes]
+        esperadas = []
+        for numero in faltantes:
+            if esperadas and esperadas[-1]['fim'] == numero - 1:
+                esperadas[-1]['fim'] = numero
+                esperadas[-1]['quantidade'] += 1
+            else:
+                esperadas.append({'inicio': numero, 'fim': numero, 'quantidade': 1})
+        esperadas.sort(key=lambda lacuna: lacuna['quantidade'], reverse=True)
+
+        self.assertEqual((context['total_ordens'], context['min_numero'], context['max_numero']), (7, 1, 12002))
+        self.assertEqual(context['total_lacunas'], 4)
+        self.assertEqual(
+            [(lacuna['inicio'], lacuna['fim'], lacuna['quantidade']) for lacuna in context['lacunas']],
+            [(lacuna['inicio'], lacuna['fim'], lacuna['quantidade']) for lacuna in esperadas],
+        )
+
+    def test_intervalos_vazios_agrupados(self):
+        context = _contexto_analise_faltantes_pelo_numero(RequestFactory().get('/'))
+        self.assertEqual(
+            [(linha['inicio'], linha['fim'], linha['existentes']) for linha in context['intervalos_analise']],
+            [(0, 4999, 5), (5000, 9999, 0), (10000, 14999, 2)],
+        )
+        self.assertEqual(
+            context['total_faltantes'],
+            sum(linha['total_esperado'] - linha['existentes'] for linha in context['intervalos_analise']),
+        )
+
+    def test_sem_ordens(self):
+        OrdemServicoCorretiva.objects.all().delete()
+        context = _contexto_analise_faltantes_pelo_numero(RequestFactory().get('/'))
+        self.assertEqual((context['total_ordens'], context['lacunas']), (0, []))
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ExecucaoManutentorTests(TestCase):
+    """Executor das ordens ligado ao manutentor pela matrícula ou pelo nome normalizado"""
+
+    def setUp(self):
+        for matricula, nome in (
+            ('00123', 'José da Silva'),
+            ('456', 'MARIA SOUZA'),
+            ('789', 'JOAO PEREIRA'),
+            ('790', 'João  Pereira'),
+        ):
+            Manutentor.objects.create(
+                Matricula=matricula, Nome=nome, tempo_trabalho='08:00', turno='Turno A', local_trab='Industria',
+            )
+
+    def criar_ordem(self, cd_ordemserv, cd_func_exec, nm_func_exec):
+        return OrdemServicoCorretiva.objects.create(
+            cd_ordemserv=cd_ordemserv, cd_func_exec=cd_func_exec, nm_func_exec=nm_func_exec,
+        )
+
+    def vinculos(self):
+        return {
+            execucao.ordem.cd_ordemserv: (execucao.manutentor_id, execucao.campo)
+            for execucao in ExecucaoManutentor.objects.select_related('ordem')
+        }
+
+    def test_resolver(self):
+        indice = IndiceManutentores()
+        self.assertEqual(indice.resolver('123.0', 'OUTRO NOME'), ('00123', 'codigo'))
+        self.assertEqual(indice.resolver(' 0123 ', None), ('00123', 'codigo'))
+        self.assertEqual(indice.resolver('', 'jose  DA silva '), ('00123', 'nome'))
+        # Nome de mais de um manutentor: sem vínculo
+        self.assertEqual(indice.resolver(None, 'JOÃO PEREIRA'), (None, None))
+        self.assertEqual(indice.resolver('999', 'FULANO'), (None, None))
+
+    def test_reconstruir_e_vincular(self):
+        self.criar_ordem(1, '123.0', 'JOSE DA SILVA')
+        self.criar_ordem(2, None, 'maria  souza')
+        self.criar_ordem(3, None, 'JOÃO PEREIRA')
+        ordem = self.criar_ordem(4, '999', 'FULANO')
+
+        self.assertEqual(reconstruir_execucoes_manutentores(), 2)
+        self.assertEqual(self.vinculos(), {1: ('00123', 'cd_func_exec'), 2: ('456', 'nm_func_exec')})
+
+        ordem.cd_func_exec = '456'
+        ordem.save()
+        self.assertEqual(vincular_execucoes_manutentores(ordens=[ordem]), 1)
+        self.assertEqual(self.vinculos()[4], ('456', 'cd_func_exec'))
+        self.assertEqual(len(self.vinculos()), 3)
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class IndicadoresParadaTests(TestCase):
+    """MTTR, MTBF e disponibilidade com paradas sobrepostas unidas e recortadas à janela"""
+
+    def setUp(self):
+        # Janela de 10 dias: 240 horas por máquina
+        self.inicio, self.fim = intervalo_datas_ordem(date(2025, 1, 1), date(2025, 1, 10))
+        for cd_maquina, cd_setormanut in ((1, 'MEC'), (2, 'MEC'), (3, 'ELE')):
+            Maquina.objects.create(cd_maquina=cd_maquina, cd_setormanut=cd_setormanut, descr_setormanut=cd_setormanut)
+        paradas = [
+            (1, '02/01/2025 08:00', '02/01/2025 12:00'),
+            (1, '02/01/2025 10:00', '02/01/2025 14:00'),  # sobreposta: uma parada de 6 horas
+            (1, '05/01/2025 08:00', '05/01/2025 10:00'),
+            (2, '31/12/2024 20:00', '01/01/2025 04:00'),  # recortada ao início da janela: 4 horas
+            (2, '06/01/2025 10:00', '06/01/2025 08:00'),  # fim antes do início: ignorada
+            (2, '15/01/2025 08:00', '15/01/2025 10:00'),  # fora da janela
+            (2, '07/01/2025 08:00', None),  # sem fim: ignorada
+        ]
+        for cd_ordemserv, (cd_maquina, inicio, fim) in enumerate(paradas, start=1):
+            OrdemServicoCorretiva.objects.create(
+                cd_ordemserv=cd_ordemserv, cd_maquina=cd_maquina, dt_iniparmanu=inicio, dt_fimparmanu=fim,
+            )
+
+    def momento(self, *valores):
+        return timezone.make_aware(datetime(*valores)).timestamp()
+
+    def test_intervalos_unidos_e_recortados(self):
+        self.assertEqual(intervalos_parada(self.inicio, self.fim), {
+            1: [
+                [self.momento(2025, 1, 2, 8), self.momento(2025, 1, 2, 14)],
+                [self.momento(2025, 1, 5, 8), self.momento(2025, 1, 5, 10)],
+            ],
+            2: [[self.momento(2025, 1, 1), self.momento(2025, 1, 1, 4)]],
+        })
+
+    def test_indicadores(self):
+        indicadores = indicadores_parada(self.inicio, self.fim)
+        self.assertEqual(indicadores['horas_janela'], 240)
+
+        por_maquina = {linha['cd_maquina']: linha for linha in indicadores['maquinas']}
+        self.assertEqual(set(por_maquina), {1, 2})
+        maquina = por_maquina[1]
+        self.assertEqual(
+            (maquina['paradas'], maquina['horas_parada'], maquina['mttr_horas'], maquina['mtbf_horas']),
+            (2, 8, 4, 116),
+        )
+        self.assertEqual(maquina['disponibilidade'], 96.67)
+
+        # Setor: tempo disponível de 2 máquinas
+        setor = {linha['cd_setormanut']: linha for linha in indicadores['setores']}['MEC']
+        self.assertEqual(
+            (setor['maquinas'], setor['paradas'], setor['mttr_horas'], setor['mtbf_horas'], setor['disponibilidade']),
+            (2, 3, 4, 156, 97.5),
+        )
+        self.assertNotIn('ELE', {linha['cd_setormanut'] for linha in indicadores['setores']})
+
+        geral = indicadores['geral']
+        self.assertEqual(
+            (geral['maquinas'], geral['paradas'], geral['horas_parada'], geral['mtbf_horas'], geral['disponibilidade']),
+            (3, 3, 12, 236, 98.33),
+        )
+
+    def test_maquinas_informadas(self):
+        geral = indicadores_parada(self.inicio, self.fim, cd_maquinas=[2])['geral']
+        self.assertEqual((geral['maquinas'], geral['paradas'], geral['mttr_horas']), (1, 1, 4))
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class IndiceSemanasTests(TestCase):
+    """IndiceSemanas.semana deve devolver a mesma semana da consulta que substituiu"""
+
+    def setUp(self):
+        inicio = date(2025, 1, 6)
+        for numero in range(8):
+            Semana52.objects.create(
+                semana=f'SEM{numero + 1}',
+                inicio=inicio + timedelta(days=7 * numero),
+                fim=inicio + timedelta(days=7 * numero + 6),
+            )
+        # Lacuna de uma semana, semana sobreposta e semana longa que cobre outras
+        Semana52.objects.create(semana='SEM10', inicio=date(2025, 3, 10), fim=date(2025, 3, 16))
+        Semana52.objects.create(semana='EXTRA', inicio=date(2025, 1, 9), fim=date(2025, 1, 15))
+        Semana52.objects.create(semana='LONGA', inicio=date(2025, 1, 1), fim=date(2025, 1, 31))
+        Semana52.objects.create(semana='SEM DATA', inicio=None, fim=None)
+
+    def test_semana_igual_a_consulta(self):
+        indice = IndiceSemanas.carregar()
+        data = date(2024, 12, 25)
+        while data <= date(2025, 3, 25):
+            esperada = Semana52.objects.filter(inicio__lte=data, fim__gte=data).first()
+            self.assertEqual(indice.semana(data), esperada, data)
+            data += timedelta(days=1)
+
+    def test_semanas_no_intervalo(self):
+        indice = IndiceSemanas.carregar()
+        inicio, fim = date(2025, 2, 20), date(2025, 3, 12)
+        esperadas = list(Semana52.objects.filter(inicio__lte=fim, fim__gte=inicio).order_by('inicio', 'pk'))
+        self.assertEqual(indice.semanas_no_intervalo(inicio, fim), esperadas)
+        self.assertIsNone(indice.semana(None))
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class SalvarAgendamentosCronogramaTests(TestCase):
+    """Agendamentos validados por item e gravados em lote, com a semana preenchida"""
+
+    def setUp(self):
+        self.ano = date.today().year
+        # Confirmada: o índice de semanas do processo é reconstruído com a versão nova
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maquinas = [Maquina.objects.create(cd_maquina=cd_maquina) for cd_maquina in (10, 11)]
+            self.semana = Semana52.objects.create(
+                semana='SEM2', inicio=date(self.ano, 1, 5), fim=date(self.ano, 1, 11),
+            )
+
+    def salvar(self, agendamentos):
+        resposta = self.client.post(
+            reverse('salvar_agendamentos_cronograma'), json.dumps({'agendamentos': agendamentos}),
+            content_type='application/json',
+        )
+        return resposta.json()
+
+    def test_grava_validos_e_informa_os_erros(self):
+        resultado = self.salvar([
+            {'tipo': 'maquina', 'id': self.maquinas[0].pk, 'data_planejada': f'{self.ano}-01-06'},
+            {'tipo': 'maquina', 'id': self.maquinas[1].pk, 'data_planejada': f'{self.ano}-02-20',
+             'nome_grupo': ' Setor A '},
+            {'tipo': 'maquina', 'id': 999999, 'data_planejada': f'{self.ano}-01-06'},
+            {'tipo': 'maquina', 'id': self.maquinas[0].pk, 'data_planejada': '06/01/2025'},
+            {'tipo': 'outro', 'id': 1, 'data_planejada': f'{self.ano}-01-06'},
+        ])
+
+        self.assertEqual((resultado['success'], resultado['saved_count'], resultado['total']), (True, 2, 5))
+        self.assertEqual(len(resultado['errors']), 3)
+        self.assertIn('Máquina com ID 999999 não encontrada', resultado['errors'])
+        self.assertEqual(
+            set(AgendamentoCronograma.objects.values_list('maquina__cd_maquina', 'data_planejada', 'semana', 'nome_grupo')),
+            {(10, date(self.ano, 1, 6), self.semana.pk, None), (11, date(self.ano, 2, 20), None, 'Setor A')},
+        )
+
+    def test_nenhum_valido(self):
+        resultado = self.salvar([{'tipo': 'maquina', 'id': 999999, 'data_planejada': f'{self.ano}-01-06'}])
+        self.assertFalse(resultado['success'])
+        self.assertFalse(AgendamentoCronograma.objects.exists())
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class RecorrenciaAgendamentoTests(TestCase):
+    """Datas geradas pela regra da recorrência, com ocorrências canceladas e movidas"""
+
+    def setUp(self):
+        maquina = Maquina.objects.create(cd_maquina=10)
+        self.recorrencia = RecorrenciaAgendamento.objects.create(
+            tipo_agendamento='maquina', maquina=maquina,
+            data_inicio=date(2025, 1, 1), periodicidade=7, data_fim=date(2025, 2, 1),
+        )
+
+    def test_datas_sem_excecoes(self):
+        self.assertEqual(list(self.recorrencia.datas()), [
+            date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15), date(2025, 1, 22), date(2025, 1, 29),
+        ])
+        self.assertEqual(self.recorrencia.total_datas(), 5)
+
+    def test_datas_com_excecoes(self):
+        ExcecaoRecorrencia.objects.create(
+            recorrencia=self.recorrencia, data_original=date(2025, 1, 8), acao=ExcecaoRecorrencia.ACAO_CANCELADA,
+        )
+        ExcecaoRecorrencia.objects.create(
+            recorrencia=self.recorrencia, data_original=date(2025, 1, 15), acao=ExcecaoRecorrencia.ACAO_MOVIDA,
+            nova_data=date(2025, 1, 24),
+        )
+
+        self.assertEqual(list(self.recorrencia.datas()), [
+            date(2025, 1, 1), date(2025, 1, 22), date(2025, 1, 24), date(2025, 1, 29),
+        ])
+        # Intervalo consultado: a data movida conta onde está agora, não na data original
+        inicio, fim = date(2025, 1, 10), date(2025, 1, 23)
+        self.assertEqual(list(self.recorrencia.datas(inicio, fim)), [date(2025, 1, 22)])
+        self.assertEqual(self.recorrencia.total_datas(inicio, fim), 1)
+        self.assertEqual(self.recorrencia.total_datas(), 4)
+
+    def test_agendamento_periodico_grava_a_regra(self):
+        ano = date.today().year
+        resposta = self.client.post(
+            reverse('salvar_agendamentos_cronograma'),
+            json.dumps({'agendamentos': [
+                {'tipo': 'maquina', 'id': self.recorrencia.maquina_id, 'data_planejada': f'{ano}-12-01', 'periodicidade': 7},
+            ]}),
+            content_type='application/json',
+        )
+
+        # saved_count continua contando as datas agendadas (1, 8, 15, 22 e 29/12)
+        self.assertEqual(resposta.json()['saved_count'], 5)
+        recorrencia = RecorrenciaAgendamento.objects.exclude(pk=self.recorrencia.pk).get()
+        self.assertEqual(
+            (recorrencia.data_inicio, recorrencia.data_fim, recorrencia.periodicidade),
+            (date(ano, 12, 1), date(ano, 12, 31), 7),
+        )
+        self.assertFalse(AgendamentoCronograma.objects.exists())
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class RespostaJsonCondicionalTests(TestCase):
+    """ETag baseado nas versões dos modelos: 304 enquanto as tabelas não mudam"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.chamadas = 0
+
+    def calcular(self):
+        self.chamadas += 1
+        return {'maquinas': Maquina.objects.count()}
+
+    def test_responde_304_com_etag_atual(self):
+        resposta = resposta_json_condicional(self.factory.get('/api/dados/?ano=2025'), [Maquina], self.calcular)
+        self.assertEqual(resposta.status_code, 200)
+        etag = resposta.headers['ETag']
+
+        resposta = resposta_json_condicional(
+            self.factory.get('/api/dados/?ano=2025', HTTP_IF_NONE_MATCH=etag), [Maquina], self.calcular,
+        )
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(self.chamadas, 1)
+
+        # Outros filtros na URL: outra resposta
+        resposta = resposta_json_condicional(
+            self.factory.get('/api/dados/?ano=2024', HTTP_IF_NONE_MATCH=etag), [Maquina], self.calcular,
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_gravacao_no_modelo_muda_o_etag(self):
+        resposta = resposta_json_condicional(self.factory.get('/api/dados/'), [Maquina], self.calcular)
+        etag = resposta.headers['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Maquina.objects.create(cd_maquina=20)
+
+        resposta = resposta_json_condicional(
+            self.factory.get('/api/dados/', HTTP_IF_NONE_MATCH=etag), [Maquina], self.calcular,
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta.headers['ETag'], etag)
+        self.assertJSONEqual(resposta.content, {'maquinas': 1})
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class FiltroBuscaTests(TestCase):
+    """A busca pelo índice FTS5 encontra os mesmos registros que os filtros __icontains"""
+
+    CAMPOS = ('descr_maquina', 'descr_setormanut', 'nome_unid')
+
+    def setUp(self):
+        descricoes = [
+            ('PRENSA HIDRAULICA 200T', 'ESTAMPARIA', 'MATRIZ'),
+            ('Prensa excêntrica', 'Estamparia', 'Filial Sul'),
+            ('TORNO CNC', 'USINAGEM', 'MATRIZ'),
+            ('Compressor "parafuso"', None, 'FILIAL NORTE'),
+            (None, 'MANUTENCAO', None),
+        ]
+        for cd_maquina, (descr_maquina, descr_setormanut, nome_unid) in enumerate(descricoes, start=1):
+            Maquina.objects.create(
+                cd_maquina=cd_maquina, descr_maquina=descr_maquina,
+                descr_setormanut=descr_setormanut, nome_unid=nome_unid,
+            )
+
+    def assertMesmoResultado(self, termo, campos=CAMPOS):
+        icontains = Maquina.objects.none()
+        for campo in campos:
+            icontains |= Maquina.objects.filter(**{f'{campo}__icontains': termo})
+        self.assertEqual(
+            set(Maquina.objects.filter(filtro_busca(Maquina, termo, campos)).values_list('pk', flat=True)),
+            set(icontains.values_list('pk', flat=True)),
+            termo,
+        )
+
+    def test_mesmo_resultado_que_icontains(self):
+        for termo in ('prensa', 'PRENSA', 'estamp', 'matriz', 'filial', 'cnc', 'to', 'x', 'inexistente',
+                      '"parafuso"', 'ar 200'):
+            self.assertMesmoResultado(termo)
+        self.assertMesmoResultado('matriz', ('descr_maquina',))
+
+    def test_acompanha_gravacoes_e_exclusoes(self):
+        maquina = Maquina.objects.get(cd_maquina=3)
+        maquina.descr_maquina = 'FURADEIRA DE BANCADA'
+        maquina.save()
+        Maquina.objects.filter(cd_maquina=1).delete()
+        for termo in ('torno', 'furadeira', 'prensa'):
+            self.assertMesmoResultado(termo)
+
+    def test_ignora_acentos(self):
+        self.assertEqual(
+            set(Maquina.objects.filter(filtro_busca(Maquina, 'excentrica', self.CAMPOS)).values_list('cd_maquina', flat=True)),
+            {2},
+        )
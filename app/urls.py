@@ -106,6 +106,7 @@ urlpatterns = [
     path('maquinas/visualizar/<int:maquina_id>/', views.visualizar_maquina, name="visualizar_maquina"),
     path('maquinas/<int:maquina_id>/calendario-planos/', views.calendario_planos_maquina, name="calendario_planos_maquina"),
     path('maquinas/<int:maquina_id>/calendario-planos-secundarias/', views.calendario_planos_secundarias, name="calendario_planos_secundarias"),
+    path('setores/<str:cd_setor>/calendario-planos/', views.calendario_planos_setor, name="calendario_planos_setor"),
     path('maquinas/editar/<int:maquina_id>/', views.editar_maquina, name="editar_maquina"),
     path('maquinas/<int:maquina_id>/pecas/', views.maquinas_pecas, name="maquinas_pecas"),
     path('maquinas/<int:maquina_id>/adicionar-peca/', views.adicionar_peca_maquina, name="adicionar_peca_maquina"),
@@ -158,6 +159,8 @@ urlpatterns = [
     path('api/search-maquinas/', views.api_search_maquinas, name="api_search_maquinas"),
     path('api/search-planos-pcm/', views.api_search_planos_pcm, name="api_search_planos_pcm"),
     path('api/salvar-agendamentos-cronograma/', views.salvar_agendamentos_cronograma, name="salvar_agendamentos_cronograma"),
+    path('api/recorrencias-agendamento/<int:recorrencia_id>/excecao/', views.salvar_excecao_recorrencia, name="salvar_excecao_recorrencia"),
     path('api/dados-diarios-requisicoes/', views.api_dados_diarios_requisicoes, name="api_dados_diarios_requisicoes"),
+    path('api/importacoes/<int:pk>/', views.api_importacao_status, name="api_importacao_status"),
     path('api/meses-por-ano/', views.api_meses_por_ano, name="api_meses_por_ano"),
 ]
\ No newline at end of file
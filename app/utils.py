@@ -1,455 +1,1246 @@
 ﻿"""
 Utility functions for file uploads and data processing
 """
+import bisect
+import codecs
 import csv
+import functools
+import hashlib
+import heapq
 import io
+import itertools
+import json
+import os
+import re
+import threading
+import unicodedata
+import uuid
+import weakref
+from collections import defaultdict
 from typing import List, Dict, Tuple
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import transaction, DatabaseError
+from django.db.models import AutoField, F, Q
+from django.utils import timezone
 import openpyxl
 
+from app.busca import campos_indexados, indexar_registros, limpar_indice_busca, reconstruir_indice_busca
 
-def read_excel_file(file, sheet_name=None):
-    """
-    LÃª um arquivo Excel (.xlsx, .xls, .xlsm) e retorna os dados
-    
-    Args:
-        file: Arquivo Excel (Django UploadedFile ou path)
-        sheet_name: Nome da planilha a ser lida (None para primeira planilha)
-    
-    Returns:
-        Lista de dicionÃ¡rios com os dados
-    """
+
+# Quantidade de registros gravados por comando nos importadores em lote
+BULK_BATCH_SIZE = 500
+
+# Limite de parâmetros por consulta ao buscar chaves existentes (SQLite aceita 999)
+BULK_MAX_QUERY_PARAMS = 900
+
+# Importação em lote (ZIP/vários CSVs): processos usados na leitura, volume mínimo para
+# valer o custo de iniciar os processos e tamanho máximo aceito por arquivo dentro do ZIP
+LOTE_PROCESSOS_MAXIMO = 4
+LOTE_PARALELO_MIN_BYTES = 2 * 1024 * 1024
+LOTE_TAMANHO_MAXIMO_MEMBRO = 50 * 1024 * 1024
+
+
+# Leitura de Excel: linhas por bloco e tamanho mínimo do arquivo para ler a planilha num
+# processo auxiliar, em paralelo com o processamento das linhas pelo importador
+EXCEL_BLOCO_LINHAS = 2000
+EXCEL_PARALELO_MIN_BYTES = 2 * 1024 * 1024
+
+# Blocos lidos à frente pelo processo auxiliar enquanto o importador processa os anteriores
+EXCEL_BLOCOS_NA_FILA = 4
+
+
+def _normalizar_texto_excel(valor):
+    # Remove os espaços das pontas e reduz espaços repetidos (inclusive \xa0) a um só;
+    # str.split() sem argumento separa pelos mesmos espaços Unicode que \s
+    return ' '.join(valor.split())
+
+
+def _tamanho_arquivo(file) -> int:
+    """Tamanho em bytes de um arquivo (UploadedFile, arquivo aberto ou path)"""
+    if hasattr(file, 'read'):
+        posicao = file.tell()
+        tamanho = file.seek(0, os.SEEK_END)
+        file.seek(posicao)
+        return tamanho
+    return os.path.getsize(file)
+
+
+def _ler_excel_em_blocos(file, sheet_name=None, tamanho_bloco=EXCEL_BLOCO_LINHAS):
+    """Lê a planilha e gera a lista de cabeçalhos e depois listas de linhas já normalizadas"""
     try:
-        # Se for um arquivo Django UploadedFile, garantir que estÃ¡ no inÃ­cio
+        # Se for um arquivo Django UploadedFile, garantir que está no início
         if hasattr(file, 'read'):
-            file.seek(0)  # Resetar para o inÃ­cio do arquivo
-            wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
-        else:
-            wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
-        
+            file.seek(0)  # Resetar para o início do arquivo
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValidationError(f"Erro ao ler arquivo Excel: {str(e)}")
+
+    try:
         # Selecionar a planilha
-        if sheet_name:
-            ws = wb[sheet_name]
-        else:
-            ws = wb.active
-        
-        # Ler cabeÃ§alhos da primeira linha
+        ws = wb[sheet_name] if sheet_name else wb.active
+
+        # Ler cabeçalhos da primeira linha (normalizando encoding e espaços)
         headers = []
         for cell in ws[1]:
             header_value = cell.value if cell.value else f'col_{len(headers)}'
-            # Normalizar encoding e espaÃ§os
             if isinstance(header_value, str):
-                # Tentar corrigir problemas de encoding comuns
-                header_value = header_value.strip().replace('\xa0', ' ').replace('\u00a0', ' ')
-                # Normalizar espaÃ§os mÃºltiplos
-                import re
-                header_value = re.sub(r'\s+', ' ', header_value).strip()
+                header_value = _normalizar_texto_excel(header_value)
             headers.append(header_value)
-        
-        # Ler dados
-        data = []
-        from datetime import datetime, date
+        yield headers
+
+        bloco = []
         for row in ws.iter_rows(min_row=2, values_only=True):
-            if any(cell is not None for cell in row):  # Ignorar linhas vazias
-                row_dict = {}
-                for idx, cell_value in enumerate(row):
-                    header = headers[idx] if idx < len(headers) else f'col_{idx}'
-                    # Se for um objeto datetime/date do Excel, manter como estÃ¡ para processamento posterior
-                    if isinstance(cell_value, (datetime, date)):
-                        row_dict[header] = cell_value
-                    # Limpar valores de cÃ©lulas de texto
-                    elif isinstance(cell_value, str):
-                        cell_value = cell_value.strip().replace('\xa0', ' ').replace('\u00a0', ' ')
-                        import re
-                        cell_value = re.sub(r'\s+', ' ', cell_value).strip()
-                        row_dict[header] = cell_value
-                    else:
-                        # Manter outros tipos (nÃºmeros, etc.) como estÃ£o
-                        row_dict[header] = cell_value
-                data.append(row_dict)
-        
-        return data
-    
+            if row.count(None) == len(row):  # Ignorar linhas vazias
+                continue
+            # Datas do Excel são mantidas como datetime/date para processamento posterior;
+            # textos são limpos; outros tipos (números, etc.) ficam como estão
+            bloco.append(tuple(
+                _normalizar_texto_excel(valor) if isinstance(valor, str) else valor
+                for valor in row
+            ))
+            if len(bloco) >= tamanho_bloco:
+                yield bloco
+                bloco = []
+        if bloco:
+            yield bloco
+    except ValidationError:
+        raise
     except Exception as e:
         raise ValidationError(f"Erro ao ler arquivo Excel: {str(e)}")
+    finally:
+        wb.close()
+
+
+def _ler_excel_em_processo(origem, sheet_name, fila, tamanho_bloco):
+    """Lê a planilha e envia cabeçalho e blocos pela fila (executado no processo auxiliar; não acessa o banco)"""
+    try:
+        if isinstance(origem, bytes):
+            origem = io.BytesIO(origem)
+        for item in _ler_excel_em_blocos(origem, sheet_name, tamanho_bloco):
+            fila.put(('dados', item))
+        fila.put(('fim', None))
+    except ValidationError as e:
+        fila.put(('erro', ' '.join(e.messages)))
+    except Exception as e:
+        fila.put(('erro', f"Erro ao ler arquivo Excel: {str(e)}"))
+
+
+def _receber_blocos_excel(processo, fila):
+    """Repassa os blocos enviados pelo processo auxiliar; encerra o processo ao terminar ou se a leitura for interrompida"""
+    import queue
+    try:
+        while True:
+            try:
+                tipo, item = fila.get(timeout=5)
+            except queue.Empty:
+                if not processo.is_alive():
+                    raise ValidationError("Erro ao ler arquivo Excel: a leitura foi interrompida inesperadamente")
+                continue
+            if tipo == 'fim':
+                return
+            if tipo == 'erro':
+                raise ValidationError(item)
+            yield item
+    finally:
+        if processo.is_alive():
+            processo.terminate()
+        processo.join()
+        fila.close()
 
 
-def read_csv_file(file, encoding='utf-8', delimiter=','):
+def iter_excel_blocos(file, sheet_name=None, tamanho_bloco=EXCEL_BLOCO_LINHAS):
     """
-    LÃª um arquivo CSV e retorna os dados
-    
+    Lê um arquivo Excel em blocos de linhas, com textos já normalizados.
+
+    Arquivos grandes (a partir de EXCEL_PARALELO_MIN_BYTES, com mais de um processador)
+    são lidos num processo auxiliar, que interpreta a planilha enquanto o importador
+    processa os blocos já recebidos.
+
     Args:
-        file: Arquivo CSV (Django UploadedFile ou path)
-        encoding: Encoding do arquivo (padrÃ£o: utf-8)
-        delimiter: Delimitador do CSV (padrÃ£o: vÃ­rgula)
-    
+        file: Arquivo Excel (Django UploadedFile, arquivo aberto ou path)
+        sheet_name: Nome da planilha a ser lida (None para primeira planilha)
+        tamanho_bloco: Quantidade de linhas por bloco
+
     Returns:
-        Lista de dicionÃ¡rios com os dados
+        Iterador que gera primeiro a lista de cabeçalhos e depois listas de tuplas
+        (uma por linha; linhas totalmente vazias são ignoradas)
     """
-    try:
-        # Se for um arquivo Django UploadedFile, garantir que estÃ¡ no inÃ­cio
-        if hasattr(file, 'read'):
+    if (os.cpu_count() or 1) > 1 and _tamanho_arquivo(file) >= EXCEL_PARALELO_MIN_BYTES:
+        import multiprocessing
+        if isinstance(file, (str, os.PathLike)):
+            origem = os.fspath(file)
+        elif hasattr(file, 'temporary_file_path'):
+            origem = file.temporary_file_path()
+        else:
             file.seek(0)
-            content = file.read().decode(encoding)
+            origem = file.read()
+        try:
+            # 'spawn': o processo auxiliar não herda as conexões e threads do servidor
+            contexto = multiprocessing.get_context('spawn')
+            fila = contexto.Queue(maxsize=EXCEL_BLOCOS_NA_FILA)
+            processo = contexto.Process(
+                target=_ler_excel_em_processo, args=(origem, sheet_name, fila, tamanho_bloco), daemon=True,
+            )
+            processo.start()
+        except (OSError, AssertionError) as e:
+            # AssertionError: processos daemon não podem criar processos auxiliares
+            print(f"Leitura paralela indisponível, lendo na sequência: {e}")
         else:
-            with open(file, 'r', encoding=encoding) as f:
-                content = f.read()
-        
-        # Ler CSV
-        csv_reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
-        data = []
-        for row in csv_reader:
-            # Remover valores vazios e normalizar
-            row_dict = {}
-            for key, value in row.items():
-                if value:
-                    row_dict[key.strip()] = value.strip()
-            if row_dict:  # Adicionar apenas se nÃ£o estiver vazio
-                data.append(row_dict)
-        
-        return data
-    
-    except Exception as e:
-        raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+            return _receber_blocos_excel(processo, fila)
+    return _ler_excel_em_blocos(file, sheet_name, tamanho_bloco)
 
 
-def upload_ordens_corretivas_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
+def iter_excel_tabela(file, sheet_name=None):
     """
-    Faz upload de ordens de serviÃ§o corretivas a partir de um arquivo CSV ou Excel
+    Lê um arquivo Excel linha a linha, sem montar dicionários.
+
+    Args:
+        file: Arquivo Excel (Django UploadedFile ou path)
+        sheet_name: Nome da planilha a ser lida (None para primeira planilha)
+
+    Yields:
+        Primeiro a lista de cabeçalhos; depois uma tupla de valores por linha
+        (linhas totalmente vazias são ignoradas)
+    """
+    blocos = iter_excel_blocos(file, sheet_name)
+    headers = next(blocos, None)
+    if headers is None:
+        return
+    yield headers
+    for bloco in blocos:
+        yield from bloco
+
+
+def iter_excel_rows(file, sheet_name=None):
+    """
+    Lê um arquivo Excel de forma incremental (ver iter_excel_blocos), como dicionários.
+
+    Yields:
+        Dicionários {cabeçalho: valor} (linhas totalmente vazias são ignoradas)
+    """
+    blocos = iter_excel_blocos(file, sheet_name)
+    headers = list(next(blocos, None) or [])
+    for bloco in blocos:
+        for row in bloco:
+            # Colunas além do cabeçalho recebem nomes col_<índice>
+            if len(row) > len(headers):
+                headers.extend(f'col_{idx}' for idx in range(len(headers), len(row)))
+            yield dict(zip(headers, row))
+
+
+def read_excel_file(file, sheet_name=None):
+    """
+    LÃª um arquivo Excel (.xlsx, .xls, .xlsm) e retorna os dados
     
     Args:
-        file: Arquivo Django UploadedFile
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
+        file: Arquivo Excel (Django UploadedFile ou path)
+        sheet_name: Nome da planilha a ser lida (None para primeira planilha)
     
     Returns:
-        Tupla (created_count, updated_count, errors)
+        Lista de dicionÃ¡rios com os dados (para arquivos grandes, prefira iter_excel_rows)
     """
-    from app.models import OrdemServicoCorretiva, OrdemServicoCorretivaFicha
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
+    return list(iter_excel_rows(file, sheet_name))
+
+
+# Encodings testados (em ordem) na amostra inicial de um CSV; latin-1 aceita qualquer sequência de bytes
+CSV_ENCODINGS = ('utf-8', 'latin-1')
+
+# Tamanho da amostra inicial usada para detectar encoding e delimitador (bytes)
+CSV_TAMANHO_AMOSTRA = 64 * 1024
+
+
+def _utf8_com_fallback_latin1(erro):
+    # Bytes inválidos em UTF-8 fora da amostra (arquivo com encodings misturados) são lidos como latin-1
+    return erro.object[erro.start:erro.end].decode('latin-1'), erro.end
+
+
+codecs.register_error('pcm_latin1_fallback', _utf8_com_fallback_latin1)
+
+
+def _amostra_arquivo(file, tamanho=CSV_TAMANHO_AMOSTRA) -> bytes:
+    """Lê os primeiros bytes de um arquivo (UploadedFile ou path) sem alterar a posição de leitura"""
+    if hasattr(file, 'read'):
+        file.seek(0)
+        amostra = file.read(tamanho)
+        file.seek(0)
+        return amostra
+    with open(file, 'rb') as f:
+        return f.read(tamanho)
+
+
+def detectar_encoding(file, encodings=CSV_ENCODINGS, amostra=None) -> str:
+    """
+    Detecta o encoding de um arquivo texto a partir de uma amostra inicial.
+
+    Args:
+        file: Arquivo (Django UploadedFile ou path)
+        encodings: Encodings testados em ordem (o primeiro que decodifica a amostra é usado)
+        amostra: Bytes iniciais já lidos (opcional)
+
+    Returns:
+        Nome do encoding ('utf-8-sig' quando o arquivo começa com BOM)
+    """
+    if amostra is None:
+        amostra = _amostra_arquivo(file)
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for encoding in encodings:
+        try:
+            # final=False: um caractere multibyte cortado no fim da amostra não é erro
+            codecs.getincrementaldecoder(encoding)().decode(amostra, final=False)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    raise ValidationError(
+        f"Erro ao ler arquivo CSV: Não foi possível decodificar o arquivo com nenhum encoding testado ({', '.join(encodings)})"
+    )
+
+
+def detectar_delimitador(file, encoding, candidatos=(';', ','), amostra=None) -> str:
+    """Escolhe o delimitador mais frequente na linha de cabeçalho (o primeiro candidato em caso de empate)"""
+    if amostra is None:
+        amostra = _amostra_arquivo(file)
+    texto = codecs.getincrementaldecoder(encoding)(errors='replace').decode(amostra, final=False)
+    cabecalho = texto.splitlines()[0] if texto else ''
+    return max(candidatos, key=lambda candidato: cabecalho.count(candidato))
+
+
+def iter_csv_tabela(file, encoding=None, delimiter=',', encodings=CSV_ENCODINGS, tratar_cabecalhos=None):
+    """
+    Lê um arquivo CSV de forma incremental, uma linha por vez.
+
+    O arquivo não é carregado inteiro em memória: o encoding é detectado uma
+    única vez pela amostra inicial e o conteúdo é decodificado aos poucos.
+
+    Args:
+        file: Arquivo CSV (Django UploadedFile ou path)
+        encoding: Encoding do arquivo (None para detectar entre `encodings`)
+        delimiter: Delimitador do CSV (None para detectar entre ';' e ',')
+        encodings: Encodings testados na detecção
+        tratar_cabecalhos: Função opcional que recebe e retorna a lista de cabeçalhos
+
+    Yields:
+        Primeiro a lista de cabeçalhos; depois uma lista de valores (sem espaços
+        nas pontas) por linha. Linhas sem nenhum valor são ignoradas.
+    """
+    amostra = None
+    if encoding is None or delimiter is None:
+        amostra = _amostra_arquivo(file)
+    if encoding is None:
+        encoding = detectar_encoding(file, encodings, amostra=amostra)
+    if delimiter is None:
+        delimiter = detectar_delimitador(file, encoding, amostra=amostra)
+    errors = 'pcm_latin1_fallback' if codecs.lookup(encoding).name == 'utf-8' else 'strict'
+
+    if hasattr(file, 'read'):
+        file.seek(0)
+        # UploadedFile: envolver o arquivo binário subjacente, sem copiá-lo
+        texto = io.TextIOWrapper(getattr(file, 'file', file), encoding=encoding, errors=errors, newline='')
+        try:
+            yield from _linhas_csv(texto, delimiter, tratar_cabecalhos)
+        finally:
+            # Desacoplar para que o wrapper não feche o arquivo enviado
+            texto.detach()
+    else:
+        with open(file, 'r', encoding=encoding, errors=errors, newline='') as texto:
+            yield from _linhas_csv(texto, delimiter, tratar_cabecalhos)
+
+
+def _linhas_csv(texto, delimiter, tratar_cabecalhos=None):
+    leitor = csv.reader(texto, delimiter=delimiter)
+    try:
+        cabecalhos = next(leitor, None)
+        if cabecalhos is None:
+            return
+        if tratar_cabecalhos is not None:
+            cabecalhos = tratar_cabecalhos([cabecalho.strip() for cabecalho in cabecalhos])
+        yield cabecalhos
+
+        for valores in leitor:
+            valores = [value.strip() for value in valores]
+            if any(valores):
+                yield valores
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValidationError(f"Erro ao ler arquivo CSV (linha {leitor.line_num}): {str(e)}")
+
+
+def iter_csv_rows(file, encoding=None, delimiter=',', encodings=CSV_ENCODINGS, tratar_cabecalhos=None):
+    """
+    Lê um arquivo CSV de forma incremental (ver iter_csv_tabela), como dicionários.
+
+    Yields:
+        Dicionários {cabeçalho: valor} sem valores vazios (linhas vazias são ignoradas)
+    """
+    linhas = iter_csv_tabela(file, encoding, delimiter, encodings, tratar_cabecalhos)
+    cabecalhos = next(linhas, None)
+    if cabecalhos is None:
+        return
+    for valores in linhas:
+        # Cabeçalhos repetidos ficam com o último valor, como no csv.DictReader;
+        # colunas além do cabeçalho são ignoradas
+        row_dict = {}
+        for cabecalho, value in dict(zip(cabecalhos, valores)).items():
+            if value:
+                row_dict[cabecalho.strip()] = value
+        if row_dict:
+            yield row_dict
+
+
+def exigir_linhas(linhas):
+    """
+    Garante que há ao menos uma linha de dados, sem consumir o iterador.
+
+    Returns:
+        Iterador equivalente a `linhas`
+
+    Raises:
+        ValidationError: Se não houver nenhuma linha
+    """
+    linhas = iter(linhas)
+    primeira = next(linhas, None)
+    if primeira is None:
+        raise ValidationError("Arquivo vazio ou sem dados válidos")
+    return itertools.chain([primeira], linhas)
+
+
+def exigir_tabela(linhas):
+    """
+    Separa o cabeçalho das linhas de dados (iter_csv_tabela/iter_excel_tabela).
+
+    Returns:
+        Tupla (cabecalhos, iterador das linhas de dados)
+
+    Raises:
+        ValidationError: Se não houver cabeçalho ou nenhuma linha de dados
+    """
+    linhas = iter(linhas)
+    cabecalhos = next(linhas, None)
+    if cabecalhos is None:
+        raise ValidationError("Arquivo vazio ou sem dados válidos")
+    return cabecalhos, exigir_linhas(linhas)
+
+
+def read_csv_file(file, encoding=None, delimiter=','):
+    """
+    LÃª um arquivo CSV e retorna os dados
     
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
+    Args:
+        file: Arquivo CSV (Django UploadedFile ou path)
+        encoding: Encoding do arquivo (padrÃ£o: detectar pela amostra inicial)
+        delimiter: Delimitador do CSV (padrÃ£o: vÃ­rgula)
     
+    Returns:
+        Lista de dicionÃ¡rios com os dados (para arquivos grandes, prefira iter_csv_rows)
+    """
     try:
-        # Ler arquivo baseado na extensÃ£o
-        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
-        elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-            # O arquivo usa delimitador ponto e vÃ­rgula (;) conforme instruÃ§Ãµes na pÃ¡gina
-            data = None
-            encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-            
-            for encoding in encodings_to_try:
-                try:
-                    file.seek(0)  # Resetar arquivo para o inÃ­cio
-                    data = read_csv_file(file, encoding=encoding, delimiter=';')
-                    break  # Se conseguir ler, sair do loop
-                except (UnicodeDecodeError, ValidationError) as e:
-                    if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                        raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                    continue  # Tentar prÃ³ximo encoding
-                except Exception as e:
-                    # Outros erros (nÃ£o relacionados a encoding)
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-            
-            if data is None:
-                raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        else:
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_FUNCIOMANU;NOME_FUNCIOMANU;FUNCIOMANU_ID;CD_SETORMANUT;DESCR_SETORMANUT;...
-                    
-                    # Unidade
-                    cd_unid = _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid'))
-                    nome_unid = _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255)
-                    
-                    # FuncionÃ¡rio
-                    cd_funciomanu = _safe_str(row_data.get('CD_FUNCIOMANU') or row_data.get('cd_funciomanu') or row_data.get('Cd_Funciomanu'), max_length=100)
-                    nome_funciomanu = _safe_str(row_data.get('NOME_FUNCIOMANU') or row_data.get('nome_funciomanu') or row_data.get('Nome_Funciomanu'), max_length=255)
-                    funciomanu_id = _safe_int(row_data.get('FUNCIOMANU_ID') or row_data.get('funciomanu_id') or row_data.get('Funciomanu_Id'))
-                    
-                    # Setor
-                    cd_setormanut = _safe_str(row_data.get('CD_SETORMANUT') or row_data.get('cd_setormanut') or row_data.get('Cd_Setormanut'), max_length=50)
-                    descr_setormanut = _safe_str(row_data.get('DESCR_SETORMANUT') or row_data.get('descr_setormanut') or row_data.get('Descr_Setormanut'), max_length=255)
-                    
-                    # Tipo Centro de Atividade
-                    cd_tpcentativ = _safe_int(row_data.get('CD_TPCENTATIV') or row_data.get('cd_tpcentativ') or row_data.get('Cd_Tpcentativ'))
-                    descr_abrev_tpcentativ = _safe_str(row_data.get('DESCR_ABREV_TPCENTATIV') or row_data.get('descr_abrev_tpcentativ') or row_data.get('Descr_Abrev_Tpcentativ'), max_length=255)
-                    
-                    # Ordem de ServiÃ§o
-                    dt_abertura = _safe_str(row_data.get('DT_ABERTURA') or row_data.get('dt_abertura') or row_data.get('Dt_Abertura'), max_length=50)
-                    cd_ordemserv = _safe_int(row_data.get('CD_ORDEMSERV') or row_data.get('cd_ordemserv') or row_data.get('Cd_Ordemserv'))
-                    ordemserv_id = _safe_int(row_data.get('ORDEMSERV_ID') or row_data.get('ordemserv_id') or row_data.get('Ordemserv_Id'))
-                    
-                    # MÃ¡quina
-                    cd_maquina = _safe_int(row_data.get('CD_MAQUINA') or row_data.get('cd_maquina') or row_data.get('Cd_Maquina'))
-                    descr_maquina = _safe_str(row_data.get('DESCR_MAQUINA') or row_data.get('descr_maquina') or row_data.get('Descr_Maquina'), max_length=500)
-                    
-                    # Validar que temos pelo menos cÃ³digo da ordem de serviÃ§o
-                    if not cd_ordemserv:
-                        errors.append(f"Linha {row_num}: CÃ³digo da ordem de serviÃ§o (CD_ORDEMSERV) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    # Remover campos que nÃ£o existem no modelo
-                    ordem_data = {
-                        'cd_unid': cd_unid,
-                        'nome_unid': nome_unid,
-                        'cd_setormanut': cd_setormanut,
-                        'descr_setormanut': descr_setormanut,
-                        'cd_tpcentativ': cd_tpcentativ,
-                        'descr_abrev_tpcentativ': descr_abrev_tpcentativ,
-                        'cd_ordemserv': cd_ordemserv,
-                        'cd_maquina': cd_maquina,
-                        'descr_maquina': descr_maquina,
-                    }
-                    
-                    # Mapear campos de funcionÃ¡rio e data se existirem no CSV
-                    # FuncionÃ¡rio solicitante (se disponÃ­vel no CSV)
-                    if cd_funciomanu or nome_funciomanu:
-                        ordem_data['cd_func_solic_os'] = cd_funciomanu
-                        ordem_data['nm_func_solic_os'] = nome_funciomanu
-                    
-                    # Data de abertura (mapear para dt_aberordser se disponÃ­vel)
-                    if dt_abertura:
-                        ordem_data['dt_aberordser'] = dt_abertura
-                    
-                    # Adicionar outros campos do CSV se existirem
-                    # Data Entrada
-                    dt_entrada = _safe_str(row_data.get('DT_ENTRADA') or row_data.get('dt_entrada') or row_data.get('Dt_Entrada'), max_length=50)
-                    if dt_entrada:
-                        ordem_data['dt_entrada'] = dt_entrada
-                    
-                    # FuncionÃ¡rio Executor
-                    cd_func_exec = _safe_str(row_data.get('CD_FUNC_EXEC') or row_data.get('cd_func_exec') or row_data.get('NM_FUNC_EXEC') or row_data.get('nm_func_exec'), max_length=100)
-                    nm_func_exec = _safe_str(row_data.get('NM_FUNC_EXEC') or row_data.get('nm_func_exec') or row_data.get('NOME_FUNC_EXEC') or row_data.get('nome_func_exec'), max_length=255)
-                    if cd_func_exec:
-                        ordem_data['cd_func_exec'] = cd_func_exec
-                    if nm_func_exec:
-                        ordem_data['nm_func_exec'] = nm_func_exec
-                    
-                    # FuncionÃ¡rio Solicitante (se nÃ£o foi mapeado acima)
-                    cd_func_solic = _safe_str(row_data.get('CD_FUNC_SOLIC_OS') or row_data.get('cd_func_solic_os') or row_data.get('NM_FUNC_SOLIC_OS') or row_data.get('nm_func_solic_os'), max_length=100)
-                    nm_func_solic = _safe_str(row_data.get('NM_FUNC_SOLIC_OS') or row_data.get('nm_func_solic_os') or row_data.get('NOME_FUNC_SOLIC_OS') or row_data.get('nome_func_solic_os'), max_length=255)
-                    if cd_func_solic and not ordem_data.get('cd_func_solic_os'):
-                        ordem_data['cd_func_solic_os'] = cd_func_solic
-                    if nm_func_solic and not ordem_data.get('nm_func_solic_os'):
-                        ordem_data['nm_func_solic_os'] = nm_func_solic
-                    
-                    # Data Encerramento
-                    dt_encordmanu = _safe_str(row_data.get('DT_ENCORDMANU') or row_data.get('dt_encordmanu') or row_data.get('Dt_Encordmanu'), max_length=50)
-                    if dt_encordmanu:
-                        ordem_data['dt_encordmanu'] = dt_encordmanu
-                    
-                    # DescriÃ§Ã£o Queixa
-                    descr_queixa = _safe_str(row_data.get('DESCR_QUEIXA') or row_data.get('descr_queixa') or row_data.get('Descr_Queixa'))
-                    if descr_queixa:
-                        ordem_data['descr_queixa'] = descr_queixa
-                    
-                    # ExecuÃ§Ã£o Tarefas
-                    exec_tarefas = _safe_str(row_data.get('EXEC_TAREFAS') or row_data.get('exec_tarefas') or row_data.get('Exec_Tarefas'))
-                    if exec_tarefas:
-                        ordem_data['exec_tarefas'] = exec_tarefas
-                    
-                    # Unidade ExecuÃ§Ã£o
-                    cd_unid_exec = _safe_int(row_data.get('CD_UNID_EXEC') or row_data.get('cd_unid_exec') or row_data.get('Cd_Unid_Exec'))
-                    nome_unid_exec = _safe_str(row_data.get('NOME_UNID_EXEC') or row_data.get('nome_unid_exec') or row_data.get('Nome_Unid_Exec'), max_length=255)
-                    if cd_unid_exec:
-                        ordem_data['cd_unid_exec'] = cd_unid_exec
-                    if nome_unid_exec:
-                        ordem_data['nome_unid_exec'] = nome_unid_exec
-                    
-                    # Data Abertura SolicitaÃ§Ã£o
-                    dt_abertura_solicita = _safe_str(row_data.get('DT_ABERTURA_SOLICITA') or row_data.get('dt_abertura_solicita') or row_data.get('Dt_Abertura_Solicita'), max_length=50)
-                    if dt_abertura_solicita:
-                        ordem_data['dt_abertura_solicita'] = dt_abertura_solicita
-                    
-                    # ObservaÃ§Ãµes da Ordem de ServiÃ§o
-                    descr_obsordserv = _safe_str(row_data.get('DESCR_OBSORDSERV') or row_data.get('descr_obsordserv') or row_data.get('Descr_Obsordserv'))
-                    if descr_obsordserv:
-                        ordem_data['descr_obsordserv'] = descr_obsordserv
-                    
-                    # Data Abertura Ordem ServiÃ§o
-                    dt_aberordser = _safe_str(row_data.get('DT_ABERORDSER') or row_data.get('dt_aberordser') or row_data.get('Dt_Aberordser'), max_length=50)
-                    if dt_aberordser:
-                        ordem_data['dt_aberordser'] = dt_aberordser
-                    
-                    # Datas de Parada de ManutenÃ§Ã£o
-                    dt_iniparmanu = _safe_str(row_data.get('DT_INIPARMANU') or row_data.get('dt_iniparmanu') or row_data.get('Dt_Iniparmanu'), max_length=50)
-                    dt_fimparmanu = _safe_str(row_data.get('DT_FIMPARMANU') or row_data.get('dt_fimparmanu') or row_data.get('Dt_Fimparmanu'), max_length=50)
-                    if dt_iniparmanu:
-                        ordem_data['dt_iniparmanu'] = dt_iniparmanu
-                    if dt_fimparmanu:
-                        ordem_data['dt_fimparmanu'] = dt_fimparmanu
-                    
-                    # Data Prevista ExecuÃ§Ã£o
-                    dt_prev_exec = _safe_str(row_data.get('DT_PREV_EXEC') or row_data.get('dt_prev_exec') or row_data.get('Dt_Prev_Exec'), max_length=50)
-                    if dt_prev_exec:
-                        ordem_data['dt_prev_exec'] = dt_prev_exec
-                    
-                    # Tipo de Ordem de ServiÃ§o
-                    cd_tpordservtv = _safe_int(row_data.get('CD_TPORDSERTV') or row_data.get('cd_tpordservtv') or row_data.get('Cd_Tpordservtv'))
-                    descr_tpordservtv = _safe_str(row_data.get('DESCR_TPORDSERTV') or row_data.get('descr_tpordservtv') or row_data.get('Descr_Tpordservtv'), max_length=255)
-                    if cd_tpordservtv:
-                        ordem_data['cd_tpordservtv'] = cd_tpordservtv
-                    if descr_tpordservtv:
-                        ordem_data['descr_tpordservtv'] = descr_tpordservtv
-                    
-                    # SituaÃ§Ã£o Ordem ServiÃ§o
-                    descr_sitordsetv = _safe_str(row_data.get('DESCR_SITORDSETV') or row_data.get('descr_sitordsetv') or row_data.get('Descr_Sitordsetv'), max_length=255)
-                    if descr_sitordsetv:
-                        ordem_data['descr_sitordsetv'] = descr_sitordsetv
-                    
-                    # RecomendaÃ§Ãµes
-                    descr_recomenos = _safe_str(row_data.get('DESCR_RECOMENOS') or row_data.get('descr_recomenos') or row_data.get('Descr_Recomenos'))
-                    if descr_recomenos:
-                        ordem_data['descr_recomenos'] = descr_recomenos
-                    
-                    # SequÃªncia Plano ManutenÃ§Ã£o
-                    descr_seqplamanu = _safe_str(row_data.get('DESCR_SEQPLAMANU') or row_data.get('descr_seqplamanu') or row_data.get('Descr_Seqplamanu'), max_length=255)
-                    if descr_seqplamanu:
-                        ordem_data['descr_seqplamanu'] = descr_seqplamanu
-                    
-                    # Tipo de ManutenÃ§Ã£o
-                    cd_tpmanuttv = _safe_int(row_data.get('CD_TPMANUTTV') or row_data.get('cd_tpmanuttv') or row_data.get('Cd_Tpmanuttv'))
-                    descr_tpmanuttv = _safe_str(row_data.get('DESCR_TPMANUTTV') or row_data.get('descr_tpmanuttv') or row_data.get('Descr_Tpmanuttv'), max_length=255)
-                    if cd_tpmanuttv:
-                        ordem_data['cd_tpmanuttv'] = cd_tpmanuttv
-                    if descr_tpmanuttv:
-                        ordem_data['descr_tpmanuttv'] = descr_tpmanuttv
-                    
-                    # ClassificaÃ§Ã£o Origem OS
-                    cd_clasorigos = _safe_int(row_data.get('CD_CLASORIGOS') or row_data.get('cd_clasorigos') or row_data.get('Cd_Clasorigos'))
-                    descr_clasorigos = _safe_str(row_data.get('DESCR_CLASORIGOS') or row_data.get('descr_clasorigos') or row_data.get('Descr_Clasorigos'), max_length=255)
-                    if cd_clasorigos:
-                        ordem_data['cd_clasorigos'] = cd_clasorigos
-                    if descr_clasorigos:
-                        ordem_data['descr_clasorigos'] = descr_clasorigos
-                    
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        ordem_obj, created = OrdemServicoCorretiva.objects.update_or_create(
-                            cd_ordemserv=cd_ordemserv,
-                            defaults=ordem_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        ordem_obj, created = OrdemServicoCorretiva.objects.get_or_create(
-                            cd_ordemserv=cd_ordemserv,
-                            defaults=ordem_data
-                        )
-                        if created:
-                            created_count += 1
-                    
-                    # Criar Ficha de ManutenÃ§Ã£o se os campos estiverem presentes no CSV
-                    cd_func_exec_os = _safe_str(row_data.get('CD_FUNC_EXEC_OS') or row_data.get('cd_func_exec_os') or row_data.get('Cd_Func_Exec_Os'), max_length=100)
-                    nm_func_exec_os = _safe_str(row_data.get('NM_FUNC_EXEC_OS') or row_data.get('nm_func_exec_os') or row_data.get('Nm_Func_Exec_Os'), max_length=255)
-                    dt_ficapomanu = _safe_str(row_data.get('DT_FICAPOMANU') or row_data.get('dt_ficapomanu') or row_data.get('Dt_Ficapomanu'), max_length=50)
-                    dt_inic_iteficmanu = _safe_str(row_data.get('DT_INIC_ITEFICMANU') or row_data.get('dt_inic_iteficmanu') or row_data.get('Dt_Inic_Iteficmanu'), max_length=50)
-                    dt_fim_iteficmanu = _safe_str(row_data.get('DT_FIM_ITEFICMANU') or row_data.get('dt_fim_iteficmanu') or row_data.get('Dt_Fim_Iteficmanu'), max_length=50)
-                    
-                    # Criar ficha apenas se houver pelo menos um campo de ficha preenchido
-                    if cd_func_exec_os or nm_func_exec_os or dt_ficapomanu or dt_inic_iteficmanu or dt_fim_iteficmanu:
-                        ficha_data = {
-                            'ordem_servico': ordem_obj,
-                        }
-                        if cd_func_exec_os:
-                            ficha_data['cd_func_exec_os'] = cd_func_exec_os
-                        if nm_func_exec_os:
-                            ficha_data['nm_func_exec_os'] = nm_func_exec_os
-                        if dt_ficapomanu:
-                            ficha_data['dt_ficapomanu'] = dt_ficapomanu
-                        if dt_inic_iteficmanu:
-                            ficha_data['dt_inic_iteficmanu'] = dt_inic_iteficmanu
-                        if dt_fim_iteficmanu:
-                            ficha_data['dt_fim_iteficmanu'] = dt_fim_iteficmanu
-                        
-                        # Criar ficha (permitir mÃºltiplas fichas para a mesma ordem)
-                        try:
-                            OrdemServicoCorretivaFicha.objects.create(**ficha_data)
-                        except Exception as e:
-                            errors.append(f"Linha {row_num}: Erro ao criar ficha de manutenÃ§Ã£o - {str(e)}")
-                    
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-    
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
+        return list(iter_csv_rows(file, encoding=encoding, delimiter=delimiter))
+    except ValidationError:
+        raise
     except Exception as e:
-        error_detail = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_detail)
-        print(f"Erro geral: {error_detail}")  # Debug
-        return 0, 0, errors
+        raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
 
 
-def upload_maquinas_from_file(file, update_existing=False, update_fields=None) -> Tuple[int, int, List[str]]:
+def _bulk_create_with_fallback(model, items, batch_size=BULK_BATCH_SIZE, error_label='Erro ao processar registro'):
     """
-    Faz upload de mÃ¡quinas a partir de um arquivo CSV ou Excel
-    
+    Grava objetos com bulk_create em lotes. Se um lote falhar, regrava os
+    objetos daquele lote um a um para identificar a linha com problema.
+
     Args:
-        file: Arquivo Django UploadedFile
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-        update_fields: Lista de campos a serem atualizados. Se None, atualiza todos os campos.
-                      Se update_existing=False, este parÃ¢metro Ã© ignorado.
-    
+        model: Classe do modelo Django
+        items: Lista de tuplas (row_num, objeto)
+        batch_size: Quantidade de objetos por INSERT
+        error_label: Texto usado nas mensagens de erro por linha
+
     Returns:
-        Tupla (created_count, updated_count, errors)
+        Tupla (objetos_gravados, errors) - objetos_gravados é uma lista de (row_num, objeto)
     """
-    from app.models import Maquina
-    
+    saved = []
     errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo baseado na extensÃ£o
-        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
-        elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings
-            try:
-                data = read_csv_file(file, encoding='utf-8')
-            except UnicodeDecodeError:
+    reset_pk = isinstance(model._meta.pk, AutoField)
+
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([obj for _, obj in batch], batch_size=batch_size)
+                indexar_registros(model, [obj for _, obj in batch])
+            saved.extend(batch)
+        except DatabaseError:
+            # Lote rejeitado pelo banco: gravar linha a linha para isolar o erro
+            for row_num, obj in batch:
+                if reset_pk:
+                    obj.pk = None
+                obj._state.adding = True
                 try:
-                    file.seek(0)  # Resetar arquivo
-                    data = read_csv_file(file, encoding='latin-1')
+                    with transaction.atomic():
+                        obj.save(force_insert=True)
+                    saved.append((row_num, obj))
                 except Exception as e:
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+                    errors.append(f"Linha {row_num}: {error_label} - {str(e)}")
+
+    if saved:
+        agendar_invalidacao_cache(model)
+    return saved, errors
+
+
+class BulkUpsert:
+    """
+    Grava linhas importadas em lote, substituindo get_or_create/update_or_create por linha.
+
+    As linhas são acumuladas com add() e gravadas a cada BULK_BATCH_SIZE chaves:
+    os registros existentes são buscados em uma única consulta, as linhas são
+    separadas em criação e atualização e gravadas com bulk_create/bulk_update.
+
+    A semântica é a mesma dos importadores anteriores:
+    - update_existing=False: registros já existentes são mantidos como estão
+    - update_existing=True: registros existentes recebem os campos informados na linha
+    - chave repetida no arquivo: a primeira ocorrência cria e as seguintes atualizam
+      (ou são ignoradas quando update_existing=False)
+
+    Na atualização, apenas os campos cujo valor mudou são gravados; registros idênticos
+    à linha do arquivo não geram escrita (contam em updated_count e em unchanged_count).
+
+    Uso:
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=True)
+        for row_num, row_data in enumerate(data, start=2):
+            upsert.add(row_num, {...})
+        upsert.flush()
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
+    """
+
+    def __init__(self, model, key_fields, update_existing=False, update_fields=None, batch_size=BULK_BATCH_SIZE,
+                 before_update=None, after_flush=None, keep_objects=True):
+        self.model = model
+        self.before_update = before_update  # callable(obj) chamado com o registro antes de receber os novos valores
+        self.after_flush = after_flush  # callable(objs) chamado com os registros de cada lote gravado
+        # keep_objects=False: self.objects guarda apenas o último lote (memória limitada em arquivos grandes)
+        self.keep_objects = keep_objects
+        self.key_fields = tuple(key_fields)
+        self.update_existing = update_existing
+        self.update_fields = set(update_fields) if update_fields else None
+        self.batch_size = batch_size
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0  # incluídos em updated_count, mas sem nenhuma alteração gravada
+        self.errors = []
+        self.objects = {}  # chave -> instância gravada (ou já existente)
+        self.created_keys = set()
+        self._pending = {}  # chave -> (row_num, data)
+        self._key_model_fields = [model._meta.get_field(field) for field in self.key_fields]
+        # Campos por nome e por attname (ex.: 'maquina' e 'maquina_id'), para comparar valores
+        self._model_fields = {}
+        for field in model._meta.concrete_fields:
+            self._model_fields[field.name] = field
+            self._model_fields[field.attname] = field
+        self._auto_now_fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def key_for(self, data):
+        """Retorna a tupla de chave para um dicionário de dados"""
+        return tuple(data.get(field) for field in self.key_fields)
+
+    def _key_for_obj(self, obj):
+        return tuple(getattr(obj, field) for field in self.key_fields)
+
+    def add(self, row_num, data):
+        """
+        Adiciona uma linha para gravação. Os dados devem conter os campos da chave.
+
+        Returns:
+            A chave da linha, usada para localizar o objeto em self.objects após flush()
+        """
+        data = dict(data)
+        # Normalizar os valores da chave para o tipo do campo (ex.: datetime em DateField)
+        # para que a comparação com os registros do banco seja exata
+        for field in self._key_model_fields:
+            data[field.name] = field.to_python(data.get(field.name))
+
+        key = self.key_for(data)
+        if key in self._pending:
+            # Chave repetida no mesmo lote: comportamento de update_or_create/get_or_create
+            if self.update_existing:
+                self._pending[key][1].update(data)
+                self.updated_count += 1
+            return key
+
+        self._pending[key] = (row_num, data)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return key
+
+    def fetch_existing(self, keys):
+        """Busca os registros existentes para as chaves informadas (uma consulta por bloco)"""
+        keys = list(keys)
+        existing = {}
+        if not keys:
+            return existing
+
+        chunk_size = max(1, BULK_MAX_QUERY_PARAMS // len(self.key_fields))
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            filters = Q()
+            for idx, field in enumerate(self.key_fields):
+                values = {key[idx] for key in chunk}
+                field_filter = Q(**{f'{field}__in': [v for v in values if v is not None]})
+                if None in values:
+                    field_filter |= Q(**{f'{field}__isnull': True})
+                filters &= field_filter
+            for obj in self.model.objects.filter(filters):
+                existing.setdefault(self._key_for_obj(obj), obj)
+
+        return existing
+
+    def flush(self):
+        """Grava as linhas pendentes no banco"""
+        if not self._pending:
+            return
+
+        pending = self._pending
+        self._pending = {}
+        if not self.keep_objects:
+            self.objects = {}
+        existing = self.fetch_existing(pending.keys())
+
+        to_create = []
+        to_update = []
+        changed_fields = set()
+        now = timezone.now()
+
+        for key, (row_num, data) in pending.items():
+            try:
+                obj = existing.get(key)
+                if obj is None:
+                    to_create.append((row_num, self.model(**data)))
+                elif self.update_existing:
+                    alterados = self._changed_fields(obj, data)
+                    if not alterados:
+                        # Registro já igual à linha do arquivo: nada a gravar
+                        self.objects[key] = obj
+                        self.updated_count += 1
+                        self.unchanged_count += 1
+                        continue
+                    if self.before_update is not None:
+                        self.before_update(obj)
+                    for field in alterados:
+                        setattr(obj, field, data[field])
+                        changed_fields.add(field)
+                    for field in self._auto_now_fields:
+                        setattr(obj, field.attname, now)
+                        changed_fields.add(field.name)
+                    to_update.append((row_num, obj))
+                else:
+                    self.objects[key] = obj
+            except Exception as e:
+                self.errors.append(f"Linha {row_num}: Erro ao processar registro - {str(e)}")
+
+        self._create(to_create)
+        self._update(to_update, changed_fields)
+
+        if self.after_flush is not None:
+            self.after_flush([self.objects[key] for key in pending if key in self.objects])
+
+    def _changed_fields(self, obj, data):
+        """
+        Campos da linha (respeitando update_fields) cujo valor difere do registro existente.
+
+        Os valores são comparados já convertidos para o tipo do campo; na dúvida
+        (valor que não converte, campo desconhecido) o campo é considerado alterado.
+        """
+        alterados = []
+        for name, value in data.items():
+            if name in self.key_fields:
+                continue
+            if self.update_fields is not None and name not in self.update_fields:
+                continue
+            field = self._model_fields.get(name)
+            if field is None:
+                alterados.append(name)
+                continue
+            atual = getattr(obj, field.attname)
+            if field.is_relation:
+                novo = value.pk if hasattr(value, '_meta') else value
+            else:
+                try:
+                    novo = field.to_python(value)
+                except ValidationError:
+                    alterados.append(name)
+                    continue
+            if novo != atual:
+                alterados.append(name)
+        return alterados
+
+    def _create(self, items):
+        if not items:
+            return
+        saved, errors = _bulk_create_with_fallback(self.model, items, self.batch_size)
+        self.errors.extend(errors)
+
+        if saved and saved[0][1].pk is None:
+            # Banco sem suporte a RETURNING no bulk insert: recarregar pelas chaves
+            refreshed = self.fetch_existing(self._key_for_obj(obj) for _, obj in saved)
+            saved = [(row_num, refreshed.get(self._key_for_obj(obj), obj)) for row_num, obj in saved]
+
+        for _, obj in saved:
+            key = self._key_for_obj(obj)
+            self.objects[key] = obj
+            if self.keep_objects:
+                self.created_keys.add(key)
+        self.created_count += len(saved)
+
+    def _update(self, items, fields):
+        if not items:
+            return
+        fields = sorted(fields)
+        indexados = set(fields) & set(campos_indexados(self.model) or ())
+
+        if fields:
+            for start in range(0, len(items), self.batch_size):
+                batch = [obj for _, obj in items[start:start + self.batch_size]]
+                with transaction.atomic():
+                    self.model.objects.bulk_update(batch, fields)
+                    if indexados:
+                        indexar_registros(self.model, batch)
+            agendar_invalidacao_cache(self.model)
+
+        for _, obj in items:
+            self.objects[self._key_for_obj(obj)] = obj
+        self.updated_count += len(items)
+
+
+
+# Linhas por bloco nas importações retomáveis: cada bloco é gravado em sua própria transação
+CHECKPOINT_LINHAS = 5000
+# Erros guardados no checkpoint (devolvidos de novo quando a importação é retomada)
+CHECKPOINT_LIMITE_ERROS = 500
+
+
+def hash_arquivo(file) -> str:
+    """SHA-256 do conteúdo de um arquivo (Django UploadedFile ou path), lido em partes"""
+    sha = hashlib.sha256()
+    if hasattr(file, 'read'):
+        file.seek(0)
+        for parte in iter(lambda: file.read(1024 * 1024), b''):
+            sha.update(parte)
+        file.seek(0)
+    else:
+        with open(file, 'rb') as f:
+            for parte in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(parte)
+    return sha.hexdigest()
+
+
+class ImportacaoRetomavel:
+    """
+    Divide uma importação em blocos de CHECKPOINT_LINHAS linhas, cada um gravado em
+    sua própria transação junto com o checkpoint (CheckpointImportacao).
+
+    O checkpoint é identificado pelo tipo e pelo hash do arquivo. Se a importação for
+    interrompida, os blocos já gravados permanecem e importar de novo o mesmo arquivo
+    (com as mesmas opções) continua a partir da linha seguinte à última gravada.
+    Um arquivo já importado por completo é importado de novo desde o início.
+
+    Uso:
+        retomavel = ImportacaoRetomavel('roteiro_preventiva', file, update_existing=update_existing)
+        for bloco in retomavel.blocos(enumerate(linhas, start=2)):
+            with transaction.atomic():
+                for row_num, valores in bloco:
+                    upsert.add(row_num, {...})
+                upsert.flush()
+                retomavel.registrar_bloco(bloco, upsert.created_count, upsert.updated_count, errors)
+        return retomavel.finalizar(errors)
+    """
+
+    def __init__(self, tipo, file, tamanho_bloco=CHECKPOINT_LINHAS, **parametros):
+        from app.models import CheckpointImportacao
+
+        self.tamanho_bloco = tamanho_bloco
+        checkpoint, _ = CheckpointImportacao.objects.get_or_create(
+            tipo=tipo, hash_arquivo=hash_arquivo(file),
+            defaults={'nome_arquivo': os.path.basename(getattr(file, 'name', str(file)))[:255], 'parametros': parametros},
+        )
+        if checkpoint.concluida or checkpoint.parametros != parametros:
+            checkpoint.reiniciar(parametros)
+            checkpoint.save()
+        self.checkpoint = checkpoint
+        self.linha_inicial = checkpoint.ultima_linha
+        # Erros dos blocos gravados nas execuções anteriores (devolvidos no resultado)
+        self.erros_anteriores = list(checkpoint.erros)
+        self._created_count = 0
+        self._updated_count = 0
+        self._total_erros = 0
+        if self.retomada:
+            print(f"Importação {tipo} de {checkpoint.nome_arquivo} retomada após a linha {self.linha_inicial}")
+
+    @property
+    def retomada(self):
+        """True se esta execução continua uma importação interrompida do mesmo arquivo"""
+        return self.linha_inicial > 0
+
+    @property
+    def estado(self):
+        """Dados extras do importador salvos com o último bloco (ex.: dias afetados)"""
+        return self.checkpoint.estado
+
+    def blocos(self, linhas_numeradas):
+        """
+        Agrupa (row_num, linha) em listas de tamanho_bloco, pulando as linhas
+        já gravadas em execuções anteriores.
+        """
+        linhas_numeradas = (
+            (row_num, linha) for row_num, linha in linhas_numeradas if row_num > self.linha_inicial
+        )
+        while True:
+            bloco = list(itertools.islice(linhas_numeradas, self.tamanho_bloco))
+            if not bloco:
+                return
+            yield bloco
+
+    def registrar_bloco(self, bloco, created_count, updated_count, errors, estado=None):
+        """
+        Salva o checkpoint ao fim de um bloco; chamar dentro da transação do bloco.
+
+        Args:
+            bloco: Lista de (row_num, linha) do bloco gravado
+            created_count, updated_count: Totais acumulados nesta execução
+            errors: Lista acumulada dos erros desta execução
+            estado: Dados extras do importador para a retomada (JSON)
+        """
+        novos_erros = errors[self._total_erros:]
+        checkpoint = self.checkpoint
+        checkpoint.blocos.append({
+            'inicio': bloco[0][0],
+            'fim': bloco[-1][0],
+            'criados': created_count - self._created_count,
+            'atualizados': updated_count - self._updated_count,
+            'erros': len(novos_erros),
+        })
+        checkpoint.ultima_linha = bloco[-1][0]
+        checkpoint.registros_criados += created_count - self._created_count
+        checkpoint.registros_atualizados += updated_count - self._updated_count
+        checkpoint.total_erros += len(novos_erros)
+        if len(checkpoint.erros) < CHECKPOINT_LIMITE_ERROS:
+            checkpoint.erros = (checkpoint.erros + novos_erros)[:CHECKPOINT_LIMITE_ERROS]
+        if estado is not None:
+            checkpoint.estado = estado
+        checkpoint.save()
+
+        self._created_count = created_count
+        self._updated_count = updated_count
+        self._total_erros = len(errors)
+
+    def finalizar(self, errors) -> Tuple[int, int, List[str]]:
+        """
+        Marca o arquivo como importado por completo.
+
+        Returns:
+            Tupla (created_count, updated_count, errors) do arquivo inteiro, somando as
+            execuções anteriores quando a importação foi retomada
+        """
+        self.checkpoint.concluida = True
+        self.checkpoint.save(update_fields=['concluida', 'updated_at'])
+        return self.checkpoint.registros_criados, self.checkpoint.registros_atualizados, self.erros_anteriores + errors
+
+    def interromper(self, errors, erro) -> Tuple[int, int, List[str]]:
+        """
+        Resultado de uma importação que falhou no meio: os blocos já gravados
+        permanecem e a mensagem indica como retomar.
+        """
+        mensagem = f"Erro geral ao processar arquivo: {str(erro)}"
+        if self.checkpoint.ultima_linha > 0:
+            mensagem += (
+                f". Os registros até a linha {self.checkpoint.ultima_linha} foram gravados; "
+                f"importe o mesmo arquivo novamente para continuar a partir da linha seguinte."
+            )
+        # Os erros do bloco desfeito ficam de fora: serão apurados de novo na retomada
+        return (
+            self.checkpoint.registros_criados,
+            self.checkpoint.registros_atualizados,
+            self.erros_anteriores + errors[:self._total_erros] + [mensagem],
+        )
+
+class IndiceSemanas:
+    """
+    Índice em memória das Semana52 (ordenadas por início) para localizar a semana
+    de uma data ou as semanas de um intervalo com busca binária, sem consultar o banco.
+
+    As instâncias de Semana52 do índice são compartilhadas entre requisições e
+    devem ser tratadas como somente leitura.
+
+    Uso:
+        indice = indice_semanas()
+        semana = indice.semana(data)  # None se nenhuma semana contém a data
+        semanas = indice.semanas_no_intervalo(data_inicio, data_fim)
+    """
+
+    def __init__(self, semanas):
+        from datetime import date
+
+        # Semanas com data de início, da mais antiga para a mais recente (como order_by('inicio', 'pk'))
+        self.semanas = sorted(
+            (semana for semana in semanas if semana.inicio),
+            key=lambda semana: (semana.inicio, semana.pk),
+        )
+        self._inicios = [semana.inicio for semana in self.semanas]
+        # Maior data de fim entre as semanas até cada posição (não decrescente, permite bisect)
+        self._maiores_fins = []
+        maior_fim = date.min
+        for semana in self.semanas:
+            if semana.fim and semana.fim > maior_fim:
+                maior_fim = semana.fim
+            self._maiores_fins.append(maior_fim)
+
+    @classmethod
+    def carregar(cls):
+        """Índice com as semanas atuais do banco (uma consulta)"""
+        from app.models import Semana52
+        return cls(Semana52.objects.filter(inicio__isnull=False))
+
+    def __len__(self):
+        return len(self.semanas)
+
+    def _primeira_terminando_em(self, data, limite):
+        """Posição da primeira semana (antes de limite) que termina em data ou depois"""
+        return bisect.bisect_left(self._maiores_fins, data, 0, limite)
+
+    def semana(self, data):
+        """
+        Semana52 que contém a data (a de início mais antigo, como em
+        Semana52.objects.filter(inicio__lte=data, fim__gte=data).first()); None se nenhuma
+        """
+        if data is None:
+            return None
+        limite = bisect.bisect_right(self._inicios, data)
+        posicao = self._primeira_terminando_em(data, limite)
+        # Na primeira posição em que o maior fim alcança a data, a própria semana termina nela
+        return self.semanas[posicao] if posicao < limite else None
+
+    def semanas_no_intervalo(self, inicio, fim):
+        """Semanas que têm algum dia entre inicio e fim (inclusive), em ordem de início"""
+        if inicio is None or fim is None or inicio > fim:
+            return []
+        limite = bisect.bisect_right(self._inicios, fim)
+        return [
+            semana
+            for semana in self.semanas[self._primeira_terminando_em(inicio, limite):limite]
+            if semana.fim and semana.fim >= inicio
+        ]
+
+    def intervalo(self):
+        """(início da primeira semana, maior data de fim); None se não houver semanas"""
+        if not self.semanas:
+            return None
+        return self._inicios[0], max(self._maiores_fins[-1], self._inicios[-1])
+
+    def ultima_iniciada(self, data):
+        """Semana de início mais recente até a data (inclusive); None se nenhuma"""
+        posicao = bisect.bisect_right(self._inicios, data)
+        return self.semanas[posicao - 1] if posicao else None
+
+    def proxima(self, data):
+        """Primeira semana que começa na data ou depois; None se nenhuma"""
+        posicao = bisect.bisect_left(self._inicios, data)
+        return self.semanas[posicao] if posicao < len(self.semanas) else None
+
+
+_indice_semanas = {'versao': None, 'indice': None}
+_indice_semanas_lock = threading.Lock()
+
+
+def indice_semanas() -> IndiceSemanas:
+    """
+    IndiceSemanas do processo, reconstruído quando as Semana52 mudam.
+
+    A validade segue a versão do modelo no cache dos dashboards (ver
+    versoes_modelos), alterada pelo upload das 52 semanas, pelo admin e por
+    qualquer outra gravação ou exclusão de Semana52; assim todos os processos
+    do servidor descartam o índice antigo.
+    """
+    from app.models import Semana52
+
+    # A versão é lida antes das semanas: uma alteração confirmada no meio da
+    # leitura muda a versão e força nova reconstrução na próxima chamada
+    versao = versoes_modelos(Semana52)
+    with _indice_semanas_lock:
+        if _indice_semanas['indice'] is None or _indice_semanas['versao'] != versao:
+            _indice_semanas['indice'] = IndiceSemanas.carregar()
+            _indice_semanas['versao'] = versao
+        return _indice_semanas['indice']
+
+
+class ReferenciasImportacao:
+    """
+    Cache das referências usadas para ligar chaves estrangeiras durante uma importação:
+    cd_maquina → id da Maquina, ca → id do CentroAtividade e índice das Semana52.
+
+    Cada tabela é carregada com uma única consulta na primeira vez em que é usada e as
+    buscas seguintes são feitas em memória. Válido apenas durante a importação (não
+    acompanha alterações feitas por outros processos).
+
+    Uso:
+        referencias = ReferenciasImportacao()
+        maquina_id = referencias.maquina_id(cd_maquina)  # None se não existir
+        if maquina_id is None:
+            maquina = Maquina.objects.create(cd_maquina=cd_maquina, ...)
+            referencias.registrar_maquina(maquina)
+    """
+
+    def __init__(self):
+        self._maquinas = None
+        self._centros_atividade = None
+        self._semanas = None
+
+    def maquina_id(self, cd_maquina):
+        """Id da máquina com o código informado (None se não existir)"""
+        if self._maquinas is None:
+            from app.models import Maquina
+            self._maquinas = dict(Maquina.objects.values_list('cd_maquina', 'id'))
+        return self._maquinas.get(cd_maquina)
+
+    def registrar_maquina(self, maquina):
+        """Inclui no cache uma máquina criada durante a importação"""
+        if self._maquinas is not None:
+            self._maquinas[maquina.cd_maquina] = maquina.pk
+
+    def centro_atividade_id(self, ca):
+        """Id do Centro de Atividade com o número de CA informado (None se não existir)"""
+        if self._centros_atividade is None:
+            from app.models import CentroAtividade
+            self._centros_atividade = dict(CentroAtividade.objects.values_list('ca', 'id'))
+        return self._centros_atividade.get(ca)
+
+    def semana(self, data):
+        """
+        Semana52 que contém a data (a de início mais antigo, como em
+        Semana52.objects.filter(inicio__lte=data, fim__gte=data).first()); None se nenhuma
+        """
+        if self._semanas is None:
+            self._semanas = indice_semanas()
+        return self._semanas.semana(data)
+
+
+def upload_ordens_corretivas_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
+    """
+    Faz upload de ordens de serviÃ§o corretivas a partir de um arquivo CSV ou Excel
+    
+    Args:
+        file: Arquivo Django UploadedFile
+        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
+    
+    Returns:
+        Tupla (created_count, updated_count, errors)
+    """
+    from app.models import OrdemServicoCorretiva, OrdemServicoCorretivaFicha
+    from datetime import date
+    
+    errors = []
+    
+    # Determinar tipo de arquivo
+    file_name = file.name.lower()
+    
+    try:
+        # Ler arquivo baseado na extensÃ£o
+        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
+            linhas = iter_excel_tabela(file)
+        elif file_name.endswith('.csv'):
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            # O arquivo usa delimitador ponto e vÃ­rgula (;) conforme instruÃ§Ãµes na pÃ¡gina
+            linhas = iter_csv_tabela(file, delimiter=';')
         else:
             raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        # Gravação em blocos com checkpoint: reimportar o mesmo arquivo após uma
+        # falha continua do último bloco gravado
+        retomavel = ImportacaoRetomavel('ordens_corretivas', file, update_existing=update_existing)
+        
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento.
+        # O cabeçalho é resolvido uma única vez; cada linha é lida por posição.
+        cabecalhos, linhas = exigir_tabela(linhas)
+        extrair = COLUNAS_ORDEM_CORRETIVA.compilar(cabecalhos)
+        
+        # Dias dos resumos diários afetados (datas antigas das ordens atualizadas e datas novas),
+        # incluindo os dos blocos gravados antes de uma interrupção
+        dias_afetados = {date.fromisoformat(dia) if dia else None for dia in retomavel.estado.get('dias', [])}
+        # Chave da ordem -> id gravado (as instâncias não ficam em memória entre os lotes)
+        ordens_ids = {}
+        
+        # Executores das ordens e fichas -> manutentores (tabela ExecucaoManutentor)
+        indice_manutentores = IndiceManutentores()
+        
+        # Qualidade dos dados: as ordens gravadas são avaliadas pelo perfil já calculado
+        perfil_qualidade = perfil_qualidade_gravado()
+        
+        def _registrar_ordens(ordens):
+            for ordem in ordens:
+                ordens_ids[(ordem.cd_ordemserv,)] = ordem.pk
+                dias_afetados.update(dias_resumo_ordem(ordem))
+            vincular_execucoes_manutentores(ordens=ordens, indice=indice_manutentores)
+            if perfil_qualidade is not None:
+                avaliar_qualidade_ordens(ordens, perfil_qualidade)
+        
+        upsert = BulkUpsert(
+            OrdemServicoCorretiva, ['cd_ordemserv'], update_existing=update_existing,
+            before_update=lambda ordem: dias_afetados.update(dias_resumo_ordem(ordem)),
+            after_flush=_registrar_ordens,
+            keep_objects=False,
+        )
+        fichas_pendentes = []
+        
+        def _gravar_fichas():
+            """Grava as fichas pendentes, vinculando-as às ordens já gravadas"""
+            upsert.flush()
+            fichas = []
+            for ficha_row_num, ordem_key, ficha_data in fichas_pendentes:
+                ordem_id = ordens_ids.get(ordem_key)
+                if ordem_id is None:
+                    # A ordem desta linha não foi gravada (erro já registrado)
+                    continue
+                fichas.append((ficha_row_num, OrdemServicoCorretivaFicha(ordem_servico_id=ordem_id, **ficha_data)))
+            fichas_pendentes.clear()
+            fichas_gravadas, ficha_errors = _bulk_create_with_fallback(
+                OrdemServicoCorretivaFicha, fichas, error_label='Erro ao criar ficha de manutenção'
+            )
+            errors.extend(ficha_errors)
+            vincular_execucoes_manutentores(fichas=[ficha for _, ficha in fichas_gravadas], indice=indice_manutentores)
+        
+        try:
+            # Cada bloco é gravado em sua própria transação, junto com o checkpoint
+            for bloco in retomavel.blocos(enumerate(linhas, start=2)):  # Começar em 2 (linha 1 é cabeçalho)
+                with transaction.atomic():
+                    for row_num, valores in bloco:
+                        try:
+                            # Verificar se a linha está vazia ou tem apenas valores vazios
+                            if not any(valores):
+                                continue
+                            
+                            campos = extrair(valores)
+                            
+                            # Validar que temos pelo menos código da ordem de serviço
+                            if not campos['cd_ordemserv']:
+                                errors.append(f"Linha {row_num}: Código da ordem de serviço (CD_ORDEMSERV) é obrigatório")
+                                continue
+                            
+                            ordem_data = {
+                                'cd_unid': campos['cd_unid'],
+                                'nome_unid': campos['nome_unid'],
+                                'cd_setormanut': campos['cd_setormanut'],
+                                'descr_setormanut': campos['descr_setormanut'],
+                                'cd_tpcentativ': campos['cd_tpcentativ'],
+                                'descr_abrev_tpcentativ': campos['descr_abrev_tpcentativ'],
+                                'cd_ordemserv': campos['cd_ordemserv'],
+                                'cd_maquina': campos['cd_maquina'],
+                                'descr_maquina': campos['descr_maquina'],
+                            }
+                            
+                            # Funcionário solicitante (CD_FUNCIOMANU/NOME_FUNCIOMANU, se disponível no CSV)
+                            if campos['cd_funciomanu'] or campos['nome_funciomanu']:
+                                ordem_data['cd_func_solic_os'] = campos['cd_funciomanu']
+                                ordem_data['nm_func_solic_os'] = campos['nome_funciomanu']
+                            
+                            # Data de abertura (mapear para dt_aberordser; DT_ABERORDSER tem precedência)
+                            if campos['dt_abertura']:
+                                ordem_data['dt_aberordser'] = campos['dt_abertura']
+                            
+                            for campo in CAMPOS_OPCIONAIS_ORDEM_CORRETIVA:
+                                if campos[campo]:
+                                    ordem_data[campo] = campos[campo]
+                            
+                            # Funcionário Solicitante (se não foi mapeado acima)
+                            for campo in ('cd_func_solic_os', 'nm_func_solic_os'):
+                                if campos[campo] and not ordem_data.get(campo):
+                                    ordem_data[campo] = campos[campo]
+                            
+                            # Colunas tipadas das datas (usadas nos filtros por período)
+                            ordem_data.update(OrdemServicoCorretiva.datas_tipadas(ordem_data))
+                            
+                            # Acumular registro para gravação em lote
+                            ordem_key = upsert.add(row_num, ordem_data)
+                            
+                            # Criar ficha apenas se houver pelo menos um campo de ficha preenchido
+                            ficha_data = {campo: campos[campo] for campo in CAMPOS_FICHA_ORDEM_CORRETIVA if campos[campo]}
+                            if ficha_data:
+                                # A ficha é gravada depois que a ordem do lote for gravada
+                                # (permitir múltiplas fichas para a mesma ordem)
+                                fichas_pendentes.append((row_num, ordem_key, ficha_data))
+                                if len(fichas_pendentes) >= BULK_BATCH_SIZE:
+                                    _gravar_fichas()
+                            
+                        except Exception as e:
+                            error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
+                            errors.append(error_msg)
+                            print(f"Erro na linha {row_num}: {e}")
+                            import traceback
+                            traceback.print_exc()
+                    
+                    _gravar_fichas()
+                    errors.extend(upsert.errors)
+                    upsert.errors.clear()
+                    retomavel.registrar_bloco(
+                        bloco, upsert.created_count, upsert.updated_count, errors,
+                        estado={'dias': [dia.isoformat() if dia else None for dia in dias_afetados]},
+                    )
+            
+            with transaction.atomic():
+                atualizar_resumo_ordens(dias_afetados)
+            if perfil_qualidade is None:
+                # Primeira importação: o perfil de todas as ordens é calculado no worker
+                from app.importacoes import enfileirar_analise_qualidade_ordens
+                enfileirar_analise_qualidade_ordens()
+        except Exception as e:
+            # Blocos anteriores já gravados; o bloco com falha foi desfeito
+            print(f"Importação de ordens interrompida: {e}")
+            return retomavel.interromper(errors, e)
+        
+        return retomavel.finalizar(errors)
+    
+    except ValidationError as e:
+        errors.append(str(e))
+        return 0, 0, errors
+    except Exception as e:
+        error_detail = f"Erro geral ao processar arquivo: {str(e)}"
+        errors.append(error_detail)
+        print(f"Erro geral: {error_detail}")  # Debug
+        return 0, 0, errors
+
+
+def upload_maquinas_from_file(file, update_existing=False, update_fields=None) -> Tuple[int, int, List[str]]:
+    """
+    Faz upload de mÃ¡quinas a partir de um arquivo CSV ou Excel
+    
+    Args:
+        file: Arquivo Django UploadedFile
+        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
+        update_fields: Lista de campos a serem atualizados. Se None, atualiza todos os campos.
+                      Se update_existing=False, este parÃ¢metro Ã© ignorado.
+    
+    Returns:
+        Tupla (created_count, updated_count, errors)
+    """
+    from app.models import Maquina
+    
+    errors = []
+    
+    # Determinar tipo de arquivo
+    file_name = file.name.lower()
+    
+    try:
+        # Ler arquivo baseado na extensÃ£o
+        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
+            data = iter_excel_rows(file)
+        elif file_name.endswith('.csv'):
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            data = iter_csv_rows(file)
+        else:
+            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
+        
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
+        
+        # Se update_fields foi especificado, apenas os campos selecionados são atualizados
+        upsert = BulkUpsert(Maquina, ['cd_maquina'], update_existing=update_existing, update_fields=update_fields)
+        # Centros de Atividade (ca → id) carregados uma vez para ligar a chave estrangeira em memória
+        referencias = ReferenciasImportacao()
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
@@ -512,43 +1303,14 @@ def upload_maquinas_from_file(file, update_existing=False, update_fields=None) -
                         'descr_gerenc': descr_gerenc,
                     }
                     
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        # Se update_fields foi especificado, filtrar apenas os campos selecionados
-                        if update_fields:
-                            # Buscar mÃ¡quina existente primeiro
-                            try:
-                                maquina_obj = Maquina.objects.get(cd_maquina=cd_maquina)
-                                # Atualizar apenas campos selecionados
-                                for field in update_fields:
-                                    if field in maquina_data:
-                                        setattr(maquina_obj, field, maquina_data[field])
-                                maquina_obj.save()
-                                updated_count += 1
-                            except Maquina.DoesNotExist:
-                                # Se nÃ£o existe, criar novo registro com todos os campos
-                                maquina_obj = Maquina.objects.create(
-                                    cd_maquina=cd_maquina,
-                                    **maquina_data
-                                )
-                                created_count += 1
-                        else:
-                            # Comportamento padrÃ£o: atualizar todos os campos
-                            maquina_obj, created = Maquina.objects.update_or_create(
-                            cd_maquina=cd_maquina,
-                            defaults=maquina_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        maquina_obj, created = Maquina.objects.get_or_create(
-                            cd_maquina=cd_maquina,
-                            defaults=maquina_data
-                        )
-                        if created:
-                            created_count += 1
+                    # Ligar ao Centro de Atividade do tipo informado, quando cadastrado
+                    centro_atividade_id = referencias.centro_atividade_id(cd_tpcentativ)
+                    if centro_atividade_id is not None:
+                        maquina_data['centro_atividade_id'] = centro_atividade_id
+                    
+                    # Acumular registro para gravação em lote
+                    maquina_data['cd_maquina'] = cd_maquina
+                    upsert.add(row_num, maquina_data)
                     
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
@@ -556,8 +1318,10 @@ def upload_maquinas_from_file(file, update_existing=False, update_fields=None) -
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
     
     except ValidationError as e:
         errors.append(str(e))
@@ -587,8 +1351,6 @@ def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_exis
     from datetime import datetime
     
     errors = []
-    created_count = 0
-    updated_count = 0
     
     # Validar data_requisicao
     if not data_requisicao:
@@ -611,106 +1373,22 @@ def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_exis
         if not file_name.endswith('.csv'):
             raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
         
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        # Usar data_requisicao + cd_item para identificar duplicados
+        upsert = BulkUpsert(
+            RequisicaoAlmoxarifado, ['data_requisicao', 'cd_item'], update_existing=update_existing, keep_objects=False,
+        )
         
-        # Processar dados em transaÃ§Ã£o
+        # Processar dados em transação (as linhas são lidas conforme o processamento)
         with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
+            for row_num, requisicao_data in iter_requisicoes_almoxarifado(file, data_requisicao, errors):
+                upsert.add(row_num, requisicao_data)
+            
+            upsert.flush()
+            
+            # Todas as linhas do arquivo são do mesmo dia: atualizar só o resumo desse dia
+            atualizar_resumo_requisicoes([data_requisicao])
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
     
     except ValidationError as e:
         errors.append(str(e))
@@ -724,6 +1402,218 @@ def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_exis
         return 0, 0, errors
 
 
+def iter_requisicoes_almoxarifado(file, data_requisicao, errors):
+    """
+    Lê um CSV diário de requisições e produz os dados de cada linha, sem acessar o banco.
+
+    Args:
+        file: Arquivo CSV (Django UploadedFile, objeto binário ou path)
+        data_requisicao: Data associada a todas as linhas (datetime.date)
+        errors: Lista onde são registrados os erros de linha
+
+    Yields:
+        Tuplas (row_num, requisicao_data)
+
+    Raises:
+        ValidationError: Se o arquivo não puder ser lido ou não tiver dados
+    """
+    # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+    cabecalhos, linhas = exigir_tabela(iter_csv_tabela(file, delimiter=';'))
+    extrair = COLUNAS_REQUISICAO_ALMOXARIFADO.compilar(cabecalhos)
+
+    for row_num, valores in enumerate(linhas, start=2):  # Começar em 2 (linha 1 é cabeçalho)
+        try:
+            # Verificar se a linha está vazia ou tem apenas valores vazios
+            if not any(valores):
+                continue
+
+            requisicao_data = extrair(valores)
+
+            # Validar que temos pelo menos código do item
+            if not requisicao_data['cd_item']:
+                errors.append(f"Linha {row_num}: Código do item (CD_ITEM) é obrigatório")
+                continue
+
+            requisicao_data['data_requisicao'] = data_requisicao
+            yield row_num, requisicao_data
+
+        except Exception as e:
+            errors.append(f"Linha {row_num}: Erro ao processar registro - {str(e)}")
+
+
+def extrair_data_nome_arquivo(file_name):
+    """Data no formato DD.MM.YYYY contida no nome do arquivo (ex.: 01.11.2025.csv), ou None"""
+    import re
+    from datetime import date
+
+    match = re.search(r'(\d{2})\.(\d{2})\.(\d{4})', os.path.basename(file_name))
+    if not match:
+        return None
+    day, month, year = (int(parte) for parte in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def expandir_arquivos_requisicoes(arquivos, errors) -> List[Tuple[str, bytes]]:
+    """
+    Lista os CSVs de um envio em lote, expandindo os arquivos ZIP.
+
+    Args:
+        arquivos: Arquivos enviados (Django UploadedFile), CSV ou ZIP
+        errors: Lista onde são registrados os arquivos ignorados
+
+    Returns:
+        Lista de (nome, conteúdo) de cada CSV, na ordem dos nomes dentro de cada ZIP
+    """
+    import zipfile
+
+    membros = []
+    for arquivo in arquivos:
+        nome = os.path.basename(arquivo.name)
+        if nome.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(arquivo) as zf:
+                    for info in sorted(zf.infolist(), key=lambda info: info.filename):
+                        membro = os.path.basename(info.filename)
+                        # Ignorar pastas e arquivos auxiliares do macOS (__MACOSX/, ._arquivo.csv)
+                        if info.is_dir() or not membro or membro.startswith('.') or '__MACOSX' in info.filename:
+                            continue
+                        if not membro.lower().endswith('.csv'):
+                            errors.append(f"{nome}/{membro}: ignorado (apenas arquivos .csv são importados)")
+                            continue
+                        if info.file_size > LOTE_TAMANHO_MAXIMO_MEMBRO:
+                            errors.append(f"{nome}/{membro}: ignorado (arquivo maior que {LOTE_TAMANHO_MAXIMO_MEMBRO // (1024 * 1024)} MB)")
+                            continue
+                        membros.append((membro, zf.read(info)))
+            except zipfile.BadZipFile:
+                errors.append(f"{nome}: arquivo ZIP inválido ou corrompido")
+        elif nome.lower().endswith('.csv'):
+            arquivo.seek(0)
+            membros.append((nome, arquivo.read()))
+        else:
+            errors.append(f"{nome}: formato de arquivo não suportado. Use .csv ou .zip")
+    return membros
+
+
+def _ler_membro_requisicoes(tarefa):
+    """Lê um CSV do lote (executado nos processos auxiliares; não acessa o banco)"""
+    nome, conteudo, data_requisicao = tarefa
+    errors = []
+    try:
+        linhas = list(iter_requisicoes_almoxarifado(io.BytesIO(conteudo), data_requisicao, errors))
+    except ValidationError as e:
+        return nome, [], [' '.join(e.messages)]
+    return nome, linhas, errors
+
+
+def _ler_membros_requisicoes(tarefas):
+    """Lê os CSVs do lote em paralelo (processos) quando o volume justifica; senão na sequência"""
+    total_bytes = sum(len(conteudo) for _, conteudo, _ in tarefas)
+    processos = min(len(tarefas), LOTE_PROCESSOS_MAXIMO, os.cpu_count() or 1)
+    if len(tarefas) > 1 and total_bytes >= LOTE_PARALELO_MIN_BYTES:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            # 'spawn': os processos auxiliares não herdam as conexões e threads do servidor
+            with ProcessPoolExecutor(max_workers=max(processos, 2),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                return list(executor.map(_ler_membro_requisicoes, tarefas))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Leitura paralela indisponível, lendo na sequência: {e}")
+    return [_ler_membro_requisicoes(tarefa) for tarefa in tarefas]
+
+
+def upload_requisicoes_almoxarifado_em_lote(arquivos, update_existing=False, data_padrao=None,
+                                            progresso=None) -> Tuple[int, int, List[str]]:
+    """
+    Importa de uma vez vários CSVs diários de requisições (ou ZIPs com esses CSVs).
+
+    A data de cada arquivo vem do nome (DD.MM.YYYY, ex.: 01.11.2025.csv); `data_padrao`
+    é usada para os arquivos sem data no nome. Os arquivos são lidos em paralelo e
+    gravados em lote numa única transação (nada é gravado se a gravação falhar).
+
+    Args:
+        arquivos: Arquivos enviados (Django UploadedFile), CSV ou ZIP
+        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
+        data_padrao: Data (datetime.date) para arquivos sem data no nome (opcional)
+        progresso: Função chamada após gravar cada arquivo, com um dicionário
+            {'arquivo', 'data_requisicao', 'created', 'updated', 'errors', 'indice', 'total'}
+
+    Returns:
+        Tupla (created_count, updated_count, errors); os erros são prefixados pelo nome do arquivo
+    """
+    from app.models import RequisicaoAlmoxarifado
+
+    errors = []
+    created_count = 0
+    updated_count = 0
+
+    try:
+        membros = expandir_arquivos_requisicoes(arquivos, errors)
+
+        tarefas = []
+        for nome, conteudo in membros:
+            data_requisicao = extrair_data_nome_arquivo(nome) or data_padrao
+            if data_requisicao is None:
+                errors.append(f"{nome}: não foi possível extrair a data do nome do arquivo (formato esperado: DD.MM.YYYY.csv)")
+                continue
+            tarefas.append((nome, conteudo, data_requisicao))
+
+        if not tarefas:
+            errors.append("Nenhum arquivo CSV válido para importar")
+            return 0, 0, errors
+
+        lidos = _ler_membros_requisicoes(tarefas)
+
+        dias = set()
+        with transaction.atomic():
+            for indice, ((nome, linhas, erros_leitura), (_, _, data_requisicao)) in enumerate(zip(lidos, tarefas), start=1):
+                # Um BulkUpsert por arquivo para contar criados/atualizados de cada um
+                upsert = BulkUpsert(
+                    RequisicaoAlmoxarifado, ['data_requisicao', 'cd_item'], update_existing=update_existing,
+                    keep_objects=False,
+                )
+                for row_num, requisicao_data in linhas:
+                    upsert.add(row_num, requisicao_data)
+                upsert.flush()
+
+                erros_arquivo = erros_leitura + upsert.errors
+                errors.extend(f"{nome} - {erro}" for erro in erros_arquivo)
+                created_count += upsert.created_count
+                updated_count += upsert.updated_count
+                if linhas:
+                    dias.add(data_requisicao)
+
+                if progresso is not None:
+                    progresso({
+                        'arquivo': nome,
+                        'data_requisicao': data_requisicao,
+                        'created': upsert.created_count,
+                        'updated': upsert.updated_count,
+                        'errors': erros_arquivo,
+                        'indice': indice,
+                        'total': len(tarefas),
+                    })
+
+            atualizar_resumo_requisicoes(dias)
+
+        return created_count, updated_count, errors
+
+    except ValidationError as e:
+        errors.append(str(e))
+        return 0, 0, errors
+    except Exception as e:
+        error_msg = f"Erro geral ao processar arquivos: {str(e)}"
+        errors.append(error_msg)
+        print(f"Erro geral: {error_msg}")
+        import traceback
+        traceback.print_exc()
+        return 0, 0, errors
+
+
 def upload_itens_estoque_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
     Faz upload de itens de estoque a partir de um arquivo Excel ou CSV
@@ -738,8 +1628,6 @@ def upload_itens_estoque_from_file(file, update_existing=False) -> Tuple[int, in
     from app.models import ItemEstoque
     
     errors = []
-    created_count = 0
-    updated_count = 0
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
@@ -747,22 +1635,17 @@ def upload_itens_estoque_from_file(file, update_existing=False) -> Tuple[int, in
     try:
         # Ler arquivo baseado na extensÃ£o
         if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
+            data = iter_excel_rows(file)
         elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings
-            try:
-                data = read_csv_file(file, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    file.seek(0)  # Resetar arquivo
-                    data = read_csv_file(file, encoding='latin-1')
-                except Exception as e:
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            data = iter_csv_rows(file)
         else:
             raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
+        
+        upsert = BulkUpsert(ItemEstoque, ['codigo_item'], update_existing=update_existing)
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
@@ -796,39 +1679,26 @@ def upload_itens_estoque_from_file(file, update_existing=False) -> Tuple[int, in
                     
                     # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
                     item_data = {
-                        'cd_unid': cd_unid,
-                        'nome_unid': nome_unid,
-                        'descr_item': descr_item,
+                        'codigo_item': cd_item,
+                        'descricao_item': descr_item,
                         'unidade_medida': unidade_medida,
-                        'qtde': qtde,
                     }
+                    if qtde is not None:
+                        item_data['quantidade'] = qtde
+                    
+                    # Acumular registro para gravação em lote
+                    upsert.add(row_num, item_data)
                     
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        item_obj, created = ItemEstoque.objects.update_or_create(
-                            codigo_item=cd_item,
-                            defaults=item_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        item_obj, created = ItemEstoque.objects.get_or_create(
-                            codigo_item=cd_item,
-                            defaults=item_data
-                        )
-                        if created:
-                            created_count += 1
-                        
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
                     errors.append(error_msg)
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
     
     except ValidationError as e:
         errors.append(str(e))
@@ -842,159 +1712,6 @@ def upload_itens_estoque_from_file(file, update_existing=False) -> Tuple[int, in
         return 0, 0, errors
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
-    """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
-    
-    Args:
-        file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
-    Returns:
-        Tupla (created_count, updated_count, errors)
-    """
-    from app.models import RequisicaoAlmoxarifado
-    from datetime import datetime
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
-        try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
-        except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
-        
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-    
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
-
-
 def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
     Faz upload de Centros de Atividade (CA) a partir de um arquivo CSV ou Excel
@@ -1009,8 +1726,6 @@ def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[st
     from app.models import CentroAtividade
     
     errors = []
-    created_count = 0
-    updated_count = 0
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
@@ -1018,52 +1733,36 @@ def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[st
     try:
         # Ler arquivo baseado na extensÃ£o
         if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
+            linhas = iter_excel_tabela(file)
         elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings
-            try:
-                data = read_csv_file(file, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    file.seek(0)  # Resetar arquivo
-                    data = read_csv_file(file, encoding='latin-1')
-                except Exception as e:
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            linhas = iter_csv_tabela(file)
         else:
             raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento.
+        # As colunas são localizadas uma única vez pelo cabeçalho.
+        cabecalhos, linhas = exigir_tabela(linhas)
+        extrair = COLUNAS_CENTRO_ATIVIDADE.compilar(cabecalhos)
+        
+        upsert = BulkUpsert(CentroAtividade, ['ca'], update_existing=update_existing)
+        locais = {}
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
+            for row_num, valores in enumerate(linhas, start=2):  # Começar em 2 (linha 1 é cabeçalho)
                 try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
+                    # Verificar se a linha está vazia ou tem apenas valores vazios
+                    if not any(valores):
                         continue
                     
-                    # Normalizar nomes de colunas (lidar com problemas de encoding)
-                    ca_value = _find_column_by_partial_match(row_data, ['ca', 'centro', 'atividade'])
-                    sigla_value = _find_column_by_partial_match(row_data, ['sigla'])
-                    descricao_value = _find_column_by_partial_match(row_data, ['descricao', 'descrio'])
-                    indice_value = _find_column_by_partial_match(row_data, ['indice', 'ndice'])
-                    encarregado_value = _find_column_by_partial_match(row_data, ['encarregado', 'responsavel', 'responsvel'])
-                    local_value = _find_column_by_partial_match(row_data, ['local'])
-                    
-                    # Se nÃ£o encontrou pelo mÃ©todo parcial, tentar nomes diretos
-                    if not ca_value:
-                        ca_value = row_data.get('CA') or row_data.get('ca') or row_data.get('Ca')
-                    if not sigla_value:
-                        sigla_value = row_data.get('SIGLA') or row_data.get('sigla') or row_data.get('Sigla')
-                    if not descricao_value:
-                        descricao_value = row_data.get('DESCRIÃ‡ÃƒO') or row_data.get('DESCRIO') or row_data.get('DescriÃ§Ã£o') or row_data.get('Descrio') or row_data.get('descriÃ§Ã£o') or row_data.get('descrio')
-                    if not indice_value:
-                        indice_value = row_data.get('ÃNDICE') or row_data.get('INDICE') or row_data.get('Ãndice') or row_data.get('Indice') or row_data.get('Ã­ndice') or row_data.get('indice')
-                    if not encarregado_value:
-                        encarregado_value = row_data.get('ENCARREGADO RESPONSÃVEL') or row_data.get('ENCARREGADO RESPONSVEL') or row_data.get('Encarregado ResponsÃ¡vel') or row_data.get('Encarregado Responsavel') or row_data.get('encarregado responsÃ¡vel') or row_data.get('encarregado responsavel')
-                    if not local_value:
-                        local_value = row_data.get('LOCAL') or row_data.get('local') or row_data.get('Local')
+                    campos = extrair(valores)
+                    ca_value = campos['ca']
+                    sigla_value = campos['sigla']
+                    descricao_value = campos['descricao']
+                    indice_value = campos['indice']
+                    encarregado_value = campos['encarregado']
+                    local_value = campos['local']
                     
                     # Validar que temos pelo menos o cÃ³digo CA
                     if not ca_value:
@@ -1087,38 +1786,21 @@ def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[st
                     
                     # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o do CA
                     ca_data = {
+                        'ca': ca_int,
                         'sigla': _safe_str(sigla_value, max_length=50),
                         'descricao': _safe_str(descricao_value, max_length=500),
                         'indice': indice_int,
                         'encarregado_responsavel': _safe_str(encarregado_value, max_length=255),
                     }
                     
-                    # Criar ou atualizar CA
-                    if update_existing:
-                        ca_obj, ca_created = CentroAtividade.objects.update_or_create(
-                            ca=ca_int,
-                            defaults=ca_data
-                        )
-                        if ca_created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        ca_obj, ca_created = CentroAtividade.objects.get_or_create(
-                            ca=ca_int,
-                            defaults=ca_data
-                        )
-                        if ca_created:
-                            created_count += 1
-                    
-                    # Atualizar campo local do CentroAtividade se houver valor de local
+                    # Acumular CA para gravação em lote
+                    ca_key = upsert.add(row_num, ca_data)
+                    
+                    # Campo local do CentroAtividade é atualizado após a gravação do CA
                     if local_value:
                         local_str = _safe_str(local_value, max_length=255)
-                        if local_str and local_str != ca_obj.local:
-                            ca_obj.local = local_str
-                            ca_obj.save()
-                            if not ca_created:
-                                updated_count += 1
+                        if local_str:
+                            locais[ca_key] = local_str
                     
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
@@ -1126,8 +1808,24 @@ def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[st
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
+            
+            # Atualizar campo local do CentroAtividade se houver valor de local
+            alterados = []
+            for ca_key, local_str in locais.items():
+                ca_obj = upsert.objects.get(ca_key)
+                if ca_obj is not None and local_str != ca_obj.local:
+                    ca_obj.local = local_str
+                    ca_obj.updated_at = timezone.now()
+                    alterados.append(ca_obj)
+                    if ca_key not in upsert.created_keys:
+                        upsert.updated_count += 1
+            CentroAtividade.objects.bulk_update(alterados, ['local', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+            if alterados:
+                agendar_invalidacao_cache(CentroAtividade)
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
     
     except ValidationError as e:
         errors.append(str(e))
@@ -1141,212 +1839,39 @@ def upload_cas_from_file(file, update_existing=False) -> Tuple[int, int, List[st
         return 0, 0, errors
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
+def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
+    Faz upload de manutentores a partir de um arquivo CSV ou Excel
     
     Args:
-        file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
+        file: Arquivo Django UploadedFile
         update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
     
     Returns:
         Tupla (created_count, updated_count, errors)
     """
-    from app.models import RequisicaoAlmoxarifado
+    from app.models import Manutentor
     from datetime import datetime
     
     errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
-        try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
-        except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
     
     try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
+        # Ler arquivo baseado na extensÃ£o
+        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
+            data = iter_excel_rows(file)
+        elif file_name.endswith('.csv'):
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            data = iter_csv_rows(file)
+        else:
+            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
         
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-    
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
-
-
-def _find_column_by_partial_match(row_data, keywords):
-    """
-    Tenta encontrar uma coluna em row_data que contenha qualquer uma das palavras-chave.
-    Ãštil para lidar com problemas de encoding ou pequenas variaÃ§Ãµes.
-    """
-    for key, value in row_data.items():
-        normalized_key = str(key).strip().lower().replace(' ', '_')
-        for keyword in keywords:
-            if keyword in normalized_key:
-                return value
-    return None
-
-
-def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
-    """
-    Faz upload de manutentores a partir de um arquivo CSV ou Excel
-    
-    Args:
-        file: Arquivo Django UploadedFile
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
-    Returns:
-        Tupla (created_count, updated_count, errors)
-    """
-    from app.models import Manutentor
-    from datetime import datetime
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo baseado na extensÃ£o
-        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
-        elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings
-            try:
-                data = read_csv_file(file, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    file.seek(0)  # Resetar arquivo
-                    data = read_csv_file(file, encoding='latin-1')
-                except Exception as e:
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        else:
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        upsert = BulkUpsert(Manutentor, ['Matricula'], update_existing=update_existing)
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
@@ -1394,6 +1919,7 @@ def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int
                     
                     # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
                     manutentor_data = {
+                        'Matricula': matricula,
                         'Nome': nome,
                         'Cargo': cargo,
                         'horario_inicio': horario_inicio_time,
@@ -1403,23 +1929,8 @@ def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int
                         'local_trab': local_trab,
                     }
                     
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        manutentor_obj, created = Manutentor.objects.update_or_create(
-                            Matricula=matricula,
-                            defaults=manutentor_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        manutentor_obj, created = Manutentor.objects.get_or_create(
-                            Matricula=matricula,
-                            defaults=manutentor_data
-                        )
-                        if created:
-                            created_count += 1
+                    # Acumular registro para gravação em lote
+                    upsert.add(row_num, manutentor_data)
                     
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
@@ -1427,8 +1938,12 @@ def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
+            # Matrículas e nomes mudaram: refazer a resolução dos executores das ordens
+            reconstruir_execucoes_manutentores()
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
     
     except ValidationError as e:
         errors.append(str(e))
@@ -1442,159 +1957,6 @@ def upload_manutentores_from_file(file, update_existing=False) -> Tuple[int, int
         return 0, 0, errors
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
-    """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
-    
-    Args:
-        file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
-    Returns:
-        Tupla (created_count, updated_count, errors)
-    """
-    from app.models import RequisicaoAlmoxarifado
-    from datetime import datetime
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
-        try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
-        except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
-        
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-        
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
-
-
 def _safe_int(value, default=None):
     """Converte valor para inteiro de forma segura"""
     if value is None or value == '':
@@ -1653,6 +2015,211 @@ def _safe_decimal(value, default=None):
         return default
 
 
+def _valor_bruto(value):
+    return value
+
+
+class Coluna:
+    """
+    Coluna de um importador: campo de destino, nomes aceitos no cabeçalho e conversor.
+
+    Args:
+        campo: Nome do campo no dicionário extraído de cada linha
+        aliases: Nomes aceitos no cabeçalho, em ordem de preferência (sem diferenciar maiúsculas)
+        conversor: Função aplicada ao valor (_safe_int, _safe_str, ...; None mantém o valor bruto)
+        max_length: Tamanho máximo repassado ao conversor
+        parciais: Palavras-chave procuradas dentro dos cabeçalhos (antes dos aliases),
+            para colunas com nomes variáveis ou com problemas de encoding
+    """
+
+    def __init__(self, campo, aliases=(), conversor=_safe_str, max_length=None, parciais=()):
+        self.campo = campo
+        self.aliases = aliases
+        if conversor is not None and max_length is not None:
+            conversor = functools.partial(conversor, max_length=max_length)
+        self.conversor = conversor if conversor is not None else _valor_bruto
+        self.parciais = parciais
+
+    def indices(self, cabecalhos):
+        """Posições das colunas do cabeçalho que atendem esta coluna, em ordem de preferência"""
+        normalizados = [str(cabecalho).strip().lower() for cabecalho in cabecalhos]
+        indices = []
+        if self.parciais:
+            for idx, cabecalho in enumerate(normalizados):
+                chave = cabecalho.replace(' ', '_')
+                if any(palavra in chave for palavra in self.parciais):
+                    indices.append(idx)
+        for alias in self.aliases:
+            alias = alias.lower()
+            for idx, cabecalho in enumerate(normalizados):
+                if cabecalho == alias and idx not in indices:
+                    indices.append(idx)
+        return indices
+
+
+class MapeamentoColunas:
+    """
+    Tabela declarativa de colunas de um importador.
+
+    O cabeçalho do arquivo é resolvido uma única vez (compilar); depois cada
+    linha é lida por posição, aplicando apenas os conversores.
+
+    Exemplo:
+        extrair = COLUNAS_ORDEM_CORRETIVA.compilar(cabecalhos)
+        for valores in linhas:
+            campos = extrair(valores)  # {'cd_unid': 92, 'nome_unid': '...', ...}
+    """
+
+    def __init__(self, *colunas):
+        self.colunas = colunas
+
+    def compilar(self, cabecalhos) -> 'ExtratorColunas':
+        return ExtratorColunas(self.colunas, cabecalhos)
+
+
+class ExtratorColunas:
+    """Extrai os campos de uma linha (lista/tupla de valores) pelas posições resolvidas no cabeçalho"""
+
+    def __init__(self, colunas, cabecalhos):
+        self.constantes = []  # colunas ausentes no arquivo: valor fixo (conversor(None))
+        self.simples = []     # (campo, índice, conversor)
+        self.multiplas = []   # (campo, índices, conversor): primeiro valor preenchido
+        self.tamanho = 0
+        for coluna in colunas:
+            indices = coluna.indices(cabecalhos)
+            if not indices:
+                self.constantes.append((coluna.campo, coluna.conversor(None)))
+            elif len(indices) == 1:
+                self.simples.append((coluna.campo, indices[0], coluna.conversor))
+            else:
+                self.multiplas.append((coluna.campo, tuple(indices), coluna.conversor))
+            self.tamanho = max([self.tamanho, *(idx + 1 for idx in indices)])
+
+    def __call__(self, valores) -> Dict:
+        if len(valores) < self.tamanho:
+            # Linha mais curta que o cabeçalho: colunas faltantes ficam vazias
+            valores = list(valores) + [None] * (self.tamanho - len(valores))
+        campos = dict(self.constantes)
+        for campo, idx, conversor in self.simples:
+            campos[campo] = conversor(valores[idx])
+        for campo, indices, conversor in self.multiplas:
+            campos[campo] = conversor(next((valores[idx] for idx in indices if valores[idx]), None))
+        return campos
+
+
+# Colunas do relatório de ordens corretivas (CSV com ';' ou Excel)
+COLUNAS_ORDEM_CORRETIVA = MapeamentoColunas(
+    # Unidade
+    Coluna('cd_unid', ('CD_UNID',), _safe_int),
+    Coluna('nome_unid', ('NOME_UNID',), max_length=255),
+    # Funcionário
+    Coluna('cd_funciomanu', ('CD_FUNCIOMANU',), max_length=100),
+    Coluna('nome_funciomanu', ('NOME_FUNCIOMANU',), max_length=255),
+    # Setor
+    Coluna('cd_setormanut', ('CD_SETORMANUT',), max_length=50),
+    Coluna('descr_setormanut', ('DESCR_SETORMANUT',), max_length=255),
+    # Tipo Centro de Atividade
+    Coluna('cd_tpcentativ', ('CD_TPCENTATIV',), _safe_int),
+    Coluna('descr_abrev_tpcentativ', ('DESCR_ABREV_TPCENTATIV',), max_length=255),
+    # Ordem de Serviço
+    Coluna('dt_abertura', ('DT_ABERTURA',), max_length=50),
+    Coluna('cd_ordemserv', ('CD_ORDEMSERV',), _safe_int),
+    # Máquina
+    Coluna('cd_maquina', ('CD_MAQUINA',), _safe_int),
+    Coluna('descr_maquina', ('DESCR_MAQUINA',), max_length=500),
+    Coluna('dt_entrada', ('DT_ENTRADA',), max_length=50),
+    # Funcionário Executor (o nome é usado como código quando não há código)
+    Coluna('cd_func_exec', ('CD_FUNC_EXEC', 'NM_FUNC_EXEC'), max_length=100),
+    Coluna('nm_func_exec', ('NM_FUNC_EXEC', 'NOME_FUNC_EXEC'), max_length=255),
+    # Funcionário Solicitante
+    Coluna('cd_func_solic_os', ('CD_FUNC_SOLIC_OS', 'NM_FUNC_SOLIC_OS'), max_length=100),
+    Coluna('nm_func_solic_os', ('NM_FUNC_SOLIC_OS', 'NOME_FUNC_SOLIC_OS'), max_length=255),
+    Coluna('dt_encordmanu', ('DT_ENCORDMANU',), max_length=50),
+    Coluna('descr_queixa', ('DESCR_QUEIXA',)),
+    Coluna('exec_tarefas', ('EXEC_TAREFAS',)),
+    # Unidade Execução
+    Coluna('cd_unid_exec', ('CD_UNID_EXEC',), _safe_int),
+    Coluna('nome_unid_exec', ('NOME_UNID_EXEC',), max_length=255),
+    Coluna('dt_abertura_solicita', ('DT_ABERTURA_SOLICITA',), max_length=50),
+    Coluna('descr_obsordserv', ('DESCR_OBSORDSERV',)),
+    Coluna('dt_aberordser', ('DT_ABERORDSER',), max_length=50),
+    # Datas de Parada de Manutenção
+    Coluna('dt_iniparmanu', ('DT_INIPARMANU',), max_length=50),
+    Coluna('dt_fimparmanu', ('DT_FIMPARMANU',), max_length=50),
+    Coluna('dt_prev_exec', ('DT_PREV_EXEC',), max_length=50),
+    # Tipo de Ordem de Serviço (o relatório usa a grafia TPORDSERTV)
+    Coluna('cd_tpordservtv', ('CD_TPORDSERTV', 'CD_TPORDSERVTV'), _safe_int),
+    Coluna('descr_tpordservtv', ('DESCR_TPORDSERTV', 'DESCR_TPORDSERVTV'), max_length=255),
+    Coluna('descr_sitordsetv', ('DESCR_SITORDSETV',), max_length=255),
+    Coluna('descr_recomenos', ('DESCR_RECOMENOS',)),
+    Coluna('descr_seqplamanu', ('DESCR_SEQPLAMANU',), max_length=255),
+    # Tipo de Manutenção
+    Coluna('cd_tpmanuttv', ('CD_TPMANUTTV',), _safe_int),
+    Coluna('descr_tpmanuttv', ('DESCR_TPMANUTTV',), max_length=255),
+    # Classificação Origem OS
+    Coluna('cd_clasorigos', ('CD_CLASORIGOS',), _safe_int),
+    Coluna('descr_clasorigos', ('DESCR_CLASORIGOS',), max_length=255),
+    # Ficha de Manutenção
+    Coluna('cd_func_exec_os', ('CD_FUNC_EXEC_OS',), max_length=100),
+    Coluna('nm_func_exec_os', ('NM_FUNC_EXEC_OS',), max_length=255),
+    Coluna('dt_ficapomanu', ('DT_FICAPOMANU',), max_length=50),
+    Coluna('dt_inic_iteficmanu', ('DT_INIC_ITEFICMANU',), max_length=50),
+    Coluna('dt_fim_iteficmanu', ('DT_FIM_ITEFICMANU',), max_length=50),
+)
+
+# Campos gravados na ordem apenas quando preenchidos (não apagam valores já importados)
+CAMPOS_OPCIONAIS_ORDEM_CORRETIVA = (
+    'dt_entrada', 'cd_func_exec', 'nm_func_exec', 'dt_encordmanu', 'descr_queixa', 'exec_tarefas',
+    'cd_unid_exec', 'nome_unid_exec', 'dt_abertura_solicita', 'descr_obsordserv', 'dt_aberordser',
+    'dt_iniparmanu', 'dt_fimparmanu', 'dt_prev_exec', 'cd_tpordservtv', 'descr_tpordservtv',
+    'descr_sitordsetv', 'descr_recomenos', 'descr_seqplamanu', 'cd_tpmanuttv', 'descr_tpmanuttv',
+    'cd_clasorigos', 'descr_clasorigos',
+)
+
+CAMPOS_FICHA_ORDEM_CORRETIVA = (
+    'cd_func_exec_os', 'nm_func_exec_os', 'dt_ficapomanu', 'dt_inic_iteficmanu', 'dt_fim_iteficmanu',
+)
+
+# Colunas do CSV diário de requisições do almoxarifado (delimitador ';')
+COLUNAS_REQUISICAO_ALMOXARIFADO = MapeamentoColunas(
+    Coluna('cd_unid', ('CD_UNID',), _safe_int),
+    Coluna('nome_unid', ('NOME_UNID',), max_length=255),
+    Coluna('cd_uso_ctb', ('CD_USO_CTB',), _safe_int),
+    Coluna('descr_uso_ctb', ('DESCR_USO_CTB',), max_length=255),
+    Coluna('cd_depo', ('CD_DEPO',), _safe_int),
+    Coluna('descr_depo', ('DESCR_DEPO',), max_length=255),
+    Coluna('cd_local_fisic', ('CD_LOCAL_FISIC',), _safe_int),
+    Coluna('descr_local_fisic', ('DESCR_LOCAL_FISIC',), max_length=255),
+    Coluna('cd_item', ('CD_ITEM',), _safe_int),
+    Coluna('cd_embalagem', ('CD_EMBALAGEM',), max_length=50),
+    Coluna('descr_item', ('DESCR_ITEM',), max_length=500),
+    Coluna('cd_operacao', ('CD_OPERACAO',), _safe_int),
+    Coluna('descr_operacao', ('DESCR_OPERACAO',), max_length=255),
+    Coluna('cd_unid_medida', ('CD_UNID_MEDIDA',), max_length=50),
+    Coluna('qtde_movto_estoq', ('QTDE_MOVTO_ESTOQ',), _safe_decimal),
+    Coluna('vlr_movto_estoq', ('VLR_MOVTO_ESTOQ',), _safe_decimal),
+    Coluna('vlr_movto_estoq_reav', ('VLR_MOVTO_ESTOQ_REAV',), _safe_decimal),
+    Coluna('cd_unid_baixa', ('CD_UNID_BAIXA',), _safe_int),
+    Coluna('cd_centro_ativ', ('CD_CENTRO_ATIV',), _safe_int),
+    Coluna('cd_usu_criou', ('CD_USU_CRIOU',), max_length=255),
+    Coluna('cd_usu_atend', ('CD_USU_ATEND',), max_length=255),
+    Coluna('obs_rm', ('OBS RM', 'OBS_RM')),
+    Coluna('obs_item', ('OBS ITEM', 'OBS_ITEM')),
+)
+
+# Colunas da planilha de Centros de Atividade. Os cabeçalhos costumam chegar com
+# acentos corrompidos ("DESCRIO", "NDICE"), por isso a busca parcial vem primeiro.
+COLUNAS_CENTRO_ATIVIDADE = MapeamentoColunas(
+    Coluna('ca', ('CA',), None, parciais=('ca', 'centro', 'atividade')),
+    Coluna('sigla', ('SIGLA',), None, parciais=('sigla',)),
+    Coluna('descricao', ('DESCRIÇÃO', 'DESCRICAO', 'DESCRIO'), None, parciais=('descricao', 'descrio')),
+    Coluna('indice', ('ÍNDICE', 'INDICE'), None, parciais=('indice', 'ndice')),
+    Coluna('encarregado', ('ENCARREGADO RESPONSÁVEL', 'ENCARREGADO RESPONSAVEL'), None,
+           parciais=('encarregado', 'responsavel', 'responsvel')),
+    Coluna('local', ('LOCAL',), None, parciais=('local',)),
+)
+
+
 def _fix_funcionario_columns(row_data):
     """
     Corrige deslocamento de colunas para 'FuncionÃ¡rio' e 'Nome FuncionÃ¡rio'
@@ -1739,11 +2306,9 @@ def upload_plano_preventiva_from_file(file, update_existing=False) -> Tuple[int,
     Returns:
         Tupla (created_count, updated_count, errors)
     """
-    from app.models import PlanoPreventiva, Maquina
+    from app.models import PlanoPreventiva
     
     errors = []
-    created_count = 0
-    updated_count = 0
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
@@ -1751,32 +2316,28 @@ def upload_plano_preventiva_from_file(file, update_existing=False) -> Tuple[int,
     try:
         # Ler arquivo baseado na extensÃ£o
         if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
+            data = iter_excel_rows(file)
         elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings e delimitadores (o arquivo usa ponto e vÃ­rgula)
-            try:
-                # Primeiro tentar com delimitador ponto e vÃ­rgula (;) e encoding latin-1
-                file.seek(0)
-                data = read_csv_file(file, encoding='latin-1', delimiter=';')
-            except Exception:
-                try:
-                    file.seek(0)
-                    data = read_csv_file(file, encoding='utf-8', delimiter=';')
-                except Exception:
-                    try:
-                        file.seek(0)
-                        data = read_csv_file(file, encoding='latin-1', delimiter=',')
-                    except Exception as e:
-                        file.seek(0)
-                        data = read_csv_file(file, encoding='utf-8', delimiter=',')
+            # Leitura incremental: encoding e delimitador (o arquivo usa ponto e vÃ­rgula)
+            # detectados uma vez pela amostra inicial
+            data = iter_csv_rows(file, delimiter=None)
         else:
             raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
+        
+        # Máquinas (cd_maquina → id) carregadas uma vez para ligar a chave estrangeira em memória
+        referencias = ReferenciasImportacao()
         
-        # Cache de mÃ¡quinas para melhorar performance
-        maquinas_cache = {}
+        upsert = BulkUpsert(
+            PlanoPreventiva,
+            ['cd_maquina', 'numero_plano', 'sequencia_manutencao', 'sequencia_tarefa'],
+            update_existing=update_existing,
+            # Atualizar a correspondência com roteiros a cada lote gravado, apenas para os planos importados
+            after_flush=lambda planos: atualizar_relacionamentos_preventiva(planos=planos),
+            keep_objects=False,
+        )
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
@@ -1790,107 +2351,94 @@ def upload_plano_preventiva_from_file(file, update_existing=False) -> Tuple[int,
                     row_data = _fix_funcionario_columns(row_data)
                     
                     # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;NUMERO_PLANO;DESCR_PLANO;CD_MAQUINA;DESCR_MAQUINA;...
+                    # O CSV exportado tem: Unidade;Nome Unidade;Setor;Descrição Setor;Atividade;Máquina;Descrição Máquina;
+                    # Nº Patrimônio;Plano;Descrição Plano;Sequência Manutenção;Data Execução;Quantidade Período;
+                    # Sequência Tarefa;Descrição Tarefa;Funcionário;Nome Funcionário
+                    # Também são aceitos os nomes técnicos: CD_UNID;NOME_UNID;NUMERO_PLANO;DESCR_PLANO;CD_MAQUINA;...
                     
                     # Unidade
-                    cd_unid = _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid'))
-                    nome_unid = _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255)
+                    cd_unid = _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid') or row_data.get('Unidade'))
+                    nome_unid = _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid') or row_data.get('Nome Unidade'), max_length=255)
+                    
+                    # Setor e Atividade
+                    cd_setor = _safe_str(row_data.get('CD_SETOR') or row_data.get('cd_setor') or row_data.get('Setor'), max_length=50)
+                    descr_setor = _safe_str(row_data.get('DESCR_SETOR') or row_data.get('descr_setor') or row_data.get('Descrição Setor'), max_length=255)
+                    cd_atividade = _safe_int(row_data.get('CD_ATIVIDADE') or row_data.get('cd_atividade') or row_data.get('Atividade'))
                     
                     # Plano
-                    numero_plano = _safe_int(row_data.get('NUMERO_PLANO') or row_data.get('numero_plano') or row_data.get('Numero_Plano'))
-                    descr_plano = _safe_str(row_data.get('DESCR_PLANO') or row_data.get('descr_plano') or row_data.get('Descr_Plano'), max_length=255)
+                    numero_plano = _safe_int(row_data.get('NUMERO_PLANO') or row_data.get('numero_plano') or row_data.get('Numero_Plano') or row_data.get('Plano'))
+                    descr_plano = _safe_str(row_data.get('DESCR_PLANO') or row_data.get('descr_plano') or row_data.get('Descr_Plano') or row_data.get('Descrição Plano'), max_length=255)
                     
-                    # MÃ¡quina
-                    cd_maquina = _safe_int(row_data.get('CD_MAQUINA') or row_data.get('cd_maquina') or row_data.get('Cd_Maquina'))
-                    descr_maquina = _safe_str(row_data.get('DESCR_MAQUINA') or row_data.get('descr_maquina') or row_data.get('Descr_Maquina'), max_length=500)
+                    # Máquina
+                    cd_maquina = _safe_int(row_data.get('CD_MAQUINA') or row_data.get('cd_maquina') or row_data.get('Cd_Maquina') or row_data.get('Máquina'))
+                    descr_maquina = _safe_str(row_data.get('DESCR_MAQUINA') or row_data.get('descr_maquina') or row_data.get('Descr_Maquina') or row_data.get('Descrição Máquina'), max_length=500)
+                    nro_patrimonio = _safe_str(row_data.get('NRO_PATRIMONIO') or row_data.get('nro_patrimonio') or row_data.get('Nº Patrimônio'), max_length=100)
                     
-                    # SequÃªncias
-                    sequencia_tarefa = _safe_int(row_data.get('SEQUENCIA_TAREFA') or row_data.get('sequencia_tarefa') or row_data.get('Sequencia_Tarefa'))
-                    sequencia_manutencao = _safe_int(row_data.get('SEQUENCIA_MANUTENCAO') or row_data.get('sequencia_manutencao') or row_data.get('Sequencia_Manutencao'))
+                    # Sequências
+                    sequencia_tarefa = _safe_int(row_data.get('SEQUENCIA_TAREFA') or row_data.get('sequencia_tarefa') or row_data.get('Sequencia_Tarefa') or row_data.get('Sequência Tarefa'))
+                    sequencia_manutencao = _safe_int(row_data.get('SEQUENCIA_MANUTENCAO') or row_data.get('sequencia_manutencao') or row_data.get('Sequencia_Manutencao') or row_data.get('Sequência Manutenção'))
+                    quantidade_periodo = _safe_int(row_data.get('QUANTIDADE_PERIODO') or row_data.get('quantidade_periodo') or row_data.get('Quantidade Período'))
                     
                     # Tarefa
-                    descr_tarefa = _safe_str(row_data.get('DESCR_TAREFA') or row_data.get('descr_tarefa') or row_data.get('Descr_Tarefa'))
+                    descr_tarefa = _safe_str(row_data.get('DESCR_TAREFA') or row_data.get('descr_tarefa') or row_data.get('Descr_Tarefa') or row_data.get('Descrição Tarefa'))
                     
-                    # FuncionÃ¡rio
-                    funcionario = _safe_str(row_data.get('FUNCIONÃRIO') or row_data.get('FUNCIONARIO') or row_data.get('FuncionÃ¡rio') or row_data.get('Funcionario') or row_data.get('funcionÃ¡rio') or row_data.get('funcionario'), max_length=100)
-                    nome_funcionario = _safe_str(row_data.get('NOME_FUNCIONÃRIO') or row_data.get('NOME_FUNCIONARIO') or row_data.get('Nome_FuncionÃ¡rio') or row_data.get('Nome_Funcionario') or row_data.get('nome_funcionÃ¡rio') or row_data.get('nome_funcionario'), max_length=255)
+                    # Funcionário
+                    funcionario = _safe_str(row_data.get('FUNCIONÁRIO') or row_data.get('FUNCIONARIO') or row_data.get('Funcionário') or row_data.get('Funcionario') or row_data.get('funcionário') or row_data.get('funcionario'), max_length=100)
+                    nome_funcionario = _safe_str(row_data.get('NOME_FUNCIONÁRIO') or row_data.get('NOME_FUNCIONARIO') or row_data.get('Nome Funcionário') or row_data.get('Nome_Funcionário') or row_data.get('Nome_Funcionario') or row_data.get('nome_funcionário') or row_data.get('nome_funcionario'), max_length=255)
                     
-                    # Data ExecuÃ§Ã£o
-                    data_execucao_str = row_data.get('DATA_EXECUCAO') or row_data.get('data_execucao') or row_data.get('Data_Execucao')
-                    data_execucao = None
+                    # Data Execução (armazenada no formato DD/MM/YYYY)
+                    data_execucao_str = row_data.get('DATA_EXECUCAO') or row_data.get('data_execucao') or row_data.get('Data_Execucao') or row_data.get('Data Execução')
+                    dt_execucao = None
                     if data_execucao_str:
-                        try:
-                            from datetime import datetime
-                            # Tentar diferentes formatos de data
-                            data_execucao = datetime.strptime(str(data_execucao_str).strip(), '%d/%m/%Y').date()
-                        except ValueError:
+                        from datetime import datetime
+                        data_execucao_str = str(data_execucao_str).strip()
+                        # Tentar diferentes formatos de data
+                        for formato in ('%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S'):
                             try:
-                                data_execucao = datetime.strptime(str(data_execucao_str).strip(), '%Y-%m-%d').date()
+                                dt_execucao = datetime.strptime(data_execucao_str, formato).strftime('%d/%m/%Y')
+                                break
                             except ValueError:
-                                pass  # Data Ã© opcional
+                                continue  # Data é opcional
                     
-                    # Validar campos obrigatÃ³rios
+                    # Validar campos obrigatórios
                     if not numero_plano:
-                        errors.append(f"Linha {row_num}: Campo 'NUMERO_PLANO' Ã© obrigatÃ³rio")
+                        errors.append(f"Linha {row_num}: Campo 'NUMERO_PLANO' (Plano) é obrigatório")
                         continue
                     
                     if not cd_maquina:
-                        errors.append(f"Linha {row_num}: Campo 'CD_MAQUINA' Ã© obrigatÃ³rio")
+                        errors.append(f"Linha {row_num}: Campo 'CD_MAQUINA' (Máquina) é obrigatório")
                         continue
                     
-                    # Tentar encontrar mÃ¡quina relacionada
-                    maquina = None
-                    if cd_maquina:
-                        # Verificar cache primeiro
-                        if cd_maquina in maquinas_cache:
-                            maquina = maquinas_cache[cd_maquina]
-                        else:
-                            try:
-                                maquina = Maquina.objects.get(cd_maquina=cd_maquina)
-                                maquinas_cache[cd_maquina] = maquina
-                            except Maquina.DoesNotExist:
-                                errors.append(f"Linha {row_num}: MÃ¡quina com cÃ³digo {cd_maquina} nÃ£o encontrada")
-                                continue
+                    # Tentar encontrar máquina relacionada
+                    maquina_id = referencias.maquina_id(cd_maquina)
+                    if maquina_id is None:
+                        errors.append(f"Linha {row_num}: Máquina com código {cd_maquina} não encontrada")
+                        continue
                     
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
+                    # Preparar dados para criação/atualização
                     plano_data = {
                         'cd_unid': cd_unid,
                         'nome_unid': nome_unid,
+                        'cd_setor': cd_setor,
+                        'descr_setor': descr_setor,
+                        'cd_atividade': cd_atividade,
+                        'numero_plano': numero_plano,
                         'descr_plano': descr_plano,
-                        'maquina': maquina,
+                        'maquina_id': maquina_id,
                         'cd_maquina': cd_maquina,
                         'descr_maquina': descr_maquina,
+                        'nro_patrimonio': nro_patrimonio,
                         'sequencia_tarefa': sequencia_tarefa,
                         'sequencia_manutencao': sequencia_manutencao,
+                        'quantidade_periodo': quantidade_periodo,
                         'descr_tarefa': descr_tarefa,
-                        'funcionario': funcionario,
+                        'cd_funcionario': funcionario,
                         'nome_funcionario': nome_funcionario,
-                        'data_execucao': data_execucao,
+                        'dt_execucao': dt_execucao,
                     }
                     
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        plano_obj, created = PlanoPreventiva.objects.update_or_create(
-                            numero_plano=numero_plano,
-                            cd_maquina=cd_maquina,
-                            sequencia_tarefa=sequencia_tarefa,
-                            sequencia_manutencao=sequencia_manutencao,
-                            defaults=plano_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        plano_obj, created = PlanoPreventiva.objects.get_or_create(
-                            numero_plano=numero_plano,
-                            cd_maquina=cd_maquina,
-                            sequencia_tarefa=sequencia_tarefa,
-                            sequencia_manutencao=sequencia_manutencao,
-                            defaults=plano_data
-                        )
-                        if created:
-                            created_count += 1
+                    # Acumular registro para gravação em lote
+                    upsert.add(row_num, plano_data)
                     
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
@@ -1898,8 +2446,10 @@ def upload_plano_preventiva_from_file(file, update_existing=False) -> Tuple[int,
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
         
-        return created_count, updated_count, errors
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
         
     except ValidationError as e:
         errors.append(str(e))
@@ -1913,163 +2463,221 @@ def upload_plano_preventiva_from_file(file, update_existing=False) -> Tuple[int,
         return 0, 0, errors
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
+def upload_roteiro_preventiva_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
+    Faz upload de roteiro de manutenÃ§Ã£o preventiva a partir de um arquivo CSV
+    O arquivo deve ter colunas no formato: CD_UNID;NOME_UNID;CD_FUNCIOMANU;...
     
     Args:
-        file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
+        file: Arquivo Django UploadedFile
         update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
     
     Returns:
         Tupla (created_count, updated_count, errors)
     """
-    from app.models import RequisicaoAlmoxarifado
-    from datetime import datetime
+    from app.models import RoteiroPreventiva, Maquina
     
     errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
-        try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
-        except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
     
     try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
+        # Ler arquivo baseado na extensÃ£o
+        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
+            data = iter_excel_rows(file)
+        elif file_name.endswith('.csv'):
+            # Leitura incremental: encoding e delimitador (o arquivo usa ponto e vÃ­rgula)
+            # detectados uma vez pela amostra inicial
+            data = iter_csv_rows(file, delimiter=None)
+        else:
+            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
         
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
+        # Gravação em blocos com checkpoint: reimportar o mesmo arquivo após uma
+        # falha continua do último bloco gravado
+        retomavel = ImportacaoRetomavel('roteiro_preventiva', file, update_existing=update_existing)
         
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
         
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
+        # Máquinas (cd_maquina → id) carregadas uma vez para ligar a chave estrangeira em memória
+        referencias = ReferenciasImportacao()
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        upsert = BulkUpsert(
+            RoteiroPreventiva,
+            ['cd_ordemserv', 'cd_planmanut', 'seq_seqplamanu', 'cd_tarefamanu'],
+            update_existing=update_existing,
+            # Atualizar a correspondência com planos a cada lote gravado, apenas para os roteiros importados
+            after_flush=lambda roteiros: atualizar_relacionamentos_preventiva(roteiros=roteiros),
+            keep_objects=False,
+        )
         
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
+        try:
+            # Cada bloco é gravado em sua própria transação, junto com o checkpoint
+            for bloco in retomavel.blocos(enumerate(data, start=2)):  # Começar em 2 (linha 1 é cabeçalho)
+                with transaction.atomic():
+                    for row_num, row_data in bloco:
+                        try:
+                            # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
+                            if not any(str(v).strip() if v else '' for v in row_data.values()):
+                                continue
                             
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
+                            # Mapear colunas do CSV para campos do modelo
+                            # O CSV tem: CD_UNID;NOME_UNID;CD_FUNCIOMANU;NOME_FUNCIOMANU;FUNCIOMANU_ID;CD_SETORMANUT;DESCR_SETORMANUT;...
+                            
+                            # Unidade
+                            cd_unid = _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid'))
+                            nome_unid = _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255)
+                            
+                            # FuncionÃ¡rio
+                            cd_funciomanu = _safe_str(row_data.get('CD_FUNCIOMANU') or row_data.get('cd_funciomanu') or row_data.get('Cd_Funciomanu'), max_length=100)
+                            nome_funciomanu = _safe_str(row_data.get('NOME_FUNCIOMANU') or row_data.get('nome_funciomanu') or row_data.get('Nome_Funciomanu'), max_length=255)
+                            funciomanu_id = _safe_int(row_data.get('FUNCIOMANU_ID') or row_data.get('funciomanu_id') or row_data.get('Funciomanu_Id'))
+                            
+                            # Setor
+                            cd_setormanut = _safe_str(row_data.get('CD_SETORMANUT') or row_data.get('cd_setormanut') or row_data.get('Cd_Setormanut'), max_length=50)
+                            descr_setormanut = _safe_str(row_data.get('DESCR_SETORMANUT') or row_data.get('descr_setormanut') or row_data.get('Descr_Setormanut'), max_length=255)
+                            
+                            # Tipo Centro de Atividade
+                            cd_tpcentativ = _safe_int(row_data.get('CD_TPCENTATIV') or row_data.get('cd_tpcentativ') or row_data.get('Cd_Tpcentativ'))
+                            descr_abrev_tpcentativ = _safe_str(row_data.get('DESCR_ABREV_TPCENTATIV') or row_data.get('descr_abrev_tpcentativ') or row_data.get('Descr_Abrev_Tpcentativ'), max_length=255)
+                            
+                            # Ordem de ServiÃ§o
+                            dt_abertura = _safe_str(row_data.get('DT_ABERTURA') or row_data.get('dt_abertura') or row_data.get('Dt_Abertura'), max_length=50)
+                            cd_ordemserv = _safe_int(row_data.get('CD_ORDEMSERV') or row_data.get('cd_ordemserv') or row_data.get('Cd_Ordemserv'))
+                            ordemserv_id = _safe_int(row_data.get('ORDEMSERV_ID') or row_data.get('ordemserv_id') or row_data.get('Ordemserv_Id'))
+                            
+                            # MÃ¡quina
+                            cd_maquina = _safe_int(row_data.get('CD_MAQUINA') or row_data.get('cd_maquina') or row_data.get('Cd_Maquina'))
+                            descr_maquina = _safe_str(row_data.get('DESCR_MAQUINA') or row_data.get('descr_maquina') or row_data.get('Descr_Maquina'), max_length=500)
+                            
+                            # Plano de ManutenÃ§Ã£o
+                            cd_planmanut = _safe_int(row_data.get('CD_PLANMANUT') or row_data.get('cd_planmanut') or row_data.get('Cd_Planmanut'))
+                            descr_planmanut = _safe_str(row_data.get('DESCR_PLANMANUT') or row_data.get('descr_planmanut') or row_data.get('Descr_Planmanut'), max_length=255)
+                            descr_recomenos = _safe_str(row_data.get('DESCR_RECOMENOS') or row_data.get('descr_recomenos') or row_data.get('Descr_Recomenos'))
+                            cf_dt_final_execucao = _safe_str(row_data.get('CF_DT_FINAL_EXECUCAO') or row_data.get('cf_dt_final_execucao') or row_data.get('Cf_Dt_Final_Execucao'), max_length=50)
+                            cs_qtde_periodo_max = _safe_int(row_data.get('CS_QTDE_PERIODO_MAX') or row_data.get('cs_qtde_periodo_max') or row_data.get('Cs_Qtde_Periodo_Max'))
+                            cs_tot_temp = _safe_str(row_data.get('CS_TOT_TEMP') or row_data.get('cs_tot_temp') or row_data.get('Cs_Tot_Temp'), max_length=50)
+                            cf_tot_temp = _safe_str(row_data.get('CF_TOT_TEMP') or row_data.get('cf_tot_temp') or row_data.get('Cf_Tot_Temp'), max_length=50)
+                            
+                            # SequÃªncia Plano ManutenÃ§Ã£o
+                            seq_seqplamanu = _safe_int(row_data.get('SEQ_SEQPLAMANU') or row_data.get('seq_seqplamanu') or row_data.get('Seq_Seqplamanu'))
+                            
+                            # Tarefa ManutenÃ§Ã£o
+                            cd_tarefamanu = _safe_int(row_data.get('CD_TAREFAMANU') or row_data.get('cd_tarefamanu') or row_data.get('Cd_Tarefamanu'))
+                            descr_tarefamanu = _safe_str(row_data.get('DESCR_TAREFAMANU') or row_data.get('descr_tarefamanu') or row_data.get('Descr_Tarefamanu'))
+                            descr_periodo = _safe_str(row_data.get('DESCR_PERIODO') or row_data.get('descr_periodo') or row_data.get('Descr_Periodo'), max_length=255)
+                            
+                            # ExecuÃ§Ã£o
+                            dt_primexec = _safe_str(row_data.get('DT_PRIMEXEC') or row_data.get('dt_primexec') or row_data.get('Dt_Primexec'), max_length=50)
+                            tempo_prev = _safe_str(row_data.get('TEMPO_PREV') or row_data.get('tempo_prev') or row_data.get('Tempo_Prev'), max_length=50)
+                            qtde_periodo = _safe_int(row_data.get('QTDE_PERIODO') or row_data.get('qtde_periodo') or row_data.get('Qtde_Periodo'))
+                            descr_seqplamanu = _safe_str(row_data.get('DESCR_SEQPLAMANU') or row_data.get('descr_seqplamanu') or row_data.get('Descr_Seqplamanu'), max_length=255)
+                            cf_temp_prev = _safe_str(row_data.get('CF_TEMP_PREV') or row_data.get('cf_temp_prev') or row_data.get('Cf_Temp_Prev'), max_length=50)
+                            
+                            # Item do Plano
+                            itemplanma_id = _safe_int(row_data.get('ITEMPLANMA_ID') or row_data.get('itemplanma_id') or row_data.get('Itemplanma_Id'))
+                            cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
+                            descr_item = _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500)
+                            item_id = _safe_int(row_data.get('ITEM_ID') or row_data.get('item_id') or row_data.get('Item_Id'))
+                            qtde = _safe_int(row_data.get('QTDE') or row_data.get('qtde') or row_data.get('Qtde'))
+                            qtde_saldo = _safe_int(row_data.get('QTDE_SALDO') or row_data.get('qtde_saldo') or row_data.get('Qtde_Saldo'))
+                            qtde_reserva = _safe_int(row_data.get('QTDE_RESERVA') or row_data.get('qtde_reserva') or row_data.get('Qtde_Reserva'))
+                            
+                            # Validar que temos pelo menos cÃ³digo da mÃ¡quina ou descriÃ§Ã£o
+                            if not cd_maquina and not descr_maquina:
+                                errors.append(f"Linha {row_num}: CÃ³digo da mÃ¡quina ou descriÃ§Ã£o Ã© obrigatÃ³rio")
+                                continue
+                            
+                            # Tentar encontrar mÃ¡quina relacionada
+                            maquina_id = None
+                            if cd_maquina:
+                                maquina_id = referencias.maquina_id(cd_maquina)
+                                if maquina_id is None:
+                                    # Criar mÃ¡quina bÃ¡sica se nÃ£o existir
+                                    maquina = Maquina.objects.create(
+                                        cd_maquina=cd_maquina,
+                                        descr_maquina=descr_maquina or f'MÃ¡quina {cd_maquina}',
+                                        cd_unid=cd_unid,
+                                        nome_unid=nome_unid,
+                                        cd_setormanut=cd_setormanut,
+                                        descr_setormanut=descr_setormanut,
+                                        cd_tpcentativ=cd_tpcentativ,
+                                        centro_atividade_id=referencias.centro_atividade_id(cd_tpcentativ),
+                                    )
+                                    referencias.registrar_maquina(maquina)
+                                    maquina_id = maquina.pk
+                            
+                            # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
+                            roteiro_data = {
+                                'cd_unid': cd_unid,
+                                'nome_unid': nome_unid,
+                                'cd_funciomanu': cd_funciomanu,
+                                'nome_funciomanu': nome_funciomanu,
+                                'funciomanu_id': funciomanu_id,
+                                'cd_setormanut': cd_setormanut,
+                                'descr_setormanut': descr_setormanut,
+                                'cd_tpcentativ': cd_tpcentativ,
+                                'descr_abrev_tpcentativ': descr_abrev_tpcentativ,
+                                'dt_abertura': dt_abertura,
+                                'cd_ordemserv': cd_ordemserv,
+                                'ordemserv_id': ordemserv_id,
+                                'maquina_id': maquina_id,
+                                'cd_maquina': cd_maquina,
+                                'descr_maquina': descr_maquina,
+                                'cd_planmanut': cd_planmanut,
+                                'descr_planmanut': descr_planmanut,
+                                'descr_recomenos': descr_recomenos,
+                                'cf_dt_final_execucao': cf_dt_final_execucao,
+                                'cs_qtde_periodo_max': cs_qtde_periodo_max,
+                                'cs_tot_temp': cs_tot_temp,
+                                'cf_tot_temp': cf_tot_temp,
+                                'seq_seqplamanu': seq_seqplamanu,
+                                'cd_tarefamanu': cd_tarefamanu,
+                                'descr_tarefamanu': descr_tarefamanu,
+                                'descr_periodo': descr_periodo,
+                                'dt_primexec': dt_primexec,
+                                'tempo_prev': tempo_prev,
+                                'qtde_periodo': qtde_periodo,
+                                'descr_seqplamanu': descr_seqplamanu,
+                                'cf_temp_prev': cf_temp_prev,
+                                'itemplanma_id': itemplanma_id,
+                                'cd_item': cd_item,
+                                'descr_item': descr_item,
+                                'item_id': item_id,
+                                'qtde': qtde,
+                                'qtde_saldo': qtde_saldo,
+                                'qtde_reserva': qtde_reserva,
+                            }
+                            
+                            # Acumular registro para gravação em lote
+                            upsert.add(row_num, roteiro_data)
+                            
+                        except Exception as e:
+                            errors.append(f"Linha {row_num}: {str(e)}")
+                            continue
+                    
+                    upsert.flush()
+                    errors.extend(upsert.errors)
+                    upsert.errors.clear()
+                    retomavel.registrar_bloco(bloco, upsert.created_count, upsert.updated_count, errors)
+        except Exception as e:
+            # Blocos anteriores já gravados; o bloco com falha foi desfeito
+            print(f"Importação de roteiro interrompida: {e}")
+            return retomavel.interromper(errors, e)
         
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
+        return retomavel.finalizar(errors)
+    
     except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
+        errors.append(f"Erro geral: {str(e)}")
         import traceback
         traceback.print_exc()
         return 0, 0, errors
 
 
-def upload_roteiro_preventiva_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
+def upload_52_semanas_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
-    Faz upload de roteiro de manutenÃ§Ã£o preventiva a partir de um arquivo CSV
-    O arquivo deve ter colunas no formato: CD_UNID;NOME_UNID;CD_FUNCIOMANU;...
+    Faz upload de semanas (52 semanas) a partir de um arquivo Excel
     
     Args:
         file: Arquivo Django UploadedFile
@@ -2078,1073 +2686,2076 @@ def upload_roteiro_preventiva_from_file(file, update_existing=False) -> Tuple[in
     Returns:
         Tupla (created_count, updated_count, errors)
     """
-    from app.models import RoteiroPreventiva, Maquina
+    from app.models import Semana52
+    from datetime import datetime
+    import re
     
     errors = []
-    created_count = 0
-    updated_count = 0
+    
+    # Mapeamento de meses em portuguÃªs para inglÃªs
+    meses_pt_para_en = {
+        'janeiro': 'January', 'fevereiro': 'February', 'marÃ§o': 'March', 'marco': 'March',
+        'abril': 'April', 'maio': 'May', 'junho': 'June',
+        'julho': 'July', 'agosto': 'August', 'setembro': 'September',
+        'outubro': 'October', 'novembro': 'November', 'dezembro': 'December'
+    }
+    
+    def limpar_texto(texto):
+        """Remove caracteres especiais e normaliza espaÃ§os"""
+        if not texto:
+            return None
+        texto = str(texto).strip()
+        # Remover \xa0 (non-breaking space) e outros caracteres especiais
+        texto = texto.replace('\xa0', ' ').replace('\u00a0', ' ')
+        # Normalizar espaÃ§os mÃºltiplos
+        texto = re.sub(r'\s+', ' ', texto)
+        return texto.strip()
+    
+    def converter_data_pt_para_en(data_str):
+        """Converte data em portuguÃªs para formato que datetime.strptime entende"""
+        if not data_str:
+            return None
+        
+        data_str = limpar_texto(data_str)
+        if not data_str:
+            return None
+        
+        # Tentar substituir meses em portuguÃªs por inglÃªs
+        data_str_lower = data_str.lower()
+        for mes_pt, mes_en in meses_pt_para_en.items():
+            if mes_pt in data_str_lower:
+                # Substituir mantendo o case original
+                pattern = re.compile(re.escape(mes_pt), re.IGNORECASE)
+                data_str = pattern.sub(mes_en, data_str)
+                break
+        
+        return data_str
+    
+    def parse_date_value(value):
+        """
+        Tenta fazer parse de uma data em vÃ¡rios formatos diferentes.
+        Suporta: strings de data, objetos datetime/date, nÃºmeros Excel, etc.
+        """
+        if not value:
+            return None
+        
+        # Se jÃ¡ for um objeto date ou datetime
+        from datetime import date, datetime
+        if isinstance(value, date):
+            return value
+        if isinstance(value, datetime):
+            return value.date()
+        
+        # Se for um nÃºmero (possÃ­vel data serial do Excel)
+        if isinstance(value, (int, float)):
+            try:
+                # Excel usa 1 de janeiro de 1900 como base (mas tem bug, entÃ£o 1900-01-01 = 1)
+                # Na verdade, Excel conta dias desde 1899-12-30
+                from datetime import datetime, timedelta
+                excel_epoch = datetime(1899, 12, 30)
+                date_obj = excel_epoch + timedelta(days=int(value))
+                return date_obj.date()
+            except (ValueError, OverflowError):
+                pass
+        
+        # Converter para string e tentar diferentes formatos
+        value_str = str(value).strip()
+        if not value_str:
+            return None
+        
+        # Limpar e converter portuguÃªs para inglÃªs
+        value_str = converter_data_pt_para_en(value_str)
+        if not value_str:
+            return None
+        
+        # Lista de formatos para tentar
+        date_formats = [
+            '%d %B %Y',           # "22 December 2025"
+            '%d/%m/%Y',           # "22/12/2025"
+            '%Y-%m-%d',           # "2025-12-22"
+            '%d-%m-%Y',           # "22-12-2025"
+            '%d.%m.%Y',           # "22.12.2025"
+            '%d/%m/%y',           # "22/12/25"
+            '%d-%m-%y',           # "22-12-25"
+            '%d %b %Y',           # "22 Dec 2025" (abreviaÃ§Ã£o)
+            '%d %B %y',           # "22 December 25"
+            '%Y/%m/%d',           # "2025/12/22"
+            '%m/%d/%Y',           # "12/22/2025" (formato US)
+            '%d de %B de %Y',     # "22 de December de 2025" (com "de")
+            '%d de %b de %Y',     # "22 de Dec de 2025"
+        ]
+        
+        for fmt in date_formats:
+            try:
+                return datetime.strptime(value_str, fmt).date()
+            except ValueError:
+                continue
+        
+        # Tentar parse com dateutil se disponÃ­vel (mais flexÃ­vel)
+        try:
+            from dateutil import parser
+            return parser.parse(value_str, dayfirst=True).date()
+        except (ImportError, ValueError, TypeError):
+            pass
+        
+        return None
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
     
     try:
-        # Ler arquivo baseado na extensÃ£o
+        # Ler arquivo Excel
         if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
             data = read_excel_file(file)
-        elif file_name.endswith('.csv'):
-            # Tentar diferentes encodings e delimitadores (o arquivo usa ponto e vÃ­rgula)
-            try:
-                # Primeiro tentar com delimitador ponto e vÃ­rgula (;) e encoding latin-1
-                file.seek(0)
-                data = read_csv_file(file, encoding='latin-1', delimiter=';')
-            except Exception:
-                try:
-                    file.seek(0)
-                    data = read_csv_file(file, encoding='utf-8', delimiter=';')
-                except Exception:
-                    try:
-                        file.seek(0)
-                        data = read_csv_file(file, encoding='latin-1', delimiter=',')
-                    except Exception as e:
-                        file.seek(0)
-                        data = read_csv_file(file, encoding='utf-8', delimiter=',')
+            print(f"DEBUG: Arquivo lido com sucesso. Total de linhas: {len(data)}")
+            if data:
+                print(f"DEBUG: Primeira linha de dados: {data[0]}")
         else:
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls, .xlsm ou .csv")
+            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls ou .xlsm")
         
         if not data:
             raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
         
-        # Cache de mÃ¡quinas para melhorar performance
-        maquinas_cache = {}
+        upsert = BulkUpsert(Semana52, ['semana', 'inicio'], update_existing=update_existing)
         
         # Processar dados em transaÃ§Ã£o
         with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
+            for row_idx, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 porque linha 1 Ã© cabeÃ§alho
                 try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
+                    # Verificar se a linha estÃ¡ vazia
                     if not any(str(v).strip() if v else '' for v in row_data.values()):
                         continue
                     
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_FUNCIOMANU;NOME_FUNCIOMANU;FUNCIOMANU_ID;CD_SETORMANUT;DESCR_SETORMANUT;...
+                    # Normalizar nomes de colunas (case-insensitive)
+                    semana_value = None
+                    inicio_value = None
+                    fim_value = None
                     
-                    # Unidade
-                    cd_unid = _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid'))
-                    nome_unid = _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255)
+                    for key, value in row_data.items():
+                        key_lower = str(key).lower().strip()
+                        if 'semana' in key_lower:
+                            semana_value = value
+                        elif 'inicio' in key_lower or 'inÃ­cio' in key_lower:
+                            inicio_value = value
+                        elif 'fim' in key_lower:
+                            fim_value = value
                     
-                    # FuncionÃ¡rio
-                    cd_funciomanu = _safe_str(row_data.get('CD_FUNCIOMANU') or row_data.get('cd_funciomanu') or row_data.get('Cd_Funciomanu'), max_length=100)
-                    nome_funciomanu = _safe_str(row_data.get('NOME_FUNCIOMANU') or row_data.get('nome_funciomanu') or row_data.get('Nome_Funciomanu'), max_length=255)
-                    funciomanu_id = _safe_int(row_data.get('FUNCIOMANU_ID') or row_data.get('funciomanu_id') or row_data.get('Funciomanu_Id'))
+                    # Debug: mostrar o que foi encontrado
+                    if row_idx == 2:  # Apenas para primeira linha de dados
+                        print(f"DEBUG Linha {row_idx}: semana_value={semana_value}, inicio_value={inicio_value}, fim_value={fim_value}")
+                        print(f"DEBUG Linha {row_idx}: row_data keys={list(row_data.keys())}")
                     
-                    # Setor
-                    cd_setormanut = _safe_str(row_data.get('CD_SETORMANUT') or row_data.get('cd_setormanut') or row_data.get('Cd_Setormanut'), max_length=50)
-                    descr_setormanut = _safe_str(row_data.get('DESCR_SETORMANUT') or row_data.get('descr_setormanut') or row_data.get('Descr_Setormanut'), max_length=255)
+                    if not semana_value:
+                        errors.append(f"Linha {row_idx}: Campo 'semana' estÃ¡ vazio. Colunas encontradas: {', '.join(str(k) for k in row_data.keys())}")
+                        continue
                     
-                    # Tipo Centro de Atividade
-                    cd_tpcentativ = _safe_int(row_data.get('CD_TPCENTATIV') or row_data.get('cd_tpcentativ') or row_data.get('Cd_Tpcentativ'))
-                    descr_abrev_tpcentativ = _safe_str(row_data.get('DESCR_ABREV_TPCENTATIV') or row_data.get('descr_abrev_tpcentativ') or row_data.get('Descr_Abrev_Tpcentativ'), max_length=255)
+                    # Limpar valores de semana
+                    semana_value = limpar_texto(semana_value)
+                    if not semana_value:
+                        errors.append(f"Linha {row_idx}: Campo 'semana' estÃ¡ vazio apÃ³s limpeza")
+                        continue
                     
-                    # Ordem de ServiÃ§o
-                    dt_abertura = _safe_str(row_data.get('DT_ABERTURA') or row_data.get('dt_abertura') or row_data.get('Dt_Abertura'), max_length=50)
-                    cd_ordemserv = _safe_int(row_data.get('CD_ORDEMSERV') or row_data.get('cd_ordemserv') or row_data.get('Cd_Ordemserv'))
-                    ordemserv_id = _safe_int(row_data.get('ORDEMSERV_ID') or row_data.get('ordemserv_id') or row_data.get('Ordemserv_Id'))
+                    # Converter datas usando funÃ§Ã£o melhorada
+                    inicio_date = None
+                    fim_date = None
                     
-                    # MÃ¡quina
-                    cd_maquina = _safe_int(row_data.get('CD_MAQUINA') or row_data.get('cd_maquina') or row_data.get('Cd_Maquina'))
-                    descr_maquina = _safe_str(row_data.get('DESCR_MAQUINA') or row_data.get('descr_maquina') or row_data.get('Descr_Maquina'), max_length=500)
-                    
-                    # Plano de ManutenÃ§Ã£o
-                    cd_planmanut = _safe_int(row_data.get('CD_PLANMANUT') or row_data.get('cd_planmanut') or row_data.get('Cd_Planmanut'))
-                    descr_planmanut = _safe_str(row_data.get('DESCR_PLANMANUT') or row_data.get('descr_planmanut') or row_data.get('Descr_Planmanut'), max_length=255)
-                    descr_recomenos = _safe_str(row_data.get('DESCR_RECOMENOS') or row_data.get('descr_recomenos') or row_data.get('Descr_Recomenos'))
-                    cf_dt_final_execucao = _safe_str(row_data.get('CF_DT_FINAL_EXECUCAO') or row_data.get('cf_dt_final_execucao') or row_data.get('Cf_Dt_Final_Execucao'), max_length=50)
-                    cs_qtde_periodo_max = _safe_int(row_data.get('CS_QTDE_PERIODO_MAX') or row_data.get('cs_qtde_periodo_max') or row_data.get('Cs_Qtde_Periodo_Max'))
-                    cs_tot_temp = _safe_str(row_data.get('CS_TOT_TEMP') or row_data.get('cs_tot_temp') or row_data.get('Cs_Tot_Temp'), max_length=50)
-                    cf_tot_temp = _safe_str(row_data.get('CF_TOT_TEMP') or row_data.get('cf_tot_temp') or row_data.get('Cf_Tot_Temp'), max_length=50)
-                    
-                    # SequÃªncia Plano ManutenÃ§Ã£o
-                    seq_seqplamanu = _safe_int(row_data.get('SEQ_SEQPLAMANU') or row_data.get('seq_seqplamanu') or row_data.get('Seq_Seqplamanu'))
-                    
-                    # Tarefa ManutenÃ§Ã£o
-                    cd_tarefamanu = _safe_int(row_data.get('CD_TAREFAMANU') or row_data.get('cd_tarefamanu') or row_data.get('Cd_Tarefamanu'))
-                    descr_tarefamanu = _safe_str(row_data.get('DESCR_TAREFAMANU') or row_data.get('descr_tarefamanu') or row_data.get('Descr_Tarefamanu'))
-                    descr_periodo = _safe_str(row_data.get('DESCR_PERIODO') or row_data.get('descr_periodo') or row_data.get('Descr_Periodo'), max_length=255)
-                    
-                    # ExecuÃ§Ã£o
-                    dt_primexec = _safe_str(row_data.get('DT_PRIMEXEC') or row_data.get('dt_primexec') or row_data.get('Dt_Primexec'), max_length=50)
-                    tempo_prev = _safe_str(row_data.get('TEMPO_PREV') or row_data.get('tempo_prev') or row_data.get('Tempo_Prev'), max_length=50)
-                    qtde_periodo = _safe_int(row_data.get('QTDE_PERIODO') or row_data.get('qtde_periodo') or row_data.get('Qtde_Periodo'))
-                    descr_seqplamanu = _safe_str(row_data.get('DESCR_SEQPLAMANU') or row_data.get('descr_seqplamanu') or row_data.get('Descr_Seqplamanu'), max_length=255)
-                    cf_temp_prev = _safe_str(row_data.get('CF_TEMP_PREV') or row_data.get('cf_temp_prev') or row_data.get('Cf_Temp_Prev'), max_length=50)
-                    
-                    # Item do Plano
-                    itemplanma_id = _safe_int(row_data.get('ITEMPLANMA_ID') or row_data.get('itemplanma_id') or row_data.get('Itemplanma_Id'))
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    descr_item = _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500)
-                    item_id = _safe_int(row_data.get('ITEM_ID') or row_data.get('item_id') or row_data.get('Item_Id'))
-                    qtde = _safe_int(row_data.get('QTDE') or row_data.get('qtde') or row_data.get('Qtde'))
-                    qtde_saldo = _safe_int(row_data.get('QTDE_SALDO') or row_data.get('qtde_saldo') or row_data.get('Qtde_Saldo'))
-                    qtde_reserva = _safe_int(row_data.get('QTDE_RESERVA') or row_data.get('qtde_reserva') or row_data.get('Qtde_Reserva'))
-                    
-                    # Validar que temos pelo menos cÃ³digo da mÃ¡quina ou descriÃ§Ã£o
-                    if not cd_maquina and not descr_maquina:
-                        errors.append(f"Linha {row_num}: CÃ³digo da mÃ¡quina ou descriÃ§Ã£o Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Tentar encontrar mÃ¡quina relacionada
-                    maquina = None
-                    if cd_maquina:
-                        # Verificar cache primeiro
-                        if cd_maquina in maquinas_cache:
-                            maquina = maquinas_cache[cd_maquina]
-                        else:
-                            try:
-                                maquina = Maquina.objects.get(cd_maquina=cd_maquina)
-                                maquinas_cache[cd_maquina] = maquina
-                            except Maquina.DoesNotExist:
-                                # Criar mÃ¡quina bÃ¡sica se nÃ£o existir
-                                maquina = Maquina.objects.create(
-                                    cd_maquina=cd_maquina,
-                                    descr_maquina=descr_maquina or f'MÃ¡quina {cd_maquina}',
-                                    cd_unid=cd_unid,
-                                    nome_unid=nome_unid,
-                                    cd_setormanut=cd_setormanut,
-                                    descr_setormanut=descr_setormanut,
-                                    cd_tpcentativ=cd_tpcentativ,
-                                )
-                                maquinas_cache[cd_maquina] = maquina
+                    if inicio_value:
+                        try:
+                            inicio_date = parse_date_value(inicio_value)
+                            if not inicio_date:
+                                errors.append(f"Linha {row_idx}: Data de inÃ­cio invÃ¡lida ou formato nÃ£o reconhecido: {inicio_value}")
+                        except Exception as e:
+                            errors.append(f"Linha {row_idx}: Erro ao processar data de inÃ­cio '{inicio_value}': {str(e)}")
                     
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    roteiro_data = {
-                        'cd_unid': cd_unid,
-                        'nome_unid': nome_unid,
-                        'cd_funciomanu': cd_funciomanu,
-                        'nome_funciomanu': nome_funciomanu,
-                        'funciomanu_id': funciomanu_id,
-                        'cd_setormanut': cd_setormanut,
-                        'descr_setormanut': descr_setormanut,
-                        'cd_tpcentativ': cd_tpcentativ,
-                        'descr_abrev_tpcentativ': descr_abrev_tpcentativ,
-                        'dt_abertura': dt_abertura,
-                        'cd_ordemserv': cd_ordemserv,
-                        'ordemserv_id': ordemserv_id,
-                        'maquina': maquina,
-                        'cd_maquina': cd_maquina,
-                        'descr_maquina': descr_maquina,
-                        'cd_planmanut': cd_planmanut,
-                        'descr_planmanut': descr_planmanut,
-                        'descr_recomenos': descr_recomenos,
-                        'cf_dt_final_execucao': cf_dt_final_execucao,
-                        'cs_qtde_periodo_max': cs_qtde_periodo_max,
-                        'cs_tot_temp': cs_tot_temp,
-                        'cf_tot_temp': cf_tot_temp,
-                        'seq_seqplamanu': seq_seqplamanu,
-                        'cd_tarefamanu': cd_tarefamanu,
-                        'descr_tarefamanu': descr_tarefamanu,
-                        'descr_periodo': descr_periodo,
-                        'dt_primexec': dt_primexec,
-                        'tempo_prev': tempo_prev,
-                        'qtde_periodo': qtde_periodo,
-                        'descr_seqplamanu': descr_seqplamanu,
-                        'cf_temp_prev': cf_temp_prev,
-                        'itemplanma_id': itemplanma_id,
-                        'cd_item': cd_item,
-                        'descr_item': descr_item,
-                        'item_id': item_id,
-                        'qtde': qtde,
-                        'qtde_saldo': qtde_saldo,
-                        'qtde_reserva': qtde_reserva,
-                    }
+                    if fim_value:
+                        try:
+                            fim_date = parse_date_value(fim_value)
+                            if not fim_date:
+                                errors.append(f"Linha {row_idx}: Data de fim invÃ¡lida ou formato nÃ£o reconhecido: {fim_value}")
+                        except Exception as e:
+                            errors.append(f"Linha {row_idx}: Erro ao processar data de fim '{fim_value}': {str(e)}")
                     
                     # Criar ou atualizar registro
-                    if update_existing:
-                        roteiro_obj, created = RoteiroPreventiva.objects.update_or_create(
-                            cd_ordemserv=cd_ordemserv,
-                            cd_planmanut=cd_planmanut,
-                            seq_seqplamanu=seq_seqplamanu,
-                            cd_tarefamanu=cd_tarefamanu,
-                            defaults=roteiro_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        roteiro_obj, created = RoteiroPreventiva.objects.get_or_create(
-                            cd_ordemserv=cd_ordemserv,
-                            cd_planmanut=cd_planmanut,
-                            seq_seqplamanu=seq_seqplamanu,
-                            cd_tarefamanu=cd_tarefamanu,
-                            defaults=roteiro_data
-                        )
-                        if created:
-                            created_count += 1
+                    # Usar semana + inicio como chave única composta para permitir múltiplas semanas com mesmo nome em anos diferentes
+                    # (semanas sem data de início são identificadas por semana + inicio vazio)
+                    upsert.add(row_idx, {
+                        'semana': semana_value,
+                        'inicio': inicio_date,
+                        'fim': fim_date,
+                    })
                     
                 except Exception as e:
-                    errors.append(f"Linha {row_num}: {str(e)}")
-                    continue
+                    error_msg = f"Linha {row_idx}: Erro ao processar registro - {str(e)}"
+                    errors.append(error_msg)
+                    print(f"Erro na linha {row_idx}: {e}")
+                    import traceback
+                    traceback.print_exc()
+            
+            upsert.flush()
         
-        return created_count, updated_count, errors
-    
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
+        
+    except ValidationError as e:
+        errors.append(str(e))
+        return 0, 0, errors
     except Exception as e:
-        errors.append(f"Erro geral: {str(e)}")
+        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
+        errors.append(error_msg)
+        print(f"Erro geral: {error_msg}")
         import traceback
         traceback.print_exc()
         return 0, 0, errors
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
+def upload_notas_fiscais_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
     """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
+    Faz upload de notas fiscais a partir de um arquivo CSV
     
     Args:
         file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
         update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
     
     Returns:
         Tupla (created_count, updated_count, errors)
     """
-    from app.models import RequisicaoAlmoxarifado
-    from datetime import datetime
+    from app.models import NotaFiscal
     
     errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
-        try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
-        except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
     
     # Determinar tipo de arquivo
     file_name = file.name.lower()
     
     try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
-        
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
+        # Ler arquivo CSV (usar delimitador ponto e vírgula)
+        # Colunas duplicadas (ex: duas colunas "Situação") são renomeadas na leitura do cabeçalho
+        if file_name.endswith('.csv'):
+            def _cabecalhos_unicos(headers_raw):
+                """Renomeia colunas duplicadas (a segunda "Situação" vira "Situação_1")"""
+                import unicodedata
+                headers = []
+                header_count = {}
+                for header in headers_raw:
+                    # Normalizar para comparar (remover acentos e case)
+                    header_normalized = unicodedata.normalize('NFKD', header.lower()).encode('ASCII', 'ignore').decode('ASCII')
+                    if header_normalized in header_count:
+                        header_count[header_normalized] += 1
+                        headers.append(f"{header}_{header_count[header_normalized]}")
+                    else:
+                        header_count[header_normalized] = 0
+                        headers.append(header)
+                return headers
+            
+            # Leitura incremental (encoding detectado uma vez pela amostra inicial)
+            data = iter_csv_rows(file, delimiter=';', tratar_cabecalhos=_cabecalhos_unicos)
+        else:
+            raise ValidationError("Formato de arquivo não suportado. Use .csv")
         
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
+        # Iterador preguiçoso: as linhas são lidas conforme o processamento
+        data = exigir_linhas(data)
         
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
+        upsert = BulkUpsert(NotaFiscal, ['emitente', 'nota', 'serie', 'modelo'], update_existing=update_existing)
         
-        # Processar dados em transaÃ§Ã£o
+        # Processar dados em transação
         with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
+            for row_num, row_data in enumerate(data, start=2):  # Começar em 2 (linha 1 é cabeçalho)
                 try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
+                    # Verificar se a linha está vazia ou tem apenas valores vazios
+                    # Também ignorar linhas que começam com "Unidade" (linhas de resumo)
                     if not any(str(v).strip() if v else '' for v in row_data.values()):
                         continue
                     
+                    # Verificar se é linha de resumo (começa com "Unidade")
+                    primeiro_valor = str(list(row_data.values())[0] if row_data.values() else '').strip()
+                    if primeiro_valor.upper() == 'UNIDADE':
+                        continue
+                    
                     # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
+                    # Emitente
+                    emitente = _safe_str(row_data.get('Emitente') or row_data.get('emitente') or row_data.get('EMITENTE'), max_length=100)
+                    nome_fantasia_emitente = _safe_str(row_data.get('Nome fantasia emitente') or row_data.get('nome fantasia emitente') or row_data.get('NOME FANTASIA EMITENTE'), max_length=500)
                     
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
+                    # Dados da Nota Fiscal
+                    nota = _safe_str(row_data.get('Nota') or row_data.get('nota') or row_data.get('NOTA'), max_length=50)
+                    serie = _safe_str(row_data.get('Série') or row_data.get('série') or row_data.get('SÉRIE') or row_data.get('Serie') or row_data.get('SERIE'), max_length=50)
+                    modelo = _safe_str(row_data.get('Modelo') or row_data.get('modelo') or row_data.get('MODELO'), max_length=50)
+                    
+                    # Total Nota (formato brasileiro: 2.982,99)
+                    total_nota_str = row_data.get('Total Nota') or row_data.get('total nota') or row_data.get('TOTAL NOTA') or row_data.get('Total nota')
+                    total_nota = _safe_decimal(total_nota_str)
+                    
+                    # Validar que temos pelo menos emitente e nota
+                    if not emitente or not nota:
+                        errors.append(f"Linha {row_num}: Emitente e Nota são obrigatórios")
                         continue
                     
+                    # Datas
+                    data_emissao = _safe_str(row_data.get('Data emissão') or row_data.get('data emissão') or row_data.get('DATA EMISSÃO') or row_data.get('Data emissao') or row_data.get('DATA EMISSAO'), max_length=50)
+                    data_vencimento = _safe_str(row_data.get('Data vencimento') or row_data.get('data vencimento') or row_data.get('DATA VENCIMENTO'), max_length=50)
+                    data_inclusao = _safe_str(row_data.get('Data inclusão') or row_data.get('data inclusão') or row_data.get('DATA INCLUSÃO') or row_data.get('Data inclusao') or row_data.get('DATA INCLUSAO'), max_length=50)
+                    data_autorizacao = _safe_str(row_data.get('Data autorização') or row_data.get('data autorização') or row_data.get('DATA AUTORIZAÇÃO') or row_data.get('Data autorizacao') or row_data.get('DATA AUTORIZACAO'), max_length=50)
+                    data_ult_sit_fechada = _safe_str(row_data.get('Data ult sit fechada') or row_data.get('data ult sit fechada') or row_data.get('DATA ULT SIT FECHADA') or row_data.get('Data ult sit fechada'), max_length=50)
+                    
+                    # Controle
+                    ctrle = _safe_str(row_data.get('Ctrle') or row_data.get('ctrle') or row_data.get('CTRLE'), max_length=50)
+                    
+                    # Unidade
+                    unidade = _safe_str(row_data.get('Unidade') or row_data.get('unidade') or row_data.get('UNIDADE'), max_length=50)
+                    nome_unidade = _safe_str(row_data.get('Nome unidade') or row_data.get('nome unidade') or row_data.get('NOME UNIDADE'), max_length=255)
+                    unidade_autorizacao = _safe_str(row_data.get('Unidade autorização') or row_data.get('unidade autorização') or row_data.get('UNIDADE AUTORIZAÇÃO') or row_data.get('Unidade autorizacao') or row_data.get('UNIDADE AUTORIZACAO'), max_length=50)
+                    nome_unidade_autorizacao = _safe_str(row_data.get('Nome unidade autorização') or row_data.get('nome unidade autorização') or row_data.get('NOME UNIDADE AUTORIZAÇÃO') or row_data.get('Nome unidade autorizacao') or row_data.get('NOME UNIDADE AUTORIZACAO'), max_length=255)
+                    
+                    # Centro de Atividade
+                    centro_atividade = _safe_str(row_data.get('Centro atividade') or row_data.get('centro atividade') or row_data.get('CENTRO ATIVIDADE'), max_length=50)
+                    nome_centro_atividade = _safe_str(row_data.get('Nome centro atividade') or row_data.get('nome centro atividade') or row_data.get('NOME CENTRO ATIVIDADE'), max_length=255)
+                    
+                    # Situação - primeira coluna (ex: "AUTORIZADA")
+                    situacao = _safe_str(
+                        row_data.get('Situação') or 
+                        row_data.get('situação') or 
+                        row_data.get('SITUAÇÃO') or 
+                        row_data.get('Situacao') or 
+                        row_data.get('SITUACAO') or
+                        row_data.get('Situação_1') or  # Primeira ocorrência quando há duplicatas
+                        row_data.get('situação_1') or
+                        row_data.get('SITUAÇÃO_1'),
+                        max_length=100
+                    )
+                    
+                    # Situação detalhada - segunda coluna (ex: "Solicitação autorizada por: ...")
+                    situacao_detalhada = _safe_str(
+                        row_data.get('Situação_2') or  # Segunda ocorrência quando há duplicatas
+                        row_data.get('situação_2') or
+                        row_data.get('SITUAÇÃO_2') or
+                        row_data.get('Situacao_2') or
+                        row_data.get('SITUACAO_2')
+                    )
+                    
+                    # UsuÃ¡rio e AutorizaÃ§Ã£o
+                    nome_usuario = _safe_str(row_data.get('Nome usuÃ¡rio') or row_data.get('nome usuÃ¡rio') or row_data.get('NOME USUÃRIO') or row_data.get('Nome usuario') or row_data.get('NOME USUARIO'), max_length=255)
+                    autorizador = _safe_str(row_data.get('Autorizador') or row_data.get('autorizador') or row_data.get('AUTORIZADOR'), max_length=255)
+                    
+                    # ObservaÃ§Ãµes
+                    observacoes = _safe_str(row_data.get('ObservaÃ§Ãµes') or row_data.get('observaÃ§Ãµes') or row_data.get('OBSERVAÃ‡Ã•ES') or row_data.get('Observacoes') or row_data.get('OBSERVACOES'))
+                    observacoes_csc = _safe_str(row_data.get('ObservaÃ§Ãµes CSC') or row_data.get('observaÃ§Ãµes csc') or row_data.get('OBSERVAÃ‡Ã•ES CSC') or row_data.get('Observacoes CSC') or row_data.get('OBSERVACOES CSC'))
+                    observacoes_autorizacao = _safe_str(row_data.get('ObservaÃ§Ãµes autorizaÃ§Ã£o') or row_data.get('observaÃ§Ãµes autorizaÃ§Ã£o') or row_data.get('OBSERVAÃ‡Ã•ES AUTORIZAÃ‡ÃƒO') or row_data.get('Observacoes autorizacao') or row_data.get('OBSERVACOES AUTORIZACAO'))
+                    
+                    # LanÃ§amento
+                    lancamento_tesf0028 = _safe_str(row_data.get('LANCAMENTO TESF0028') or row_data.get('lancamento tesf0028') or row_data.get('Lancamento TESF0028'), max_length=255)
+                    
                     # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
+                    nota_data = {
+                        'emitente': emitente,
+                        'nome_fantasia_emitente': nome_fantasia_emitente,
+                        'nota': nota,
+                        'serie': serie,
+                        'modelo': modelo,
+                        'total_nota': total_nota,
+                        'data_emissao': data_emissao,
+                        'data_vencimento': data_vencimento,
+                        'data_inclusao': data_inclusao,
+                        'data_autorizacao': data_autorizacao,
+                        'data_ult_sit_fechada': data_ult_sit_fechada,
+                        'ctrle': ctrle,
+                        'unidade': unidade,
+                        'nome_unidade': nome_unidade,
+                        'unidade_autorizacao': unidade_autorizacao,
+                        'nome_unidade_autorizacao': nome_unidade_autorizacao,
+                        'centro_atividade': centro_atividade,
+                        'nome_centro_atividade': nome_centro_atividade,
+                        'situacao': situacao,
+                        'situacao_detalhada': situacao_detalhada,
+                        'nome_usuario': nome_usuario,
+                        'autorizador': autorizador,
+                        'observacoes': observacoes,
+                        'observacoes_csc': observacoes_csc,
+                        'observacoes_autorizacao': observacoes_autorizacao,
+                        'lancamento_tesf0028': lancamento_tesf0028,
                     }
                     
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
+                    # Acumular registro para gravação em lote (série e modelo vazios fazem parte da chave)
+                    nota_data['serie'] = serie or ''
+                    nota_data['modelo'] = modelo or ''
+                    upsert.add(row_num, nota_data)
+                    
                 except Exception as e:
                     error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
                     errors.append(error_msg)
                     print(f"Erro na linha {row_num}: {e}")
                     import traceback
                     traceback.print_exc()
+            
+            upsert.flush()
         
-        return created_count, updated_count, errors
-        
+        return upsert.created_count, upsert.updated_count, errors + upsert.errors
+    
     except ValidationError as e:
         errors.append(str(e))
         return 0, 0, errors
     except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
+        error_detail = f"Erro geral ao processar arquivo: {str(e)}"
+        errors.append(error_detail)
+        print(f"Erro geral: {error_detail}")
         import traceback
         traceback.print_exc()
         return 0, 0, errors
 
 
-def upload_52_semanas_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
+def _normalizar_descricao(valor) -> str:
+    """Normaliza uma descrição para comparação (sem espaços nas pontas e em maiúsculas)"""
+    return (valor or '').strip().upper()
+
+
+def chave_relacionamento_plano(plano):
     """
-    Faz upload de semanas (52 semanas) a partir de um arquivo Excel
-    
+    Chave composta usada para relacionar um PlanoPreventiva a um RoteiroPreventiva.
+
+    Retorna None quando falta algum dos códigos obrigatórios (cd_maquina,
+    sequencia_tarefa ou sequencia_manutencao), pois esses planos nunca têm correspondência.
+    """
+    if not plano.cd_maquina or not plano.sequencia_tarefa or not plano.sequencia_manutencao:
+        return None
+    return (
+        plano.cd_maquina,
+        _normalizar_descricao(plano.descr_maquina),
+        plano.sequencia_tarefa,
+        _normalizar_descricao(plano.descr_tarefa),
+        plano.sequencia_manutencao,
+    )
+
+
+def chave_relacionamento_roteiro(roteiro):
+    """
+    Chave composta de um RoteiroPreventiva, equivalente a chave_relacionamento_plano().
+
+    cd_tarefamanu corresponde a sequencia_tarefa e seq_seqplamanu a sequencia_manutencao.
+    """
+    if not roteiro.cd_maquina or not roteiro.cd_tarefamanu or not roteiro.seq_seqplamanu:
+        return None
+    return (
+        roteiro.cd_maquina,
+        _normalizar_descricao(roteiro.descr_maquina),
+        roteiro.cd_tarefamanu,
+        _normalizar_descricao(roteiro.descr_tarefamanu),
+        roteiro.seq_seqplamanu,
+    )
+
+
+def relacionar_planos_roteiros(planos, roteiros) -> Tuple[List[tuple], list, list]:
+    """
+    Relaciona planos e roteiros de preventiva por correspondência exata em uma única passada.
+
+    Indexa os roteiros pela chave composta e consulta o índice para cada plano,
+    em vez de comparar todos os pares. Cada plano fica com o primeiro roteiro
+    (na ordem recebida) que tenha a mesma chave; um mesmo roteiro pode atender
+    a mais de um plano.
+
     Args:
-        file: Arquivo Django UploadedFile
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
+        planos: Iterável de PlanoPreventiva
+        roteiros: Iterável de RoteiroPreventiva
+
     Returns:
-        Tupla (created_count, updated_count, errors)
+        Tupla (pares, planos_sem_relacao, roteiros_sem_relacao) - pares é uma lista
+        de (plano, roteiro) na ordem dos planos
     """
-    from app.models import Semana52
-    from datetime import datetime
-    import re
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Mapeamento de meses em portuguÃªs para inglÃªs
-    meses_pt_para_en = {
-        'janeiro': 'January', 'fevereiro': 'February', 'marÃ§o': 'March', 'marco': 'March',
-        'abril': 'April', 'maio': 'May', 'junho': 'June',
-        'julho': 'July', 'agosto': 'August', 'setembro': 'September',
-        'outubro': 'October', 'novembro': 'November', 'dezembro': 'December'
-    }
-    
-    def limpar_texto(texto):
-        """Remove caracteres especiais e normaliza espaÃ§os"""
-        if not texto:
-            return None
-        texto = str(texto).strip()
-        # Remover \xa0 (non-breaking space) e outros caracteres especiais
-        texto = texto.replace('\xa0', ' ').replace('\u00a0', ' ')
-        # Normalizar espaÃ§os mÃºltiplos
-        texto = re.sub(r'\s+', ' ', texto)
-        return texto.strip()
-    
-    def converter_data_pt_para_en(data_str):
-        """Converte data em portuguÃªs para formato que datetime.strptime entende"""
-        if not data_str:
-            return None
-        
-        data_str = limpar_texto(data_str)
-        if not data_str:
-            return None
-        
-        # Tentar substituir meses em portuguÃªs por inglÃªs
-        data_str_lower = data_str.lower()
-        for mes_pt, mes_en in meses_pt_para_en.items():
-            if mes_pt in data_str_lower:
-                # Substituir mantendo o case original
-                pattern = re.compile(re.escape(mes_pt), re.IGNORECASE)
-                data_str = pattern.sub(mes_en, data_str)
-                break
-        
-        return data_str
-    
-    def parse_date_value(value):
-        """
-        Tenta fazer parse de uma data em vÃ¡rios formatos diferentes.
-        Suporta: strings de data, objetos datetime/date, nÃºmeros Excel, etc.
-        """
-        if not value:
-            return None
-        
-        # Se jÃ¡ for um objeto date ou datetime
-        from datetime import date, datetime
-        if isinstance(value, date):
-            return value
-        if isinstance(value, datetime):
-            return value.date()
-        
-        # Se for um nÃºmero (possÃ­vel data serial do Excel)
-        if isinstance(value, (int, float)):
-            try:
-                # Excel usa 1 de janeiro de 1900 como base (mas tem bug, entÃ£o 1900-01-01 = 1)
-                # Na verdade, Excel conta dias desde 1899-12-30
-                from datetime import datetime, timedelta
-                excel_epoch = datetime(1899, 12, 30)
-                date_obj = excel_epoch + timedelta(days=int(value))
-                return date_obj.date()
-            except (ValueError, OverflowError):
-                pass
-        
-        # Converter para string e tentar diferentes formatos
-        value_str = str(value).strip()
-        if not value_str:
-            return None
-        
-        # Limpar e converter portuguÃªs para inglÃªs
-        value_str = converter_data_pt_para_en(value_str)
-        if not value_str:
-            return None
-        
-        # Lista de formatos para tentar
-        date_formats = [
-            '%d %B %Y',           # "22 December 2025"
-            '%d/%m/%Y',           # "22/12/2025"
-            '%Y-%m-%d',           # "2025-12-22"
-            '%d-%m-%Y',           # "22-12-2025"
-            '%d.%m.%Y',           # "22.12.2025"
-            '%d/%m/%y',           # "22/12/25"
-            '%d-%m-%y',           # "22-12-25"
-            '%d %b %Y',           # "22 Dec 2025" (abreviaÃ§Ã£o)
-            '%d %B %y',           # "22 December 25"
-            '%Y/%m/%d',           # "2025/12/22"
-            '%m/%d/%Y',           # "12/22/2025" (formato US)
-            '%d de %B de %Y',     # "22 de December de 2025" (com "de")
-            '%d de %b de %Y',     # "22 de Dec de 2025"
+    roteiros = list(roteiros)
+    indice = {}
+    for roteiro in roteiros:
+        chave = chave_relacionamento_roteiro(roteiro)
+        if chave is not None:
+            indice.setdefault(chave, roteiro)
+
+    pares = []
+    planos_sem_relacao = []
+    roteiros_relacionados = set()
+    for plano in planos:
+        chave = chave_relacionamento_plano(plano)
+        roteiro = indice.get(chave) if chave is not None else None
+        if roteiro is None:
+            planos_sem_relacao.append(plano)
+        else:
+            pares.append((plano, roteiro))
+            roteiros_relacionados.add(roteiro.pk)
+
+    roteiros_sem_relacao = [r for r in roteiros if r.pk not in roteiros_relacionados]
+    return pares, planos_sem_relacao, roteiros_sem_relacao
+
+
+def chave_relacionamento_hash(chave) -> str:
+    """
+    Converte a chave composta de chave_relacionamento_plano()/chave_relacionamento_roteiro()
+    no valor gravado em chave_relacionamento (SHA-1 em hexadecimal, ou '' sem chave).
+    """
+    if chave is None:
+        return ''
+    cd_maquina, descr_maquina, tarefa, descr_tarefa, sequencia = chave
+    texto = json.dumps(
+        [int(cd_maquina), descr_maquina, int(tarefa), descr_tarefa, int(sequencia)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def _em_blocos(valores, tamanho=BULK_MAX_QUERY_PARAMS):
+    """Divide uma coleção em listas de até `tamanho` itens (para filtros __in)"""
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+
+def atualizar_relacionamentos_preventiva(planos=(), roteiros=()) -> int:
+    """
+    Atualiza a tabela RelacionamentoPlanoRoteiro apenas para os registros informados.
+
+    Recalcula chave_relacionamento dos planos e roteiros recebidos e refaz a
+    correspondência dos planos afetados: os próprios planos recebidos e os que
+    compartilham a chave antiga ou nova de algum roteiro recebido. Cada plano
+    fica com o primeiro roteiro da chave, na ordenação padrão de RoteiroPreventiva
+    (mesma regra de relacionar_planos_roteiros()).
+
+    Args:
+        planos: Instâncias gravadas de PlanoPreventiva que foram importadas/alteradas
+        roteiros: Instâncias gravadas de RoteiroPreventiva que foram importadas/alteradas
+
+    Returns:
+        Quantidade de planos cuja correspondência foi recalculada
+    """
+    from app.models import PlanoPreventiva, RoteiroPreventiva, RelacionamentoPlanoRoteiro
+
+    chaves_afetadas = set()
+    planos_alterados = []
+    for plano in planos:
+        nova_chave = chave_relacionamento_hash(chave_relacionamento_plano(plano))
+        if nova_chave != plano.chave_relacionamento:
+            plano.chave_relacionamento = nova_chave
+            planos_alterados.append(plano)
+
+    roteiros_alterados = []
+    for roteiro in roteiros:
+        nova_chave = chave_relacionamento_hash(chave_relacionamento_roteiro(roteiro))
+        chaves_afetadas.add(roteiro.chave_relacionamento)
+        # Roteiro gravado por save(): a chave já foi recalculada e a anterior fica neste atributo
+        chaves_afetadas.add(getattr(roteiro, 'chave_relacionamento_anterior', ''))
+        chaves_afetadas.add(nova_chave)
+        if nova_chave != roteiro.chave_relacionamento:
+            roteiro.chave_relacionamento = nova_chave
+            roteiros_alterados.append(roteiro)
+    chaves_afetadas.discard('')
+
+    with transaction.atomic():
+        for bloco in _em_blocos(planos_alterados, BULK_BATCH_SIZE):
+            PlanoPreventiva.objects.bulk_update(bloco, ['chave_relacionamento'])
+        for bloco in _em_blocos(roteiros_alterados, BULK_BATCH_SIZE):
+            RoteiroPreventiva.objects.bulk_update(bloco, ['chave_relacionamento'])
+        if planos_alterados:
+            agendar_invalidacao_cache(PlanoPreventiva)
+        if roteiros_alterados:
+            agendar_invalidacao_cache(RoteiroPreventiva)
+
+        # Planos cuja correspondência precisa ser refeita
+        planos_afetados = {plano.pk: plano.chave_relacionamento for plano in planos if plano.pk}
+        for bloco in _em_blocos(chaves_afetadas):
+            planos_afetados.update(
+                PlanoPreventiva.objects.filter(chave_relacionamento__in=bloco)
+                .values_list('id', 'chave_relacionamento')
+            )
+        if not planos_afetados:
+            return 0
+
+        # Primeiro roteiro de cada chave
+        roteiro_por_chave = {}
+        chaves = {chave for chave in planos_afetados.values() if chave}
+        ordenacao = list(RoteiroPreventiva._meta.ordering) + ['id']
+        for bloco in _em_blocos(chaves):
+            for roteiro_id, chave in (
+                RoteiroPreventiva.objects.filter(chave_relacionamento__in=bloco)
+                .order_by(*ordenacao)
+                .values_list('id', 'chave_relacionamento')
+            ):
+                roteiro_por_chave.setdefault(chave, roteiro_id)
+
+        for bloco in _em_blocos(planos_afetados):
+            RelacionamentoPlanoRoteiro.objects.filter(plano_id__in=bloco).delete()
+        RelacionamentoPlanoRoteiro.objects.bulk_create(
+            [
+                RelacionamentoPlanoRoteiro(plano_id=plano_id, roteiro_id=roteiro_por_chave[chave], chave=chave)
+                for plano_id, chave in planos_afetados.items()
+                if chave in roteiro_por_chave
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        agendar_invalidacao_cache(RelacionamentoPlanoRoteiro)
+
+    return len(planos_afetados)
+
+
+# Campos (código, nome) do executor usados para ligar ordens e fichas aos manutentores
+CAMPOS_EXECUTOR_MANUTENTOR = {
+    'ordem': ('cd_func_exec', 'nm_func_exec'),
+    'ficha': ('cd_func_exec_os', 'nm_func_exec_os'),
+}
+
+
+def normalizar_nome_executor(valor) -> str:
+    """Nome em maiúsculas, sem acentos e com espaços simples (para comparar executores e manutentores)"""
+    if not valor:
+        return ''
+    sem_acentos = unicodedata.normalize('NFKD', str(valor)).encode('ASCII', 'ignore').decode('ASCII')
+    return ' '.join(sem_acentos.upper().split())
+
+
+def normalizar_codigo_executor(valor) -> str:
+    """Código do executor/matrícula sem espaços, sem zeros à esquerda e sem o '.0' de células numéricas"""
+    codigo = _safe_str(valor)
+    if codigo.endswith('.0') and codigo[:-2].isdigit():
+        codigo = codigo[:-2]
+    return codigo.lstrip('0') or codigo
+
+
+class IndiceManutentores:
+    """
+    Resolução do executor de uma ordem ou ficha para a matrícula do Manutentor: primeiro
+    pelo código (matrícula), depois pelo nome normalizado.
+
+    Carregado com uma única consulta. Um nome usado por mais de um manutentor não é
+    resolvido (o executor fica sem vínculo em vez de ser atribuído a um deles).
+    """
+
+    def __init__(self):
+        from app.models import Manutentor
+
+        self.por_codigo = {}
+        self.por_nome = {}
+        nomes_repetidos = set()
+        for matricula, nome in Manutentor.objects.values_list('Matricula', 'Nome'):
+            codigo = normalizar_codigo_executor(matricula)
+            if codigo:
+                self.por_codigo.setdefault(codigo, matricula)
+            nome = normalizar_nome_executor(nome)
+            if nome:
+                if self.por_nome.setdefault(nome, matricula) != matricula:
+                    nomes_repetidos.add(nome)
+        for nome in nomes_repetidos:
+            del self.por_nome[nome]
+
+    def resolver(self, codigo, nome):
+        """Tupla (matrícula, 'codigo' ou 'nome'); (None, None) se não corresponde a nenhum manutentor"""
+        codigo = normalizar_codigo_executor(codigo)
+        if codigo and codigo in self.por_codigo:
+            return self.por_codigo[codigo], 'codigo'
+        nome = normalizar_nome_executor(nome)
+        if nome and nome in self.por_nome:
+            return self.por_nome[nome], 'nome'
+        return None, None
+
+
+def _execucoes_manutentores(indice, tipo, registros):
+    """Gera ExecucaoManutentor para tuplas (id, código, nome) de ordens ou fichas ('ordem'/'ficha')"""
+    from app.models import ExecucaoManutentor
+
+    campo_codigo, campo_nome = CAMPOS_EXECUTOR_MANUTENTOR[tipo]
+    for registro_id, codigo, nome in registros:
+        matricula, origem = indice.resolver(codigo, nome)
+        if matricula is not None:
+            yield ExecucaoManutentor(**{
+                'manutentor_id': matricula,
+                f'{tipo}_id': registro_id,
+                'campo': campo_codigo if origem == 'codigo' else campo_nome,
+            })
+
+
+def vincular_execucoes_manutentores(ordens=(), fichas=(), indice=None) -> int:
+    """
+    Atualiza a tabela ExecucaoManutentor apenas para as ordens e fichas informadas.
+
+    Args:
+        ordens: Instâncias gravadas de OrdemServicoCorretiva
+        fichas: Instâncias gravadas de OrdemServicoCorretivaFicha
+        indice: IndiceManutentores já carregado (reaproveitado entre os lotes de uma importação)
+
+    Returns:
+        Quantidade de vínculos criados
+    """
+    from app.models import ExecucaoManutentor
+
+    if indice is None:
+        indice = IndiceManutentores()
+    criados = 0
+    with transaction.atomic():
+        for tipo, registros in (('ordem', ordens), ('ficha', fichas)):
+            campo_codigo, campo_nome = CAMPOS_EXECUTOR_MANUTENTOR[tipo]
+            valores = [
+                (registro.pk, getattr(registro, campo_codigo), getattr(registro, campo_nome))
+                for registro in registros if registro.pk
+            ]
+            if not valores:
+                continue
+            for bloco in _em_blocos(valor[0] for valor in valores):
+                ExecucaoManutentor.objects.filter(**{f'{tipo}_id__in': bloco}).delete()
+            execucoes = list(_execucoes_manutentores(indice, tipo, valores))
+            ExecucaoManutentor.objects.bulk_create(execucoes, batch_size=BULK_BATCH_SIZE)
+            criados += len(execucoes)
+        agendar_invalidacao_cache(ExecucaoManutentor)
+    return criados
+
+
+def reconstruir_execucoes_manutentores() -> int:
+    """
+    Reconstrói toda a tabela ExecucaoManutentor (após importar ou alterar manutentores).
+
+    Ordens e fichas são lidas em blocos, apenas com o id e os campos do executor.
+
+    Returns:
+        Quantidade de vínculos criados
+    """
+    from app.models import ExecucaoManutentor, OrdemServicoCorretiva, OrdemServicoCorretivaFicha
+
+    indice = IndiceManutentores()
+    modelos = (('ordem', OrdemServicoCorretiva), ('ficha', OrdemServicoCorretivaFicha))
+    criados = 0
+    with transaction.atomic():
+        ExecucaoManutentor.objects.all().delete()
+        if indice.por_codigo or indice.por_nome:
+            for tipo, model in modelos:
+                registros = model.objects.order_by().values_list(
+                    'id', *CAMPOS_EXECUTOR_MANUTENTOR[tipo],
+                ).iterator(chunk_size=BULK_BATCH_SIZE * 4)
+                execucoes = _execucoes_manutentores(indice, tipo, registros)
+                while True:
+                    bloco = list(itertools.islice(execucoes, BULK_BATCH_SIZE))
+                    if not bloco:
+                        break
+                    ExecucaoManutentor.objects.bulk_create(bloco)
+                    criados += len(bloco)
+        agendar_invalidacao_cache(ExecucaoManutentor)
+    return criados
+
+
+def agregar_por_dia(queryset, campo_data, data_inicio, data_fim, **agregacoes) -> Dict:
+    """
+    Agrupa um queryset por dia em uma única consulta (GROUP BY data).
+
+    Args:
+        queryset: QuerySet base (já com os filtros desejados)
+        campo_data: Nome do campo de data (DateField ou DateTimeField)
+        data_inicio: Primeiro dia (date, inclusive)
+        data_fim: Último dia (date, inclusive)
+        **agregacoes: Agregações extras por dia, ex.: valor=Sum(Abs('vlr_movto_estoq'))
+
+    Returns:
+        Dicionário {date: {'total': quantidade de registros, <agregações>...}}
+        apenas para os dias com registros. Campos DateTimeField são agrupados
+        pelo dia no fuso horário atual.
+    """
+    from django.db.models import Count, DateTimeField
+    from django.db.models.functions import TruncDate
+    from app.models import intervalo_datas_ordem
+
+    campo = queryset.model._meta.get_field(campo_data)
+    if isinstance(campo, DateTimeField):
+        inicio, fim = intervalo_datas_ordem(data_inicio, data_fim)
+        queryset = queryset.filter(**{f'{campo_data}__gte': inicio, f'{campo_data}__lt': fim})
+        queryset = queryset.annotate(dia_agrupado=TruncDate(campo_data))
+    else:
+        queryset = queryset.filter(**{f'{campo_data}__gte': data_inicio, f'{campo_data}__lte': data_fim})
+        queryset = queryset.annotate(dia_agrupado=F(campo_data))
+
+    linhas = (
+        queryset.order_by()
+        .values('dia_agrupado')
+        .annotate(total=Count('pk'), **agregacoes)
+    )
+    return {linha.pop('dia_agrupado'): linha for linha in linhas}
+
+
+def _blocos_de_dias(dias):
+    """
+    Divide um conjunto de dias em blocos para filtros __in.
+
+    Retorna [None] quando dias é None (todos os dias) e, caso contrário,
+    tuplas (lista_de_datas, inclui_dia_vazio).
+    """
+    if dias is None:
+        return [None]
+    dias = set(dias)
+    inclui_vazio = None in dias
+    datas = sorted(dia for dia in dias if dia is not None)
+    blocos = [(bloco, False) for bloco in _em_blocos(datas)]
+    if inclui_vazio:
+        blocos.append(([], True))
+    return blocos
+
+
+def _filtro_dias(campo, bloco):
+    """Monta o filtro Q de um bloco retornado por _blocos_de_dias() (None = sem filtro)"""
+    if bloco is None:
+        return Q()
+    datas, inclui_vazio = bloco
+    if inclui_vazio:
+        return Q(**{f'{campo}__isnull': True})
+    return Q(**{f'{campo}__in': datas})
+
+
+def _filtro_dias_datetime(campo, bloco):
+    """
+    Filtro Q de um bloco de _blocos_de_dias() em um campo datetime: um intervalo
+    [início, fim) por sequência de dias consecutivos, que usa o índice do campo
+    (o lookup __date converte cada linha e percorre a tabela inteira)
+    """
+    from datetime import timedelta
+    from app.models import intervalo_datas_ordem
+
+    if bloco is None:
+        return Q()
+    datas, inclui_vazio = bloco
+    if inclui_vazio:
+        return Q(**{f'{campo}__isnull': True})
+    sequencias = []
+    for data in datas:
+        if sequencias and data == sequencias[-1][1] + timedelta(days=1):
+            sequencias[-1][1] = data
+        else:
+            sequencias.append([data, data])
+    filtro = Q()
+    for primeiro_dia, ultimo_dia in sequencias:
+        inicio, fim = intervalo_datas_ordem(primeiro_dia, ultimo_dia)
+        filtro |= Q(**{f'{campo}__gte': inicio, f'{campo}__lt': fim})
+    return filtro
+
+
+def dia_local(valor):
+    """Dia (date) no fuso horário atual de um datetime com fuso, ou None"""
+    if valor is None:
+        return None
+    return timezone.localtime(valor).date()
+
+
+def horas_parada_por_dia(inicio, fim) -> Dict:
+    """
+    Divide um intervalo de parada [inicio, fim) em horas por dia local.
+
+    Returns:
+        Dicionário {date: horas}; vazio quando o fim é anterior ou igual ao início
+    """
+    from datetime import datetime, time, timedelta
+
+    horas = {}
+    if inicio is None or fim is None:
+        return horas
+    atual = timezone.localtime(inicio)
+    fim = timezone.localtime(fim)
+    while atual < fim:
+        proximo_dia = timezone.make_aware(datetime.combine(atual.date() + timedelta(days=1), time.min))
+        corte = min(proximo_dia, fim)
+        horas[atual.date()] = horas.get(atual.date(), 0) + (corte - atual).total_seconds() / 3600
+        atual = corte
+    return horas
+
+
+def dias_resumo_ordem(ordem) -> set:
+    """
+    Dias dos resumos diários afetados por uma ordem: o dia local de cada evento
+    (None quando a data está vazia) e os dias cobertos pela parada.
+    """
+    from app.models import EVENTOS_RESUMO_ORDEM
+
+    dias = {dia_local(getattr(ordem, campo)) for _, _, campo in EVENTOS_RESUMO_ORDEM}
+    if ordem.dt_iniparmanu_dt is not None:
+        dias.add(dia_local(ordem.dt_iniparmanu_dt))
+        dias.update(horas_parada_por_dia(ordem.dt_iniparmanu_dt, ordem.dt_fimparmanu_dt))
+    return dias
+
+
+def atualizar_resumo_requisicoes(dias=None) -> int:
+    """
+    Recalcula ResumoDiarioRequisicao para os dias informados.
+
+    Args:
+        dias: Iterável de date (None dentro dele = requisições sem data). None recalcula tudo.
+
+    Returns:
+        Quantidade de linhas de resumo gravadas
+    """
+    from django.db.models import Count, Sum
+    from django.db.models.functions import Abs
+    from app.models import RequisicaoAlmoxarifado, ResumoDiarioRequisicao
+
+    gravadas = 0
+    with transaction.atomic():
+        for bloco in _blocos_de_dias(dias):
+            ResumoDiarioRequisicao.objects.filter(_filtro_dias('dia', bloco)).delete()
+            linhas = (
+                RequisicaoAlmoxarifado.objects.filter(_filtro_dias('data_requisicao', bloco))
+                .order_by()
+                .values('data_requisicao', 'cd_centro_ativ', 'cd_item')
+                .annotate(
+                    total=Count('pk'),
+                    valor=Sum('vlr_movto_estoq'),
+                    valor_absoluto=Sum(Abs('vlr_movto_estoq')),
+                    quantidade_absoluta=Sum(Abs('qtde_movto_estoq')),
+                )
+            )
+            resumos = [
+                ResumoDiarioRequisicao(
+                    dia=linha['data_requisicao'],
+                    cd_centro_ativ=linha['cd_centro_ativ'],
+                    cd_item=linha['cd_item'],
+                    total=linha['total'],
+                    valor=linha['valor'] or 0,
+                    valor_absoluto=linha['valor_absoluto'] or 0,
+                    quantidade_absoluta=linha['quantidade_absoluta'] or 0,
+                )
+                for linha in linhas
+            ]
+            ResumoDiarioRequisicao.objects.bulk_create(resumos, batch_size=BULK_BATCH_SIZE)
+            gravadas += len(resumos)
+        agendar_invalidacao_cache(ResumoDiarioRequisicao)
+    return gravadas
+
+
+def atualizar_resumo_ordens(dias=None) -> int:
+    """
+    Recalcula ResumoDiarioOrdem (todos os eventos) e ResumoDiarioParada para os dias informados.
+
+    Args:
+        dias: Iterável de date (None dentro dele = ordens sem data no evento). None recalcula tudo.
+
+    Returns:
+        Quantidade de linhas de resumo gravadas
+    """
+    from django.db.models import Count
+    from django.db.models.functions import TruncDate
+    from app.models import (
+        OrdemServicoCorretiva, ResumoDiarioOrdem, ResumoDiarioParada,
+        EVENTOS_RESUMO_ORDEM, intervalo_datas_ordem,
+    )
+
+    gravadas = 0
+    with transaction.atomic():
+        for evento, _, campo in EVENTOS_RESUMO_ORDEM:
+            for bloco in _blocos_de_dias(dias):
+                ResumoDiarioOrdem.objects.filter(Q(evento=evento) & _filtro_dias('dia', bloco)).delete()
+                linhas = (
+                    OrdemServicoCorretiva.objects.filter(_filtro_dias_datetime(campo, bloco))
+                    .order_by()
+                    .annotate(dia_resumo=TruncDate(campo))
+                    .values('dia_resumo', 'descr_setormanut', 'descr_tpordservtv', 'cd_maquina')
+                    .annotate(total=Count('pk'))
+                )
+                resumos = [
+                    ResumoDiarioOrdem(
+                        evento=evento,
+                        dia=linha['dia_resumo'],
+                        descr_setormanut=linha['descr_setormanut'],
+                        descr_tpordservtv=linha['descr_tpordservtv'],
+                        cd_maquina=linha['cd_maquina'],
+                        total=linha['total'],
+                    )
+                    for linha in linhas
+                ]
+                ResumoDiarioOrdem.objects.bulk_create(resumos, batch_size=BULK_BATCH_SIZE)
+                gravadas += len(resumos)
+
+        agendar_invalidacao_cache(ResumoDiarioOrdem)
+        agendar_invalidacao_cache(ResumoDiarioParada)
+
+        # Paradas: uma parada pode cobrir vários dias, então o filtro é pelo intervalo
+        ordens_parada = OrdemServicoCorretiva.objects.filter(dt_iniparmanu_dt__isnull=False)
+        dias_parada = None
+        if dias is not None:
+            dias_parada = {dia for dia in dias if dia is not None}
+            if not dias_parada:
+                return gravadas
+            inicio, fim = intervalo_datas_ordem(min(dias_parada), max(dias_parada))
+            ordens_parada = ordens_parada.filter(
+                Q(dt_iniparmanu_dt__lt=fim)
+                & (Q(dt_iniparmanu_dt__gte=inicio) | Q(dt_fimparmanu_dt__gt=inicio))
+            )
+            for bloco in _em_blocos(dias_parada):
+                ResumoDiarioParada.objects.filter(dia__in=bloco).delete()
+        else:
+            ResumoDiarioParada.objects.all().delete()
+
+        paradas = {}
+        for cd_maquina, inicio_parada, fim_parada in ordens_parada.values_list(
+            'cd_maquina', 'dt_iniparmanu_dt', 'dt_fimparmanu_dt'
+        ).order_by():
+            # Parada sem fim (ou com fim inválido) conta a ordem no dia de início, sem horas
+            horas_por_dia = horas_parada_por_dia(inicio_parada, fim_parada) or {dia_local(inicio_parada): 0}
+            for dia, horas in horas_por_dia.items():
+                if dias_parada is not None and dia not in dias_parada:
+                    continue
+                acumulado = paradas.setdefault((dia, cd_maquina), [0, 0])
+                acumulado[0] += horas
+                acumulado[1] += 1
+
+        resumos = [
+            ResumoDiarioParada(dia=dia, cd_maquina=cd_maquina, horas_parada=horas, total_ordens=total)
+            for (dia, cd_maquina), (horas, total) in paradas.items()
         ]
-        
-        for fmt in date_formats:
+        ResumoDiarioParada.objects.bulk_create(resumos, batch_size=BULK_BATCH_SIZE)
+        gravadas += len(resumos)
+    return gravadas
+
+
+# Resumos diários derivados de cada tabela (esvaziados quando a tabela inteira é excluída)
+RESUMOS_DIARIOS = {
+    'RequisicaoAlmoxarifado': ('ResumoDiarioRequisicao',),
+    'OrdemServicoCorretiva': ('ResumoDiarioOrdem', 'ResumoDiarioParada'),
+}
+
+_resumos_pendentes = threading.local()
+
+
+def dias_resumo_requisicao(requisicao) -> set:
+    """Dias dos resumos diários afetados por uma requisição (None quando está sem data)"""
+    return {requisicao.data_requisicao}
+
+
+def agendar_atualizacao_resumos(requisicoes=(), ordens=()):
+    """
+    Recalcula os resumos diários dos dias informados quando a transação atual for confirmada.
+
+    Usado pelos sinais nas gravações e exclusões registro a registro (admin, telas de
+    edição); as importações recalculam os resumos dos dias importados por conta própria.
+    Várias gravações na mesma transação geram um único recálculo por tabela de resumo
+    (mesmo controle de callback pendente de agendar_invalidacao_cache).
+
+    Args:
+        requisicoes: Dias afetados de RequisicaoAlmoxarifado
+        ordens: Dias afetados de OrdemServicoCorretiva
+    """
+    agendado = getattr(_resumos_pendentes, 'callback', None)
+    if agendado is not None and agendado() is not None:
+        _resumos_pendentes.requisicoes.update(requisicoes)
+        _resumos_pendentes.ordens.update(ordens)
+        return
+
+    dias_requisicoes = _resumos_pendentes.requisicoes = set(requisicoes)
+    dias_ordens = _resumos_pendentes.ordens = set(ordens)
+
+    def aplicar():
+        _resumos_pendentes.callback = None
+        if dias_requisicoes:
+            atualizar_resumo_requisicoes(dias_requisicoes)
+        if dias_ordens:
+            atualizar_resumo_ordens(dias_ordens)
+
+    _resumos_pendentes.callback = weakref.ref(aplicar)
+    transaction.on_commit(aplicar)
+
+
+# Campos de OrdemServicoCorretiva avaliados na análise de qualidade dos dados importados
+CAMPOS_QUALIDADE_ORDEM = (
+    'dt_entrada', 'dt_abertura_solicita', 'dt_encordmanu', 'dt_aberordser',
+    'dt_iniparmanu', 'dt_fimparmanu', 'dt_prev_exec',
+    'cd_ordemserv', 'cd_maquina', 'cd_unid',
+    'nome_unid', 'descr_setormanut', 'descr_maquina',
+    'nm_func_exec', 'nm_func_solic_os', 'descr_tpordservtv',
+    'descr_sitordsetv', 'descr_tpmanuttv', 'descr_clasorigos',
+)
+
+# Ordens lidas por consulta nas passagens da análise de qualidade (memória constante)
+QUALIDADE_BLOCO_ORDENS = 2000
+
+# Campo vazio é problema quando a maioria das ordens (acima dessa fração) tem o campo preenchido
+QUALIDADE_PREENCHIMENTO_MINIMO = 0.8
+
+# Formatos de data reconhecidos (o primeiro que casa com o início do valor; 'DD/MM/AAAA HH:MM' cai no primeiro)
+FORMATOS_DATA_QUALIDADE = (
+    ('DD/MM/AAAA', re.compile(r'\d{2}/\d{2}/\d{4}')),
+    ('DD-MM-AAAA', re.compile(r'\d{2}-\d{2}-\d{4}')),
+    ('AAAA-MM-DD', re.compile(r'\d{4}-\d{2}-\d{2}')),
+)
+
+# Caracteres fora de letras, números, espaços, pontuação comum de datas/códigos e acentos
+_CARACTERES_SUSPEITOS = re.compile(r'[^\w\s\-\/\.\:\(\)áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ]', re.IGNORECASE)
+
+
+def formato_data_qualidade(valor):
+    """Formato (nome em FORMATOS_DATA_QUALIDADE) de uma data em texto; None se não reconhecido"""
+    for formato, padrao in FORMATOS_DATA_QUALIDADE:
+        if padrao.match(valor):
+            return formato
+    return None
+
+
+def _iter_ordens_em_blocos(campos, tamanho=QUALIDADE_BLOCO_ORDENS):
+    """
+    Percorre OrdemServicoCorretiva em blocos pela chave primária (uma consulta por bloco),
+    gerando listas de tuplas (id, *campos). Seguro para gravar nas ordens entre os blocos.
+    """
+    from app.models import OrdemServicoCorretiva
+
+    ultimo_id = 0
+    while True:
+        bloco = list(
+            OrdemServicoCorretiva.objects.filter(id__gt=ultimo_id).order_by('id')
+            .values_list('id', *campos)[:tamanho]
+        )
+        if not bloco:
+            return
+        yield bloco
+        ultimo_id = bloco[-1][0]
+
+
+def perfil_campos_ordens(campos=CAMPOS_QUALIDADE_ORDEM) -> Dict:
+    """
+    Calcula, em uma passagem por blocos, o perfil de cada campo das ordens: taxa de
+    preenchimento, histograma dos formatos de data e comprimento mínimo/médio/máximo.
+
+    Returns:
+        Dicionário {'total': N, 'campos': {campo: {...}}}
+    """
+    estatisticas = {
+        campo: {'preenchidos': 0, 'formatos_data': defaultdict(int), 'soma_comprimentos': 0,
+                'comprimento_min': None, 'comprimento_max': None}
+        for campo in campos
+    }
+    campos_data = {campo for campo in campos if 'dt_' in campo}
+    total = 0
+    for bloco in _iter_ordens_em_blocos(campos):
+        total += len(bloco)
+        for linha in bloco:
+            for campo, valor in zip(campos, linha[1:]):
+                if valor is None:
+                    continue
+                if isinstance(valor, str):
+                    valor = valor.strip()
+                    if not valor:
+                        continue
+                    if campo in campos_data:
+                        formato = formato_data_qualidade(valor)
+                        if formato:
+                            estatisticas[campo]['formatos_data'][formato] += 1
+                else:
+                    valor = str(valor)
+                stats = estatisticas[campo]
+                comprimento = len(valor)
+                stats['preenchidos'] += 1
+                stats['soma_comprimentos'] += comprimento
+                if stats['comprimento_min'] is None or comprimento < stats['comprimento_min']:
+                    stats['comprimento_min'] = comprimento
+                if stats['comprimento_max'] is None or comprimento > stats['comprimento_max']:
+                    stats['comprimento_max'] = comprimento
+
+    perfil = {}
+    for campo, stats in estatisticas.items():
+        formatos = dict(stats['formatos_data'])
+        perfil[campo] = {
+            'preenchidos': stats['preenchidos'],
+            'preenchimento': stats['preenchidos'] / total if total else 0,
+            'formatos_data': formatos,
+            'formato_data': max(formatos.items(), key=lambda item: item[1])[0] if formatos else None,
+            'comprimento_min': stats['comprimento_min'] or 0,
+            'comprimento_max': stats['comprimento_max'] or 0,
+            'comprimento_medio': stats['soma_comprimentos'] / stats['preenchidos'] if stats['preenchidos'] else 0,
+        }
+    return {'total': total, 'campos': perfil}
+
+
+def _problemas_campo_ordem(campo, valor, perfil_campo) -> List[str]:
+    """Problemas de um campo de ordem comparado ao perfil (padrão da maioria) do campo"""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        # Campo vazio - problema se a maioria tem valores
+        if perfil_campo['preenchimento'] > QUALIDADE_PREENCHIMENTO_MINIMO:
+            return ['Campo vazio quando deveria ter valor']
+        return []
+
+    problemas = []
+    valor_str = str(valor).strip()
+
+    # Formato de data diferente do mais comum no campo
+    if ('dt_' in campo or 'data' in campo) and perfil_campo['formato_data']:
+        if formato_data_qualidade(valor_str) != perfil_campo['formato_data']:
+            problemas.append('Formato de data inconsistente')
+
+    # Comprimento muito fora do range normal (campos texto)
+    if isinstance(valor, str) and perfil_campo['comprimento_medio'] > 0:
+        comprimento_atual = len(valor_str)
+        comprimento_min = perfil_campo['comprimento_min']
+        comprimento_max = perfil_campo['comprimento_max']
+        comprimento_medio = perfil_campo['comprimento_medio']
+        if comprimento_max > comprimento_min:  # Se há variação
+            range_normal = comprimento_max - comprimento_min
+            if (comprimento_atual < comprimento_min - range_normal * 0.5
+                    or comprimento_atual > comprimento_max + range_normal * 0.5):
+                problemas.append('Comprimento anormal')
+        elif abs(comprimento_atual - comprimento_medio) > comprimento_medio * 2:
+            problemas.append('Comprimento anormal')
+
+    # Caracteres especiais suspeitos (acentos comuns são permitidos)
+    if _CARACTERES_SUSPEITOS.search(valor_str):
+        problemas.append('Caracteres especiais suspeitos')
+
+    # Campos de código devem ser numéricos
+    if 'cd_' in campo and campo != 'cd_setormanut':
+        try:
+            float(valor_str)
+        except (ValueError, TypeError):
+            problemas.append('Valor não numérico em campo numérico')
+
+    return problemas
+
+
+def _data_texto_ordem(valor):
+    """Data (sem hora) de um campo texto de ordem, nos formatos dd/mm/aaaa, dd-mm-aaaa ou aaaa-mm-dd"""
+    from datetime import datetime
+    data_str = valor.split()[0]
+    for formato in ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(data_str, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def problemas_qualidade_ordem(valores, perfil) -> List[str]:
+    """
+    Problemas de qualidade de uma ordem em relação ao perfil dos campos (perfil_campos_ordens).
+
+    Args:
+        valores: Dicionário {campo: valor} com os campos de CAMPOS_QUALIDADE_ORDEM
+        perfil: Dicionário {campo: perfil do campo} (chave 'campos' de perfil_campos_ordens)
+
+    Returns:
+        Lista de descrições no formato 'campo: problema'
+    """
+    problemas = []
+    for campo, perfil_campo in perfil.items():
+        problemas.extend(
+            f'{campo}: {problema}' for problema in _problemas_campo_ordem(campo, valores.get(campo), perfil_campo)
+        )
+
+    # Data de abertura antes da data de entrada
+    dt_abertura_solicita = valores.get('dt_abertura_solicita')
+    dt_entrada = valores.get('dt_entrada')
+    if dt_abertura_solicita and dt_entrada and dt_abertura_solicita.strip() and dt_entrada.strip():
+        data_abertura = _data_texto_ordem(dt_abertura_solicita)
+        data_entrada = _data_texto_ordem(dt_entrada)
+        if data_abertura and data_entrada and data_abertura < data_entrada:
+            problemas.append('Data abertura anterior à data entrada')
+
+    if not valores.get('cd_ordemserv'):
+        problemas.append('cd_ordemserv ausente')
+
+    # Campos críticos que geralmente devem estar preenchidos
+    if not dt_abertura_solicita or not dt_abertura_solicita.strip():
+        problemas.append('dt_abertura_solicita: Campo crítico vazio')
+    descr_tpordservtv = valores.get('descr_tpordservtv')
+    if not descr_tpordservtv or not descr_tpordservtv.strip():
+        problemas.append('descr_tpordservtv: Campo importante vazio')
+
+    return problemas
+
+
+def perfil_qualidade_gravado():
+    """Perfil dos campos gravado por atualizar_qualidade_ordens ({campo: perfil}), ou None se ainda não calculado"""
+    from app.models import PerfilQualidadeOrdens
+
+    registro = PerfilQualidadeOrdens.objects.order_by('pk').only('campos').first()
+    return registro.campos if registro is not None else None
+
+
+def avaliar_qualidade_ordens(ordens, perfil) -> int:
+    """
+    Grava os problemas de qualidade das ordens informadas em relação a um perfil já
+    calculado (perfil_qualidade_gravado), sem percorrer as demais ordens.
+
+    Usado na importação para as ordens de cada lote gravado; o perfil de todas as ordens
+    só é recalculado por atualizar_qualidade_ordens.
+
+    Returns:
+        Quantidade de ordens cujos problemas mudaram
+    """
+    from app.models import OrdemServicoCorretiva
+
+    atualizar = []
+    for ordem in ordens:
+        valores = {campo: getattr(ordem, campo) for campo in CAMPOS_QUALIDADE_ORDEM}
+        problemas = problemas_qualidade_ordem(valores, perfil)
+        if problemas != ordem.problemas_qualidade:
+            ordem.problemas_qualidade = problemas
+            ordem.total_problemas_qualidade = len(problemas)
+            atualizar.append(ordem)
+    if atualizar:
+        OrdemServicoCorretiva.objects.bulk_update(
+            atualizar, ['problemas_qualidade', 'total_problemas_qualidade'], batch_size=BULK_BATCH_SIZE,
+        )
+        agendar_invalidacao_cache(OrdemServicoCorretiva)
+    return len(atualizar)
+
+
+def atualizar_qualidade_ordens() -> Tuple[int, int]:
+    """
+    Recalcula o perfil dos campos das ordens (PerfilQualidadeOrdens) e os problemas de
+    qualidade de cada ordem (problemas_qualidade/total_problemas_qualidade).
+
+    São duas passagens por blocos (perfil e avaliação), com memória constante; apenas
+    as ordens cujos problemas mudaram são gravadas. Percorre a tabela inteira: roda pelo
+    comando atualizar_qualidade_ordens ou no worker das importações
+    (importacoes.enfileirar_analise_qualidade_ordens), nunca durante uma requisição.
+
+    Returns:
+        Tupla (total de ordens, ordens com problemas)
+    """
+    from app.models import OrdemServicoCorretiva, PerfilQualidadeOrdens
+
+    perfil = perfil_campos_ordens()
+    campos = CAMPOS_QUALIDADE_ORDEM
+    total_com_problemas = 0
+    alteradas = 0
+    with transaction.atomic():
+        for bloco in _iter_ordens_em_blocos(('problemas_qualidade',) + campos):
+            atualizar = []
+            for linha in bloco:
+                problemas = problemas_qualidade_ordem(dict(zip(campos, linha[2:])), perfil['campos'])
+                if problemas:
+                    total_com_problemas += 1
+                if problemas != linha[1]:
+                    atualizar.append(OrdemServicoCorretiva(
+                        id=linha[0], problemas_qualidade=problemas, total_problemas_qualidade=len(problemas),
+                    ))
+            if atualizar:
+                OrdemServicoCorretiva.objects.bulk_update(
+                    atualizar, ['problemas_qualidade', 'total_problemas_qualidade'], batch_size=BULK_BATCH_SIZE,
+                )
+                alteradas += len(atualizar)
+
+        registro = PerfilQualidadeOrdens.objects.order_by('pk').first() or PerfilQualidadeOrdens()
+        registro.total_ordens = perfil['total']
+        registro.total_com_problemas = total_com_problemas
+        registro.campos = perfil['campos']
+        registro.save()
+        PerfilQualidadeOrdens.objects.exclude(pk=registro.pk).delete()
+        if alteradas:
+            agendar_invalidacao_cache(OrdemServicoCorretiva)
+        agendar_invalidacao_cache(PerfilQualidadeOrdens)
+    return perfil['total'], total_com_problemas
+
+
+# ==================== INDICADORES DE PARADA (MTTR / MTBF) ====================
+
+# Janela dos indicadores de parada quando nenhum período é informado (dias até hoje)
+JANELA_PADRAO_PARADA_DIAS = 90
+
+
+def janela_indicadores_parada(data_inicio=None, data_fim=None, dias=JANELA_PADRAO_PARADA_DIAS) -> Tuple:
+    """
+    Janela [início, fim) dos indicadores de parada a partir de datas (inclusive) ou textos
+    AAAA-MM-DD; sem datas, os últimos `dias` dias até hoje. O fim nunca passa do momento atual.
+
+    Returns:
+        Tupla (inicio, fim, data_inicio, data_fim) - inicio/fim em datetime com fuso
+    """
+    from datetime import datetime, timedelta
+    from app.models import intervalo_datas_ordem
+
+    def _data(valor):
+        if isinstance(valor, str):
             try:
-                return datetime.strptime(value_str, fmt).date()
+                return datetime.strptime(valor.strip(), '%Y-%m-%d').date()
             except ValueError:
-                continue
-        
-        # Tentar parse com dateutil se disponÃ­vel (mais flexÃ­vel)
-        try:
-            from dateutil import parser
-            return parser.parse(value_str, dayfirst=True).date()
-        except (ImportError, ValueError, TypeError):
-            pass
-        
-        return None
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo Excel
-        if file_name.endswith(('.xlsx', '.xls', '.xlsm')):
-            data = read_excel_file(file)
-            print(f"DEBUG: Arquivo lido com sucesso. Total de linhas: {len(data)}")
-            if data:
-                print(f"DEBUG: Primeira linha de dados: {data[0]}")
+                return None
+        return valor
+
+    data_fim = _data(data_fim) or timezone.localdate()
+    data_inicio = _data(data_inicio) or data_fim - timedelta(days=dias - 1)
+    if data_inicio > data_fim:
+        data_inicio, data_fim = data_fim, data_inicio
+    inicio, fim = intervalo_datas_ordem(data_inicio, data_fim)
+    fim = max(min(fim, timezone.now()), inicio)
+    return inicio, fim, data_inicio, data_fim
+
+
+def intervalos_parada(inicio, fim, cd_maquinas=None) -> Dict:
+    """
+    Intervalos de parada de cada máquina dentro da janela [inicio, fim).
+
+    As paradas vêm das colunas tipadas dt_iniparmanu_dt/dt_fimparmanu_dt (ordens sem fim ou
+    com fim anterior ao início são ignoradas), são recortadas à janela e as sobrepostas
+    (várias ordens para a mesma parada) são unidas em uma única parada.
+
+    Returns:
+        Dicionário {cd_maquina: [[inicio, fim], ...]} em segundos (timestamp), em ordem
+    """
+    from app.models import OrdemServicoCorretiva
+
+    ordens = OrdemServicoCorretiva.objects.filter(
+        cd_maquina__isnull=False,
+        dt_iniparmanu_dt__lt=fim,
+        dt_fimparmanu_dt__gt=inicio,
+    ).filter(dt_fimparmanu_dt__gt=F('dt_iniparmanu_dt'))
+    if cd_maquinas is not None:
+        ordens = ordens.filter(cd_maquina__in=list(cd_maquinas))
+
+    janela_inicio = inicio.timestamp()
+    janela_fim = fim.timestamp()
+    intervalos = {}
+    for cd_maquina, inicio_parada, fim_parada in ordens.order_by('cd_maquina', 'dt_iniparmanu_dt').values_list(
+        'cd_maquina', 'dt_iniparmanu_dt', 'dt_fimparmanu_dt',
+    ):
+        # Ordenadas pelo início: basta comparar com a última parada unida da máquina
+        inicio_parada = max(inicio_parada.timestamp(), janela_inicio)
+        fim_parada = min(fim_parada.timestamp(), janela_fim)
+        unidas = intervalos.setdefault(cd_maquina, [])
+        if unidas and inicio_parada <= unidas[-1][1]:
+            unidas[-1][1] = max(unidas[-1][1], fim_parada)
         else:
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .xlsx, .xls ou .xlsm")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_idx, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 porque linha 1 Ã© cabeÃ§alho
-                try:
-                    # Verificar se a linha estÃ¡ vazia
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Normalizar nomes de colunas (case-insensitive)
-                    semana_value = None
-                    inicio_value = None
-                    fim_value = None
-                    
-                    for key, value in row_data.items():
-                        key_lower = str(key).lower().strip()
-                        if 'semana' in key_lower:
-                            semana_value = value
-                        elif 'inicio' in key_lower or 'inÃ­cio' in key_lower:
-                            inicio_value = value
-                        elif 'fim' in key_lower:
-                            fim_value = value
-                    
-                    # Debug: mostrar o que foi encontrado
-                    if row_idx == 2:  # Apenas para primeira linha de dados
-                        print(f"DEBUG Linha {row_idx}: semana_value={semana_value}, inicio_value={inicio_value}, fim_value={fim_value}")
-                        print(f"DEBUG Linha {row_idx}: row_data keys={list(row_data.keys())}")
-                    
-                    if not semana_value:
-                        errors.append(f"Linha {row_idx}: Campo 'semana' estÃ¡ vazio. Colunas encontradas: {', '.join(str(k) for k in row_data.keys())}")
-                        continue
-                    
-                    # Limpar valores de semana
-                    semana_value = limpar_texto(semana_value)
-                    if not semana_value:
-                        errors.append(f"Linha {row_idx}: Campo 'semana' estÃ¡ vazio apÃ³s limpeza")
-                        continue
-                    
-                    # Converter datas usando funÃ§Ã£o melhorada
-                    inicio_date = None
-                    fim_date = None
-                    
-                    if inicio_value:
-                        try:
-                            inicio_date = parse_date_value(inicio_value)
-                            if not inicio_date:
-                                errors.append(f"Linha {row_idx}: Data de inÃ­cio invÃ¡lida ou formato nÃ£o reconhecido: {inicio_value}")
-                        except Exception as e:
-                            errors.append(f"Linha {row_idx}: Erro ao processar data de inÃ­cio '{inicio_value}': {str(e)}")
-                    
-                    if fim_value:
-                        try:
-                            fim_date = parse_date_value(fim_value)
-                            if not fim_date:
-                                errors.append(f"Linha {row_idx}: Data de fim invÃ¡lida ou formato nÃ£o reconhecido: {fim_value}")
-                        except Exception as e:
-                            errors.append(f"Linha {row_idx}: Erro ao processar data de fim '{fim_value}': {str(e)}")
-                    
-                    # Criar ou atualizar registro
-                    # Usar semana + inicio como chave Ãºnica composta para permitir mÃºltiplas semanas com mesmo nome em anos diferentes
-                    if update_existing:
-                        if inicio_date:
-                            # Se temos data de inÃ­cio, usar semana + inicio como chave Ãºnica
-                            semana_obj, created = Semana52.objects.update_or_create(
-                                semana=semana_value,
-                                inicio=inicio_date,
-                                defaults={
-                                    'fim': fim_date
-                                }
-                            )
-                            if created:
-                                created_count += 1
-                            else:
-                                updated_count += 1
-                        else:
-                            # Se nÃ£o temos data de inÃ­cio, verificar se existe registro com mesmo nome e sem data
-                            try:
-                                semana_obj = Semana52.objects.get(semana=semana_value, inicio__isnull=True)
-                                # Atualizar registro existente
-                                semana_obj.fim = fim_date
-                                semana_obj.save()
-                                updated_count += 1
-                            except Semana52.DoesNotExist:
-                                # Criar novo registro
-                                semana_obj = Semana52.objects.create(
-                                    semana=semana_value,
-                                    inicio=inicio_date,
-                                    fim=fim_date
-                                )
-                                created_count += 1
-                            except Semana52.MultipleObjectsReturned:
-                                # MÃºltiplos registros encontrados, atualizar o primeiro
-                                semana_obj = Semana52.objects.filter(semana=semana_value, inicio__isnull=True).first()
-                                if semana_obj:
-                                    semana_obj.fim = fim_date
-                                    semana_obj.save()
-                                    updated_count += 1
-                                else:
-                                    # Criar novo registro se nenhum foi encontrado
-                                    semana_obj = Semana52.objects.create(
-                                        semana=semana_value,
-                                        inicio=inicio_date,
-                                        fim=fim_date
-                                    )
-                                    created_count += 1
-                    else:
-                        if inicio_date:
-                            # Se temos data de inÃ­cio, usar semana + inicio como chave Ãºnica
-                            semana_obj, created = Semana52.objects.get_or_create(
-                                semana=semana_value,
-                                inicio=inicio_date,
-                                defaults={
-                                    'fim': fim_date
-                                }
-                            )
-                        else:
-                            # Se nÃ£o temos data de inÃ­cio, verificar se jÃ¡ existe semana com mesmo nome e sem data
-                            semana_obj, created = Semana52.objects.get_or_create(
-                                semana=semana_value,
-                                inicio__isnull=True,
-                                defaults={
-                                    'inicio': inicio_date,
-                                    'fim': fim_date
-                                }
-                            )
-                        if created:
-                            created_count += 1
-                        else:
-                            # Registro jÃ¡ existe, ignorar
-                            pass
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_idx}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_idx}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-        
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
+            unidas.append([inicio_parada, fim_parada])
+    return intervalos
 
 
-def upload_requisicoes_almoxarifado_from_file(file, data_requisicao, update_existing=False) -> Tuple[int, int, List[str]]:
+def _indicadores_grupo_parada(maquinas, paradas, segundos_parada, segundos_janela) -> Dict:
+    """MTTR e MTBF (horas) e disponibilidade (%) a partir dos totais de uma máquina ou grupo"""
+    segundos_disponiveis = segundos_janela * maquinas
+    segundos_operando = max(segundos_disponiveis - segundos_parada, 0)
+    return {
+        'maquinas': maquinas,
+        'paradas': paradas,
+        'horas_parada': round(segundos_parada / 3600, 2),
+        'mttr_horas': round(segundos_parada / paradas / 3600, 2) if paradas else None,
+        'mtbf_horas': round(segundos_operando / paradas / 3600, 2) if paradas else None,
+        'disponibilidade': round(segundos_operando / segundos_disponiveis * 100, 2) if segundos_disponiveis else None,
+    }
+
+
+def indicadores_parada(inicio, fim, cd_maquinas=None) -> Dict:
     """
-    Faz upload de requisiÃ§Ãµes de almoxarifado a partir de um arquivo CSV
-    
+    Indicadores de parada por máquina, setor de manutenção e Centro de Atividade na janela [inicio, fim).
+
+    Por máquina (com as paradas sobrepostas já unidas por intervalos_parada):
+    - MTTR = tempo parado / quantidade de paradas
+    - MTBF = (tempo da janela - tempo parado) / quantidade de paradas
+    - Disponibilidade = (tempo da janela - tempo parado) / tempo da janela
+
+    Um setor ou CA soma as máquinas cadastradas nele (e as máquinas com parada sem cadastro,
+    pelo setor da ordem): o tempo disponível do grupo é a janela vezes a quantidade de máquinas.
+
     Args:
-        file: Arquivo Django UploadedFile (CSV)
-        data_requisicao: Data da requisiÃ§Ã£o (datetime.date) - serÃ¡ associada a todos os itens
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
+        inicio: Início da janela (datetime com fuso, inclusive)
+        fim: Fim da janela (datetime com fuso, exclusivo)
+        cd_maquinas: Restringe às máquinas informadas (None: todas)
+
     Returns:
-        Tupla (created_count, updated_count, errors)
+        Dicionário com 'horas_janela', 'geral' e as listas 'maquinas', 'setores' e
+        'centros_atividade' (apenas os que tiveram parada, maior tempo parado primeiro)
     """
-    from app.models import RequisicaoAlmoxarifado
-    from datetime import datetime
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Validar data_requisicao
-    if not data_requisicao:
-        errors.append("Data da requisiÃ§Ã£o Ã© obrigatÃ³ria")
-        return 0, 0, errors
-    
-    # Converter data_requisicao para date se necessÃ¡rio
-    if isinstance(data_requisicao, str):
+    from app.models import Maquina, OrdemServicoCorretiva
+
+    segundos_janela = max((fim - inicio).total_seconds(), 0)
+    intervalos = intervalos_parada(inicio, fim, cd_maquinas)
+
+    # Cadastro das máquinas: descrição, setor e CA
+    maquinas = Maquina.objects.all()
+    if cd_maquinas is not None:
+        maquinas = maquinas.filter(cd_maquina__in=list(cd_maquinas))
+    cadastro = {
+        cd_maquina: (descr_maquina, cd_setormanut, descr_setormanut, ca, sigla)
+        for cd_maquina, descr_maquina, cd_setormanut, descr_setormanut, ca, sigla in maquinas.values_list(
+            'cd_maquina', 'descr_maquina', 'cd_setormanut', 'descr_setormanut',
+            'centro_atividade__ca', 'centro_atividade__sigla',
+        )
+    }
+    # Máquinas com parada que não estão no cadastro: dados da ordem
+    for bloco in _em_blocos(cd for cd in intervalos if cd not in cadastro):
+        for cd_maquina, descr_maquina, cd_setormanut, descr_setormanut in OrdemServicoCorretiva.objects.filter(
+            cd_maquina__in=bloco,
+        ).order_by('cd_maquina', '-id').values_list('cd_maquina', 'descr_maquina', 'cd_setormanut', 'descr_setormanut'):
+            cadastro.setdefault(cd_maquina, (descr_maquina, cd_setormanut, descr_setormanut, None, None))
+
+    # Totais por máquina, setor e CA: [máquinas, paradas, segundos parados]
+    por_maquina = []
+    setores = {}
+    centros = {}
+    for cd_maquina, (descr_maquina, cd_setormanut, descr_setormanut, ca, sigla) in cadastro.items():
+        unidas = intervalos.get(cd_maquina, ())
+        paradas = len(unidas)
+        segundos_parada = sum(fim_parada - inicio_parada for inicio_parada, fim_parada in unidas)
+        if paradas:
+            indicadores = _indicadores_grupo_parada(1, paradas, segundos_parada, segundos_janela)
+            indicadores.update({'cd_maquina': cd_maquina, 'descr_maquina': descr_maquina or '',
+                                'cd_setormanut': cd_setormanut or '', 'ca': ca})
+            por_maquina.append(indicadores)
+        for grupos, chave, descricao in (
+            (setores, cd_setormanut or '', descr_setormanut or cd_setormanut or 'Sem setor'),
+            (centros, ca, 'Sem CA' if ca is None else (f'{ca} - {sigla}' if sigla else str(ca))),
+        ):
+            totais = grupos.setdefault(chave, [descricao, 0, 0, 0])
+            totais[1] += 1
+            totais[2] += paradas
+            totais[3] += segundos_parada
+
+    def _grupos(grupos, campo_chave):
+        linhas = []
+        for chave, (descricao, qtd_maquinas, paradas, segundos_parada) in grupos.items():
+            if paradas:
+                indicadores = _indicadores_grupo_parada(qtd_maquinas, paradas, segundos_parada, segundos_janela)
+                indicadores.update({campo_chave: chave, 'descricao': descricao})
+                linhas.append(indicadores)
+        return sorted(linhas, key=lambda linha: linha['horas_parada'], reverse=True)
+
+    total_paradas = sum(linha['paradas'] for linha in por_maquina)
+    total_segundos = sum(totais[3] for totais in setores.values())
+    return {
+        'horas_janela': round(segundos_janela / 3600, 2),
+        'geral': _indicadores_grupo_parada(len(cadastro), total_paradas, total_segundos, segundos_janela),
+        'maquinas': sorted(por_maquina, key=lambda linha: linha['horas_parada'], reverse=True),
+        'setores': _grupos(setores, 'cd_setormanut'),
+        'centros_atividade': _grupos(centros, 'ca'),
+    }
+
+
+
+# ==================== AGENDAMENTOS DO CRONOGRAMA ====================
+
+def criar_agendamentos_cronograma(agendamentos) -> int:
+    """
+    Grava agendamentos de cronograma já validados com bulk_create, em lotes.
+
+    bulk_create não chama AgendamentoCronograma.save() nem envia post_save; por isso a
+    semana de cada agendamento é preenchida aqui pelo índice das semanas (ver
+    indice_semanas) e o cache dos dashboards é invalidado ao final.
+
+    Args:
+        agendamentos: Instâncias não salvas de AgendamentoCronograma
+
+    Returns:
+        Quantidade de agendamentos criados
+    """
+    from app.models import AgendamentoCronograma
+
+    indice = indice_semanas()
+    for agendamento in agendamentos:
+        agendamento.semana = indice.semana(agendamento.data_planejada)
+
+    with transaction.atomic():
+        criados = AgendamentoCronograma.objects.bulk_create(agendamentos, batch_size=BULK_BATCH_SIZE)
+        if criados:
+            agendar_invalidacao_cache(AgendamentoCronograma)
+    return len(criados)
+
+
+def criar_recorrencias_agendamento(recorrencias) -> int:
+    """
+    Grava recorrências de agendamento já validadas com bulk_create e invalida o cache
+    dos dashboards (bulk_create não envia post_save).
+
+    Args:
+        recorrencias: Instâncias não salvas de RecorrenciaAgendamento
+
+    Returns:
+        Quantidade de datas agendadas pelas recorrências
+    """
+    from app.models import RecorrenciaAgendamento
+
+    with transaction.atomic():
+        criadas = RecorrenciaAgendamento.objects.bulk_create(recorrencias, batch_size=BULK_BATCH_SIZE)
+        if criadas:
+            agendar_invalidacao_cache(RecorrenciaAgendamento)
+    return sum(recorrencia.total_datas_previstas() for recorrencia in criadas)
+
+
+def converter_agendamentos_periodicos() -> Tuple[int, int]:
+    """
+    Substitui os AgendamentoCronograma periódicos gravados uma linha por data por
+    RecorrenciaAgendamento.
+
+    Agendamentos do mesmo item, grupo, periodicidade e autor cujas datas seguem a
+    periodicidade sem falhas formam uma recorrência (mínimo de duas datas). Agendamentos
+    com observações são mantidos como estão.
+
+    Returns:
+        Tupla (recorrencias_criadas, agendamentos_removidos)
+    """
+    from app.models import AgendamentoCronograma, RecorrenciaAgendamento
+
+    grupos = defaultdict(list)
+    agendamentos = AgendamentoCronograma.objects.filter(
+        periodicidade__gt=0,
+    ).filter(
+        Q(observacoes__isnull=True) | Q(observacoes='')
+    ).order_by('data_planejada').values_list(
+        'id', 'tipo_agendamento', 'maquina_id', 'plano_preventiva_id', 'nome_grupo',
+        'periodicidade', 'created_by', 'data_planejada',
+    )
+    for id_agendamento, *chave, data_planejada in agendamentos:
+        grupos[tuple(chave)].append((data_planejada, id_agendamento))
+
+    recorrencias = []
+    ids_convertidos = []
+
+    def _fechar_sequencia(chave, sequencia):
+        if len(sequencia) < 2:
+            return
+        tipo, maquina_id, plano_id, nome_grupo, periodicidade, created_by = chave
+        recorrencias.append(RecorrenciaAgendamento(
+            tipo_agendamento=tipo,
+            maquina_id=maquina_id,
+            plano_preventiva_id=plano_id,
+            nome_grupo=nome_grupo,
+            periodicidade=periodicidade,
+            data_inicio=sequencia[0][0],
+            data_fim=sequencia[-1][0],
+            created_by=created_by,
+        ))
+        ids_convertidos.extend(id_agendamento for _, id_agendamento in sequencia)
+
+    for chave, datas in grupos.items():
+        periodicidade = chave[4]
+        sequencia = []
+        for data_planejada, id_agendamento in datas:
+            if sequencia and (data_planejada - sequencia[-1][0]).days != periodicidade:
+                _fechar_sequencia(chave, sequencia)
+                sequencia = []
+            sequencia.append((data_planejada, id_agendamento))
+        _fechar_sequencia(chave, sequencia)
+
+    with transaction.atomic():
+        criar_recorrencias_agendamento(recorrencias)
+        for inicio in range(0, len(ids_convertidos), BULK_BATCH_SIZE):
+            AgendamentoCronograma.objects.filter(id__in=ids_convertidos[inicio:inicio + BULK_BATCH_SIZE]).delete()
+    return len(recorrencias), len(ids_convertidos)
+
+
+def _chave_agendamento(agendamento):
+    return agendamento.data_planejada, agendamento.tipo_agendamento
+
+
+def recorrencias_no_intervalo(inicio=None, fim=None, recorrencias=None):
+    """
+    Recorrências que podem ter ocorrência entre inicio e fim (pela regra ou por uma
+    data movida para o intervalo), com máquina, plano e exceções já carregados.
+
+    Args:
+        inicio, fim: Limites do intervalo (None = sem limite)
+        recorrencias: QuerySet de RecorrenciaAgendamento já filtrado (padrão: todas)
+    """
+    from app.models import ExcecaoRecorrencia, RecorrenciaAgendamento
+
+    if recorrencias is None:
+        recorrencias = RecorrenciaAgendamento.objects.all()
+    if inicio or fim:
+        pela_regra = Q()
+        movidas = ExcecaoRecorrencia.objects.filter(acao=ExcecaoRecorrencia.ACAO_MOVIDA)
+        if inicio:
+            pela_regra &= Q(data_fim__gte=inicio)
+            movidas = movidas.filter(nova_data__gte=inicio)
+        if fim:
+            pela_regra &= Q(data_inicio__lte=fim)
+            movidas = movidas.filter(nova_data__lte=fim)
+        recorrencias = recorrencias.filter(pela_regra | Q(id__in=movidas.values('recorrencia_id')))
+    return recorrencias.select_related(
+        'maquina', 'plano_preventiva',
+    ).prefetch_related('excecoes')
+
+
+def ocorrencias_recorrencias(inicio=None, fim=None, recorrencias=None):
+    """
+    Gera as ocorrências das recorrências entre inicio e fim, em ordem de data e tipo,
+    como AgendamentoCronograma não salvos (ver RecorrenciaAgendamento.ocorrencias).
+    Apenas as datas do intervalo são geradas.
+    """
+    return heapq.merge(
+        *(recorrencia.ocorrencias(inicio, fim) for recorrencia in recorrencias_no_intervalo(inicio, fim, recorrencias)),
+        key=_chave_agendamento,
+    )
+
+
+class AgendaCronograma:
+    """
+    Agendamentos gravados (AgendamentoCronograma) e ocorrências das recorrências em uma
+    única sequência ordenada por data e tipo, própria para o Paginator.
+
+    count() soma as ocorrências sem gerá-las; cada página busca no banco apenas os
+    agendamentos até o seu fim e gera apenas as ocorrências necessárias.
+
+    Uso:
+        agenda = AgendaCronograma(AgendamentoCronograma.objects.all(), inicio=data_ini, fim=data_f)
+        pagina = Paginator(agenda, 50).get_page(numero)
+    """
+
+    def __init__(self, agendamentos, recorrencias=None, inicio=None, fim=None):
+        self.agendamentos = agendamentos.order_by('data_planejada', 'tipo_agendamento')
+        self.inicio = inicio
+        self.fim = fim
+        self._recorrencias_filtradas = recorrencias
+        self._recorrencias = None
+        self._total = None
+
+    @property
+    def recorrencias(self):
+        if self._recorrencias is None:
+            self._recorrencias = list(recorrencias_no_intervalo(self.inicio, self.fim, self._recorrencias_filtradas))
+        return self._recorrencias
+
+    def total_ocorrencias(self):
+        return sum(recorrencia.total_datas(self.inicio, self.fim) for recorrencia in self.recorrencias)
+
+    def count(self):
+        if self._total is None:
+            self._total = self.agendamentos.count() + self.total_ocorrencias()
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def _mesclados(self, agendamentos):
+        return heapq.merge(
+            agendamentos,
+            *(recorrencia.ocorrencias(self.inicio, self.fim) for recorrencia in self.recorrencias),
+            key=_chave_agendamento,
+        )
+
+    def __iter__(self):
+        return self._mesclados(self.agendamentos.iterator(chunk_size=BULK_BATCH_SIZE))
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio = indice.start or 0
+            if indice.stop is None:
+                return list(itertools.islice(iter(self), inicio, None))
+            return list(itertools.islice(self._mesclados(self.agendamentos[:indice.stop]), inicio, indice.stop))
+        itens = self[indice:indice + 1]
+        if not itens:
+            raise IndexError(indice)
+        return itens[0]
+
+
+# ==================== CACHE DOS DASHBOARDS ====================
+
+# Alias em settings.CACHES usado pelos dashboards
+DASHBOARD_CACHE_ALIAS = 'dashboards'
+
+# Validade máxima de um resultado (segundos); a invalidação normal é pela versão dos modelos
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Parâmetros GET que identificam os filtros de um dashboard
+PARAMETROS_FILTRO_DASHBOARD = ('ano', 'mes', 'data_inicio', 'data_fim')
+
+_invalidacoes_pendentes = threading.local()
+
+
+def _cache_dashboards():
+    from django.core.cache import caches
+    return caches[DASHBOARD_CACHE_ALIAS]
+
+
+def _chave_versao_modelo(model) -> str:
+    return f'versao_modelo:{model._meta.concrete_model._meta.label_lower}'
+
+
+def _nova_versao() -> str:
+    # Valor único: gravações concorrentes nunca produzem a mesma versão (o incr do cache em
+    # arquivo lê e grava em dois passos e perderia uma das invalidações)
+    return uuid.uuid4().hex
+
+
+def invalidar_cache_modelos(*models):
+    """
+    Troca a versão dos modelos informados por um valor novo, invalidando os resultados
+    de dashboard que dependem deles.
+    """
+    cache = _cache_dashboards()
+    cache.set_many({_chave_versao_modelo(model): _nova_versao() for model in models}, timeout=None)
+
+
+def _versoes_lidas(cache, chaves_versao, valores) -> Dict:
+    """Versões lidas do cache (valores); as que faltam são criadas com um valor novo"""
+    versoes = {}
+    for chave_versao in chaves_versao:
+        versao = valores.get(chave_versao)
+        if versao is None:
+            cache.add(chave_versao, _nova_versao(), timeout=None)
+            versao = cache.get(chave_versao)
+        versoes[chave_versao] = versao
+    return versoes
+
+
+def versoes_modelos(*models) -> Dict:
+    """
+    Versão atual de cada modelo, que muda a cada gravação confirmada nele
+    (ver invalidar_cache_modelos). Versões iguais em dois momentos indicam
+    que as tabelas não foram alteradas entre eles.
+    """
+    cache = _cache_dashboards()
+    chaves_versao = sorted({_chave_versao_modelo(model) for model in models})
+    return _versoes_lidas(cache, chaves_versao, cache.get_many(chaves_versao))
+
+
+def agendar_invalidacao_cache(model):
+    """
+    Invalida o cache dos dashboards de um modelo quando a transação atual for confirmada.
+
+    Várias gravações na mesma transação (ex.: exclusão em cascata) geram um único callback,
+    com o conjunto dos modelos pendentes da thread; o callback limpa a marca ao rodar. A marca
+    é uma referência fraca ao callback: se o Django o descartar (rollback da transação ou do
+    savepoint em que foi agendado), a próxima gravação agenda outro. Fora de transação a
+    invalidação é imediata.
+    """
+    agendado = getattr(_invalidacoes_pendentes, 'callback', None)
+    if agendado is not None and agendado() is not None:
+        _invalidacoes_pendentes.modelos.add(model)
+        return
+
+    modelos = _invalidacoes_pendentes.modelos = {model}
+
+    def aplicar():
+        _invalidacoes_pendentes.callback = None
+        invalidar_cache_modelos(*modelos)
+
+    _invalidacoes_pendentes.callback = weakref.ref(aplicar)
+    transaction.on_commit(aplicar)
+
+
+def normalizar_filtros_dashboard(request, parametros=PARAMETROS_FILTRO_DASHBOARD) -> Dict:
+    """
+    Normaliza os filtros GET de um dashboard para compor a chave do cache:
+    valores sem espaços, sem repetição e ordenados; números como inteiros
+    (mes=05 e mes=5 geram a mesma chave).
+    """
+    filtros = {}
+    for nome in parametros:
+        valores = set()
+        for valor in request.GET.getlist(nome):
+            valor = valor.strip()
+            if valor:
+                valores.add(int(valor) if valor.isdigit() else valor)
+        if valores:
+            filtros[nome] = sorted(valores, key=lambda v: (isinstance(v, str), v))
+    return filtros
+
+
+def contexto_dashboard_em_cache(request, nome, modelos, calcular_contexto, parametros=PARAMETROS_FILTRO_DASHBOARD):
+    """
+    Retorna o contexto de um dashboard, calculando-o apenas quando os dados mudaram.
+
+    O resultado fica em uma chave formada pelo nome do dashboard, pelos filtros
+    normalizados e pelo dia atual, junto com a versão de cada modelo usada no
+    cálculo. Entrada e versões são lidas em uma única consulta ao cache; se
+    alguma versão mudou (importação ou edição), o contexto é recalculado.
+
+    Args:
+        request: Requisição do dashboard
+        nome: Nome do dashboard (normalmente o nome da view)
+        modelos: Modelos dos quais o contexto depende
+        calcular_contexto: Função que recebe o request e retorna o contexto
+        parametros: Parâmetros GET que alteram o resultado
+
+    Returns:
+        Dicionário de contexto para o template
+    """
+    from datetime import date
+
+    cache = _cache_dashboards()
+    filtros = normalizar_filtros_dashboard(request, parametros)
+    identificacao = json.dumps({'filtros': filtros, 'dia': date.today().isoformat()}, sort_keys=True)
+    chave = f'dashboard:{nome}:{hashlib.sha1(identificacao.encode()).hexdigest()}'
+    chaves_versao = sorted({_chave_versao_modelo(model) for model in modelos})
+
+    valores = cache.get_many([chave] + chaves_versao)
+    versoes = _versoes_lidas(cache, chaves_versao, valores)
+
+    entrada = valores.get(chave)
+    if entrada is not None and entrada['versoes'] == versoes:
+        return entrada['contexto']
+
+    contexto = calcular_contexto(request)
+    cache.set(chave, {'versoes': versoes, 'contexto': contexto}, DASHBOARD_CACHE_TIMEOUT)
+    return contexto
+
+
+# ==================== EXCLUSÃO EM MASSA ====================
+
+def _excluir_em_cascata(queryset, excluidos, anulados) -> int:
+    """
+    DELETE direto dos registros do queryset, depois de excluir (CASCADE) ou anular
+    (SET_NULL) as referências a eles. Acumula por modelo, em `excluidos` e `anulados`,
+    a quantidade de registros afetados.
+    """
+    from django.db import models
+
+    model = queryset.model
+    for relacao in model._meta.related_objects:
+        campo = relacao.field
+        relacionados = relacao.related_model._base_manager.filter(
+            **{f'{campo.attname}__in': queryset.values(campo.target_field.attname)}
+        )
+        if relacao.on_delete is models.CASCADE:
+            _excluir_em_cascata(relacionados, excluidos, anulados)
+        elif relacao.on_delete is models.SET_NULL:
+            total = relacionados.update(**{campo.attname: None})
+            if total:
+                anulados[relacao.related_model] = anulados.get(relacao.related_model, 0) + total
+        elif relacao.on_delete is not models.DO_NOTHING:
+            raise NotImplementedError(f'{campo.model.__name__}.{campo.name}: on_delete não suportado na exclusão em massa')
+
+    # QuerySet._raw_delete é o DELETE que o próprio Django usa nas exclusões rápidas
+    total = queryset._raw_delete(queryset.db)
+    if total:
+        excluidos[model] = excluidos.get(model, 0) + total
+    return total
+
+
+def excluir_todos_registros(model) -> int:
+    """
+    Exclui todos os registros de um modelo (e os relacionados em cascata) com DELETE
+    direto no banco, em uma transação.
+
+    queryset.delete() carrega cada registro e envia post_delete por registro nos modelos
+    com receptores (app.signals), o que em tabelas grandes mantém o SQLite bloqueado por
+    muito tempo. Aqui nenhum sinal é enviado: o que os receptores fariam registro a
+    registro é feito uma vez para cada modelo afetado. Os resumos diários da tabela
+    (RESUMOS_DIARIOS) e o seu índice de busca são esvaziados; o índice de busca de um
+    modelo excluído apenas em parte (cascata) é reconstruído.
+
+    Returns:
+        Quantidade de registros do modelo excluídos
+    """
+    from django.apps import apps
+
+    excluidos = {}
+    anulados = {}
+    with transaction.atomic():
+        total = _excluir_em_cascata(model._base_manager.all(), excluidos, anulados)
+        for nome_resumo in RESUMOS_DIARIOS.get(model.__name__, ()):
+            resumo = apps.get_model('app', nome_resumo)
+            removidos = resumo.objects.all().delete()[0]
+            if removidos:
+                excluidos[resumo] = removidos
+        limpar_indice_busca(model)
+        for modelo_excluido in excluidos:
+            if modelo_excluido is not model:
+                reconstruir_indice_busca(modelo_excluido)
+        for modelo_alterado in {*excluidos, *anulados}:
+            agendar_invalidacao_cache(modelo_alterado)
+    return total
+
+
+# ==================== RESPOSTAS JSON CONDICIONAIS (CALENDÁRIOS) ====================
+
+def janela_calendario(request):
+    """
+    Intervalo pedido pelo FullCalendar (?start=...&end=..., fim exclusivo) como
+    (inicio, fim) em date; None no limite ausente ou inválido.
+    """
+    from datetime import date
+
+    limites = []
+    for parametro in ('start', 'end'):
         try:
-            data_requisicao = datetime.strptime(data_requisicao, '%Y-%m-%d').date()
+            limites.append(date.fromisoformat(request.GET.get(parametro, '')[:10]))
         except ValueError:
-            errors.append(f"Formato de data invÃ¡lido: {data_requisicao}. Use YYYY-MM-DD")
-            return 0, 0, errors
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
-    try:
-        # Ler arquivo CSV (usar delimitador ponto e vÃ­rgula)
-        if not file_name.endswith('.csv'):
-            raise ValidationError("Formato de arquivo nÃ£o suportado. Use .csv")
-        
-        # Tentar diferentes encodings - comeÃ§ar com latin-1 (mais comum para arquivos brasileiros)
-        data = None
-        encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Resetar arquivo para o inÃ­cio
-                data = read_csv_file(file, encoding=encoding, delimiter=';')
-                break  # Se conseguir ler, sair do loop
-            except (UnicodeDecodeError, ValidationError) as e:
-                if encoding == encodings_to_try[-1]:  # Se for o Ãºltimo encoding
-                    raise ValidationError(f"Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                continue  # Tentar prÃ³ximo encoding
-            except Exception as e:
-                # Outros erros (nÃ£o relacionados a encoding)
-                raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-        
-        if data is None:
-            raise ValidationError("Erro ao ler arquivo CSV: NÃ£o foi possÃ­vel processar o arquivo.")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados vÃ¡lidos")
-        
-        # Processar dados em transaÃ§Ã£o
-        with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # ComeÃ§ar em 2 (linha 1 Ã© cabeÃ§alho)
-                try:
-                    # Verificar se a linha estÃ¡ vazia ou tem apenas valores vazios
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # O CSV tem: CD_UNID;NOME_UNID;CD_USO_CTB;DESCR_USO_CTB;...
-                    
-                    # Validar que temos pelo menos cÃ³digo do item
-                    cd_item = _safe_int(row_data.get('CD_ITEM') or row_data.get('cd_item') or row_data.get('Cd_Item'))
-                    if not cd_item:
-                        errors.append(f"Linha {row_num}: CÃ³digo do item (CD_ITEM) Ã© obrigatÃ³rio")
-                        continue
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    requisicao_data = {
-                        'data_requisicao': data_requisicao,
-                        'cd_unid': _safe_int(row_data.get('CD_UNID') or row_data.get('cd_unid') or row_data.get('Cd_Unid')),
-                        'nome_unid': _safe_str(row_data.get('NOME_UNID') or row_data.get('nome_unid') or row_data.get('Nome_Unid'), max_length=255),
-                        'cd_uso_ctb': _safe_int(row_data.get('CD_USO_CTB') or row_data.get('cd_uso_ctb') or row_data.get('Cd_Uso_Ctb')),
-                        'descr_uso_ctb': _safe_str(row_data.get('DESCR_USO_CTB') or row_data.get('descr_uso_ctb') or row_data.get('Descr_Uso_Ctb'), max_length=255),
-                        'cd_depo': _safe_int(row_data.get('CD_DEPO') or row_data.get('cd_depo') or row_data.get('Cd_Depo')),
-                        'descr_depo': _safe_str(row_data.get('DESCR_DEPO') or row_data.get('descr_depo') or row_data.get('Descr_Depo'), max_length=255),
-                        'cd_local_fisic': _safe_int(row_data.get('CD_LOCAL_FISIC') or row_data.get('cd_local_fisic') or row_data.get('Cd_Local_Fisic')),
-                        'descr_local_fisic': _safe_str(row_data.get('DESCR_LOCAL_FISIC') or row_data.get('descr_local_fisic') or row_data.get('Descr_Local_Fisic'), max_length=255),
-                        'cd_item': cd_item,
-                        'cd_embalagem': _safe_str(row_data.get('CD_EMBALAGEM') or row_data.get('cd_embalagem') or row_data.get('Cd_Embalagem'), max_length=50),
-                        'descr_item': _safe_str(row_data.get('DESCR_ITEM') or row_data.get('descr_item') or row_data.get('Descr_Item'), max_length=500),
-                        'cd_operacao': _safe_int(row_data.get('CD_OPERACAO') or row_data.get('cd_operacao') or row_data.get('Cd_Operacao')),
-                        'descr_operacao': _safe_str(row_data.get('DESCR_OPERACAO') or row_data.get('descr_operacao') or row_data.get('Descr_Operacao'), max_length=255),
-                        'cd_unid_medida': _safe_str(row_data.get('CD_UNID_MEDIDA') or row_data.get('cd_unid_medida') or row_data.get('Cd_Unid_Medida'), max_length=50),
-                        'qtde_movto_estoq': _safe_decimal(row_data.get('QTDE_MOVTO_ESTOQ') or row_data.get('qtde_movto_estoq') or row_data.get('Qtde_Movto_Estoq')),
-                        'vlr_movto_estoq': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ') or row_data.get('vlr_movto_estoq') or row_data.get('Vlr_Movto_Estoq')),
-                        'vlr_movto_estoq_reav': _safe_decimal(row_data.get('VLR_MOVTO_ESTOQ_REAV') or row_data.get('vlr_movto_estoq_reav') or row_data.get('Vlr_Movto_Estoq_Reav')),
-                        'cd_unid_baixa': _safe_int(row_data.get('CD_UNID_BAIXA') or row_data.get('cd_unid_baixa') or row_data.get('Cd_Unid_Baixa')),
-                        'cd_centro_ativ': _safe_int(row_data.get('CD_CENTRO_ATIV') or row_data.get('cd_centro_ativ') or row_data.get('Cd_Centro_Ativ')),
-                        'cd_usu_criou': _safe_str(row_data.get('CD_USU_CRIOU') or row_data.get('cd_usu_criou') or row_data.get('Cd_Usu_Criou'), max_length=255),
-                        'cd_usu_atend': _safe_str(row_data.get('CD_USU_ATEND') or row_data.get('cd_usu_atend') or row_data.get('Cd_Usu_Atend'), max_length=255),
-                        'obs_rm': _safe_str(row_data.get('OBS RM') or row_data.get('obs_rm') or row_data.get('Obs_Rm')),
-                        'obs_item': _safe_str(row_data.get('OBS ITEM') or row_data.get('obs_item') or row_data.get('Obs_Item')),
-                    }
-                    
-                    # Criar ou atualizar registro
-                    # Usar data_requisicao + cd_item como chave Ãºnica (um item pode ser requisitado mÃºltiplas vezes na mesma data)
-                    # Mas vamos usar apenas cd_item + data_requisicao para identificar duplicados
-                    if update_existing:
-                        requisicao, created = RequisicaoAlmoxarifado.objects.update_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        # Apenas criar novos registros
-                        requisicao, created = RequisicaoAlmoxarifado.objects.get_or_create(
-                            data_requisicao=data_requisicao,
-                            cd_item=cd_item,
-                            defaults=requisicao_data
-                        )
-                        if created:
-                            created_count += 1
-                        # Se nÃ£o foi criado, ignorar (jÃ¡ existe)
-                            
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-        
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_msg = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_msg)
-        print(f"Erro geral: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
-def upload_notas_fiscais_from_file(file, update_existing=False) -> Tuple[int, int, List[str]]:
+            limites.append(None)
+    return tuple(limites)
+
+
+def resposta_json_condicional(request, modelos, calcular_dados, ultima_alteracao=None):
     """
-    Faz upload de notas fiscais a partir de um arquivo CSV
-    
+    JsonResponse compacto com ETag e Last-Modified, respondendo 304 quando o cliente
+    já tem a versão atual (If-None-Match / If-Modified-Since).
+
+    O ETag combina a URL completa (filtros e janela pedida) com a versão de cada modelo
+    (ver versoes_modelos), que muda a cada gravação confirmada: os dados só são
+    calculados e enviados de novo quando alguma das tabelas mudou.
+
     Args:
-        file: Arquivo Django UploadedFile (CSV)
-        update_existing: Se True, atualiza registros existentes. Se False, ignora duplicados.
-    
+        request: Requisição
+        modelos: Modelos dos quais a resposta depende
+        calcular_dados: Função sem argumentos que retorna os dados (serializáveis em JSON)
+        ultima_alteracao: datetime da alteração mais recente dos dados (Last-Modified), opcional
+
     Returns:
-        Tupla (created_count, updated_count, errors)
+        JsonResponse ou HttpResponseNotModified
     """
-    from app.models import NotaFiscal
-    
-    errors = []
-    created_count = 0
-    updated_count = 0
-    
-    # Determinar tipo de arquivo
-    file_name = file.name.lower()
-    
+    from django.http import JsonResponse
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date, quote_etag
+
+    identificacao = json.dumps({'url': request.get_full_path(), 'versoes': versoes_modelos(*modelos)}, sort_keys=True)
+    etag = quote_etag(hashlib.sha1(identificacao.encode()).hexdigest())
+    last_modified = int(ultima_alteracao.timestamp()) if ultima_alteracao else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(calcular_dados(), safe=False, json_dumps_params={'separators': (',', ':')})
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    # O navegador guarda a resposta, mas sempre confirma com o servidor antes de usá-la
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ==================== PERFIL DAS REQUISIÇÕES ====================
+
+def registrar_perfil_view(view, metricas) -> None:
+    """
+    Soma o perfil de uma requisição ao resumo do dia da view (ResumoDiarioPerfilView).
+
+    Uma única atualização com expressões F (sem ler o registro). Falhas de gravação são
+    ignoradas: o perfil nunca interrompe a requisição. Os dias fora da janela são descartados
+    por limpar_perfil_views (comando limpar_perfil_views), fora das requisições.
+
+    Args:
+        view: Nome da view (resolver_match.view_name)
+        metricas: Dicionário com consultas, consultas_repetidas, tempo_total_ms, tempo_db_ms,
+            tempo_view_ms, tempo_template_ms, consulta_mais_repetida e repeticoes_consulta
+    """
+    from django.db.models import Case, TextField, Value, When
+    from django.db.models.functions import Greatest
+    from app.models import ResumoDiarioPerfilView
+
+    dia = timezone.localdate()
+    view = view[:200]
     try:
-        # Ler arquivo CSV (usar delimitador ponto e vírgula)
-        # Precisamos ler manualmente para tratar colunas duplicadas (ex: duas colunas "Situação")
-        if file_name.endswith('.csv'):
-            # Tentar diferentes encodings - começar com latin-1 (mais comum para arquivos brasileiros)
-            data = None
-            encodings_to_try = ['latin-1', 'iso-8859-1', 'utf-8', 'cp1252']
-            
-            for encoding in encodings_to_try:
-                try:
-                    file.seek(0)  # Resetar arquivo para o início
-                    # Ler conteúdo do arquivo
-                    if hasattr(file, 'read'):
-                        content = file.read().decode(encoding)
-                    else:
-                        with open(file, 'r', encoding=encoding) as f:
-                            content = f.read()
-                    
-                    # Ler CSV manualmente para tratar colunas duplicadas (ex: duas colunas "Situação")
-                    lines = content.strip().split('\n')
-                    if not lines:
-                        raise ValidationError("Arquivo CSV vazio")
-                    
-                    # Ler cabeçalho e tratar duplicatas
-                    header_line = lines[0]
-                    headers_raw = [h.strip() for h in header_line.split(';')]
-                    
-                    # Criar headers únicos para colunas duplicadas
-                    headers = []
-                    header_count = {}
-                    for header in headers_raw:
-                        header_lower = header.lower()
-                        # Normalizar para comparar (remover acentos e case)
-                        import unicodedata
-                        header_normalized = unicodedata.normalize('NFKD', header_lower).encode('ASCII', 'ignore').decode('ASCII')
-                        if header_normalized in header_count:
-                            header_count[header_normalized] += 1
-                            # Para a segunda ocorrência de "Situação", usar "Situação_2"
-                            headers.append(f"{header}_{header_count[header_normalized]}")
-                        else:
-                            header_count[header_normalized] = 0
-                            headers.append(header)
-                    
-                    # Ler dados
-                    data = []
-                    for line_num, line in enumerate(lines[1:], start=2):
-                        if not line.strip():
-                            continue
-                        values = [v.strip() for v in line.split(';')]
-                        row_dict = {}
-                        for idx, value in enumerate(values):
-                            if idx < len(headers):
-                                header = headers[idx]
-                                if value:
-                                    row_dict[header] = value
-                        if row_dict:  # Adicionar apenas se não estiver vazio
-                            data.append(row_dict)
-                    
-                    break  # Se conseguir ler, sair do loop
-                except (UnicodeDecodeError, ValidationError) as e:
-                    if encoding == encodings_to_try[-1]:  # Se for o último encoding
-                        raise ValidationError(f"Erro ao ler arquivo CSV: Não foi possível decodificar o arquivo com nenhum encoding testado (latin-1, iso-8859-1, utf-8, cp1252). Erro original: {str(e)}")
-                    continue  # Tentar próximo encoding
-                except Exception as e:
-                    # Outros erros (não relacionados a encoding)
-                    raise ValidationError(f"Erro ao ler arquivo CSV: {str(e)}")
-            
-            if data is None:
-                raise ValidationError("Erro ao ler arquivo CSV: Não foi possível processar o arquivo.")
-        else:
-            raise ValidationError("Formato de arquivo não suportado. Use .csv")
-        
-        if not data:
-            raise ValidationError("Arquivo vazio ou sem dados válidos")
-        
-        # Processar dados em transação
         with transaction.atomic():
-            for row_num, row_data in enumerate(data, start=2):  # Começar em 2 (linha 1 é cabeçalho)
-                try:
-                    # Verificar se a linha está vazia ou tem apenas valores vazios
-                    # Também ignorar linhas que começam com "Unidade" (linhas de resumo)
-                    if not any(str(v).strip() if v else '' for v in row_data.values()):
-                        continue
-                    
-                    # Verificar se é linha de resumo (começa com "Unidade")
-                    primeiro_valor = str(list(row_data.values())[0] if row_data.values() else '').strip()
-                    if primeiro_valor.upper() == 'UNIDADE':
-                        continue
-                    
-                    # Mapear colunas do CSV para campos do modelo
-                    # Emitente
-                    emitente = _safe_str(row_data.get('Emitente') or row_data.get('emitente') or row_data.get('EMITENTE'), max_length=100)
-                    nome_fantasia_emitente = _safe_str(row_data.get('Nome fantasia emitente') or row_data.get('nome fantasia emitente') or row_data.get('NOME FANTASIA EMITENTE'), max_length=500)
-                    
-                    # Dados da Nota Fiscal
-                    nota = _safe_str(row_data.get('Nota') or row_data.get('nota') or row_data.get('NOTA'), max_length=50)
-                    serie = _safe_str(row_data.get('Série') or row_data.get('série') or row_data.get('SÉRIE') or row_data.get('Serie') or row_data.get('SERIE'), max_length=50)
-                    modelo = _safe_str(row_data.get('Modelo') or row_data.get('modelo') or row_data.get('MODELO'), max_length=50)
-                    
-                    # Total Nota (formato brasileiro: 2.982,99)
-                    total_nota_str = row_data.get('Total Nota') or row_data.get('total nota') or row_data.get('TOTAL NOTA') or row_data.get('Total nota')
-                    total_nota = _safe_decimal(total_nota_str)
-                    
-                    # Validar que temos pelo menos emitente e nota
-                    if not emitente or not nota:
-                        errors.append(f"Linha {row_num}: Emitente e Nota são obrigatórios")
-                        continue
-                    
-                    # Datas
-                    data_emissao = _safe_str(row_data.get('Data emissão') or row_data.get('data emissão') or row_data.get('DATA EMISSÃO') or row_data.get('Data emissao') or row_data.get('DATA EMISSAO'), max_length=50)
-                    data_vencimento = _safe_str(row_data.get('Data vencimento') or row_data.get('data vencimento') or row_data.get('DATA VENCIMENTO'), max_length=50)
-                    data_inclusao = _safe_str(row_data.get('Data inclusão') or row_data.get('data inclusão') or row_data.get('DATA INCLUSÃO') or row_data.get('Data inclusao') or row_data.get('DATA INCLUSAO'), max_length=50)
-                    data_autorizacao = _safe_str(row_data.get('Data autorização') or row_data.get('data autorização') or row_data.get('DATA AUTORIZAÇÃO') or row_data.get('Data autorizacao') or row_data.get('DATA AUTORIZACAO'), max_length=50)
-                    data_ult_sit_fechada = _safe_str(row_data.get('Data ult sit fechada') or row_data.get('data ult sit fechada') or row_data.get('DATA ULT SIT FECHADA') or row_data.get('Data ult sit fechada'), max_length=50)
-                    
-                    # Controle
-                    ctrle = _safe_str(row_data.get('Ctrle') or row_data.get('ctrle') or row_data.get('CTRLE'), max_length=50)
-                    
-                    # Unidade
-                    unidade = _safe_str(row_data.get('Unidade') or row_data.get('unidade') or row_data.get('UNIDADE'), max_length=50)
-                    nome_unidade = _safe_str(row_data.get('Nome unidade') or row_data.get('nome unidade') or row_data.get('NOME UNIDADE'), max_length=255)
-                    unidade_autorizacao = _safe_str(row_data.get('Unidade autorização') or row_data.get('unidade autorização') or row_data.get('UNIDADE AUTORIZAÇÃO') or row_data.get('Unidade autorizacao') or row_data.get('UNIDADE AUTORIZACAO'), max_length=50)
-                    nome_unidade_autorizacao = _safe_str(row_data.get('Nome unidade autorização') or row_data.get('nome unidade autorização') or row_data.get('NOME UNIDADE AUTORIZAÇÃO') or row_data.get('Nome unidade autorizacao') or row_data.get('NOME UNIDADE AUTORIZACAO'), max_length=255)
-                    
-                    # Centro de Atividade
-                    centro_atividade = _safe_str(row_data.get('Centro atividade') or row_data.get('centro atividade') or row_data.get('CENTRO ATIVIDADE'), max_length=50)
-                    nome_centro_atividade = _safe_str(row_data.get('Nome centro atividade') or row_data.get('nome centro atividade') or row_data.get('NOME CENTRO ATIVIDADE'), max_length=255)
-                    
-                    # Situação - primeira coluna (ex: "AUTORIZADA")
-                    situacao = _safe_str(
-                        row_data.get('Situação') or 
-                        row_data.get('situação') or 
-                        row_data.get('SITUAÇÃO') or 
-                        row_data.get('Situacao') or 
-                        row_data.get('SITUACAO') or
-                        row_data.get('Situação_1') or  # Primeira ocorrência quando há duplicatas
-                        row_data.get('situação_1') or
-                        row_data.get('SITUAÇÃO_1'),
-                        max_length=100
-                    )
-                    
-                    # Situação detalhada - segunda coluna (ex: "Solicitação autorizada por: ...")
-                    situacao_detalhada = _safe_str(
-                        row_data.get('Situação_2') or  # Segunda ocorrência quando há duplicatas
-                        row_data.get('situação_2') or
-                        row_data.get('SITUAÇÃO_2') or
-                        row_data.get('Situacao_2') or
-                        row_data.get('SITUACAO_2')
-                    )
-                    
-                    # UsuÃ¡rio e AutorizaÃ§Ã£o
-                    nome_usuario = _safe_str(row_data.get('Nome usuÃ¡rio') or row_data.get('nome usuÃ¡rio') or row_data.get('NOME USUÃRIO') or row_data.get('Nome usuario') or row_data.get('NOME USUARIO'), max_length=255)
-                    autorizador = _safe_str(row_data.get('Autorizador') or row_data.get('autorizador') or row_data.get('AUTORIZADOR'), max_length=255)
-                    
-                    # ObservaÃ§Ãµes
-                    observacoes = _safe_str(row_data.get('ObservaÃ§Ãµes') or row_data.get('observaÃ§Ãµes') or row_data.get('OBSERVAÃ‡Ã•ES') or row_data.get('Observacoes') or row_data.get('OBSERVACOES'))
-                    observacoes_csc = _safe_str(row_data.get('ObservaÃ§Ãµes CSC') or row_data.get('observaÃ§Ãµes csc') or row_data.get('OBSERVAÃ‡Ã•ES CSC') or row_data.get('Observacoes CSC') or row_data.get('OBSERVACOES CSC'))
-                    observacoes_autorizacao = _safe_str(row_data.get('ObservaÃ§Ãµes autorizaÃ§Ã£o') or row_data.get('observaÃ§Ãµes autorizaÃ§Ã£o') or row_data.get('OBSERVAÃ‡Ã•ES AUTORIZAÃ‡ÃƒO') or row_data.get('Observacoes autorizacao') or row_data.get('OBSERVACOES AUTORIZACAO'))
-                    
-                    # LanÃ§amento
-                    lancamento_tesf0028 = _safe_str(row_data.get('LANCAMENTO TESF0028') or row_data.get('lancamento tesf0028') or row_data.get('Lancamento TESF0028'), max_length=255)
-                    
-                    # Preparar dados para criaÃ§Ã£o/atualizaÃ§Ã£o
-                    nota_data = {
-                        'emitente': emitente,
-                        'nome_fantasia_emitente': nome_fantasia_emitente,
-                        'nota': nota,
-                        'serie': serie,
-                        'modelo': modelo,
-                        'total_nota': total_nota,
-                        'data_emissao': data_emissao,
-                        'data_vencimento': data_vencimento,
-                        'data_inclusao': data_inclusao,
-                        'data_autorizacao': data_autorizacao,
-                        'data_ult_sit_fechada': data_ult_sit_fechada,
-                        'ctrle': ctrle,
-                        'unidade': unidade,
-                        'nome_unidade': nome_unidade,
-                        'unidade_autorizacao': unidade_autorizacao,
-                        'nome_unidade_autorizacao': nome_unidade_autorizacao,
-                        'centro_atividade': centro_atividade,
-                        'nome_centro_atividade': nome_centro_atividade,
-                        'situacao': situacao,
-                        'situacao_detalhada': situacao_detalhada,
-                        'nome_usuario': nome_usuario,
-                        'autorizador': autorizador,
-                        'observacoes': observacoes,
-                        'observacoes_csc': observacoes_csc,
-                        'observacoes_autorizacao': observacoes_autorizacao,
-                        'lancamento_tesf0028': lancamento_tesf0028,
-                    }
-                    
-                    # Criar ou atualizar registro
-                    if update_existing:
-                        nota_obj, created = NotaFiscal.objects.update_or_create(
-                            emitente=emitente,
-                            nota=nota,
-                            serie=serie or '',
-                            modelo=modelo or '',
-                            defaults=nota_data
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                    else:
-                        nota_obj, created = NotaFiscal.objects.get_or_create(
-                            emitente=emitente,
-                            nota=nota,
-                            serie=serie or '',
-                            modelo=modelo or '',
-                            defaults=nota_data
-                        )
-                        if created:
-                            created_count += 1
-                    
-                except Exception as e:
-                    error_msg = f"Linha {row_num}: Erro ao processar registro - {str(e)}"
-                    errors.append(error_msg)
-                    print(f"Erro na linha {row_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-        
-        return created_count, updated_count, errors
-    
-    except ValidationError as e:
-        errors.append(str(e))
-        return 0, 0, errors
-    except Exception as e:
-        error_detail = f"Erro geral ao processar arquivo: {str(e)}"
-        errors.append(error_detail)
-        print(f"Erro geral: {error_detail}")
-        import traceback
-        traceback.print_exc()
-        return 0, 0, errors
+            atualizados = ResumoDiarioPerfilView.objects.filter(dia=dia, view=view).update(
+                requisicoes=F('requisicoes') + 1,
+                consultas=F('consultas') + metricas['consultas'],
+                consultas_repetidas=F('consultas_repetidas') + metricas['consultas_repetidas'],
+                max_consultas=Greatest(F('max_consultas'), Value(metricas['consultas'])),
+                tempo_total_ms=F('tempo_total_ms') + metricas['tempo_total_ms'],
+                tempo_db_ms=F('tempo_db_ms') + metricas['tempo_db_ms'],
+                tempo_view_ms=F('tempo_view_ms') + metricas['tempo_view_ms'],
+                tempo_template_ms=F('tempo_template_ms') + metricas['tempo_template_ms'],
+                max_tempo_total_ms=Greatest(F('max_tempo_total_ms'), Value(metricas['tempo_total_ms'])),
+                # Antes de repeticoes_consulta: compara com o valor ainda não atualizado
+                consulta_mais_repetida=Case(
+                    When(repeticoes_consulta__lt=metricas['repeticoes_consulta'],
+                         then=Value(metricas['consulta_mais_repetida'])),
+                    default=F('consulta_mais_repetida'),
+                    output_field=TextField(),
+                ),
+                repeticoes_consulta=Greatest(F('repeticoes_consulta'), Value(metricas['repeticoes_consulta'])),
+                updated_at=timezone.now(),
+            )
+            if not atualizados:
+                ResumoDiarioPerfilView.objects.create(
+                    dia=dia, view=view, requisicoes=1,
+                    max_consultas=metricas['consultas'], max_tempo_total_ms=metricas['tempo_total_ms'],
+                    **metricas,
+                )
+    except DatabaseError as e:
+        # Ex.: outra requisição criou o registro do dia ao mesmo tempo (a amostra é descartada)
+        print(f"Erro ao registrar o perfil da view {view}: {e}")
+
+
+def limpar_perfil_views(dias=None) -> int:
+    """
+    Exclui os resumos de perfil (ResumoDiarioPerfilView) anteriores à janela de retenção.
+
+    Args:
+        dias: Dias mantidos (padrão: settings.PERFIL_REQUISICOES_DIAS)
+
+    Returns:
+        Quantidade de resumos excluídos
+    """
+    from datetime import timedelta
+    from django.conf import settings
+    from app.models import ResumoDiarioPerfilView
 
+    if dias is None:
+        dias = getattr(settings, 'PERFIL_REQUISICOES_DIAS', 30)
+    limite = timezone.localdate() - timedelta(days=dias)
+    excluidos, _ = ResumoDiarioPerfilView.objects.filter(dia__lt=limite).delete()
+    return excluidos
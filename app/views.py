@@ -30,9 +30,14 @@ def handle_form_errors(form, request):
 
 def home(request):
     """Home page view - Data filtered by current week from Semana52"""
-    from app.models import OrdemServicoCorretiva, RequisicaoAlmoxarifado, Semana52, Maquina, Manutentor
+    from app.models import (
+        OrdemServicoCorretiva, RequisicaoAlmoxarifado, Maquina, Manutentor,
+        ResumoDiarioOrdem, ResumoDiarioRequisicao, intervalo_datas_ordem,
+    )
+    from app.utils import indice_semanas
     from datetime import datetime, timedelta, date
     from django.db.models import Sum, Count, Q
+    from django.utils import timezone
     from decimal import Decimal
     
     hoje = date.today()
@@ -40,24 +45,19 @@ def home(request):
     # Encontrar a semana atual baseada na data de hoje
     semana_atual = None
     try:
+        semanas = indice_semanas()
+        
         # Buscar semana onde hoje está entre inicio e fim
-        semana_atual = Semana52.objects.filter(
-            inicio__lte=hoje,
-            fim__gte=hoje
-        ).first()
+        semana_atual = semanas.semana(hoje)
         
         # Se não encontrou, buscar a semana mais próxima
         if not semana_atual:
             # Tentar encontrar semana onde inicio é mais próximo de hoje (mas não futuro)
-            semana_atual = Semana52.objects.filter(
-                inicio__lte=hoje
-            ).order_by('-inicio').first()
+            semana_atual = semanas.ultima_iniciada(hoje)
         
         # Se ainda não encontrou, buscar qualquer semana futura próxima
         if not semana_atual:
-            semana_atual = Semana52.objects.filter(
-                inicio__gte=hoje
-            ).order_by('inicio').first()
+            semana_atual = semanas.proxima(hoje)
     except Exception as e:
         print(f"Erro ao buscar semana atual: {e}")
         semana_atual = None
@@ -87,28 +87,11 @@ def home(request):
     manutencoes_corretivas = 0
     if data_inicio_semana and data_fim_semana:
         try:
-            ordens_semana = OrdemServicoCorretiva.objects.exclude(
-                dt_entrada__isnull=True
-            ).exclude(dt_entrada='')
-            
-            # Filtrar por data (precisa parsear dt_entrada que é string)
-            for ordem in ordens_semana:
-                try:
-                    dt_str = ordem.dt_entrada.strip()
-                    if ' ' in dt_str:
-                        date_part = dt_str.split(' ')[0]
-                    else:
-                        date_part = dt_str
-                    
-                    if '/' in date_part:
-                        parts = date_part.split('/')
-                        if len(parts) == 3:
-                            day, month, year = parts
-                            ordem_date = date(int(year), int(month), int(day))
-                            if data_inicio_semana <= ordem_date <= data_fim_semana:
-                                manutencoes_corretivas += 1
-                except:
-                    continue
+            manutencoes_corretivas = ResumoDiarioOrdem.objects.filter(
+                evento='entrada',
+                dia__gte=data_inicio_semana,
+                dia__lte=data_fim_semana
+            ).aggregate(total=Sum('total'))['total'] or 0
         except Exception as e:
             print(f"Erro ao contar manutenções corretivas: {e}")
     
@@ -128,14 +111,12 @@ def home(request):
     
     # 3. Requisições de Almoxarifado na semana atual
     if data_inicio_semana and data_fim_semana:
-        requisicoes_semana = RequisicaoAlmoxarifado.objects.filter(
-            data_requisicao__gte=data_inicio_semana,
-            data_requisicao__lte=data_fim_semana
-        )
-        total_requisicoes_semana = requisicoes_semana.count()
-        valor_total_semana = requisicoes_semana.aggregate(
-            total=Sum('vlr_movto_estoq')
-        )['total'] or Decimal('0')
+        resumo_semana = ResumoDiarioRequisicao.objects.filter(
+            dia__gte=data_inicio_semana,
+            dia__lte=data_fim_semana
+        ).aggregate(total=Sum('total'), valor=Sum('valor'))
+        total_requisicoes_semana = resumo_semana['total'] or 0
+        valor_total_semana = resumo_semana['valor'] or Decimal('0')
     else:
         total_requisicoes_semana = RequisicaoAlmoxarifado.objects.count()
         valor_total_semana = Decimal('0')
@@ -148,35 +129,19 @@ def home(request):
     eventos = []
     if data_inicio_semana and data_fim_semana:
         # Buscar ordens de serviço na semana atual
-        ordens = OrdemServicoCorretiva.objects.exclude(
-            dt_entrada__isnull=True
-        ).exclude(dt_entrada='')
+        inicio_semana_dt, fim_semana_dt = intervalo_datas_ordem(data_inicio_semana, data_fim_semana)
+        ordens = OrdemServicoCorretiva.objects.filter(
+            dt_entrada_dt__gte=inicio_semana_dt,
+            dt_entrada_dt__lt=fim_semana_dt
+        ).only('cd_ordemserv', 'descr_maquina', 'dt_entrada_dt')
         
         for ordem in ordens:
-            try:
-                dt_str = ordem.dt_entrada.strip()
-                if ' ' in dt_str:
-                    date_part = dt_str.split(' ')[0]
-                else:
-                    date_part = dt_str
-                
-                if '/' in date_part:
-                    parts = date_part.split('/')
-                    if len(parts) == 3:
-                        day, month, year = parts
-                        ordem_date = date(int(year), int(month), int(day))
-                        
-                        # Incluir apenas eventos dentro da semana atual
-                        if data_inicio_semana <= ordem_date <= data_fim_semana:
-                            start_date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                            eventos.append({
-                                'title': f'OS {ordem.cd_ordemserv} - {ordem.descr_maquina[:30] if ordem.descr_maquina else "Sem descrição"}',
-                                'start': start_date,
-                                'color': '#3788d8',  # Azul
-                                'url': f'/manutencao-corretiva/consultar/?search={ordem.cd_ordemserv}'
-                            })
-            except:
-                continue
+            eventos.append({
+                'title': f'OS {ordem.cd_ordemserv} - {ordem.descr_maquina[:30] if ordem.descr_maquina else "Sem descrição"}',
+                'start': timezone.localtime(ordem.dt_entrada_dt).strftime('%Y-%m-%d'),
+                'color': '#3788d8',  # Azul
+                'url': f'/manutencao-corretiva/consultar/?search={ordem.cd_ordemserv}'
+            })
         
         # Adicionar eventos de manutenção preventiva na semana atual
         try:
@@ -235,103 +200,21 @@ def home(request):
     ordens_fechadas_labels = []
     ordens_fechadas_data = []
     
-    def parse_date_from_string(date_str):
-        """
-        Tenta fazer parse de uma data em vários formatos diferentes.
-        Retorna um objeto date ou None se não conseguir fazer parse.
-        """
-        if not date_str:
-            return None
-        
-        date_str = str(date_str).strip()
-        if not date_str:
-            return None
-        
-        # Remover hora se existir (formato: "dd/mm/yyyy hh:mm" ou "dd/mm/yyyy hh:mm:ss")
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-        else:
-            date_part = date_str
-        
-        # Tentar diferentes formatos de data
-        date_formats = [
-            '%d/%m/%Y',      # 26/09/2025
-            '%d-%m-%Y',      # 26-09-2025
-            '%d.%m.%Y',      # 26.09.2025
-            '%Y-%m-%d',      # 2025-09-26
-            '%Y/%m/%d',      # 2025/09/26
-            '%d/%m/%y',      # 26/09/25
-            '%d-%m-%y',      # 26-09-25
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_part, fmt).date()
-            except (ValueError, TypeError):
-                continue
-        
-        # Se nenhum formato funcionou, tentar parse manual para formato brasileiro comum
-        if '/' in date_part:
-            parts = date_part.split('/')
-            if len(parts) == 3:
-                try:
-                    day, month, year = parts
-                    # Se ano tem 2 dígitos, assumir 2000+
-                    if len(year) == 2:
-                        year = '20' + year
-                    return date(int(year), int(month), int(day))
-                except (ValueError, TypeError):
-                    pass
-        
-        return None
-    
     if data_inicio_semana and data_fim_semana:
         # Criar dicionário para contar ordens por dia
         from collections import defaultdict
         ordens_por_dia = defaultdict(int)
         
-        # Buscar todas as ordens com dt_encordmanu preenchida
-        ordens_fechadas = OrdemServicoCorretiva.objects.exclude(
-            dt_encordmanu__isnull=True
-        ).exclude(dt_encordmanu='')
-        
-        # Processar cada ordem e contar por dia
-        for ordem in ordens_fechadas:
-            try:
-                # Usar função de parse melhorada
-                ordem_date = parse_date_from_string(ordem.dt_encordmanu)
-                
-                if ordem_date:
-                    # Debug: verificar se esta ordem específica está sendo processada
-                    if ordem.cd_ordemserv == 7 or '07/12/2025' in str(ordem.dt_encordmanu):
-                        print(f"DEBUG - Ordem {ordem.cd_ordemserv}:")
-                        print(f"  dt_encordmanu original: {ordem.dt_encordmanu}")
-                        print(f"  Data parseada: {ordem_date}")
-                        print(f"  Semana atual: {data_inicio_semana} a {data_fim_semana}")
-                        print(f"  Está na semana? {data_inicio_semana <= ordem_date <= data_fim_semana}")
-                    
-                    # Verificar se está na semana atual
-                    if data_inicio_semana <= ordem_date <= data_fim_semana:
-                        # Formatar data como chave (YYYY-MM-DD)
-                        data_key = ordem_date.strftime('%Y-%m-%d')
-                        ordens_por_dia[data_key] += 1
-                    elif ordem.cd_ordemserv == 7 or '07/12/2025' in str(ordem.dt_encordmanu):
-                        print(f"  Ordem {ordem.cd_ordemserv} NÃO está na semana atual!")
-                        print(f"  Comparação: {data_inicio_semana} <= {ordem_date} <= {data_fim_semana}")
-                else:
-                    # Debug: se não conseguiu fazer parse
-                    if ordem.cd_ordemserv == 7 or '07/12/2025' in str(ordem.dt_encordmanu):
-                        print(f"DEBUG - Ordem {ordem.cd_ordemserv}: Não conseguiu fazer parse de '{ordem.dt_encordmanu}'")
-            except Exception as e:
-                # Log erro para debug, mas continuar processando outras ordens
-                if ordem.cd_ordemserv == 7 or '07/12/2025' in str(ordem.dt_encordmanu):
-                    print(f"Erro ao processar dt_encordmanu da ordem {ordem.cd_ordemserv}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                continue
+        # Ordens encerradas por dia a partir do resumo diário
+        ordens_fechadas = ResumoDiarioOrdem.objects.filter(
+            evento='encerramento',
+            dia__gte=data_inicio_semana,
+            dia__lte=data_fim_semana
+        ).values('dia').annotate(total=Sum('total')).order_by()
+        for item in ordens_fechadas:
+            ordens_por_dia[item['dia'].strftime('%Y-%m-%d')] += item['total']
         
         # Criar lista de todos os dias da semana
-        from datetime import timedelta
         current_date = data_inicio_semana
         while current_date <= data_fim_semana:
             data_key = current_date.strftime('%Y-%m-%d')
@@ -342,49 +225,6 @@ def home(request):
     
     # Converter para JSON para o template
     import json
-    # Garantir que sempre temos arrays válidos (mesmo que vazios)
-    if not ordens_fechadas_labels:
-        ordens_fechadas_labels = []
-    if not ordens_fechadas_data:
-        ordens_fechadas_data = []
-    
-    # Debug: imprimir dados calculados
-    print(f"DEBUG - Gráfico Ordens Fechadas (usando dt_encordmanu):")
-    print(f"  Data de hoje: {hoje}")
-    print(f"  Semana: {semana_atual.semana if semana_atual else 'N/A'}")
-    print(f"  Data início semana: {data_inicio_semana}, Data fim semana: {data_fim_semana}")
-    print(f"  Total de ordens processadas: {ordens_fechadas.count()}")
-    print(f"  Labels: {ordens_fechadas_labels}")
-    print(f"  Data: {ordens_fechadas_data}")
-    print(f"  Total de ordens fechadas na semana: {sum(ordens_fechadas_data)}")
-    
-    # Debug adicional: verificar se há ordens com dt_encordmanu = 07/12/2025
-    # Tentar encontrar ordem com ID 7 ou com data 07/12/2025
-    ordem_teste = OrdemServicoCorretiva.objects.filter(cd_ordemserv=7).first()
-    if not ordem_teste:
-        # Tentar encontrar qualquer ordem com essa data
-        ordens_com_data = OrdemServicoCorretiva.objects.exclude(dt_encordmanu__isnull=True).exclude(dt_encordmanu='')
-        for ordem in ordens_com_data:
-            if '07/12/2025' in str(ordem.dt_encordmanu):
-                ordem_teste = ordem
-                break
-    
-    if ordem_teste:
-        print(f"DEBUG - Ordem encontrada (ID: {ordem_teste.cd_ordemserv}):")
-        print(f"  dt_encordmanu: {ordem_teste.dt_encordmanu}")
-        ordem_date_teste = parse_date_from_string(ordem_teste.dt_encordmanu)
-        print(f"  Data parseada: {ordem_date_teste}")
-        if ordem_date_teste:
-            print(f"  Está na semana atual ({data_inicio_semana} a {data_fim_semana})? {data_inicio_semana <= ordem_date_teste <= data_fim_semana if data_inicio_semana and data_fim_semana else 'N/A'}")
-            # Verificar qual semana contém essa data
-            semana_com_data = Semana52.objects.filter(
-                inicio__lte=ordem_date_teste,
-                fim__gte=ordem_date_teste
-            ).first()
-            if semana_com_data:
-                print(f"  Esta data pertence à semana: {semana_com_data.semana} ({semana_com_data.inicio} a {semana_com_data.fim})")
-            else:
-                print(f"  Nenhuma semana encontrada que contenha esta data!")
     
     ordens_fechadas_labels_json = json.dumps(ordens_fechadas_labels)
     ordens_fechadas_data_json = json.dumps(ordens_fechadas_data)
@@ -440,11 +280,11 @@ def em_desenvolvimento(request):
 
 def analise_requisicoes(request):
     """Análise de requisições de almoxarifado"""
-    from app.models import RequisicaoAlmoxarifado
+    from app.models import RequisicaoAlmoxarifado, ResumoDiarioRequisicao
     from decimal import Decimal
     from datetime import datetime, timedelta
-    from django.db.models import Sum, Count, Q, Avg
-    from collections import defaultdict
+    from django.db.models import Sum, Count, Q, Avg, F
+    from django.db.models.functions import Abs, TruncMonth
     import json
     from calendar import monthrange
     
@@ -464,8 +304,9 @@ def analise_requisicoes(request):
     # Debug: verificar se os filtros estão sendo recebidos
     # print(f"DEBUG - Filtros recebidos: data_inicio={data_inicio_str}, data_fim={data_fim_str}, ano={ano_selecionado}, mes={mes_selecionado}")
     
-    # Construir queryset base com filtros
+    # Construir queryset base com filtros (requisições e resumo diário com os mesmos filtros de data)
     queryset_base = RequisicaoAlmoxarifado.objects.all()
+    resumo_base = ResumoDiarioRequisicao.objects.all()
     
     # Prioridade: Se há filtro de intervalo de datas, usar apenas ele
     # Caso contrário, usar filtro de ano/mês
@@ -478,6 +319,7 @@ def analise_requisicoes(request):
             try:
                 data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d').date()
                 queryset_base = queryset_base.filter(data_requisicao__gte=data_inicio)
+                resumo_base = resumo_base.filter(dia__gte=data_inicio)
             except ValueError as e:
                 # print(f"DEBUG - Erro ao parse data_inicio: {e}")
                 pass
@@ -486,6 +328,7 @@ def analise_requisicoes(request):
             try:
                 data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date()
                 queryset_base = queryset_base.filter(data_requisicao__lte=data_fim)
+                resumo_base = resumo_base.filter(dia__lte=data_fim)
             except ValueError as e:
                 # print(f"DEBUG - Erro ao parse data_fim: {e}")
                 pass
@@ -494,11 +337,13 @@ def analise_requisicoes(request):
         try:
             ano = int(ano_selecionado)
             queryset_base = queryset_base.filter(data_requisicao__year=ano)
+            resumo_base = resumo_base.filter(dia__year=ano)
             
             if mes_selecionado:
                 try:
                     mes = int(mes_selecionado)
                     queryset_base = queryset_base.filter(data_requisicao__month=mes)
+                    resumo_base = resumo_base.filter(dia__month=mes)
                 except ValueError as e:
                     # print(f"DEBUG - Erro ao parse mes: {e}")
                     pass
@@ -513,14 +358,14 @@ def analise_requisicoes(request):
     
     # Estatísticas gerais (usando queryset filtrado)
     hoje = datetime.now().date()
-    total_requisicoes = queryset_base.count()
+    total_requisicoes = resumo_base.aggregate(total_geral=Sum('total'))['total_geral'] or 0
     
     # Últimos 30 dias (apenas se não houver filtros de data)
     if not tem_filtro_data_range and not tem_filtro_ano_mes:
         data_30_dias_atras = hoje - timedelta(days=30)
-        requisicoes_recentes = queryset_base.filter(
-            data_requisicao__gte=data_30_dias_atras
-        ).count()
+        requisicoes_recentes = resumo_base.filter(
+            dia__gte=data_30_dias_atras
+        ).aggregate(total_geral=Sum('total'))['total_geral'] or 0
     else:
         # Se há filtros, mostrar total filtrado
         requisicoes_recentes = total_requisicoes
@@ -528,30 +373,29 @@ def analise_requisicoes(request):
     # Mês atual (apenas se não houver filtros de data)
     if not tem_filtro_data_range and not tem_filtro_ano_mes:
         primeiro_dia_mes = hoje.replace(day=1)
-        requisicoes_mes_atual = queryset_base.filter(
-            data_requisicao__gte=primeiro_dia_mes
-        ).count()
+        requisicoes_mes_atual = resumo_base.filter(
+            dia__gte=primeiro_dia_mes
+        ).aggregate(total_geral=Sum('total'))['total_geral'] or 0
     else:
         # Se há filtros, mostrar total filtrado
         requisicoes_mes_atual = total_requisicoes
     
     # Itens únicos
-    itens_unicos = queryset_base.values('cd_item').distinct().count()
+    itens_unicos = resumo_base.values('cd_item').distinct().count()
     
     # Centros de atividade únicos
-    centros_unicos = queryset_base.exclude(
+    centros_unicos = resumo_base.exclude(
         cd_centro_ativ__isnull=True
     ).values('cd_centro_ativ').distinct().count()
     
     # Calcular valor total (vlr_movto_estoq já é o valor total da linha, não precisa multiplicar por quantidade)
-    valor_total = Decimal('0.00')
-    quantidade_total = Decimal('0.00')
-    for req in queryset_base:
-        if req.vlr_movto_estoq:
-            # vlr_movto_estoq já representa o valor total da transação (pode ser negativo para saídas)
-            valor_total += abs(req.vlr_movto_estoq)
-        if req.qtde_movto_estoq:
-            quantidade_total += abs(req.qtde_movto_estoq)
+    # vlr_movto_estoq pode ser negativo para saídas: o resumo diário já guarda a soma dos valores absolutos
+    totais = resumo_base.aggregate(
+        valor_total=Sum('valor_absoluto'),
+        quantidade_total=Sum('quantidade_absoluta'),
+    )
+    valor_total = totais['valor_total'] or Decimal('0.00')
+    quantidade_total = totais['quantidade_total'] or Decimal('0.00')
     
     # Valor médio por requisição
     valor_medio = valor_total / total_requisicoes if total_requisicoes > 0 else Decimal('0.00')
@@ -596,30 +440,26 @@ def analise_requisicoes(request):
         periodo_inicio = (hoje - timedelta(days=365)).replace(day=1)
         periodo_fim = hoje
     
+    # Totais por mês do período em uma única consulta agrupada
+    totais_por_mes = {
+        linha['mes']: linha
+        for linha in resumo_base.filter(
+            dia__gte=periodo_inicio.replace(day=1),
+            dia__lte=periodo_fim,
+        ).order_by().annotate(mes=TruncMonth('dia')).values('mes').annotate(
+            total_mes=Sum('total'),
+            valor_mes=Sum('valor_absoluto'),
+        )
+    }
+    
     # Gerar meses do período
     data_atual = periodo_inicio.replace(day=1)
     while data_atual <= periodo_fim:
-        # Calcular último dia do mês
-        ultimo_dia_mes = monthrange(data_atual.year, data_atual.month)[1]
-        fim_mes_calc = datetime(data_atual.year, data_atual.month, ultimo_dia_mes).date()
-        fim_mes = fim_mes_calc if fim_mes_calc <= periodo_fim else periodo_fim
-        
-        count = queryset_base.filter(
-            data_requisicao__gte=data_atual,
-            data_requisicao__lte=fim_mes
-        ).count()
-        
-        valor_mes = Decimal('0.00')
-        for req in queryset_base.filter(
-            data_requisicao__gte=data_atual,
-            data_requisicao__lte=fim_mes
-        ):
-            if req.vlr_movto_estoq:
-                valor_mes += abs(req.vlr_movto_estoq)
+        totais_mes = totais_por_mes.get(data_atual, {})
         
         meses_labels.append(data_atual.strftime('%b/%Y'))
-        meses_data.append(count)
-        meses_valor.append(float(valor_mes))
+        meses_data.append(totais_mes.get('total_mes', 0))
+        meses_valor.append(float(totais_mes.get('valor_mes') or 0))
         
         # Próximo mês
         if data_atual.month == 12:
@@ -644,16 +484,9 @@ def analise_requisicoes(request):
         top_itens_data.append(abs(float(item['total_qtd'])))
     
     # Top 10 itens por valor
-    top_itens_valor = []
-    itens_valor_dict = defaultdict(lambda: Decimal('0.00'))
-    
-    for req in queryset_base.exclude(vlr_movto_estoq__isnull=True):
-        if req.vlr_movto_estoq:
-            # vlr_movto_estoq já representa o valor total da transação
-            itens_valor_dict[req.cd_item] += abs(req.vlr_movto_estoq)
-    
-    # Ordenar e pegar top 10
-    sorted_itens = sorted(itens_valor_dict.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_itens = resumo_base.exclude(valor_absoluto=0).order_by().values_list('cd_item').annotate(
+        valor_item=Sum('valor_absoluto')
+    ).order_by('-valor_item', 'cd_item')[:10]
     
     top_itens_valor_labels = []
     top_itens_valor_data = []
@@ -666,63 +499,53 @@ def analise_requisicoes(request):
         top_itens_valor_data.append(float(valor))
     
     # Distribuição por centro de atividade (top 10)
-    centros_dict = defaultdict(lambda: {'count': 0, 'valor': Decimal('0.00')})
-    
-    for req in queryset_base.exclude(cd_centro_ativ__isnull=True):
-        centros_dict[req.cd_centro_ativ]['count'] += 1
-        if req.vlr_movto_estoq:
-            # vlr_movto_estoq já representa o valor total da transação
-            centros_dict[req.cd_centro_ativ]['valor'] += abs(req.vlr_movto_estoq)
-    
-    sorted_centros = sorted(centros_dict.items(), key=lambda x: x[1]['valor'], reverse=True)[:10]
+    sorted_centros = resumo_base.exclude(cd_centro_ativ__isnull=True).order_by().values(
+        'cd_centro_ativ'
+    ).annotate(
+        count=Sum('total'),
+        valor_centro=Sum('valor_absoluto'),
+    ).order_by(F('valor_centro').desc(nulls_last=True), 'cd_centro_ativ')[:10]
     
     centros_labels = []
     centros_data_count = []
     centros_data_valor = []
-    for centro_id, dados in sorted_centros:
-        centros_labels.append(str(centro_id))
+    for dados in sorted_centros:
+        centros_labels.append(str(dados['cd_centro_ativ']))
         centros_data_count.append(dados['count'])
-        centros_data_valor.append(float(dados['valor']))
+        centros_data_valor.append(float(dados['valor_centro'] or 0))
     
     # Distribuição por operação (top 10)
-    operacoes_dict = defaultdict(lambda: {'count': 0, 'valor': Decimal('0.00')})
-    
-    for req in queryset_base.exclude(descr_operacao__isnull=True).exclude(descr_operacao=''):
-        operacoes_dict[req.descr_operacao]['count'] += 1
-        if req.vlr_movto_estoq:
-            # vlr_movto_estoq já representa o valor total da transação
-            operacoes_dict[req.descr_operacao]['valor'] += abs(req.vlr_movto_estoq)
-    
-    sorted_operacoes = sorted(operacoes_dict.items(), key=lambda x: x[1]['count'], reverse=True)[:10]
+    sorted_operacoes = queryset_base.exclude(descr_operacao__isnull=True).exclude(
+        descr_operacao=''
+    ).order_by().values_list('descr_operacao').annotate(count=Count('pk')).order_by('-count', 'descr_operacao')[:10]
     
     operacoes_labels = []
     operacoes_data = []
-    for operacao, dados in sorted_operacoes:
+    for operacao, count in sorted_operacoes:
         if len(operacao) > 30:
             operacao = operacao[:27] + "..."
         operacoes_labels.append(operacao)
-        operacoes_data.append(dados['count'])
+        operacoes_data.append(count)
     
     # Requisições recentes (últimas 20)
     requisicoes_recentes_list = queryset_base.order_by('-data_requisicao', '-created_at')[:20]
     
     # Top 10 usuários que criaram requisições
-    usuarios_dict = defaultdict(lambda: {'count': 0, 'valor': Decimal('0.00')})
-    
-    for req in queryset_base.exclude(cd_usu_criou__isnull=True).exclude(cd_usu_criou=''):
-        usuarios_dict[req.cd_usu_criou]['count'] += 1
-        if req.vlr_movto_estoq:
-            usuarios_dict[req.cd_usu_criou]['valor'] += abs(req.vlr_movto_estoq)
-    
-    sorted_usuarios = sorted(usuarios_dict.items(), key=lambda x: x[1]['count'], reverse=True)[:10]
+    sorted_usuarios = queryset_base.exclude(cd_usu_criou__isnull=True).exclude(
+        cd_usu_criou=''
+    ).order_by().values('cd_usu_criou').annotate(
+        count=Count('pk'),
+        valor=Sum(Abs('vlr_movto_estoq')),
+    ).order_by('-count', 'cd_usu_criou')[:10]
     
     usuarios_labels = []
     usuarios_data_count = []
     usuarios_data_valor = []
-    for usuario, dados in sorted_usuarios:
+    for dados in sorted_usuarios:
+        usuario = dados['cd_usu_criou']
         usuarios_labels.append(str(usuario) if usuario else 'Não informado')
         usuarios_data_count.append(dados['count'])
-        usuarios_data_valor.append(float(dados['valor']))
+        usuarios_data_valor.append(float(dados['valor'] or 0))
     
     # Dados diários para o mês selecionado (para o gráfico de evolução diária)
     if ano_selecionado and mes_selecionado:
@@ -754,19 +577,24 @@ def analise_requisicoes(request):
     dias_data = []
     dias_valor = []
     
+    totais_por_dia = {
+        linha['dia']: linha
+        for linha in resumo_base.filter(
+            dia__gte=primeiro_dia_mes_atual,
+            dia__lte=ultimo_dia_mes_atual,
+        ).order_by().values('dia').annotate(
+            total_dia=Sum('total'),
+            valor_dia=Sum('valor_absoluto'),
+        )
+    }
+    
     for dia in range(1, ultimo_dia_mes_atual.day + 1):
         data_dia = primeiro_dia_mes_atual.replace(day=dia)
-        count = queryset_base.filter(data_requisicao=data_dia).count()
-        
-        valor_dia = Decimal('0.00')
-        for req in queryset_base.filter(data_requisicao=data_dia):
-            if req.vlr_movto_estoq:
-                # vlr_movto_estoq já representa o valor total da transação
-                valor_dia += abs(req.vlr_movto_estoq)
+        totais_dia = totais_por_dia.get(data_dia, {})
         
         dias_labels.append(data_dia.strftime('%d/%m'))
-        dias_data.append(count)
-        dias_valor.append(float(valor_dia))
+        dias_data.append(totais_dia.get('total_dia', 0))
+        dias_valor.append(float(totais_dia.get('valor_dia') or 0))
     
     # Determinar mês selecionado para o gráfico diário
     if ano_selecionado and mes_selecionado:
@@ -876,8 +704,9 @@ def api_dados_diarios_requisicoes(request):
     """API endpoint para obter dados diários de requisições, manutenções terceiro e visitas para um mês específico"""
     from django.http import JsonResponse
     from calendar import monthrange
-    from app.models import RequisicaoAlmoxarifado, ManutencaoTerceiro, Visitas
-    from decimal import Decimal
+    from app.models import ResumoDiarioRequisicao, ManutencaoTerceiro, Visitas
+    from app.utils import agregar_por_dia
+    from django.db.models import Sum
     from datetime import datetime
     
     if request.method != 'GET':
@@ -906,31 +735,30 @@ def api_dados_diarios_requisicoes(request):
         dias_manutencao_terceiro = []  # Manutenções Terceiro
         dias_visitas = []  # Visitas
         
+        # Uma consulta agrupada por dia para cada fonte (requisições a partir do resumo diário)
+        requisicoes_por_dia = {
+            linha['dia']: linha
+            for linha in ResumoDiarioRequisicao.objects.filter(
+                dia__gte=primeiro_dia,
+                dia__lte=ultimo_dia,
+            ).order_by().values('dia').annotate(
+                total_dia=Sum('total'),
+                valor_dia=Sum('valor_absoluto'),
+            )
+        }
+        # ManutencaoTerceiro e Visitas: data é DateTimeField, agrupada pelo dia local
+        manutencoes_por_dia = agregar_por_dia(ManutencaoTerceiro.objects.all(), 'data', primeiro_dia, ultimo_dia)
+        visitas_por_dia = agregar_por_dia(Visitas.objects.all(), 'data', primeiro_dia, ultimo_dia)
+        
         for dia in range(1, ultimo_dia.day + 1):
             data_dia = primeiro_dia.replace(day=dia)
-            
-            # Requisições de Almoxarifado
-            count = RequisicaoAlmoxarifado.objects.filter(data_requisicao=data_dia).count()
-            valor_dia = Decimal('0.00')
-            for req in RequisicaoAlmoxarifado.objects.filter(data_requisicao=data_dia):
-                if req.vlr_movto_estoq:
-                    valor_dia += abs(req.vlr_movto_estoq)
-            
-            # Manutenções Terceiro (filtrar por data, que é DateTimeField)
-            manutencao_count = ManutencaoTerceiro.objects.filter(
-                data__date=data_dia
-            ).count()
-            
-            # Visitas (filtrar por data, que é DateTimeField)
-            visitas_count = Visitas.objects.filter(
-                data__date=data_dia
-            ).count()
+            requisicoes_dia = requisicoes_por_dia.get(data_dia, {})
             
             dias_labels.append(data_dia.strftime('%d/%m'))
-            dias_data.append(count)
-            dias_valor.append(float(valor_dia))
-            dias_manutencao_terceiro.append(manutencao_count)
-            dias_visitas.append(visitas_count)
+            dias_data.append(requisicoes_dia.get('total_dia', 0))
+            dias_valor.append(float(requisicoes_dia.get('valor_dia') or 0))
+            dias_manutencao_terceiro.append(manutencoes_por_dia.get(data_dia, {}).get('total', 0))
+            dias_visitas.append(visitas_por_dia.get(data_dia, {}).get('total', 0))
         
         return JsonResponse({
             'labels': dias_labels,
@@ -1018,6 +846,7 @@ def analise_plano_preventiva(request):
 def analise_roteiro_plano_preventiva(request):
     """Análise de Roteiro e Plano de Preventiva - Encontrar relações baseadas em campos específicos"""
     from app.models import PlanoPreventiva, RoteiroPreventiva, MeuPlanoPreventiva, Maquina
+    from app.utils import relacionar_planos_roteiros
     from django.core.paginator import Paginator
     from django.db import transaction
     from django.contrib import messages
@@ -1038,110 +867,76 @@ def analise_roteiro_plano_preventiva(request):
             relacionamentos_confirmados = 0
             relacionamentos_erro = 0
             
-            # Get all planos and roteiros
-            planos = PlanoPreventiva.objects.all()
-            roteiros = RoteiroPreventiva.objects.all()
+            # Relacionar planos e roteiros por chave composta (hash join)
+            pares, _, _ = relacionar_planos_roteiros(
+                PlanoPreventiva.objects.all(), RoteiroPreventiva.objects.all()
+            )
             
-            # Helper function to check if fields match (same as campos_correspondem)
-            def campos_correspondem(plano, roteiro):
-                if not plano.cd_maquina or not roteiro.cd_maquina:
-                    return False
-                if plano.cd_maquina != roteiro.cd_maquina:
-                    return False
-                
-                descr_plano = (plano.descr_maquina or '').strip().upper()
-                descr_roteiro = (roteiro.descr_maquina or '').strip().upper()
-                if descr_plano and descr_roteiro:
-                    if descr_plano != descr_roteiro:
-                        return False
-                elif descr_plano or descr_roteiro:
-                    return False
-                
-                if not plano.sequencia_tarefa or not roteiro.cd_tarefamanu:
-                    return False
-                if plano.sequencia_tarefa != roteiro.cd_tarefamanu:
-                    return False
-                
-                descr_tarefa_plano = (plano.descr_tarefa or '').strip().upper()
-                descr_tarefa_roteiro = (roteiro.descr_tarefamanu or '').strip().upper()
-                if descr_tarefa_plano and descr_tarefa_roteiro:
-                    if descr_tarefa_plano != descr_tarefa_roteiro:
-                        return False
-                elif descr_tarefa_plano or descr_tarefa_roteiro:
-                    return False
-                
-                if not plano.sequencia_manutencao or not roteiro.seq_seqplamanu:
-                    return False
-                if plano.sequencia_manutencao != roteiro.seq_seqplamanu:
-                    return False
-                
-                return True
+            # Combinações já salvas em MeuPlanoPreventiva (mesma chave usada no get_or_create)
+            ja_salvos = set(MeuPlanoPreventiva.objects.values_list(
+                'cd_maquina', 'numero_plano', 'sequencia_manutencao', 'sequencia_tarefa'
+            ))
             
             # Process all relationships
             with transaction.atomic():
-                for plano in planos:
-                    for roteiro in roteiros:
-                        if campos_correspondem(plano, roteiro):
-                            # Check if already saved
-                            ja_existe = MeuPlanoPreventiva.objects.filter(
+                for plano, roteiro in pares:
+                    chave_salva = (
+                        plano.cd_maquina, plano.numero_plano,
+                        plano.sequencia_manutencao, plano.sequencia_tarefa,
+                    )
+                    if chave_salva not in ja_salvos:
+                        try:
+                            meu_plano, created = MeuPlanoPreventiva.objects.get_or_create(
                                 cd_maquina=plano.cd_maquina,
                                 numero_plano=plano.numero_plano,
                                 sequencia_manutencao=plano.sequencia_manutencao,
-                                sequencia_tarefa=plano.sequencia_tarefa
-                            ).exists()
+                                sequencia_tarefa=plano.sequencia_tarefa,
+                                defaults={
+                                    'cd_unid': plano.cd_unid,
+                                    'nome_unid': plano.nome_unid,
+                                    'cd_setor': plano.cd_setor,
+                                    'descr_setor': plano.descr_setor,
+                                    'cd_atividade': plano.cd_atividade,
+                                    'descr_maquina': plano.descr_maquina,
+                                    'nro_patrimonio': plano.nro_patrimonio,
+                                    'descr_plano': plano.descr_plano,
+                                    'dt_execucao': plano.dt_execucao,
+                                    'quantidade_periodo': plano.quantidade_periodo,
+                                    'descr_tarefa': plano.descr_tarefa,
+                                    'cd_funcionario': plano.cd_funcionario,
+                                    'nome_funcionario': plano.nome_funcionario,
+                                    'descr_seqplamanu': roteiro.descr_seqplamanu,
+                                    'desc_detalhada_do_roteiro_preventiva': roteiro.descr_seqplamanu,
+                                    'roteiro_preventiva': roteiro,
+                                    'maquina': plano.maquina,
+                                }
+                            )
                             
-                            if not ja_existe:
-                                try:
-                                    meu_plano, created = MeuPlanoPreventiva.objects.get_or_create(
-                                        cd_maquina=plano.cd_maquina,
-                                        numero_plano=plano.numero_plano,
-                                        sequencia_manutencao=plano.sequencia_manutencao,
-                                        sequencia_tarefa=plano.sequencia_tarefa,
-                                        defaults={
-                                            'cd_unid': plano.cd_unid,
-                                            'nome_unid': plano.nome_unid,
-                                            'cd_setor': plano.cd_setor,
-                                            'descr_setor': plano.descr_setor,
-                                            'cd_atividade': plano.cd_atividade,
-                                            'descr_maquina': plano.descr_maquina,
-                                            'nro_patrimonio': plano.nro_patrimonio,
-                                            'descr_plano': plano.descr_plano,
-                                            'dt_execucao': plano.dt_execucao,
-                                            'quantidade_periodo': plano.quantidade_periodo,
-                                            'descr_tarefa': plano.descr_tarefa,
-                                            'cd_funcionario': plano.cd_funcionario,
-                                            'nome_funcionario': plano.nome_funcionario,
-                                            'descr_seqplamanu': roteiro.descr_seqplamanu,
-                                            'desc_detalhada_do_roteiro_preventiva': roteiro.descr_seqplamanu,
-                                            'roteiro_preventiva': roteiro,
-                                            'maquina': plano.maquina,
-                                        }
-                                    )
-                                    
-                                    if not created:
-                                        meu_plano.desc_detalhada_do_roteiro_preventiva = roteiro.descr_seqplamanu
-                                        meu_plano.descr_seqplamanu = roteiro.descr_seqplamanu
-                                        meu_plano.roteiro_preventiva = roteiro
-                                        meu_plano.cd_unid = plano.cd_unid
-                                        meu_plano.nome_unid = plano.nome_unid
-                                        meu_plano.cd_setor = plano.cd_setor
-                                        meu_plano.descr_setor = plano.descr_setor
-                                        meu_plano.cd_atividade = plano.cd_atividade
-                                        meu_plano.descr_maquina = plano.descr_maquina
-                                        meu_plano.nro_patrimonio = plano.nro_patrimonio
-                                        meu_plano.descr_plano = plano.descr_plano
-                                        meu_plano.dt_execucao = plano.dt_execucao
-                                        meu_plano.quantidade_periodo = plano.quantidade_periodo
-                                        meu_plano.descr_tarefa = plano.descr_tarefa
-                                        meu_plano.cd_funcionario = plano.cd_funcionario
-                                        meu_plano.nome_funcionario = plano.nome_funcionario
-                                        meu_plano.maquina = plano.maquina
-                                        meu_plano.save()
-                                    
-                                    relacionamentos_confirmados += 1
-                                except Exception as e:
-                                    relacionamentos_erro += 1
-                                    print(f"Erro ao confirmar relação Plano {plano.id} - Roteiro {roteiro.id}: {str(e)}")
+                            if not created:
+                                meu_plano.desc_detalhada_do_roteiro_preventiva = roteiro.descr_seqplamanu
+                                meu_plano.descr_seqplamanu = roteiro.descr_seqplamanu
+                                meu_plano.roteiro_preventiva = roteiro
+                                meu_plano.cd_unid = plano.cd_unid
+                                meu_plano.nome_unid = plano.nome_unid
+                                meu_plano.cd_setor = plano.cd_setor
+                                meu_plano.descr_setor = plano.descr_setor
+                                meu_plano.cd_atividade = plano.cd_atividade
+                                meu_plano.descr_maquina = plano.descr_maquina
+                                meu_plano.nro_patrimonio = plano.nro_patrimonio
+                                meu_plano.descr_plano = plano.descr_plano
+                                meu_plano.dt_execucao = plano.dt_execucao
+                                meu_plano.quantidade_periodo = plano.quantidade_periodo
+                                meu_plano.descr_tarefa = plano.descr_tarefa
+                                meu_plano.cd_funcionario = plano.cd_funcionario
+                                meu_plano.nome_funcionario = plano.nome_funcionario
+                                meu_plano.maquina = plano.maquina
+                                meu_plano.save()
+                            
+                            ja_salvos.add(chave_salva)
+                            relacionamentos_confirmados += 1
+                        except Exception as e:
+                            relacionamentos_erro += 1
+                            print(f"Erro ao confirmar relação Plano {plano.id} - Roteiro {roteiro.id}: {str(e)}")
             
             if relacionamentos_confirmados > 0:
                 messages.success(request, f'{relacionamentos_confirmados} relação(ões) confirmada(s) e salva(s) com sucesso!')
@@ -1242,56 +1037,17 @@ def analise_roteiro_plano_preventiva(request):
     total_planos = planos.count()
     total_roteiros = roteiros.count()
     
-    # Encontrar relacionamentos baseados em correspondência exata dos campos
+    # Encontrar relacionamentos baseados em correspondência exata dos campos (hash join)
+    pares, planos_sem_match, roteiros_sem_match = relacionar_planos_roteiros(planos, roteiros)
+    
     relacionamentos = []
     planos_sem_relacao = []
     roteiros_sem_relacao = []
     
-    # Processar planos e encontrar relacionamentos
-    planos_processados = set()
-    roteiros_processados = set()
-    
-    def campos_correspondem(plano, roteiro):
-        """Verifica se os campos principais correspondem exatamente"""
-        # Comparar cd_maquina (ambos devem ter valor e serem iguais)
-        if not plano.cd_maquina or not roteiro.cd_maquina:
-            return False
-        if plano.cd_maquina != roteiro.cd_maquina:
-            return False
-        
-        # Comparar descr_maquina (ignorar case e espaços, mas ambos devem ter valor)
-        descr_plano = (plano.descr_maquina or '').strip().upper()
-        descr_roteiro = (roteiro.descr_maquina or '').strip().upper()
-        if descr_plano and descr_roteiro:
-            if descr_plano != descr_roteiro:
-                return False
-        elif descr_plano or descr_roteiro:
-            # Se apenas um tem valor, não corresponde
-            return False
-        
-        # Comparar sequencia_tarefa (Plano) com cd_tarefamanu (Roteiro)
-        if not plano.sequencia_tarefa or not roteiro.cd_tarefamanu:
-            return False
-        if plano.sequencia_tarefa != roteiro.cd_tarefamanu:
-            return False
-        
-        # Comparar descr_tarefa (Plano) com descr_tarefamanu (Roteiro) - ignorar case e espaços
-        descr_tarefa_plano = (plano.descr_tarefa or '').strip().upper()
-        descr_tarefa_roteiro = (roteiro.descr_tarefamanu or '').strip().upper()
-        if descr_tarefa_plano and descr_tarefa_roteiro:
-            if descr_tarefa_plano != descr_tarefa_roteiro:
-                return False
-        elif descr_tarefa_plano or descr_tarefa_roteiro:
-            # Se apenas um tem valor, não corresponde
-            return False
-        
-        # Comparar sequencia_manutencao (Plano) com seq_seqplamanu (Roteiro)
-        if not plano.sequencia_manutencao or not roteiro.seq_seqplamanu:
-            return False
-        if plano.sequencia_manutencao != roteiro.seq_seqplamanu:
-            return False
-        
-        return True
+    # Combinações já salvas em MeuPlanoPreventiva (mesma chave usada no get_or_create)
+    ja_salvos = set(MeuPlanoPreventiva.objects.values_list(
+        'cd_maquina', 'numero_plano', 'sequencia_manutencao', 'sequencia_tarefa'
+    ))
     
     # Função para calcular score parcial de match
     def calcular_score_parcial(plano, roteiro):
@@ -1337,72 +1093,49 @@ def analise_roteiro_plano_preventiva(request):
             return 0
         return (score / total * 100)
     
-    for plano in planos:
-        melhor_match = None
-        melhor_score = 0
-        
-        # Buscar roteiros que correspondem exatamente
-        for roteiro in roteiros:
-            if campos_correspondem(plano, roteiro):
-                melhor_match = roteiro
-                melhor_score = 100
-                break
-        
-        if melhor_match:
-            # Verificar se já foi salvo em MeuPlanoPreventiva
-            # Usar a mesma combinação de campos usada no get_or_create
-            ja_salvo = MeuPlanoPreventiva.objects.filter(
-                cd_maquina=plano.cd_maquina,
-                numero_plano=plano.numero_plano,
-                sequencia_manutencao=plano.sequencia_manutencao,
-                sequencia_tarefa=plano.sequencia_tarefa
-            ).exists()
-            
-            relacionamentos.append({
-                'plano': plano,
-                'roteiro': melhor_match,
-                'descr_seqplamanu': melhor_match.descr_seqplamanu,
-                'ja_salvo': ja_salvo,
-            })
-            planos_processados.add(plano.id)
-            roteiros_processados.add(melhor_match.id)
-        else:
-            # Encontrar melhor match parcial para exibição (sempre encontrar o melhor, mesmo que score < 40%)
-            # Isso permite mostrar análise de erros mesmo quando não há match parcial bom
-            melhor_match_parcial = None
-            melhor_score_parcial = 0
-            for roteiro in roteiros:
-                if roteiro.id not in roteiros_processados:
-                    score = calcular_score_parcial(plano, roteiro)
-                    if score > melhor_score_parcial:  # Sempre encontrar o melhor, mesmo que baixo
-                        melhor_score_parcial = score
-                        melhor_match_parcial = roteiro
-            
-            planos_sem_relacao.append({
-                'plano': plano,
-                'melhor_match_parcial': melhor_match_parcial,
-                'score_parcial': melhor_score_parcial,
-            })
+    for plano, roteiro in pares:
+        relacionamentos.append({
+            'plano': plano,
+            'roteiro': roteiro,
+            'descr_seqplamanu': roteiro.descr_seqplamanu,
+            'ja_salvo': (
+                plano.cd_maquina, plano.numero_plano,
+                plano.sequencia_manutencao, plano.sequencia_tarefa,
+            ) in ja_salvos,
+        })
+    
+    # Encontrar melhor match parcial para exibição (sempre encontrar o melhor, mesmo que score < 40%)
+    # Isso permite mostrar análise de erros mesmo quando não há match parcial bom
+    for plano in planos_sem_match:
+        melhor_match_parcial = None
+        melhor_score_parcial = 0
+        for roteiro in roteiros_sem_match:
+            score = calcular_score_parcial(plano, roteiro)
+            if score > melhor_score_parcial:
+                melhor_score_parcial = score
+                melhor_match_parcial = roteiro
+        
+        planos_sem_relacao.append({
+            'plano': plano,
+            'melhor_match_parcial': melhor_match_parcial,
+            'score_parcial': melhor_score_parcial,
+        })
     
     # Encontrar roteiros sem plano correspondente
-    for roteiro in roteiros:
-        if roteiro.id not in roteiros_processados:
-            # Encontrar melhor match parcial para exibição (sempre encontrar o melhor, mesmo que score < 40%)
-            # Isso permite mostrar análise de erros mesmo quando não há match parcial bom
-            melhor_match_parcial = None
-            melhor_score_parcial = 0
-            for plano in planos:
-                if plano.id not in planos_processados:
-                    score = calcular_score_parcial(plano, roteiro)
-                    if score > melhor_score_parcial:  # Sempre encontrar o melhor, mesmo que baixo
-                        melhor_score_parcial = score
-                        melhor_match_parcial = plano
-            
-            roteiros_sem_relacao.append({
-                'roteiro': roteiro,
-                'melhor_match_parcial': melhor_match_parcial,
-                'score_parcial': melhor_score_parcial,
-            })
+    for roteiro in roteiros_sem_match:
+        melhor_match_parcial = None
+        melhor_score_parcial = 0
+        for plano in planos_sem_match:
+            score = calcular_score_parcial(plano, roteiro)
+            if score > melhor_score_parcial:
+                melhor_score_parcial = score
+                melhor_match_parcial = plano
+        
+        roteiros_sem_relacao.append({
+            'roteiro': roteiro,
+            'melhor_match_parcial': melhor_match_parcial,
+            'score_parcial': melhor_score_parcial,
+        })
     
     # Filtros - Obter valores ANTES de aplicar
     filter_maquina = request.GET.get('filter_maquina', '').strip()
@@ -1960,6 +1693,42 @@ def embalagem_industrializados(request):
     return render(request, 'centros_de_atividade/embalagem_industrializados.html', context)
 
 
+def _enfileirar_importacao(request, tipo, arquivos, pagina, **parametros):
+    """Registra a importação para rodar em segundo plano e volta à página, que acompanha o progresso"""
+    from app.importacoes import enfileirar_importacao
+    from django.urls import reverse
+    
+    try:
+        importacao = enfileirar_importacao(tipo, arquivos, **parametros)
+    except Exception as e:
+        messages.error(request, f'Erro ao receber arquivo: {str(e)}')
+        return redirect(pagina)
+    
+    if isinstance(arquivos, (list, tuple)) and len(arquivos) > 1:
+        recebido = f'{len(arquivos)} arquivos recebidos'
+    else:
+        recebido = f'Arquivo "{importacao.nome_arquivo}" recebido'
+    messages.info(
+        request,
+        f'{recebido}. A importação está sendo processada em segundo plano; acompanhe o andamento nesta página.'
+    )
+    return redirect(f"{reverse(pagina)}?importacao={importacao.pk}")
+
+
+def api_importacao_status(request, pk):
+    """API endpoint com a situação e o progresso de uma importação em segundo plano (consultado pelas telas de importação)"""
+    from app.importacoes import status_importacao
+    from app.models import ImportacaoArquivo
+    
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    
+    importacao = ImportacaoArquivo.objects.filter(pk=pk).first()
+    if importacao is None:
+        return JsonResponse({'error': 'Importação não encontrada'}, status=404)
+    return JsonResponse(status_importacao(importacao))
+
+
 def importar_maquinas(request):
     """Importar Máquinas page view"""
     if request.method == 'POST':
@@ -1970,7 +1739,7 @@ def importar_maquinas(request):
                 'page_title': 'Importar Máquinas',
                 'active_page': 'importar_maquinas'
             }
-            return render(request, 'importar/maquinas.html', context)
+            return render(request, 'importar/importar_maquinas.html', context)
         
         file = request.FILES['file']
         
@@ -1987,7 +1756,7 @@ def importar_maquinas(request):
                 'page_title': 'Importar Máquinas',
                 'active_page': 'importar_maquinas'
             }
-            return render(request, 'importar/maquinas.html', context)
+            return render(request, 'importar/importar_maquinas.html', context)
         
         # Verificar se deve apenas adicionar novos registros (ignorar duplicados)
         only_new_records = request.POST.get('only_new_records', 'off') == 'on'
@@ -2010,45 +1779,17 @@ def importar_maquinas(request):
                         'descr_gerenc'
                     ]
         
-        try:
-            from app.utils import upload_maquinas_from_file
-            
-            # Fazer upload dos dados
-            # Se only_new_records estiver marcado, update_existing será False (ignora duplicados)
-            created_count, updated_count, errors = upload_maquinas_from_file(
-                file, 
-                update_existing=update_existing,
-                update_fields=update_fields if update_existing else None
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(
-                        request, 
-                        f'... e mais {len(errors) - 10} erro(s). Verifique o arquivo.'
-                    )
-            
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Importação concluída com sucesso! '
-                if created_count > 0:
-                    success_msg += f'{created_count} registro(s) criado(s). '
-                if updated_count > 0:
-                    success_msg += f'{updated_count} registro(s) atualizado(s).'
-                messages.success(request, success_msg)
-            elif not errors:
-                messages.info(request, 'Nenhum registro foi importado.')
-            
-        except Exception as e:
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
+        return _enfileirar_importacao(
+            request, 'maquinas', file, 'importar_maquinas',
+            update_existing=update_existing,
+            update_fields=update_fields if update_existing else None,
+        )
     
     context = {
         'page_title': 'Importar Máquinas',
         'active_page': 'importar_maquinas'
     }
-    return render(request, 'importar/maquinas.html', context)
+    return render(request, 'importar/importar_maquinas.html', context)
 
 
 def importar_manutentores(request):
@@ -2086,39 +1827,10 @@ def importar_manutentores(request):
         update_existing = request.POST.get('update_existing', 'off') == 'on'
         print(f"DEBUG - Update existing: {update_existing}")
         
-        try:
-            from app.utils import upload_manutentores_from_file
-            
-            # Fazer upload dos dados
-            print("DEBUG - Iniciando upload...")
-            created_count, updated_count, errors = upload_manutentores_from_file(
-                file,
-                update_existing=update_existing
-            )
-            
-            print(f"DEBUG - Upload concluído: {created_count} criados, {updated_count} atualizados, {len(errors)} erros")
-            
-            # Exibir mensagens
-            if created_count > 0:
-                messages.success(request, f'{created_count} manutentor(es) criado(s) com sucesso!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} manutentor(es) atualizado(s) com sucesso!')
-            if errors:
-                for error in errors[:10]:  # Limitar a 10 erros para não sobrecarregar
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(request, f'... e mais {len(errors) - 10} erro(s). Verifique o arquivo.')
-            if created_count == 0 and updated_count == 0 and not errors:
-                messages.info(request, 'Nenhum registro foi importado. Verifique se o arquivo contém dados válidos.')
-        
-        except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"DEBUG - Erro durante upload: {error_detail}")
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
-        
-        # Sempre redirecionar para consultar_manutentores após importação
-        return redirect('consultar_manutentores')
+        return _enfileirar_importacao(
+            request, 'manutentores', file, 'importar_manutentores',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Manutentores',
@@ -2162,51 +1874,10 @@ def importar_ordens_corretivas_e_outros(request):
         update_existing = request.POST.get('update_existing', 'off') == 'on'
         print(f"DEBUG - Update existing: {update_existing}")
         
-        try:
-            from app.utils import upload_ordens_corretivas_from_file
-            
-            # Fazer upload dos dados
-            print("DEBUG - Iniciando upload...")
-            created_count, updated_count, errors = upload_ordens_corretivas_from_file(
-                file, 
-                update_existing=update_existing
-            )
-            print(f"DEBUG - Upload concluído: criados={created_count}, atualizados={updated_count}, erros={len(errors)}")
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(
-                        request, 
-                        f'... e mais {len(errors) - 10} erro(s). Verifique o arquivo.'
-                    )
-            
-            # Sempre redirecionar após tentativa de importação, independente do resultado
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Importação concluída com sucesso! '
-                if created_count > 0:
-                    success_msg += f'{created_count} registro(s) criado(s). '
-                if updated_count > 0:
-                    success_msg += f'{updated_count} registro(s) atualizado(s).'
-                messages.success(request, success_msg)
-            elif not errors:
-                messages.info(request, 'Nenhum registro foi importado.')
-            else:
-                # Se houver apenas erros, ainda redireciona mas mostra os erros
-                messages.warning(request, 'Importação concluída com erros. Verifique as mensagens acima.')
-            
-            # Redirecionar para a página de consulta após importação
-            return redirect('consultar_corretivas_outros')
-            
-        except Exception as e:
-            import traceback
-            print(f"DEBUG - Erro: {str(e)}")
-            print(f"DEBUG - Traceback: {traceback.format_exc()}")
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
-            # Redirecionar mesmo em caso de erro para não ficar na página de importação
-            return redirect('consultar_corretivas_outros')
+        return _enfileirar_importacao(
+            request, 'ordens_corretivas', file, 'importar_ordens_corretivas_e_outros',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Ordens Corretivas e Outros',
@@ -2262,32 +1933,10 @@ def importar_plano_preventiva(request):
         if not only_new_records:
             update_existing = request.POST.get('update_existing', 'off') == 'on'
         
-        try:
-            from app.utils import upload_plano_preventiva_from_file
-            
-            # Fazer upload dos dados
-            # Se only_new_records estiver marcado, update_existing será False (ignora duplicados)
-            created_count, updated_count, errors = upload_plano_preventiva_from_file(
-                file, 
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(request, f'... e mais {len(errors) - 10} erros.')
-            
-            if created_count > 0:
-                messages.success(request, f'{created_count} registro(s) de plano preventiva criado(s) com sucesso!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} registro(s) de plano preventiva atualizado(s)!')
-            if created_count == 0 and updated_count == 0 and not errors:
-                messages.info(request, 'Nenhum registro novo foi importado. Todos os registros já existem no banco de dados.')
-            
-        except Exception as e:
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
+        return _enfileirar_importacao(
+            request, 'plano_preventiva', file, 'importar_plano_preventiva',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Plano Preventiva',
@@ -2334,32 +1983,10 @@ def importar_roteiro_preventiva(request):
         if not only_new_records:
             update_existing = request.POST.get('update_existing', 'off') == 'on'
         
-        try:
-            from app.utils import upload_roteiro_preventiva_from_file
-            
-            # Fazer upload dos dados
-            # Se only_new_records estiver marcado, update_existing será False (ignora duplicados)
-            created_count, updated_count, errors = upload_roteiro_preventiva_from_file(
-                file, 
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(request, f'... e mais {len(errors) - 10} erros.')
-            
-            if created_count > 0:
-                messages.success(request, f'{created_count} registro(s) de roteiro preventiva criado(s) com sucesso!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} registro(s) de roteiro preventiva atualizado(s)!')
-            if created_count == 0 and updated_count == 0 and not errors:
-                messages.info(request, 'Nenhum registro novo foi importado. Todos os registros já existem no banco de dados.')
-            
-        except Exception as e:
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
+        return _enfileirar_importacao(
+            request, 'roteiro_preventiva', file, 'importar_roteiro_preventiva',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Roteiro Preventiva',
@@ -2406,38 +2033,10 @@ def importar_52_semanas(request):
         if not only_new_records:
             update_existing = request.POST.get('update_existing', 'off') == 'on'
         
-        try:
-            from app.utils import upload_52_semanas_from_file
-            import traceback
-            
-            # Fazer upload dos dados
-            # Se only_new_records estiver marcado, update_existing será False (ignora duplicados)
-            created_count, updated_count, errors = upload_52_semanas_from_file(
-                file, 
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(request, f'... e mais {len(errors) - 10} erros.')
-            
-            if created_count > 0:
-                messages.success(request, f'{created_count} semana(s) criada(s) com sucesso!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} semana(s) atualizada(s)!')
-            if created_count == 0 and updated_count == 0 and not errors:
-                messages.info(request, 'Nenhum registro novo foi importado. Todas as semanas já existem no banco de dados.')
-            
-        except Exception as e:
-            error_msg = f'Erro ao importar arquivo: {str(e)}'
-            messages.error(request, error_msg)
-            # Log detalhado do erro para debug
-            import traceback
-            print(f"Erro ao importar 52 semanas: {error_msg}")
-            traceback.print_exc()
+        return _enfileirar_importacao(
+            request, 'semanas_52', file, 'importar_52_semanas',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar 52 Semanas',
@@ -2448,7 +2047,6 @@ def importar_52_semanas(request):
 
 def importar_notas_fiscais(request):
     """Importar Notas Fiscais page view"""
-    from app.utils import upload_notas_fiscais_from_file
     from django.contrib import messages
     
     if request.method == 'POST':
@@ -2469,27 +2067,10 @@ def importar_notas_fiscais(request):
         if only_new_records:
             update_existing = False
         
-        # Processar arquivo
-        try:
-            created_count, updated_count, errors = upload_notas_fiscais_from_file(file, update_existing=update_existing)
-            
-            # Mensagens de sucesso
-            if created_count > 0:
-                messages.success(request, f'{created_count} nota(s) fiscal(is) importada(s) com sucesso!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} nota(s) fiscal(is) atualizada(s).')
-            if created_count == 0 and updated_count == 0:
-                messages.warning(request, 'Nenhuma nota fiscal foi importada. Verifique se há novos registros no arquivo.')
-            
-            # Mensagens de erro
-            if errors:
-                for error in errors[:10]:  # Limitar a 10 erros para não sobrecarregar
-                    messages.error(request, error)
-                if len(errors) > 10:
-                    messages.error(request, f'... e mais {len(errors) - 10} erro(s). Verifique o console para mais detalhes.')
-        
-        except Exception as e:
-            messages.error(request, f'Erro ao processar arquivo: {str(e)}')
+        return _enfileirar_importacao(
+            request, 'notas_fiscais', file, 'importar_notas_fiscais',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Notas Fiscais',
@@ -2498,6 +2079,29 @@ def importar_notas_fiscais(request):
     return render(request, 'importar/importar_notas_fiscais.html', context)
 
 
+def _importar_requisicoes_almoxarifado_em_lote(request, files):
+    """Enfileira a importação de vários CSVs diários (ou ZIPs) de requisições; a data de cada arquivo vem do nome"""
+    from datetime import datetime
+    
+    # Data informada no formulário: usada apenas para arquivos sem data no nome
+    data_padrao = None
+    data_requisicao_str = request.POST.get('data_requisicao')
+    if data_requisicao_str and request.POST.get('use_file_name_date') != 'on':
+        try:
+            data_padrao = datetime.strptime(data_requisicao_str, '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, f'Formato de data inválido: {data_requisicao_str}. Use YYYY-MM-DD')
+    
+    only_new_records = request.POST.get('only_new_records', 'off') == 'on'
+    update_existing = not only_new_records and request.POST.get('update_existing', 'off') == 'on'
+    
+    return _enfileirar_importacao(
+        request, 'requisicoes_almoxarifado_lote', files, 'importar_requisicoes_almoxarifado',
+        update_existing=update_existing,
+        data_padrao=data_padrao,
+    )
+
+
 def importar_requisicoes_almoxarifado(request):
     """Importar Requisições Almoxarifado page view"""
     if request.method == 'POST':
@@ -2510,25 +2114,25 @@ def importar_requisicoes_almoxarifado(request):
             }
             return render(request, 'importar/importar_requisicoes_almoxaridado.html', context)
         
-        file = request.FILES['file']
+        files = request.FILES.getlist('file')
+        
+        # Importação em lote: vários arquivos ou ZIP com um CSV por dia
+        if len(files) > 1 or any(f.name.lower().endswith('.zip') for f in files):
+            return _importar_requisicoes_almoxarifado_em_lote(request, files)
+        
+        file = files[0]
         use_file_name_date = request.POST.get('use_file_name_date') == 'on'
         data_requisicao_str = request.POST.get('data_requisicao')
         
         # Se usar data do nome do arquivo, extrair do nome
         if use_file_name_date:
-            import re
+            from app.utils import extrair_data_nome_arquivo
             file_name = file.name
-            # Remover extensão
-            name_without_ext = file_name.replace('.csv', '').replace('.CSV', '')
-            # Tentar padrão DD.MM.YYYY
-            date_pattern = r'(\d{2})\.(\d{2})\.(\d{4})'
-            match = re.search(date_pattern, name_without_ext)
+            # Padrão DD.MM.YYYY
+            data_nome_arquivo = extrair_data_nome_arquivo(file_name)
             
-            if match:
-                day = match.group(1)
-                month = match.group(2)
-                year = match.group(3)
-                data_requisicao_str = f"{year}-{month}-{day}"
+            if data_nome_arquivo:
+                data_requisicao_str = data_nome_arquivo.strftime('%Y-%m-%d')
             else:
                 messages.error(request, f'Não foi possível extrair a data do nome do arquivo "{file_name}". O formato esperado é DD.MM.YYYY (ex: 01.11.2025.csv).')
                 context = {
@@ -2570,49 +2174,24 @@ def importar_requisicoes_almoxarifado(request):
         if not only_new_records:
             update_existing = request.POST.get('update_existing', 'off') == 'on'
         
+        from datetime import datetime
+        
+        # Converter data_requisicao_str para date
         try:
-            from app.utils import upload_requisicoes_almoxarifado_from_file
-            from datetime import datetime
-            
-            # Converter data_requisicao_str para date
-            try:
-                data_requisicao = datetime.strptime(data_requisicao_str, '%Y-%m-%d').date()
-            except ValueError:
-                messages.error(request, f'Formato de data inválido: {data_requisicao_str}. Use YYYY-MM-DD')
-                context = {
-                    'page_title': 'Importar Requisições Almoxarifado',
-                    'active_page': 'importar_requisicoes_almoxarifado'
-                }
-                return render(request, 'importar/importar_requisicoes_almoxaridado.html', context)
-            
-            # Fazer upload dos dados
-            created_count, updated_count, errors = upload_requisicoes_almoxarifado_from_file(
-                file, 
-                data_requisicao=data_requisicao,
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(request, f'... e mais {len(errors) - 10} erros.')
-            
-            if created_count > 0:
-                messages.success(request, f'{created_count} requisição(ões) criada(s) com sucesso para a data {data_requisicao.strftime("%d/%m/%Y")}!')
-            if updated_count > 0:
-                messages.info(request, f'{updated_count} requisição(ões) atualizada(s) para a data {data_requisicao.strftime("%d/%m/%Y")}!')
-            if created_count == 0 and updated_count == 0 and not errors:
-                messages.info(request, f'Nenhum registro novo foi importado para a data {data_requisicao.strftime("%d/%m/%Y")}. Todas as requisições já existem no banco de dados.')
-            
-        except Exception as e:
-            error_msg = f'Erro ao importar arquivo: {str(e)}'
-            messages.error(request, error_msg)
-            # Log detalhado do erro para debug
-            import traceback
-            print(f"Erro ao importar requisições almoxarifado: {error_msg}")
-            traceback.print_exc()
+            data_requisicao = datetime.strptime(data_requisicao_str, '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, f'Formato de data inválido: {data_requisicao_str}. Use YYYY-MM-DD')
+            context = {
+                'page_title': 'Importar Requisições Almoxarifado',
+                'active_page': 'importar_requisicoes_almoxarifado'
+            }
+            return render(request, 'importar/importar_requisicoes_almoxaridado.html', context)
+        
+        return _enfileirar_importacao(
+            request, 'requisicoes_almoxarifado', file, 'importar_requisicoes_almoxarifado',
+            data_requisicao=data_requisicao,
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Requisições Almoxarifado',
@@ -2653,42 +2232,10 @@ def importar_estoque(request):
         # Verificar se deve atualizar registros existentes
         update_existing = request.POST.get('update_existing', 'off') == 'on'
         
-        try:
-            from app.utils import upload_itens_estoque_from_file
-            
-            # Fazer upload dos dados
-            created_count, updated_count, errors = upload_itens_estoque_from_file(
-                file,
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(
-                        request,
-                        f'... e mais {len(errors) - 10} erro(s). Verifique o arquivo.'
-                    )
-            
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Importação concluída com sucesso! '
-                if created_count > 0:
-                    success_msg += f'{created_count} registro(s) criado(s). '
-                if updated_count > 0:
-                    success_msg += f'{updated_count} registro(s) atualizado(s).'
-                messages.success(request, success_msg)
-            elif not errors:
-                messages.info(request, 'Nenhum registro foi importado.')
-            else:
-                messages.warning(request, 'Importação concluída com erros. Verifique as mensagens acima.')
-            
-        except Exception as e:
-            import traceback
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
-            print(f"DEBUG - Erro: {str(e)}")
-            print(f"DEBUG - Traceback: {traceback.format_exc()}")
+        return _enfileirar_importacao(
+            request, 'itens_estoque', file, 'importar_estoque',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Estoque',
@@ -2700,6 +2247,7 @@ def importar_estoque(request):
 def consultar_estoque(request):
     """Consultar/listar itens de estoque cadastrados com filtros avançados"""
     from app.models import ItemEstoque
+    from app.busca import filtro_busca
     from decimal import Decimal
     
     # Buscar todos os itens de estoque
@@ -2722,13 +2270,10 @@ def consultar_estoque(request):
             print(f"DEBUG consultar_estoque - Could not convert '{search_query}' to number")
             pass
         
-        # Para campos de texto, usar icontains
-        text_conditions = (
-            Q(descricao_item__icontains=search_query) |
-            Q(unidade_medida__icontains=search_query) |
-            Q(descricao_dest_uso__icontains=search_query) |
-            Q(classificacao_tempo_sem_consumo__icontains=search_query)
-        )
+        # Para campos de texto, usar o índice de busca (FTS5)
+        text_conditions = filtro_busca(ItemEstoque, search_query, (
+            'descricao_item', 'unidade_medida', 'descricao_dest_uso', 'classificacao_tempo_sem_consumo',
+        ))
         search_conditions |= text_conditions
         print(f"DEBUG consultar_estoque - Added text search conditions")
         
@@ -2886,41 +2431,10 @@ def importar_locais_e_cas(request):
         if not only_new_records:
             update_existing = request.POST.get('update_existing', 'off') == 'on'
         
-        try:
-            from app.utils import upload_cas_from_file
-            
-            # Fazer upload dos dados
-            # Se only_new_records estiver marcado, update_existing será False (ignora duplicados)
-            created_count, updated_count, errors = upload_cas_from_file(
-                file, 
-                update_existing=update_existing
-            )
-            
-            # Preparar mensagens
-            if errors:
-                for error in errors[:10]:  # Mostrar apenas os primeiros 10 erros
-                    messages.warning(request, error)
-                if len(errors) > 10:
-                    messages.warning(
-                        request, 
-                        f'... e mais {len(errors) - 10} erro(s). Verifique o arquivo.'
-                    )
-            
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Importação concluída com sucesso! '
-                if created_count > 0:
-                    success_msg += f'{created_count} registro(s) criado(s). '
-                if updated_count > 0:
-                    success_msg += f'{updated_count} registro(s) atualizado(s).'
-                messages.success(request, success_msg)
-            elif not errors:
-                messages.info(request, 'Nenhum registro foi importado.')
-            
-        except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            messages.error(request, f'Erro ao importar arquivo: {str(e)}')
-            print(f"DEBUG - Erro ao importar: {error_detail}")
+        return _enfileirar_importacao(
+            request, 'cas', file, 'importar_locais_e_cas',
+            update_existing=update_existing,
+        )
     
     context = {
         'page_title': 'Importar Locais e CAs',
@@ -3294,8 +2808,8 @@ def cadastrar_maquina(request):
 
 def analise_maquinas(request):
     """Página de análise de máquinas com gráficos e estatísticas"""
-    from app.models import Maquina, OrdemServicoCorretiva
-    from django.db.models import Count, Q
+    from app.models import Maquina, ResumoDiarioOrdem
+    from django.db.models import Count, Q, Sum
     from datetime import datetime, timedelta
     from collections import defaultdict
     import json
@@ -3390,12 +2904,13 @@ def analise_maquinas(request):
     mes_atual = datetime.now().replace(day=1)
     maquinas_mes_atual = Maquina.objects.filter(created_at__gte=mes_atual).count()
     
-    # Top 10 máquinas com mais ordens de serviço
-    top_maquinas_os = OrdemServicoCorretiva.objects.exclude(
+    # Top 10 máquinas com mais ordens de serviço (resumo diário do evento de abertura,
+    # que inclui as ordens sem data de abertura)
+    top_maquinas_os = ResumoDiarioOrdem.objects.filter(evento='abertura').exclude(
         cd_maquina__isnull=True
-    ).values('cd_maquina').annotate(
-        total=Count('id')
-    ).order_by('-total')[:10]
+    ).order_by().values('cd_maquina').annotate(
+        qtd=Sum('total')
+    ).order_by('-qtd', 'cd_maquina')[:10]
     
     # Buscar descrições das máquinas
     top_maquinas_os_list = []
@@ -3405,13 +2920,13 @@ def analise_maquinas(request):
             top_maquinas_os_list.append({
                 'cd_maquina': item['cd_maquina'],
                 'descr_maquina': maquina.descr_maquina or 'Sem descrição',
-                'total': item['total']
+                'total': item['qtd']
             })
         except Maquina.DoesNotExist:
             top_maquinas_os_list.append({
                 'cd_maquina': item['cd_maquina'],
                 'descr_maquina': 'Máquina não encontrada',
-                'total': item['total']
+                'total': item['qtd']
             })
     
     maquinas_os_labels = [f"{item['cd_maquina']} - {item['descr_maquina'][:40]}" for item in top_maquinas_os_list]
@@ -3658,6 +3173,7 @@ def analise_maquinas_importadas(request):
 def consultar_maquinas(request):
     """Consultar/listar máquinas cadastradas"""
     from app.models import Maquina
+    from app.busca import filtro_busca
     
     # Buscar todas as máquinas
     maquinas_list = Maquina.objects.all()
@@ -3675,14 +3191,10 @@ def consultar_maquinas(request):
         except (ValueError, TypeError):
             pass
         
-        # Para campos de texto, usar icontains
-        search_conditions |= (
-            Q(descr_maquina__icontains=search_query) |
-            Q(cd_setormanut__icontains=search_query) |
-            Q(descr_setormanut__icontains=search_query) |
-            Q(nome_unid__icontains=search_query) |
-            Q(nro_patrimonio__icontains=search_query)
-        )
+        # Para campos de texto, usar o índice de busca (FTS5)
+        search_conditions |= filtro_busca(Maquina, search_query, (
+            'descr_maquina', 'cd_setormanut', 'descr_setormanut', 'nome_unid', 'nro_patrimonio',
+        ))
         
         maquinas_list = maquinas_list.filter(search_conditions)
     
@@ -3937,6 +3449,7 @@ def consultar_manutencoes_preventivas(request):
 def consultar_meu_plano(request):
     """Consultar/listar Meus Planos Preventiva (MeuPlanoPreventiva)"""
     from app.models import MeuPlanoPreventiva
+    from app.busca import filtro_busca
     
     # Buscar todos os meus planos preventiva
     planos_list = MeuPlanoPreventiva.objects.all().select_related('maquina', 'roteiro_preventiva')
@@ -3954,19 +3467,11 @@ def consultar_meu_plano(request):
         except (ValueError, TypeError):
             pass
         
-        # Para campos de texto, usar icontains
-        search_conditions |= (
-            Q(descr_maquina__icontains=search_query) |
-            Q(descr_tarefa__icontains=search_query) |
-            Q(nome_funcionario__icontains=search_query) |
-            Q(cd_funcionario__icontains=search_query) |
-            Q(cd_setor__icontains=search_query) |
-            Q(descr_setor__icontains=search_query) |
-            Q(nome_unid__icontains=search_query) |
-            Q(descr_plano__icontains=search_query) |
-            Q(desc_detalhada_do_roteiro_preventiva__icontains=search_query) |
-            Q(descr_seqplamanu__icontains=search_query)
-        )
+        # Para campos de texto, usar o índice de busca (FTS5)
+        search_conditions |= filtro_busca(MeuPlanoPreventiva, search_query, (
+            'descr_maquina', 'descr_tarefa', 'nome_funcionario', 'cd_funcionario', 'cd_setor', 'descr_setor',
+            'nome_unid', 'descr_plano', 'desc_detalhada_do_roteiro_preventiva', 'descr_seqplamanu',
+        ))
         
         planos_list = planos_list.filter(search_conditions)
     
@@ -4337,6 +3842,7 @@ def analise_requisicoes_data_importada(request):
 def consultar_notas_fiscais(request):
     """Consultar/listar notas fiscais com filtros avançados"""
     from app.models import NotaFiscal
+    from app.busca import filtro_busca
     from decimal import Decimal
     from datetime import datetime
     
@@ -4350,19 +3856,13 @@ def consultar_notas_fiscais(request):
         try:
             search_num = int(float(search_query))
             notas_list = notas_list.filter(
-                Q(nota__icontains=search_query) |
-                Q(emitente__icontains=search_query) |
-                Q(nome_fantasia_emitente__icontains=search_query) |
+                filtro_busca(NotaFiscal, search_query, ('nota', 'emitente', 'nome_fantasia_emitente')) |
                 Q(total_nota=search_num)
             )
         except (ValueError, TypeError):
-            notas_list = notas_list.filter(
-                Q(nota__icontains=search_query) |
-                Q(emitente__icontains=search_query) |
-                Q(nome_fantasia_emitente__icontains=search_query) |
-                Q(nome_unidade__icontains=search_query) |
-                Q(situacao__icontains=search_query)
-            )
+            notas_list = notas_list.filter(filtro_busca(NotaFiscal, search_query, (
+                'nota', 'emitente', 'nome_fantasia_emitente', 'nome_unidade', 'situacao',
+            )))
     
     # Filtros específicos
     filtro_nota = request.GET.get('filtro_nota', '').strip()
@@ -4587,9 +4087,29 @@ def consultar_52_semanas(request):
 
 def analise_geral_plano_preventiva_pcm(request):
     """Análise geral dos dados de Plano Preventiva PCM - Dashboard com estatísticas"""
+    from app.models import (
+        MeuPlanoPreventiva, PlanoPreventiva, RoteiroPreventiva, MaquinaPrimariaSecundaria,
+        Maquina, MeuPlanoPreventivaDocumento, Semana52, RelacionamentoPlanoRoteiro,
+    )
+    from app.utils import contexto_dashboard_em_cache
+    
+    context = contexto_dashboard_em_cache(
+        request, 'analise_geral_plano_preventiva_pcm',
+        [
+            MeuPlanoPreventiva, PlanoPreventiva, RoteiroPreventiva, MaquinaPrimariaSecundaria,
+            Maquina, MeuPlanoPreventivaDocumento, Semana52, RelacionamentoPlanoRoteiro,
+        ],
+        _contexto_analise_geral_plano_preventiva_pcm,
+    )
+    return render(request, 'planejamento/analise_geral_plano_preventiva_pcm.html', context)
+
+
+def _contexto_analise_geral_plano_preventiva_pcm(request):
+    """Calcula o contexto da análise geral do Plano Preventiva PCM"""
     from app.models import (
         MeuPlanoPreventiva, PlanoPreventiva, RoteiroPreventiva,
-        MaquinaPrimariaSecundaria, Maquina, MeuPlanoPreventivaDocumento, Semana52
+        MaquinaPrimariaSecundaria, Maquina, MeuPlanoPreventivaDocumento, Semana52,
+        RelacionamentoPlanoRoteiro
     )
     from django.db.models import Count, Q
     from datetime import date, timedelta
@@ -4621,59 +4141,10 @@ def analise_geral_plano_preventiva_pcm(request):
     total_planos = PlanoPreventiva.objects.count()
     total_roteiros = RoteiroPreventiva.objects.count()
     
-    # Função para verificar correspondência exata
-    def campos_correspondem(plano, roteiro):
-        if not plano.cd_maquina or not roteiro.cd_maquina:
-            return False
-        if plano.cd_maquina != roteiro.cd_maquina:
-            return False
-        
-        descr_plano = (plano.descr_maquina or '').strip().upper()
-        descr_roteiro = (roteiro.descr_maquina or '').strip().upper()
-        if descr_plano and descr_roteiro:
-            if descr_plano != descr_roteiro:
-                return False
-        elif descr_plano or descr_roteiro:
-            return False
-        
-        if not plano.sequencia_tarefa or not roteiro.cd_tarefamanu:
-            return False
-        if plano.sequencia_tarefa != roteiro.cd_tarefamanu:
-            return False
-        
-        descr_tarefa_plano = (plano.descr_tarefa or '').strip().upper()
-        descr_tarefa_roteiro = (roteiro.descr_tarefamanu or '').strip().upper()
-        if descr_tarefa_plano and descr_tarefa_roteiro:
-            if descr_tarefa_plano != descr_tarefa_roteiro:
-                return False
-        elif descr_tarefa_plano or descr_tarefa_roteiro:
-            return False
-        
-        if not plano.sequencia_manutencao or not roteiro.seq_seqplamanu:
-            return False
-        if plano.sequencia_manutencao != roteiro.seq_seqplamanu:
-            return False
-        
-        return True
-    
-    # Contar relacionamentos encontrados
-    relacionamentos_encontrados = 0
-    planos_processados = set()
-    roteiros_processados = set()
-    
-    planos_list = PlanoPreventiva.objects.all()
-    roteiros_list = RoteiroPreventiva.objects.all()
-    
-    for plano in planos_list:
-        for roteiro in roteiros_list:
-            if campos_correspondem(plano, roteiro):
-                relacionamentos_encontrados += 1
-                planos_processados.add(plano.id)
-                roteiros_processados.add(roteiro.id)
-                break
-    
-    planos_sem_relacao = total_planos - len(planos_processados)
-    roteiros_sem_relacao = total_roteiros - len(roteiros_processados)
+    # Contar relacionamentos encontrados (tabela mantida pelos importadores de plano e roteiro)
+    relacionamentos_encontrados = RelacionamentoPlanoRoteiro.objects.count()
+    planos_sem_relacao = PlanoPreventiva.objects.filter(relacionamento_roteiro__isnull=True).count()
+    roteiros_sem_relacao = RoteiroPreventiva.objects.filter(relacionamentos_plano__isnull=True).count()
     
     # Relacionamentos já confirmados (salvos em MeuPlanoPreventiva)
     relacionamentos_confirmados = MeuPlanoPreventiva.objects.exclude(
@@ -4830,14 +4301,20 @@ def analise_geral_plano_preventiva_pcm(request):
         'semana_atual': semana_atual,
     }
     
-    return render(request, 'planejamento/analise_geral_plano_preventiva_pcm.html', context)
+    return context
 
 
 def analise_ordens_de_servico(request):
     """Análise de Ordens de Serviço - Dashboard com estatísticas e filtros"""
-    from app.models import OrdemServicoCorretiva, PlanoPreventiva, OrdemServicoCorretivaFicha, CentroAtividade
-    from django.db.models import Count, Q, Avg
-    from datetime import datetime, timedelta
+    from app.models import (
+        OrdemServicoCorretiva, PlanoPreventiva, OrdemServicoCorretivaFicha, CentroAtividade,
+        ResumoDiarioOrdem, intervalo_datas_ordem,
+    )
+    from django.db.models import Count, Q, Avg, Sum
+    from django.db.models.functions import TruncMonth
+    from django.utils import timezone
+    from datetime import datetime, timedelta, date
+    from calendar import monthrange
     from collections import defaultdict
     import json
     
@@ -4871,61 +4348,22 @@ def analise_ordens_de_servico(request):
     if not meses_filtro_int:
         meses_filtro_int = list(range(1, 13))
     
-    # Função para fazer parse de dt_abertura_solicita
-    def parse_dt_abertura_solicita(date_str):
-        """Tenta fazer parse de dt_abertura_solicita em vários formatos diferentes."""
-        if not date_str:
-            return None
-        
-        date_str = str(date_str).strip()
-        if not date_str:
-            return None
-        
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-        else:
-            date_part = date_str
-        
-        date_formats = [
-            '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%Y/%m/%d',
-            '%d/%m/%y', '%d-%m-%y',
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_part, fmt)
-            except (ValueError, TypeError):
-                continue
-        
-        if '/' in date_part:
-            parts = date_part.split('/')
-            if len(parts) == 3:
-                try:
-                    day, month, year = parts
-                    if len(year) == 2:
-                        year = '20' + year
-                    return datetime(int(year), int(month), int(day))
-                except (ValueError, TypeError):
-                    pass
-        
-        return None
-    
-    # Função para filtrar ordens por data
-    def filtrar_ordens_por_data(queryset, ano, meses):
-        """Filtra ordens baseado em dt_abertura_solicita"""
-        ordens_filtradas = []
-        for ordem in queryset:
-            if ordem.dt_abertura_solicita:
-                data_parseada = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-                if data_parseada:
-                    if data_parseada.year == ano:
-                        if data_parseada.month in meses:
-                            ordens_filtradas.append(ordem)
-        return ordens_filtradas
+    # Filtrar ordens pela data de abertura da solicitação (coluna tipada e indexada),
+    # um intervalo por mês selecionado
+    filtro_periodo = Q()
+    filtro_resumo = Q()
+    for mes in meses_filtro_int:
+        inicio_mes = date(ano_filtro, mes, 1)
+        fim_mes = date(ano_filtro, mes, monthrange(ano_filtro, mes)[1])
+        inicio_dt, fim_dt = intervalo_datas_ordem(inicio_mes, fim_mes)
+        filtro_periodo |= Q(dt_abertura_solicita_dt__gte=inicio_dt, dt_abertura_solicita_dt__lt=fim_dt)
+        filtro_resumo |= Q(dia__gte=inicio_mes, dia__lte=fim_mes)
     
-    # Obter todas as ordens e filtrar
     todas_ordens = OrdemServicoCorretiva.objects.all()
-    ordens_filtradas = filtrar_ordens_por_data(todas_ordens, ano_filtro, meses_filtro_int)
+    ordens_filtradas = list(todas_ordens.filter(filtro_periodo))
+    
+    # Contagens por setor, tipo de OS, máquina e mês a partir do resumo diário (evento de abertura)
+    resumo_periodo = ResumoDiarioOrdem.objects.filter(filtro_resumo, evento='abertura').order_by()
     
     # Estatísticas básicas (filtradas)
     total_corretivas = len(ordens_filtradas)
@@ -4934,20 +4372,18 @@ def analise_ordens_de_servico(request):
     
     # ========== ESTATÍSTICAS ORDEMSERVICOCORRETIVA (FILTRADAS) ==========
     # Ordens por tipo de ordem (descr_tpordservtv) - MUITO IMPORTANTE
-    ordens_por_tipo_os_dict = defaultdict(int)
-    for ordem in ordens_filtradas:
-        if ordem.descr_tpordservtv:
-            ordens_por_tipo_os_dict[ordem.descr_tpordservtv] += 1
-    ordens_por_tipo_os = sorted(ordens_por_tipo_os_dict.items(), key=lambda x: x[1], reverse=True)
+    ordens_por_tipo_os = list(
+        resumo_periodo.exclude(descr_tpordservtv__isnull=True).exclude(descr_tpordservtv='')
+        .values_list('descr_tpordservtv').annotate(qtd=Sum('total')).order_by('-qtd', 'descr_tpordservtv')
+    )
     tipos_os_labels = [item[0][:40] for item in ordens_por_tipo_os[:10]]
     tipos_os_data = [item[1] for item in ordens_por_tipo_os[:10]]
     
     # Ordens por setor (top 10)
-    ordens_por_setor_dict = defaultdict(int)
-    for ordem in ordens_filtradas:
-        if ordem.descr_setormanut:
-            ordens_por_setor_dict[ordem.descr_setormanut] += 1
-    ordens_por_setor_list = sorted(ordens_por_setor_dict.items(), key=lambda x: x[1], reverse=True)[:10]
+    ordens_por_setor_list = list(
+        resumo_periodo.exclude(descr_setormanut__isnull=True).exclude(descr_setormanut='')
+        .values_list('descr_setormanut').annotate(qtd=Sum('total')).order_by('-qtd', 'descr_setormanut')[:10]
+    )
     ordens_por_setor = [{'descr_setormanut': item[0], 'total': item[1]} for item in ordens_por_setor_list]
     setores_labels = [item[0][:30] for item in ordens_por_setor_list]
     setores_data = [item[1] for item in ordens_por_setor_list]
@@ -4990,14 +4426,15 @@ def analise_ordens_de_servico(request):
     ordens_sem_solicitante = total_corretivas - ordens_com_solicitante
     
     # Top 10 máquinas com mais ordens
-    maquinas_dict = defaultdict(int)
+    top_maquinas_list = list(
+        resumo_periodo.exclude(cd_maquina__isnull=True).exclude(cd_maquina=0)
+        .values_list('cd_maquina').annotate(qtd=Sum('total')).order_by('-qtd', 'cd_maquina')[:10]
+    )
+    top_maquinas_cds = {cd_maquina for cd_maquina, _ in top_maquinas_list}
     maquinas_desc = {}
     for ordem in ordens_filtradas:
-        if ordem.cd_maquina:
-            maquinas_dict[ordem.cd_maquina] += 1
-            if ordem.descr_maquina:
-                maquinas_desc[ordem.cd_maquina] = ordem.descr_maquina
-    top_maquinas_list = sorted(maquinas_dict.items(), key=lambda x: x[1], reverse=True)[:10]
+        if ordem.descr_maquina and ordem.cd_maquina in top_maquinas_cds:
+            maquinas_desc[ordem.cd_maquina] = ordem.descr_maquina
     top_maquinas = [{'cd_maquina': item[0], 'descr_maquina': maquinas_desc.get(item[0], ''), 'total': item[1]} for item in top_maquinas_list]
     maquinas_labels = [f"{item['cd_maquina']} - {item['descr_maquina'][:40]}" for item in top_maquinas]
     maquinas_data = [item['total'] for item in top_maquinas]
@@ -5014,12 +4451,8 @@ def analise_ordens_de_servico(request):
     
     # Ordens por mês do ano filtrado
     ordens_por_mes = defaultdict(int)
-    for ordem in ordens_filtradas:
-        if ordem.dt_abertura_solicita:
-            data_parseada = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-            if data_parseada and data_parseada.year == ano_filtro:
-                mes_ano = data_parseada.strftime('%Y-%m')
-                ordens_por_mes[mes_ano] += 1
+    for mes_resumo, qtd in resumo_periodo.annotate(mes=TruncMonth('dia')).values_list('mes').annotate(qtd=Sum('total')):
+        ordens_por_mes[mes_resumo.strftime('%Y-%m')] += qtd
     
     # Preencher todos os meses
     for mes in meses_filtro_int:
@@ -5098,13 +4531,10 @@ def analise_ordens_de_servico(request):
     unidades_count = len(unidades_unicas)
     
     # Obter lista de anos disponíveis
-    anos_disponiveis = set()
-    for ordem in todas_ordens:
-        if ordem.dt_abertura_solicita:
-            data_parseada = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-            if data_parseada:
-                anos_disponiveis.add(data_parseada.year)
-    anos_disponiveis = sorted(anos_disponiveis, reverse=True)
+    anos_disponiveis = sorted(
+        {dt.year for dt in todas_ordens.datetimes('dt_abertura_solicita_dt', 'year')},
+        reverse=True
+    )
     if not anos_disponiveis:
         anos_disponiveis = [hoje.year]
     
@@ -5173,16 +4603,32 @@ def analise_ordens_de_servico(request):
 
 def analise_ordens_importadas_com_erro(request):
     """Análise de Ordens Importadas com Erro - Detecta padrões inconsistentes nos dados"""
-    from app.models import OrdemServicoCorretiva
-    from django.db.models import Count, Q
+    from app.models import OrdemServicoCorretiva, PerfilQualidadeOrdens
+    from app.utils import contexto_dashboard_em_cache
+    
+    context = contexto_dashboard_em_cache(
+        request, 'analise_ordens_importadas_com_erro',
+        [OrdemServicoCorretiva, PerfilQualidadeOrdens],
+        _contexto_analise_ordens_importadas_com_erro,
+    )
+    return render(request, 'ordens_de_servico/analise_ordens_importadas_com_erro.html', context)
+
+
+def _contexto_analise_ordens_importadas_com_erro(request):
+    """
+    Calcula o contexto da análise de ordens importadas com erro.
+
+    Os problemas de cada ordem são gravados na importação (avaliar_qualidade_ordens, pelo
+    perfil gravado); aqui apenas são agrupados por intervalo de cd_ordemserv no banco.
+    """
+    from app.models import OrdemServicoCorretiva, PerfilQualidadeOrdens
+    from app.importacoes import enfileirar_analise_qualidade_ordens
+    from app.utils import CAMPOS_QUALIDADE_ORDEM
+    from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, Min, Q, Window
+    from django.db.models.functions import RowNumber
     from collections import defaultdict
-    from datetime import datetime
-    import json
-    import re
     
-    # Obter todas as ordens ordenadas por cd_ordemserv
-    todas_ordens = list(OrdemServicoCorretiva.objects.all().order_by('cd_ordemserv'))
-    total_ordens = int(len(todas_ordens))
+    total_ordens = OrdemServicoCorretiva.objects.count()
     
     # Se não houver ordens, retornar página vazia
     if total_ordens == 0:
@@ -5194,347 +4640,58 @@ def analise_ordens_importadas_com_erro(request):
             'total_sem_problemas': 0,
             'percentual_problemas': 0,
             'intervalos_analise': [],
+            'perfil_campos': [],
         }
-        return render(request, 'ordens_de_servico/analise_ordens_importadas_com_erro.html', context)
-    
-    # Função para detectar padrão de data
-    def detectar_formato_data(valor):
-        """Detecta o formato de data mais comum"""
-        if not valor or not str(valor).strip():
-            return None
-        
-        valor_str = str(valor).strip()
-        formatos_comuns = [
-            r'\d{2}/\d{2}/\d{4}',  # DD/MM/YYYY
-            r'\d{2}-\d{2}-\d{4}',  # DD-MM-YYYY
-            r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
-            r'\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}',  # DD/MM/YYYY HH:MM
-        ]
-        
-        for formato in formatos_comuns:
-            if re.match(formato, valor_str):
-                return formato
-        
-        return None
+        return context
     
-    # Função para verificar se um valor segue o padrão da maioria
-    def verificar_padrao_campo(campo_nome, valor, padroes_maioria):
-        """Verifica se um valor segue o padrão da maioria"""
-        problemas = []
-        
-        if valor is None or (isinstance(valor, str) and not valor.strip()):
-            # Campo vazio - verificar se a maioria tem valores
-            if padroes_maioria.get(f'{campo_nome}_preenchido', 0) > 0.8:  # 80% preenchido
-                problemas.append('Campo vazio quando deveria ter valor')
-            return problemas
-        
-        valor_str = str(valor).strip()
-        
-        # Verificar formato de data para campos de data
-        if 'dt_' in campo_nome.lower() or 'data' in campo_nome.lower():
-            formato_esperado = padroes_maioria.get(f'{campo_nome}_formato_data')
-            if formato_esperado:
-                formato_atual = detectar_formato_data(valor_str)
-                if formato_atual != formato_esperado:
-                    problemas.append(f'Formato de data inconsistente')
-        
-        # Verificar comprimento para campos de texto
-        if isinstance(valor, str):
-            comprimento_medio = padroes_maioria.get(f'{campo_nome}_comprimento_medio', 0)
-            comprimento_min = padroes_maioria.get(f'{campo_nome}_comprimento_min', 0)
-            comprimento_max = padroes_maioria.get(f'{campo_nome}_comprimento_max', 0)
-            
-            # Garantir que são numéricos
-            try:
-                comprimento_medio = float(comprimento_medio) if comprimento_medio else 0
-                comprimento_min = float(comprimento_min) if comprimento_min else 0
-                comprimento_max = float(comprimento_max) if comprimento_max else 0
-            except (ValueError, TypeError):
-                comprimento_medio = 0
-                comprimento_min = 0
-                comprimento_max = 0
-            
-            if comprimento_medio > 0:
-                comprimento_atual = len(valor_str)
-                # Verificar se está muito fora do range normal
-                if comprimento_max > comprimento_min:  # Se há variação
-                    range_normal = comprimento_max - comprimento_min
-                    if comprimento_atual < comprimento_min - range_normal * 0.5 or comprimento_atual > comprimento_max + range_normal * 0.5:
-                        problemas.append(f'Comprimento anormal')
-                elif abs(comprimento_atual - comprimento_medio) > comprimento_medio * 2:
-                    problemas.append(f'Comprimento anormal')
-        
-        # Verificar caracteres especiais suspeitos (mas permitir acentos comuns)
-        if valor_str and re.search(r'[^\w\s\-\/\.\:\(\)áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ]', valor_str, re.IGNORECASE):
-            # Verificar se não são apenas caracteres de encoding comum
-            if not re.match(r'^[\w\s\-\/\.\:\(\)áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ]+$', valor_str, re.IGNORECASE):
-                problemas.append('Caracteres especiais suspeitos')
-        
-        # Verificar campos numéricos
-        if 'cd_' in campo_nome.lower() and campo_nome.lower() not in ['cd_setormanut']:
-            try:
-                float(valor_str)
-            except (ValueError, TypeError):
-                if valor_str:  # Se não está vazio mas não é numérico
-                    problemas.append('Valor não numérico em campo numérico')
-        
-        return problemas
-    
-    # Analisar padrões da maioria dos registros
-    padroes_maioria = {}
-    campos_analisar = [
-        'dt_entrada', 'dt_abertura_solicita', 'dt_encordmanu', 'dt_aberordser',
-        'dt_iniparmanu', 'dt_fimparmanu', 'dt_prev_exec',
-        'cd_ordemserv', 'cd_maquina', 'cd_unid',
-        'nome_unid', 'descr_setormanut', 'descr_maquina',
-        'nm_func_exec', 'nm_func_solic_os', 'descr_tpordservtv',
-        'descr_sitordsetv', 'descr_tpmanuttv', 'descr_clasorigos',
-    ]
+    # Ordens importadas antes da análise gravada na importação: o perfil é calculado
+    # no worker das importações (a tabela inteira não é percorrida na requisição)
+    perfil = PerfilQualidadeOrdens.objects.order_by('pk').first()
+    if perfil is None:
+        enfileirar_analise_qualidade_ordens()
     
-    # Calcular padrões para cada campo usando uma amostra maior
-    # Garantir que total_ordens é um inteiro
-    if not isinstance(total_ordens, int):
-        total_ordens = int(total_ordens) if total_ordens else 0
-    amostra_tamanho = 5000 if total_ordens > 5000 else total_ordens
-    for campo_nome in campos_analisar:
-        valores = []
-        valores_preenchidos = 0
-        formatos_data = defaultdict(int)
-        valores_unicos = set()
-        
-        for ordem in todas_ordens[:amostra_tamanho]:
-            try:
-                valor = getattr(ordem, campo_nome, None)
-                # Verificar se valor não é um HttpResponse ou outro tipo inválido
-                from django.http import HttpResponse
-                if isinstance(valor, HttpResponse):
-                    continue
-                
-                if valor is not None:
-                    if isinstance(valor, str):
-                        if valor.strip():
-                            valores_preenchidos += 1
-                            valores.append(valor.strip())
-                            valores_unicos.add(valor.strip())
-                            # Detectar formato de data
-                            if 'dt_' in campo_nome.lower():
-                                formato = detectar_formato_data(valor.strip())
-                                if formato:
-                                    formatos_data[formato] += 1
-                    else:
-                        # Valor não-string (numérico, etc)
-                        try:
-                            valor_str = str(valor)
-                            valores_preenchidos += 1
-                            valores.append(valor_str)
-                        except:
-                            continue
-            except Exception:
-                continue
-        
-        total_amostra = amostra_tamanho
-        padroes_maioria[f'{campo_nome}_preenchido'] = valores_preenchidos / total_amostra if total_amostra > 0 else 0
-        
-        if valores:
-            # Garantir que todos os valores são strings válidas antes de calcular comprimentos
-            valores_validos = []
-            for v in valores:
-                if isinstance(v, str):
-                    valores_validos.append(v)
-                else:
-                    try:
-                        valores_validos.append(str(v))
-                    except:
-                        continue
-            
-            if valores_validos:
-                comprimentos_validos = []
-                for v in valores_validos:
-                    try:
-                        # Verificar se v é uma string válida
-                        if not isinstance(v, str):
-                            continue
-                        # Calcular comprimento
-                        comprimento = len(v)
-                        # Verificar se comprimento é um inteiro válido
-                        if isinstance(comprimento, int) and not isinstance(comprimento, bool):
-                            # Verificação adicional: garantir que não é HttpResponse
-                            from django.http import HttpResponse
-                            if not isinstance(comprimento, HttpResponse):
-                                comprimentos_validos.append(comprimento)
-                    except (TypeError, AttributeError, ValueError):
-                        continue
-                
-                # Calcular estatísticas apenas se houver valores válidos
-                if comprimentos_validos and len(comprimentos_validos) > 0:
-                    try:
-                        # Verificação final antes de usar min/max
-                        # Filtrar qualquer coisa que não seja int
-                        comprimentos_finais = [c for c in comprimentos_validos if isinstance(c, int) and not isinstance(c, bool) and type(c) is int]
-                        
-                        if comprimentos_finais and len(comprimentos_finais) > 0:
-                            soma = sum(comprimentos_finais)
-                            quantidade = len(comprimentos_finais)
-                            min_val = comprimentos_finais[0]
-                            max_val = comprimentos_finais[0]
-                            
-                            # Calcular min e max manualmente para evitar problemas
-                            for c in comprimentos_finais:
-                                if isinstance(c, int) and not isinstance(c, bool):
-                                    if c < min_val:
-                                        min_val = c
-                                    if c > max_val:
-                                        max_val = c
-                            
-                            padroes_maioria[f'{campo_nome}_comprimento_medio'] = float(soma / quantidade)
-                            padroes_maioria[f'{campo_nome}_comprimento_min'] = float(min_val)
-                            padroes_maioria[f'{campo_nome}_comprimento_max'] = float(max_val)
-                        else:
-                            padroes_maioria[f'{campo_nome}_comprimento_medio'] = 0.0
-                            padroes_maioria[f'{campo_nome}_comprimento_min'] = 0.0
-                            padroes_maioria[f'{campo_nome}_comprimento_max'] = 0.0
-                    except Exception:
-                        padroes_maioria[f'{campo_nome}_comprimento_medio'] = 0.0
-                        padroes_maioria[f'{campo_nome}_comprimento_min'] = 0.0
-                        padroes_maioria[f'{campo_nome}_comprimento_max'] = 0.0
-                else:
-                    padroes_maioria[f'{campo_nome}_comprimento_medio'] = 0.0
-                    padroes_maioria[f'{campo_nome}_comprimento_min'] = 0.0
-                    padroes_maioria[f'{campo_nome}_comprimento_max'] = 0.0
-            else:
-                padroes_maioria[f'{campo_nome}_comprimento_medio'] = 0.0
-                padroes_maioria[f'{campo_nome}_comprimento_min'] = 0.0
-                padroes_maioria[f'{campo_nome}_comprimento_max'] = 0.0
-        
-        if formatos_data:
-            formato_mais_comum = max(formatos_data.items(), key=lambda x: x[1])[0]
-            padroes_maioria[f'{campo_nome}_formato_data'] = formato_mais_comum
-            padroes_maioria[f'{campo_nome}_formato_data_count'] = formatos_data[formato_mais_comum]
-        
-        # Detectar se campo tem valores muito variados (pode indicar problema)
-        if len(valores_unicos) > 0:
-            padroes_maioria[f'{campo_nome}_diversidade'] = len(valores_unicos) / len(valores) if valores else 0
-    
-    # Analisar cada ordem e detectar problemas
-    ordens_com_problemas = []
-    for ordem in todas_ordens:
-        problemas_ordem = []
-        
-        for campo_nome in campos_analisar:
-            valor = getattr(ordem, campo_nome, None)
-            problemas_campo = verificar_padrao_campo(campo_nome, valor, padroes_maioria)
-            if problemas_campo:
-                problemas_ordem.extend([f'{campo_nome}: {p}' for p in problemas_campo])
-        
-        # Verificações adicionais específicas
-        # Data de abertura antes da data de entrada (lógico)
-        if ordem.dt_abertura_solicita and ordem.dt_entrada:
-            try:
-                dt_abertura_str = ordem.dt_abertura_solicita.split()[0] if ' ' in ordem.dt_abertura_solicita else ordem.dt_abertura_solicita
-                dt_entrada_str = ordem.dt_entrada.split()[0] if ' ' in ordem.dt_entrada else ordem.dt_entrada
-                
-                # Tentar diferentes formatos
-                formatos = ['%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d']
-                dt_abertura = None
-                dt_entrada = None
-                
-                for fmt in formatos:
-                    try:
-                        dt_abertura = datetime.strptime(dt_abertura_str, fmt)
-                        break
-                    except:
-                        continue
-                
-                for fmt in formatos:
-                    try:
-                        dt_entrada = datetime.strptime(dt_entrada_str, fmt)
-                        break
-                    except:
-                        continue
-                
-                if dt_abertura and dt_entrada and dt_abertura < dt_entrada:
-                    problemas_ordem.append('Data abertura anterior à data entrada')
-            except:
-                pass
-        
-        # Verificar se cd_ordemserv está presente e é válido
-        if not ordem.cd_ordemserv:
-            problemas_ordem.append('cd_ordemserv ausente')
-        
-        # Verificar campos críticos que geralmente devem estar preenchidos
-        if not ordem.dt_abertura_solicita or not ordem.dt_abertura_solicita.strip():
-            problemas_ordem.append('dt_abertura_solicita: Campo crítico vazio')
-        
-        # Verificar se descr_tpordservtv está presente (campo importante mencionado pelo usuário)
-        if not ordem.descr_tpordservtv or not ordem.descr_tpordservtv.strip():
-            problemas_ordem.append('descr_tpordservtv: Campo importante vazio')
-        
-        if problemas_ordem:
-            ordens_com_problemas.append({
-                'ordem': ordem,
-                'problemas': problemas_ordem,
-                'total_problemas': len(problemas_ordem)
-            })
+    total_com_problemas = OrdemServicoCorretiva.objects.filter(total_problemas_qualidade__gt=0).count()
     
     # Agrupar por intervalos de 5000 baseado em cd_ordemserv
-    intervalos_analise = []
     tamanho_intervalo = 5000
+    intervalo_expr = ExpressionWrapper(F('cd_ordemserv') / tamanho_intervalo, output_field=IntegerField())
+    ordens_numeradas = OrdemServicoCorretiva.objects.exclude(cd_ordemserv__isnull=True).annotate(
+        intervalo=intervalo_expr,
+    )
+    estatisticas_intervalos = ordens_numeradas.values('intervalo').annotate(
+        total=Count('id'),
+        com_problemas=Count('id', filter=Q(total_problemas_qualidade__gt=0)),
+        primeira_os=Min('cd_ordemserv'),
+        ultima_os=Max('cd_ordemserv'),
+    ).order_by('intervalo')
+    
+    # Ordens com problemas exibidas por intervalo (as de menor número; limitado por performance)
+    ordens_exibidas = 100
+    problemas_por_intervalo = defaultdict(list)
+    ordens_problemas_qs = ordens_numeradas.filter(total_problemas_qualidade__gt=0).annotate(
+        posicao=Window(RowNumber(), partition_by=[intervalo_expr], order_by=F('cd_ordemserv').asc()),
+    ).filter(posicao__lte=ordens_exibidas).order_by('cd_ordemserv').values(
+        'intervalo', 'id', 'cd_ordemserv', 'descr_maquina', 'dt_abertura_solicita',
+        'problemas_qualidade', 'total_problemas_qualidade',
+    )
+    for linha in ordens_problemas_qs:
+        problemas_por_intervalo[linha['intervalo']].append({
+            'ordem': {
+                'id': linha['id'],
+                'cd_ordemserv': linha['cd_ordemserv'],
+                'descr_maquina': linha['descr_maquina'],
+                'dt_abertura_solicita': linha['dt_abertura_solicita'],
+            },
+            'problemas': linha['problemas_qualidade'],
+            'total_problemas': linha['total_problemas_qualidade'],
+        })
     
-    # Encontrar o menor e maior cd_ordemserv
-    min_cd_ordemserv = None
-    max_cd_ordemserv = None
-    for ordem in todas_ordens:
-        if ordem.cd_ordemserv is not None:
-            try:
-                cd_num = int(ordem.cd_ordemserv)
-                if min_cd_ordemserv is None or cd_num < min_cd_ordemserv:
-                    min_cd_ordemserv = cd_num
-                if max_cd_ordemserv is None or cd_num > max_cd_ordemserv:
-                    max_cd_ordemserv = cd_num
-            except (ValueError, TypeError):
-                continue
-    
-    # Se não encontrou nenhum cd_ordemserv válido, retornar vazio
-    if min_cd_ordemserv is None or max_cd_ordemserv is None:
-        min_cd_ordemserv = 0
-        max_cd_ordemserv = 0
-    
-    # Criar intervalos baseados em cd_ordemserv
-    # Começar do múltiplo de 5000 mais próximo abaixo do min
-    inicio_geral = (min_cd_ordemserv // tamanho_intervalo) * tamanho_intervalo
-    fim_geral = ((max_cd_ordemserv // tamanho_intervalo) + 1) * tamanho_intervalo
-    
-    intervalo_numero = 1
-    for intervalo_inicio in range(inicio_geral, fim_geral + 1, tamanho_intervalo):
-        intervalo_fim = intervalo_inicio + tamanho_intervalo - 1
-        
-        # Filtrar ordens que estão neste intervalo de cd_ordemserv
-        ordens_intervalo = []
-        for ordem in todas_ordens:
-            if ordem.cd_ordemserv is not None:
-                try:
-                    cd_num = int(ordem.cd_ordemserv)
-                    if intervalo_inicio <= cd_num <= intervalo_fim:
-                        ordens_intervalo.append(ordem)
-                except (ValueError, TypeError):
-                    continue
-        
-        if not ordens_intervalo:
-            # Se não há ordens neste intervalo, pular
-            continue
-        
-        ordens_intervalo_ids = {ordem.id for ordem in ordens_intervalo}
-        
-        # Encontrar problemas neste intervalo
-        problemas_intervalo = []
-        for item in ordens_com_problemas:
-            if item['ordem'].id in ordens_intervalo_ids:
-                problemas_intervalo.append(item)
-        
-        # Estatísticas do intervalo
-        total_intervalo = len(ordens_intervalo)
-        total_com_problemas_intervalo = len(problemas_intervalo)
-        percentual_problemas = (total_com_problemas_intervalo / total_intervalo * 100) if total_intervalo > 0 else 0
+    intervalos_analise = []
+    for intervalo_numero, estatisticas in enumerate(estatisticas_intervalos, start=1):
+        intervalo_inicio = estatisticas['intervalo'] * tamanho_intervalo
+        total_intervalo = estatisticas['total']
+        total_com_problemas_intervalo = estatisticas['com_problemas']
+        percentual_problemas = total_com_problemas_intervalo / total_intervalo * 100
         
         # Determinar status
         if percentual_problemas == 0:
@@ -5546,30 +4703,43 @@ def analise_ordens_importadas_com_erro(request):
         else:
             status = 'alto'
         
-        # Obter primeira e última ordem do intervalo (por cd_ordemserv)
-        ordens_ordenadas = sorted(ordens_intervalo, key=lambda x: int(x.cd_ordemserv) if x.cd_ordemserv else 0)
-        primeira_ordem = ordens_ordenadas[0] if ordens_ordenadas else None
-        ultima_ordem = ordens_ordenadas[-1] if ordens_ordenadas else None
-        
         intervalos_analise.append({
             'inicio_idx': intervalo_numero,  # Número do intervalo
             'fim_idx': intervalo_numero,  # Mesmo número, pois é baseado em cd_ordemserv
             'inicio_numero': intervalo_inicio,  # Início do intervalo de cd_ordemserv
-            'fim_numero': intervalo_fim,  # Fim do intervalo de cd_ordemserv
-            'primeira_os': primeira_ordem.cd_ordemserv if primeira_ordem else None,
-            'ultima_os': ultima_ordem.cd_ordemserv if ultima_ordem else None,
+            'fim_numero': intervalo_inicio + tamanho_intervalo - 1,  # Fim do intervalo de cd_ordemserv
+            'primeira_os': estatisticas['primeira_os'],
+            'ultima_os': estatisticas['ultima_os'],
             'total': total_intervalo,
             'com_problemas': total_com_problemas_intervalo,
             'sem_problemas': total_intervalo - total_com_problemas_intervalo,
             'percentual_problemas': round(percentual_problemas, 2),
             'status': status,
-            'ordens_problemas': problemas_intervalo[:100],  # Limitar a 100 por performance
+            'ordens_problemas': problemas_por_intervalo.get(estatisticas['intervalo'], []),
+        })
+    
+    # Perfil dos campos (preenchimento e formato de data predominante) usado na análise
+    perfil_campos = []
+    campos_perfil = perfil.campos if perfil else {}
+    for campo in CAMPOS_QUALIDADE_ORDEM:
+        perfil_campo = campos_perfil.get(campo)
+        if not perfil_campo:
+            continue
+        formatos_data = perfil_campo['formatos_data']
+        perfil_campos.append({
+            'campo': campo,
+            'preenchidos': perfil_campo['preenchidos'],
+            'percentual_preenchido': round(perfil_campo['preenchimento'] * 100, 2),
+            'formato_data': perfil_campo['formato_data'],
+            'percentual_formato_data': round(
+                formatos_data[perfil_campo['formato_data']] / sum(formatos_data.values()) * 100, 2,
+            ) if perfil_campo['formato_data'] else None,
+            'comprimento_min': perfil_campo['comprimento_min'],
+            'comprimento_medio': round(perfil_campo['comprimento_medio'], 1),
+            'comprimento_max': perfil_campo['comprimento_max'],
         })
-        
-        intervalo_numero += 1
     
     # Estatísticas gerais
-    total_com_problemas = len(ordens_com_problemas)
     percentual_geral = (total_com_problemas / total_ordens * 100) if total_ordens > 0 else 0
     
     context = {
@@ -5580,26 +4750,50 @@ def analise_ordens_importadas_com_erro(request):
         'total_sem_problemas': total_ordens - total_com_problemas,
         'percentual_problemas': round(percentual_geral, 2),
         'intervalos_analise': intervalos_analise,
+        'perfil_campos': perfil_campos,
+        'perfil_atualizado_em': perfil.updated_at if perfil else None,
+        'analise_pendente': perfil is None,
     }
     
-    return render(request, 'ordens_de_servico/analise_ordens_importadas_com_erro.html', context)
+    return context
+
 
 
 def analise_faltantes_pelo_numero(request):
     """Análise de Faltantes pelo Número - Identifica números sequenciais faltantes em cd_ordemserv usando intervalos fixos de 5000"""
     from app.models import OrdemServicoCorretiva
-    from django.db.models import Min, Max, Count
+    from app.utils import contexto_dashboard_em_cache
+    
+    context = contexto_dashboard_em_cache(
+        request, 'analise_faltantes_pelo_numero',
+        [OrdemServicoCorretiva],
+        _contexto_analise_faltantes_pelo_numero,
+    )
+    return render(request, 'ordens_de_servico/analise_faltantes_pelo_numero.html', context)
+
+
+def _contexto_analise_faltantes_pelo_numero(request):
+    """
+    Calcula o contexto da análise de faltantes pelo número.
+
+    A contagem por intervalo (GROUP BY) e as faixas faltantes (LAG sobre cd_ordemserv)
+    são calculadas no banco: o custo acompanha a quantidade de ordens e de lacunas,
+    não a distância entre o menor e o maior número.
+    """
+    from app.models import OrdemServicoCorretiva
+    from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, Min, Window
+    from django.db.models.functions import Lag
     import json
-    import builtins
-    import math
     
-    # Obter todos os valores de cd_ordemserv ordenados
-    ordens = OrdemServicoCorretiva.objects.exclude(
-        cd_ordemserv__isnull=True
-    ).values_list('cd_ordemserv', flat=True).order_by('cd_ordemserv')
+    ordens = OrdemServicoCorretiva.objects.exclude(cd_ordemserv__isnull=True)
     
-    # Estatísticas básicas
-    total_ordens = ordens.count()
+    # Estatísticas básicas (cd_ordemserv é único: contagem = números distintos)
+    stats = ordens.aggregate(
+        total_ordens=Count('id'),
+        min_numero=Min('cd_ordemserv'),
+        max_numero=Max('cd_ordemserv'),
+    )
+    total_ordens = stats['total_ordens']
     
     if total_ordens == 0:
         context = {
@@ -5609,42 +4803,45 @@ def analise_faltantes_pelo_numero(request):
             'min_numero': None,
             'max_numero': None,
             'intervalos_analise': [],
+            'lacunas': [],
         }
-        return render(request, 'ordens_de_servico/analise_faltantes_pelo_numero.html', context)
-    
-    # Obter min e max usando aggregate para melhor performance
-    stats = OrdemServicoCorretiva.objects.exclude(
-        cd_ordemserv__isnull=True
-    ).aggregate(
-        min_numero=Min('cd_ordemserv'),
-        max_numero=Max('cd_ordemserv')
-    )
+        return context
     
     min_numero = int(stats['min_numero'])
     max_numero = int(stats['max_numero'])
     
-    # Converter para set para busca rápida
-    numeros_existentes = set(ordens)
+    # Lacunas listadas na página (as maiores)
+    lacunas_exibidas = 100
     
-    # Criar intervalos fixos de 5000
+    # Intervalos fixos de 5000, começando do min_numero arredondado para baixo para múltiplo de 5000
     intervalo_tamanho = 5000
-    intervalos_analise = []
     
-    # Começar do 0 ou do min_numero arredondado para baixo para múltiplo de 5000
-    inicio_geral = (min_numero // intervalo_tamanho) * intervalo_tamanho
-    fim_geral = ((max_numero // intervalo_tamanho) + 1) * intervalo_tamanho
+    # Quantidade de números existentes por intervalo (apenas intervalos com ordens)
+    existentes_por_intervalo = dict(
+        ordens.annotate(
+            intervalo=ExpressionWrapper(F('cd_ordemserv') / intervalo_tamanho, output_field=IntegerField()),
+        ).values('intervalo').annotate(total=Count('id')).values_list('intervalo', 'total')
+    )
     
-    # Criar intervalos
-    for intervalo_inicio in range(inicio_geral, fim_geral, intervalo_tamanho):
-        intervalo_fim = intervalo_inicio + intervalo_tamanho - 1
-        
-        # Contar números existentes neste intervalo
-        existentes_no_intervalo = sum(1 for num in numeros_existentes if intervalo_inicio <= num <= intervalo_fim)
-        
-        # Calcular faltantes
-        total_esperado_intervalo = intervalo_tamanho
-        faltantes_no_intervalo = total_esperado_intervalo - existentes_no_intervalo
-        percentual_completo_intervalo = (existentes_no_intervalo / total_esperado_intervalo * 100) if total_esperado_intervalo > 0 else 0
+    # Faixas faltantes: pares (número anterior, número atual) separados por mais de 1;
+    # apenas as maiores são trazidas do banco
+    lacunas_qs = ordens.annotate(
+        anterior=Window(Lag('cd_ordemserv'), order_by=F('cd_ordemserv').asc()),
+    ).annotate(
+        salto=ExpressionWrapper(F('cd_ordemserv') - F('anterior'), output_field=IntegerField()),
+    ).filter(salto__gt=1)
+    total_lacunas = lacunas_qs.count()
+    lacunas = [
+        {'inicio': anterior + 1, 'fim': atual - 1, 'quantidade': atual - anterior - 1}
+        for anterior, atual in lacunas_qs.order_by('-salto', 'cd_ordemserv').values_list(
+            'anterior', 'cd_ordemserv',
+        )[:lacunas_exibidas]
+    ]
+    
+    def _linha_intervalo(intervalo_inicio, intervalo_fim, existentes):
+        total_esperado_intervalo = intervalo_fim - intervalo_inicio + 1
+        faltantes_no_intervalo = total_esperado_intervalo - existentes
+        percentual_completo_intervalo = existentes / total_esperado_intervalo * 100
         percentual_faltantes_intervalo = 100 - percentual_completo_intervalo
         
         # Determinar status do intervalo
@@ -5661,17 +4858,32 @@ def analise_faltantes_pelo_numero(request):
             status = 'critico'
             status_class = 'danger'
         
-        intervalos_analise.append({
+        return {
             'inicio': intervalo_inicio,
             'fim': intervalo_fim,
-            'existentes': existentes_no_intervalo,
+            'existentes': existentes,
             'faltantes': faltantes_no_intervalo,
             'total_esperado': total_esperado_intervalo,
             'percentual_completo': round(percentual_completo_intervalo, 2),
             'percentual_faltantes': round(percentual_faltantes_intervalo, 2),
             'status': status,
             'status_class': status_class,
-        })
+        }
+    
+    # Uma linha por intervalo com ordens; intervalos vazios consecutivos (dentro de
+    # uma lacuna) são agrupados numa única linha
+    intervalos_analise = []
+    intervalo_anterior = None
+    for intervalo in sorted(existentes_por_intervalo):
+        if intervalo_anterior is not None and intervalo > intervalo_anterior + 1:
+            intervalos_analise.append(_linha_intervalo(
+                (intervalo_anterior + 1) * intervalo_tamanho, intervalo * intervalo_tamanho - 1, 0,
+            ))
+        intervalos_analise.append(_linha_intervalo(
+            intervalo * intervalo_tamanho, (intervalo + 1) * intervalo_tamanho - 1,
+            existentes_por_intervalo[intervalo],
+        ))
+        intervalo_anterior = intervalo
     
     # Calcular totais gerais
     total_faltantes = sum(intervalo['faltantes'] for intervalo in intervalos_analise)
@@ -5695,11 +4907,13 @@ def analise_faltantes_pelo_numero(request):
         'percentual_faltantes': round(percentual_faltantes, 2),
         'percentual_completo': round(percentual_completo, 2),
         'intervalos_analise': intervalos_analise,
+        'total_lacunas': total_lacunas,
+        'lacunas': lacunas,
         'distribuicao_labels': json.dumps(distribuicao_labels),
         'distribuicao_existentes': json.dumps(distribuicao_existentes),
         'distribuicao_faltantes': json.dumps(distribuicao_faltantes),
     }
-    return render(request, 'ordens_de_servico/analise_faltantes_pelo_numero.html', context)
+    return context
 
 
 def config_analise_ordens(request):
@@ -5883,6 +5097,7 @@ def agrupar_preventiva_por_data(request):
 def criar_cronograma_planejado_preventiva(request):
     """Criar cronograma planejado de preventivas"""
     from app.models import MeuPlanoPreventiva, Semana52, Maquina
+    from app.utils import indice_semanas
     from django.db.models import Q
     from datetime import datetime, date
     from collections import defaultdict
@@ -5916,8 +5131,9 @@ def criar_cronograma_planejado_preventiva(request):
         cd_setormanut=''
     ).values_list('cd_setormanut', flat=True).distinct().order_by('cd_setormanut')
     
-    # Buscar todas as semanas do ano
+    # Buscar todas as semanas do ano (o índice localiza a semana de cada plano por busca binária)
     semanas = Semana52.objects.all().order_by('inicio')
+    indice = indice_semanas()
     
     # Buscar todos os planos preventiva PCM
     planos = MeuPlanoPreventiva.objects.all().order_by('dt_execucao', 'cd_maquina', 'sequencia_manutencao')
@@ -5930,9 +5146,14 @@ def criar_cronograma_planejado_preventiva(request):
     if selected_plano:
         planos = planos.filter(id=selected_plano.id)
     
-    # Buscar agendamentos de cronograma
+    # Buscar agendamentos de cronograma: os gravados e as ocorrências das recorrências
+    # geradas apenas para o período coberto pelas semanas
     from app.models import AgendamentoCronograma
-    agendamentos = AgendamentoCronograma.objects.all().select_related('maquina', 'plano_preventiva', 'semana').order_by('data_planejada')
+    from app.utils import ocorrencias_recorrencias
+    agendamentos = list(AgendamentoCronograma.objects.all().select_related('maquina', 'plano_preventiva', 'semana').order_by('data_planejada'))
+    if indice.intervalo():
+        agendamentos.extend(ocorrencias_recorrencias(*indice.intervalo()))
+        agendamentos.sort(key=lambda agendamento: agendamento.data_planejada)
     
     # Agrupar planos por semana
     planos_por_semana = defaultdict(list)
@@ -5951,12 +5172,7 @@ def criar_cronograma_planejado_preventiva(request):
                     data_obj = datetime.strptime(data_str, '%Y%m%d').date()
                 
                 # Encontrar a semana correspondente
-                semana_encontrada = None
-                for semana in semanas:
-                    if semana.inicio and semana.fim:
-                        if semana.inicio <= data_obj <= semana.fim:
-                            semana_encontrada = semana
-                            break
+                semana_encontrada = indice.semana(data_obj)
                 
                 if semana_encontrada:
                     planos_por_semana[semana_encontrada].append(plano)
@@ -5981,7 +5197,7 @@ def criar_cronograma_planejado_preventiva(request):
     total_planos = planos.count()
     total_com_semana = sum(len(planos_por_semana[semana]) for semana in semanas)
     total_sem_semana = len(planos_sem_data)
-    total_agendamentos = agendamentos.count()
+    total_agendamentos = len(agendamentos)
     total_agendamentos_com_semana = sum(len(agendamentos_por_semana[semana]) for semana in semanas)
     
     # Criar lista de tuplas para facilitar acesso no template
@@ -6027,6 +5243,7 @@ def criar_cronograma_planejado_preventiva(request):
 def api_search_maquinas(request):
     """API endpoint para buscar máquinas"""
     from app.models import Maquina
+    from app.busca import filtro_busca
     from django.http import JsonResponse
     
     query = request.GET.get('q', '').strip()
@@ -6041,14 +5258,10 @@ def api_search_maquinas(request):
         query_num = int(float(query))
         maquinas = maquinas.filter(
             Q(cd_maquina=query_num) |
-            Q(descr_maquina__icontains=query)
+            filtro_busca(Maquina, query, ('descr_maquina',))
         )
     except (ValueError, TypeError):
-        maquinas = maquinas.filter(
-            Q(descr_maquina__icontains=query) |
-            Q(cd_setormanut__icontains=query) |
-            Q(nome_unid__icontains=query)
-        )
+        maquinas = maquinas.filter(filtro_busca(Maquina, query, ('descr_maquina', 'cd_setormanut', 'nome_unid')))
     
     # Limitar a 20 resultados
     maquinas = maquinas[:20]
@@ -6069,6 +5282,7 @@ def api_search_maquinas(request):
 def api_search_planos_pcm(request):
     """API endpoint para buscar planos PCM"""
     from app.models import MeuPlanoPreventiva
+    from app.busca import filtro_busca
     from django.http import JsonResponse
     
     query = request.GET.get('q', '').strip()
@@ -6084,15 +5298,10 @@ def api_search_planos_pcm(request):
         planos = planos.filter(
             Q(cd_maquina=query_num) |
             Q(numero_plano=query_num) |
-            Q(descr_maquina__icontains=query) |
-            Q(descr_tarefa__icontains=query)
+            filtro_busca(MeuPlanoPreventiva, query, ('descr_maquina', 'descr_tarefa'))
         )
     except (ValueError, TypeError):
-        planos = planos.filter(
-            Q(descr_maquina__icontains=query) |
-            Q(descr_tarefa__icontains=query) |
-            Q(descr_plano__icontains=query)
-        )
+        planos = planos.filter(filtro_busca(MeuPlanoPreventiva, query, ('descr_maquina', 'descr_tarefa', 'descr_plano')))
     
     # Limitar a 20 resultados
     planos = planos[:20]
@@ -6114,9 +5323,12 @@ def api_search_planos_pcm(request):
 
 def salvar_agendamentos_cronograma(request):
     """Salvar múltiplos agendamentos de cronograma com suporte a periodicidade"""
-    from app.models import AgendamentoCronograma
+    from app.models import AgendamentoCronograma, Maquina, MeuPlanoPreventiva, RecorrenciaAgendamento
+    from app.utils import criar_agendamentos_cronograma, criar_recorrencias_agendamento
+    from django.core.exceptions import ValidationError
+    from django.db import DatabaseError, transaction
     from django.http import JsonResponse
-    from datetime import datetime, date, timedelta
+    from datetime import datetime, date
     import json
     
     if request.method != 'POST':
@@ -6131,6 +5343,29 @@ def salvar_agendamentos_cronograma(request):
         
         saved_count = 0
         errors = []
+        created_by = request.user.username if request.user.is_authenticated else 'Sistema'
+        fim_do_ano = date(date.today().year, 12, 31)
+        
+        def _id_item(item_id):
+            try:
+                return int(item_id)
+            except (TypeError, ValueError):
+                return None
+        
+        # Máquinas e planos de todos os agendamentos carregados de uma vez
+        ids_por_tipo = {'maquina': set(), 'plano': set()}
+        for agendamento_data in agendamentos_data:
+            if isinstance(agendamento_data, dict) and agendamento_data.get('tipo') in ids_por_tipo:
+                item_id = _id_item(agendamento_data.get('id'))
+                if item_id is not None:
+                    ids_por_tipo[agendamento_data['tipo']].add(item_id)
+        maquinas = Maquina.objects.in_bulk(ids_por_tipo['maquina'])
+        planos = MeuPlanoPreventiva.objects.in_bulk(ids_por_tipo['plano'])
+        
+        # Agendamentos únicos, validados uma vez por pedido e gravados em lote;
+        # com periodicidade é gravada apenas a regra (RecorrenciaAgendamento)
+        novos_agendamentos = []
+        novas_recorrencias = []
         
         for agendamento_data in agendamentos_data:
             try:
@@ -6152,70 +5387,70 @@ def salvar_agendamentos_cronograma(request):
                     continue
                 
                 # Obter objeto máquina ou plano
-                maquina_obj = None
-                plano_obj = None
+                campos = {
+                    'tipo_agendamento': tipo,
+                    'nome_grupo': nome_grupo,
+                    'periodicidade': periodicidade if periodicidade and periodicidade > 0 else None,
+                    'created_by': created_by,
+                }
                 
                 if tipo == 'maquina':
-                    from app.models import Maquina
-                    try:
-                        maquina_obj = Maquina.objects.get(id=item_id)
-                    except Maquina.DoesNotExist:
+                    campos['maquina'] = maquinas.get(_id_item(item_id))
+                    if campos['maquina'] is None:
                         errors.append(f'Máquina com ID {item_id} não encontrada')
                         continue
                 elif tipo == 'plano':
-                    from app.models import MeuPlanoPreventiva
-                    try:
-                        plano_obj = MeuPlanoPreventiva.objects.get(id=item_id)
-                    except MeuPlanoPreventiva.DoesNotExist:
+                    campos['plano_preventiva'] = planos.get(_id_item(item_id))
+                    if campos['plano_preventiva'] is None:
                         errors.append(f'Plano com ID {item_id} não encontrado')
                         continue
                 else:
                     errors.append(f'Tipo de agendamento inválido: {tipo}')
                     continue
                 
-                # Calcular datas se houver periodicidade
-                if periodicidade and periodicidade > 0:
-                    # Calcular todas as datas até o final do ano
-                    ano_atual = date.today().year
-                    fim_do_ano = date(ano_atual, 12, 31)
-                    
-                    datas_agendamento = []
-                    data_atual = data_planejada
-                    
-                    while data_atual <= fim_do_ano:
-                        datas_agendamento.append(data_atual)
-                        data_atual = data_atual + timedelta(days=periodicidade)
+                # Validar uma vez (máquina e plano já foram carregados, não precisam ser consultados de novo)
+                if campos['periodicidade']:
+                    # Ocorrências até o final do ano, geradas sob demanda a partir da regra
+                    if data_planejada > fim_do_ano:
+                        continue
+                    agendamento = RecorrenciaAgendamento(
+                        tipo_agendamento=tipo,
+                        maquina=campos.get('maquina'),
+                        plano_preventiva=campos.get('plano_preventiva'),
+                        nome_grupo=nome_grupo,
+                        periodicidade=campos['periodicidade'],
+                        data_inicio=data_planejada,
+                        data_fim=fim_do_ano,
+                        created_by=created_by,
+                    )
                 else:
-                    # Sem periodicidade, apenas uma data
-                    datas_agendamento = [data_planejada]
+                    agendamento = AgendamentoCronograma(data_planejada=data_planejada, **campos)
+                try:
+                    agendamento.full_clean(exclude=['maquina', 'plano_preventiva', 'semana'])
+                except ValidationError as e:
+                    errors.append(f'Erro ao salvar agendamento para data {data_planejada}: {str(e)}')
+                    continue
                 
-                # Criar agendamentos para cada data
-                for data_agendamento in datas_agendamento:
-                    try:
-                        agendamento = AgendamentoCronograma(
-                            tipo_agendamento=tipo,
-                            data_planejada=data_agendamento,
-                            nome_grupo=nome_grupo,
-                            periodicidade=periodicidade if periodicidade and periodicidade > 0 else None,
-                            created_by=request.user.username if request.user.is_authenticated else 'Sistema'
-                        )
-                        
-                        if tipo == 'maquina':
-                            agendamento.maquina = maquina_obj
-                        elif tipo == 'plano':
-                            agendamento.plano_preventiva = plano_obj
-                        
-                        agendamento.full_clean()
-                        agendamento.save()
-                        saved_count += 1
-                    except Exception as e:
-                        errors.append(f'Erro ao salvar agendamento para data {data_agendamento}: {str(e)}')
-                        continue
+                if isinstance(agendamento, RecorrenciaAgendamento):
+                    novas_recorrencias.append(agendamento)
+                else:
+                    novos_agendamentos.append(agendamento)
                 
             except Exception as e:
                 errors.append(f'Erro ao processar agendamento: {str(e)}')
                 continue
         
+        try:
+            with transaction.atomic():
+                if novos_agendamentos:
+                    saved_count += criar_agendamentos_cronograma(novos_agendamentos)
+                if novas_recorrencias:
+                    # saved_count continua contando as datas agendadas
+                    saved_count += criar_recorrencias_agendamento(novas_recorrencias)
+        except DatabaseError as e:
+            saved_count = 0
+            errors.append(f'Erro ao salvar agendamentos: {str(e)}')
+        
         if saved_count > 0:
             return JsonResponse({
                 'success': True,
@@ -6236,6 +5471,58 @@ def salvar_agendamentos_cronograma(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+def salvar_excecao_recorrencia(request, recorrencia_id):
+    """Cancelar ou mover uma ocorrência de uma recorrência de agendamento"""
+    from app.models import ExcecaoRecorrencia, RecorrenciaAgendamento
+    from django.core.exceptions import ValidationError
+    from django.http import JsonResponse
+    from datetime import datetime
+    import json
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método não permitido'}, status=405)
+    
+    try:
+        recorrencia = RecorrenciaAgendamento.objects.get(id=recorrencia_id)
+    except RecorrenciaAgendamento.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Recorrência não encontrada'}, status=404)
+    
+    try:
+        data = json.loads(request.body)
+        acao = data.get('acao')
+        
+        try:
+            data_original = datetime.strptime(data.get('data_original') or '', '%Y-%m-%d').date()
+            nova_data = datetime.strptime(data['nova_data'], '%Y-%m-%d').date() if data.get('nova_data') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Data inválida'})
+        
+        # Restaurar: a ocorrência volta a seguir a regra
+        if acao == 'restaurar':
+            recorrencia.excecoes.filter(data_original=data_original).delete()
+            return JsonResponse({'success': True})
+        
+        excecao = recorrencia.excecoes.filter(data_original=data_original).first() or ExcecaoRecorrencia(
+            recorrencia=recorrencia, data_original=data_original
+        )
+        excecao.acao = acao
+        excecao.nova_data = nova_data
+        excecao.observacoes = (data.get('observacoes') or '').strip() or None
+        excecao.created_by = request.user.username if request.user.is_authenticated else 'Sistema'
+        try:
+            excecao.full_clean()
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'errors': e.messages})
+        excecao.save()
+        
+        return JsonResponse({'success': True, 'excecao_id': excecao.id})
+    
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 def consultar_roteiro_preventiva(request):
     """Consultar/listar roteiros de manutenção preventiva"""
     from app.models import RoteiroPreventiva
@@ -6637,41 +5924,6 @@ def erro_analise_plano_roteiro_geral(request):
     planos = PlanoPreventiva.objects.all()
     roteiros = RoteiroPreventiva.objects.all()
     
-    # Função para verificar se campos correspondem (mesma lógica da análise principal)
-    def campos_correspondem(plano, roteiro):
-        if not plano.cd_maquina or not roteiro.cd_maquina:
-            return False
-        if plano.cd_maquina != roteiro.cd_maquina:
-            return False
-        
-        descr_plano = (plano.descr_maquina or '').strip().upper()
-        descr_roteiro = (roteiro.descr_maquina or '').strip().upper()
-        if descr_plano and descr_roteiro:
-            if descr_plano != descr_roteiro:
-                return False
-        elif descr_plano or descr_roteiro:
-            return False
-        
-        if not plano.sequencia_tarefa or not roteiro.cd_tarefamanu:
-            return False
-        if plano.sequencia_tarefa != roteiro.cd_tarefamanu:
-            return False
-        
-        descr_tarefa_plano = (plano.descr_tarefa or '').strip().upper()
-        descr_tarefa_roteiro = (roteiro.descr_tarefamanu or '').strip().upper()
-        if descr_tarefa_plano and descr_tarefa_roteiro:
-            if descr_tarefa_plano != descr_tarefa_roteiro:
-                return False
-        elif descr_tarefa_plano or descr_tarefa_roteiro:
-            return False
-        
-        if not plano.sequencia_manutencao or not roteiro.seq_seqplamanu:
-            return False
-        if plano.sequencia_manutencao != roteiro.seq_seqplamanu:
-            return False
-        
-        return True
-    
     # Função para analisar erros de um par plano-roteiro
     def analisar_erros(plano, roteiro):
         erros = []
@@ -6712,57 +5964,49 @@ def erro_analise_plano_roteiro_geral(request):
         
         return erros
     
+    # Registros sem correspondência (tabela mantida pelos importadores); só eles passam pela análise de erros
+    roteiros = list(roteiros)
+    planos_sem_relacao = list(planos.filter(relacionamento_roteiro__isnull=True))
+    roteiros_sem_relacao = list(RoteiroPreventiva.objects.filter(relacionamentos_plano__isnull=True))
+    
     # Encontrar planos sem match
     planos_sem_match = []
-    planos_processados = set()
-    roteiros_processados = set()
-    
-    for plano in planos:
-        tem_match = False
+    for plano in planos_sem_relacao:
         melhor_match = None
         melhor_erros = []
         
+        # Analisar erros para encontrar o melhor match parcial
         for roteiro in roteiros:
-            if campos_correspondem(plano, roteiro):
-                tem_match = True
-                planos_processados.add(plano.id)
-                roteiros_processados.add(roteiro.id)
-                break
-            else:
-                # Analisar erros para encontrar o melhor match parcial
-                erros = analisar_erros(plano, roteiro)
-                if not melhor_match or len(erros) < len(melhor_erros):
-                    melhor_match = roteiro
-                    melhor_erros = erros
-        
-        if not tem_match:
-            planos_sem_match.append({
-                'plano': plano,
-                'melhor_match': melhor_match,
-                'erros': melhor_erros,
-                'total_erros': len(melhor_erros) if melhor_erros else 5,
-            })
+            erros = analisar_erros(plano, roteiro)
+            if not melhor_match or len(erros) < len(melhor_erros):
+                melhor_match = roteiro
+                melhor_erros = erros
+        
+        planos_sem_match.append({
+            'plano': plano,
+            'melhor_match': melhor_match,
+            'erros': melhor_erros,
+            'total_erros': len(melhor_erros) if melhor_erros else 5,
+        })
     
     # Encontrar roteiros sem match
     roteiros_sem_match = []
-    for roteiro in roteiros:
-        if roteiro.id not in roteiros_processados:
-            melhor_match = None
-            melhor_erros = []
-            
-            for plano in planos:
-                if plano.id not in planos_processados:
-                    erros = analisar_erros(plano, roteiro)
-                    if not melhor_match or len(erros) < len(melhor_erros):
-                        melhor_match = plano
-                        melhor_erros = erros
-            
-            roteiros_sem_match.append({
-                'roteiro': roteiro,
-                'melhor_match': melhor_match,
-                'erros': melhor_erros,
-                'total_erros': len(melhor_erros) if melhor_erros else 5,
-            })
+    for roteiro in roteiros_sem_relacao:
+        melhor_match = None
+        melhor_erros = []
+        
+        for plano in planos_sem_relacao:
+            erros = analisar_erros(plano, roteiro)
+            if not melhor_match or len(erros) < len(melhor_erros):
+                melhor_match = plano
+                melhor_erros = erros
+        
+        roteiros_sem_match.append({
+            'roteiro': roteiro,
+            'melhor_match': melhor_match,
+            'erros': melhor_erros,
+            'total_erros': len(melhor_erros) if melhor_erros else 5,
+        })
     
     # Estatísticas gerais
     total_planos_sem_match = len(planos_sem_match)
@@ -6852,59 +6096,9 @@ def relacionar_roteiro_plano(request):
     planos = PlanoPreventiva.objects.all()
     roteiros = RoteiroPreventiva.objects.all()
     
-    # Função para verificar se campos correspondem
-    def campos_correspondem(plano, roteiro):
-        if not plano.cd_maquina or not roteiro.cd_maquina:
-            return False
-        if plano.cd_maquina != roteiro.cd_maquina:
-            return False
-        
-        descr_plano = (plano.descr_maquina or '').strip().upper()
-        descr_roteiro = (roteiro.descr_maquina or '').strip().upper()
-        if descr_plano and descr_roteiro:
-            if descr_plano != descr_roteiro:
-                return False
-        elif descr_plano or descr_roteiro:
-            return False
-        
-        if not plano.sequencia_tarefa or not roteiro.cd_tarefamanu:
-            return False
-        if plano.sequencia_tarefa != roteiro.cd_tarefamanu:
-            return False
-        
-        descr_tarefa_plano = (plano.descr_tarefa or '').strip().upper()
-        descr_tarefa_roteiro = (roteiro.descr_tarefamanu or '').strip().upper()
-        if descr_tarefa_plano and descr_tarefa_roteiro:
-            if descr_tarefa_plano != descr_tarefa_roteiro:
-                return False
-        elif descr_tarefa_plano or descr_tarefa_roteiro:
-            return False
-        
-        if not plano.sequencia_manutencao or not roteiro.seq_seqplamanu:
-            return False
-        if plano.sequencia_manutencao != roteiro.seq_seqplamanu:
-            return False
-        
-        return True
-    
-    # Encontrar relacionamentos existentes
-    relacionamentos = []
-    planos_processados = set()
-    roteiros_processados = set()
-    
-    for plano in planos:
-        for roteiro in roteiros:
-            if campos_correspondem(plano, roteiro):
-                relacionamentos.append((plano.id, roteiro.id))
-                planos_processados.add(plano.id)
-                roteiros_processados.add(roteiro.id)
-                break
-    
-    # Encontrar planos sem match
-    planos_sem_match = [p for p in planos if p.id not in planos_processados]
-    
-    # Encontrar roteiros sem match
-    roteiros_sem_match = [r for r in roteiros if r.id not in roteiros_processados]
+    # Planos e roteiros sem correspondência exata (tabela mantida pelos importadores)
+    planos_sem_match = planos.filter(relacionamento_roteiro__isnull=True)
+    roteiros_sem_match = roteiros.filter(relacionamentos_plano__isnull=True)
     
     # Paginação
     page_planos = request.GET.get('page_planos', 1)
@@ -6921,8 +6115,8 @@ def relacionar_roteiro_plano(request):
         'active_page': 'relacionar_roteiro_plano',
         'planos_sem_match': planos_paginated,
         'roteiros_sem_match': roteiros_paginated,
-        'total_planos_sem_match': len(planos_sem_match),
-        'total_roteiros_sem_match': len(roteiros_sem_match),
+        'total_planos_sem_match': paginator_planos.count,
+        'total_roteiros_sem_match': paginator_roteiros.count,
         'todos_planos': list(planos.values('id', 'numero_plano', 'cd_maquina', 'descr_maquina', 'sequencia_manutencao', 'sequencia_tarefa')),
         'todos_roteiros': list(roteiros.values('id', 'cd_planmanut', 'cd_maquina', 'descr_maquina', 'seq_seqplamanu', 'cd_tarefamanu')),
     }
@@ -7765,6 +6959,7 @@ def remover_documento_maquina(request, maquina_id, documento_id):
 def visualizar_maquina(request, maquina_id):
     """Visualizar detalhes de uma máquina específica"""
     from app.models import Maquina, ItemEstoque, MaquinaPeca, MaquinaPrimariaSecundaria, PlanoPreventiva, MaquinaDocumento, MeuPlanoPreventiva
+    from app.utils import indicadores_parada, janela_indicadores_parada
     
     try:
         maquina = Maquina.objects.get(id=maquina_id)
@@ -7811,6 +7006,12 @@ def visualizar_maquina(request, maquina_id):
     if is_maquina_principal and relacionamentos_como_primaria.exists():
         maquinas_secundarias_ids = relacionamentos_como_primaria.values_list('maquina_secundaria_id', flat=True)
     
+    # Indicadores de parada da máquina no período (padrão: últimos 90 dias)
+    inicio_janela, fim_janela, parada_data_inicio, parada_data_fim = janela_indicadores_parada(
+        request.GET.get('data_inicio'), request.GET.get('data_fim'),
+    )
+    indicadores_maquina = indicadores_parada(inicio_janela, fim_janela, cd_maquinas=[maquina.cd_maquina])
+    
     context = {
         'page_title': f'Visualizar Máquina {maquina.cd_maquina}',
         'active_page': 'consultar_maquinas',
@@ -7824,15 +7025,121 @@ def visualizar_maquina(request, maquina_id):
         'documentos_maquina': documentos_maquina,
         'is_maquina_principal': is_maquina_principal,
         'maquinas_secundarias_ids': list(maquinas_secundarias_ids),
+        'parada_data_inicio': parada_data_inicio,
+        'parada_data_fim': parada_data_fim,
+        'indicadores_parada': indicadores_maquina['geral'],
     }
     return render(request, 'visualizar/visualizar_maquina.html', context)
 
 
+def _planos_calendario(request, filtro):
+    """MeuPlanoPreventiva com data de execução dentro da janela pedida pelo FullCalendar"""
+    from app.models import MeuPlanoPreventiva
+    from app.utils import janela_calendario
+    
+    inicio, fim = janela_calendario(request)
+    planos = MeuPlanoPreventiva.objects.filter(filtro, data_execucao__isnull=False)
+    if inicio:
+        planos = planos.filter(data_execucao__gte=inicio)
+    if fim:
+        planos = planos.filter(data_execucao__lt=fim)
+    return planos.order_by('data_execucao', 'id')
+
+
+def _evento_calendario_plano(plano, cor_padrao, id_evento=None, com_maquina=False, maquina_id=None):
+    """Evento do FullCalendar para um MeuPlanoPreventiva (apenas os campos preenchidos)"""
+    # Criar título do evento (com o código da máquina quando o calendário reúne várias)
+    titulo_parts = []
+    if com_maquina:
+        titulo_parts.append(f"Máq: {plano.cd_maquina}")
+    if plano.numero_plano:
+        titulo_parts.append(f"Plano {plano.numero_plano}")
+    if plano.sequencia_manutencao:
+        titulo_parts.append(f"Seq: {plano.sequencia_manutencao}")
+    if plano.descr_tarefa:
+        titulo_parts.append(plano.descr_tarefa[:40 if com_maquina else 50])
+    
+    titulo = " - ".join(titulo_parts) if titulo_parts else f"Manutenção Preventiva - {plano.cd_maquina}"
+    
+    # Criar descrição/tooltip
+    descricao_parts = []
+    if com_maquina:
+        descricao_parts.append(f"Máquina: {plano.cd_maquina} - {plano.descr_maquina or 'Sem descrição'}")
+    if plano.descr_tarefa:
+        descricao_parts.append(f"Tarefa: {plano.descr_tarefa}")
+    if plano.nome_funcionario:
+        descricao_parts.append(f"Funcionário: {plano.nome_funcionario}")
+    if plano.descr_setor:
+        descricao_parts.append(f"Setor: {plano.descr_setor}")
+    if plano.quantidade_periodo:
+        descricao_parts.append(f"Período: {plano.quantidade_periodo} dias")
+    
+    # Determinar cor baseada em informações do plano
+    cor = cor_padrao
+    if plano.quantidade_periodo and plano.quantidade_periodo > 30:
+        cor = '#dc3545'  # Vermelho para períodos longos
+    elif plano.quantidade_periodo and plano.quantidade_periodo <= 7:
+        cor = '#28a745'  # Verde para períodos curtos
+    
+    propriedades = {
+        'plano_id': plano.id,
+        'numero_plano': plano.numero_plano,
+        'sequencia_manutencao': plano.sequencia_manutencao,
+        'descricao': "\n".join(descricao_parts),
+        'url': f"/plano-pcm/visualizar/{plano.id}/",
+    }
+    if com_maquina:
+        propriedades.update({
+            'maquina_id': maquina_id,
+            'maquina_codigo': plano.cd_maquina,
+            'maquina_url': f"/maquinas/visualizar/{maquina_id}/" if maquina_id else None,
+        })
+    
+    # Data sem horário: o FullCalendar trata como evento de dia inteiro; 'color' vale para fundo e borda
+    return {
+        'id': id_evento or plano.id,
+        'title': titulo,
+        'start': plano.data_execucao.isoformat(),
+        'color': cor,
+        'extendedProps': {chave: valor for chave, valor in propriedades.items() if valor not in (None, '')},
+    }
+
+
+def _resposta_calendario_planos(request, planos, modelos, cor_padrao, prefixo_id='', com_maquina=False):
+    """
+    Eventos dos planos como JSON condicional: ETag pelas versões dos modelos e
+    Last-Modified pela última alteração dos planos da janela.
+    """
+    from app.models import Maquina
+    from app.utils import resposta_json_condicional
+    from django.db.models import Max
+    
+    def montar_eventos():
+        planos_lista = list(planos)
+        ids_por_codigo = {}
+        if com_maquina:
+            # Máquina dos planos sem relacionamento, buscada pelo código (uma consulta)
+            codigos = {plano.cd_maquina for plano in planos_lista if not plano.maquina_id and plano.cd_maquina is not None}
+            if codigos:
+                ids_por_codigo = dict(Maquina.objects.filter(cd_maquina__in=codigos).values_list('cd_maquina', 'id'))
+        return [
+            _evento_calendario_plano(
+                plano, cor_padrao, id_evento=f'{prefixo_id}{plano.id}' if prefixo_id else None, com_maquina=com_maquina,
+                maquina_id=plano.maquina_id or ids_por_codigo.get(plano.cd_maquina),
+            )
+            for plano in planos_lista
+        ]
+    
+    return resposta_json_condicional(
+        request, modelos, montar_eventos,
+        ultima_alteracao=planos.aggregate(ultima=Max('updated_at'))['ultima'],
+    )
+
+
 def calendario_planos_maquina(request, maquina_id):
     """Endpoint JSON para fornecer eventos do calendário de MeuPlanoPreventiva para uma máquina"""
     from app.models import Maquina, MeuPlanoPreventiva
     from django.http import JsonResponse
-    from datetime import datetime
     from django.db.models import Q
     
     try:
@@ -7840,90 +7147,16 @@ def calendario_planos_maquina(request, maquina_id):
     except Maquina.DoesNotExist:
         return JsonResponse({'error': 'Máquina não encontrada'}, status=404)
     
-    # Buscar MeuPlanoPreventiva relacionados a esta máquina
-    planos = MeuPlanoPreventiva.objects.filter(
-        Q(maquina=maquina) | Q(cd_maquina=maquina.cd_maquina)
-    ).exclude(
-        dt_execucao__isnull=True
-    ).exclude(
-        dt_execucao=''
-    )
+    # MeuPlanoPreventiva desta máquina na janela visível (start/end)
+    planos = _planos_calendario(request, Q(maquina=maquina) | Q(cd_maquina=maquina.cd_maquina))
     
-    # Converter para formato de eventos do FullCalendar
-    events = []
-    for plano in planos:
-        if plano.dt_execucao:
-            try:
-                # Tentar parsear a data (formato DD/MM/YYYY ou YYYY-MM-DD)
-                data_str = plano.dt_execucao.strip()
-                if '/' in data_str:
-                    # Formato DD/MM/YYYY
-                    data_obj = datetime.strptime(data_str, '%d/%m/%Y').date()
-                elif '-' in data_str:
-                    # Formato YYYY-MM-DD
-                    data_obj = datetime.strptime(data_str, '%Y-%m-%d').date()
-                else:
-                    continue  # Pular se não conseguir parsear
-                
-                # Criar título do evento
-                titulo_parts = []
-                if plano.numero_plano:
-                    titulo_parts.append(f"Plano {plano.numero_plano}")
-                if plano.sequencia_manutencao:
-                    titulo_parts.append(f"Seq: {plano.sequencia_manutencao}")
-                if plano.descr_tarefa:
-                    titulo_parts.append(plano.descr_tarefa[:50])
-                
-                titulo = " - ".join(titulo_parts) if titulo_parts else f"Manutenção Preventiva - {plano.cd_maquina}"
-                
-                # Criar descrição/tooltip
-                descricao_parts = []
-                if plano.descr_tarefa:
-                    descricao_parts.append(f"Tarefa: {plano.descr_tarefa}")
-                if plano.nome_funcionario:
-                    descricao_parts.append(f"Funcionário: {plano.nome_funcionario}")
-                if plano.descr_setor:
-                    descricao_parts.append(f"Setor: {plano.descr_setor}")
-                if plano.quantidade_periodo:
-                    descricao_parts.append(f"Período: {plano.quantidade_periodo} dias")
-                
-                descricao = "\n".join(descricao_parts)
-                
-                # Determinar cor baseada em informações do plano
-                cor = '#3788d8'  # Azul padrão
-                if plano.quantidade_periodo and plano.quantidade_periodo > 30:
-                    cor = '#dc3545'  # Vermelho para períodos longos
-                elif plano.quantidade_periodo and plano.quantidade_periodo <= 7:
-                    cor = '#28a745'  # Verde para períodos curtos
-                
-                events.append({
-                    'id': plano.id,
-                    'title': titulo,
-                    'start': data_obj.isoformat(),
-                    'allDay': True,
-                    'backgroundColor': cor,
-                    'borderColor': cor,
-                    'textColor': '#ffffff',
-                    'extendedProps': {
-                        'plano_id': plano.id,
-                        'numero_plano': plano.numero_plano,
-                        'sequencia_manutencao': plano.sequencia_manutencao,
-                        'descricao': descricao,
-                        'url': f"/plano-pcm/visualizar/{plano.id}/" if plano.id else None,
-                    }
-                })
-            except (ValueError, AttributeError):
-                # Se não conseguir parsear a data, pular este plano
-                continue
-    
-    return JsonResponse(events, safe=False)
+    return _resposta_calendario_planos(request, planos, [Maquina, MeuPlanoPreventiva], '#3788d8')  # Azul padrão
 
 
 def calendario_planos_secundarias(request, maquina_id):
     """Endpoint JSON para fornecer eventos do calendário de MeuPlanoPreventiva para máquinas secundárias de uma máquina principal"""
     from app.models import Maquina, MeuPlanoPreventiva, MaquinaPrimariaSecundaria
     from django.http import JsonResponse
-    from datetime import datetime
     from django.db.models import Q
     
     try:
@@ -7937,112 +7170,42 @@ def calendario_planos_secundarias(request, maquina_id):
     if not is_maquina_principal:
         return JsonResponse({'error': 'Esta máquina não é uma máquina principal'}, status=400)
     
-    # Buscar máquinas secundárias relacionadas
-    relacionamentos = MaquinaPrimariaSecundaria.objects.filter(
-        maquina_primaria=maquina_principal
-    ).select_related('maquina_secundaria')
-    
-    if not relacionamentos.exists():
-        return JsonResponse([], safe=False)  # Retornar lista vazia se não houver máquinas secundárias
+    # Máquinas secundárias relacionadas (subconsultas; sem relacionamentos não há planos)
+    relacionamentos = MaquinaPrimariaSecundaria.objects.filter(maquina_primaria=maquina_principal)
+    maquinas_secundarias_ids = relacionamentos.values('maquina_secundaria_id')
+    maquinas_secundarias_codigos = relacionamentos.values('maquina_secundaria__cd_maquina')
     
-    # Obter IDs e códigos das máquinas secundárias
-    maquinas_secundarias_ids = relacionamentos.values_list('maquina_secundaria_id', flat=True)
-    maquinas_secundarias_codigos = relacionamentos.values_list('maquina_secundaria__cd_maquina', flat=True)
+    # MeuPlanoPreventiva das máquinas secundárias na janela visível (start/end)
+    planos = _planos_calendario(
+        request, Q(maquina_id__in=maquinas_secundarias_ids) | Q(cd_maquina__in=maquinas_secundarias_codigos)
+    )
     
-    # Buscar MeuPlanoPreventiva relacionados às máquinas secundárias
-    planos = MeuPlanoPreventiva.objects.filter(
-        Q(maquina_id__in=maquinas_secundarias_ids) | Q(cd_maquina__in=maquinas_secundarias_codigos)
-    ).exclude(
-        dt_execucao__isnull=True
-    ).exclude(
-        dt_execucao=''
+    # Cinza para distinguir as máquinas secundárias
+    return _resposta_calendario_planos(
+        request, planos, [Maquina, MeuPlanoPreventiva, MaquinaPrimariaSecundaria], '#6c757d',
+        prefixo_id='sec_', com_maquina=True,
     )
+
+
+def calendario_planos_setor(request, cd_setor):
+    """Endpoint JSON para fornecer eventos do calendário de MeuPlanoPreventiva das máquinas de um setor de manutenção"""
+    from app.models import Maquina, MeuPlanoPreventiva
+    from django.http import JsonResponse
+    from django.db.models import Q
     
-    # Converter para formato de eventos do FullCalendar
-    events = []
-    for plano in planos:
-        if plano.dt_execucao:
-            try:
-                # Tentar parsear a data (formato DD/MM/YYYY ou YYYY-MM-DD)
-                data_str = plano.dt_execucao.strip()
-                if '/' in data_str:
-                    # Formato DD/MM/YYYY
-                    data_obj = datetime.strptime(data_str, '%d/%m/%Y').date()
-                elif '-' in data_str:
-                    # Formato YYYY-MM-DD
-                    data_obj = datetime.strptime(data_str, '%Y-%m-%d').date()
-                else:
-                    continue  # Pular se não conseguir parsear
-                
-                # Criar título do evento (incluir código da máquina secundária)
-                titulo_parts = []
-                titulo_parts.append(f"Máq: {plano.cd_maquina}")
-                if plano.numero_plano:
-                    titulo_parts.append(f"Plano {plano.numero_plano}")
-                if plano.sequencia_manutencao:
-                    titulo_parts.append(f"Seq: {plano.sequencia_manutencao}")
-                if plano.descr_tarefa:
-                    titulo_parts.append(plano.descr_tarefa[:40])
-                
-                titulo = " - ".join(titulo_parts) if titulo_parts else f"Manutenção Preventiva - {plano.cd_maquina}"
-                
-                # Criar descrição/tooltip
-                descricao_parts = []
-                descricao_parts.append(f"Máquina: {plano.cd_maquina} - {plano.descr_maquina or 'Sem descrição'}")
-                if plano.descr_tarefa:
-                    descricao_parts.append(f"Tarefa: {plano.descr_tarefa}")
-                if plano.nome_funcionario:
-                    descricao_parts.append(f"Funcionário: {plano.nome_funcionario}")
-                if plano.descr_setor:
-                    descricao_parts.append(f"Setor: {plano.descr_setor}")
-                if plano.quantidade_periodo:
-                    descricao_parts.append(f"Período: {plano.quantidade_periodo} dias")
-                
-                descricao = "\n".join(descricao_parts)
-                
-                # Determinar cor baseada em informações do plano (usar cor diferente para distinguir)
-                cor = '#6c757d'  # Cinza para máquinas secundárias
-                if plano.quantidade_periodo and plano.quantidade_periodo > 30:
-                    cor = '#dc3545'  # Vermelho para períodos longos
-                elif plano.quantidade_periodo and plano.quantidade_periodo <= 7:
-                    cor = '#28a745'  # Verde para períodos curtos
-                
-                # Buscar ID da máquina relacionada para criar link
-                maquina_relacionada_id = None
-                if plano.maquina_id:
-                    maquina_relacionada_id = plano.maquina_id
-                else:
-                    # Tentar encontrar pelo código
-                    try:
-                        maquina_obj = Maquina.objects.get(cd_maquina=plano.cd_maquina)
-                        maquina_relacionada_id = maquina_obj.id
-                    except Maquina.DoesNotExist:
-                        pass
-                
-                events.append({
-                    'id': f'sec_{plano.id}',
-                    'title': titulo,
-                    'start': data_obj.isoformat(),
-                    'allDay': True,
-                    'backgroundColor': cor,
-                    'borderColor': cor,
-                    'textColor': '#ffffff',
-                    'extendedProps': {
-                        'plano_id': plano.id,
-                        'maquina_id': maquina_relacionada_id,
-                        'maquina_codigo': plano.cd_maquina,
-                        'numero_plano': plano.numero_plano,
-                        'sequencia_manutencao': plano.sequencia_manutencao,
-                        'descricao': descricao,
-                        'url': f"/plano-pcm/visualizar/{plano.id}/" if plano.id else None,
-                        'maquina_url': f"/maquinas/visualizar/{maquina_relacionada_id}/" if maquina_relacionada_id else None,
-                    }
-                })
-            except (ValueError, AttributeError):
-                # Se não conseguir parsear a data, pular este plano
-                continue
+    maquinas_setor = Maquina.objects.filter(cd_setormanut=cd_setor)
+    if not maquinas_setor.exists():
+        return JsonResponse({'error': 'Setor não encontrado'}, status=404)
+    
+    # MeuPlanoPreventiva das máquinas do setor na janela visível (start/end)
+    planos = _planos_calendario(
+        request,
+        Q(maquina__cd_setormanut=cd_setor) | Q(cd_maquina__in=maquinas_setor.values('cd_maquina'))
+    )
     
-    return JsonResponse(events, safe=False)
+    return _resposta_calendario_planos(
+        request, planos, [Maquina, MeuPlanoPreventiva], '#3788d8', com_maquina=True,
+    )
 
 
 def editar_maquina(request, maquina_id):
@@ -8377,9 +7540,12 @@ def visualizar_corretiva_outros(request, ordem_id):
 
 def analise_corretiva_outros(request):
     """Página inicial da seção Manutenção Corretiva com análises e gráficos"""
-    from app.models import OrdemServicoCorretiva, Maquina, CentroAtividade
-    from django.db.models import Count, Q
-    from datetime import datetime, timedelta
+    from app.models import OrdemServicoCorretiva, Maquina, CentroAtividade, ResumoDiarioOrdem, intervalo_datas_ordem
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import TruncMonth
+    from django.utils import timezone
+    from datetime import datetime, timedelta, date
+    from calendar import monthrange
     from collections import defaultdict
     import json
     
@@ -8411,66 +7577,21 @@ def analise_corretiva_outros(request):
         # Remover duplicatas e ordenar
         meses_filtro_int = sorted(list(set(meses_filtro_int)))
     
-    # Função para fazer parse de dt_abertura_solicita
-    def parse_dt_abertura_solicita(date_str):
-        """Tenta fazer parse de dt_abertura_solicita em vários formatos diferentes."""
-        if not date_str:
-            return None
-        
-        date_str = str(date_str).strip()
-        if not date_str:
-            return None
-        
-        # Remover hora se existir
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-        else:
-            date_part = date_str
-        
-        # Tentar diferentes formatos de data
-        date_formats = [
-            '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%Y/%m/%d',
-            '%d/%m/%y', '%d-%m-%y',
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_part, fmt)
-            except (ValueError, TypeError):
-                continue
-        
-        # Parse manual para formato brasileiro
-        if '/' in date_part:
-            parts = date_part.split('/')
-            if len(parts) == 3:
-                try:
-                    day, month, year = parts
-                    if len(year) == 2:
-                        year = '20' + year
-                    return datetime(int(year), int(month), int(day))
-                except (ValueError, TypeError):
-                    pass
-        
-        return None
+    # Filtrar ordens pela data de abertura da solicitação (coluna tipada e indexada),
+    # um intervalo por mês selecionado (todos os meses quando nenhum foi selecionado)
+    filtro_periodo = Q()
+    filtro_resumo = Q()
+    for mes in (meses_filtro_int or range(1, 13)):
+        inicio_mes = date(ano_filtro, mes, 1)
+        fim_mes = date(ano_filtro, mes, monthrange(ano_filtro, mes)[1])
+        inicio_dt, fim_dt = intervalo_datas_ordem(inicio_mes, fim_mes)
+        filtro_periodo |= Q(dt_abertura_solicita_dt__gte=inicio_dt, dt_abertura_solicita_dt__lt=fim_dt)
+        filtro_resumo |= Q(dia__gte=inicio_mes, dia__lte=fim_mes)
     
-    # Função para filtrar ordens baseado em dt_abertura_solicita
-    def filtrar_ordens_por_data(queryset, ano, meses=None):
-        """Filtra ordens baseado em dt_abertura_solicita
-        meses: lista de inteiros (1-12) ou None para todos os meses
-        """
-        ordens_filtradas = []
-        for ordem in queryset:
-            if ordem.dt_abertura_solicita:
-                data_parseada = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-                if data_parseada:
-                    if data_parseada.year == ano:
-                        if meses is None or len(meses) == 0 or data_parseada.month in meses:
-                            ordens_filtradas.append(ordem)
-        return ordens_filtradas
+    ordens_filtradas = list(OrdemServicoCorretiva.objects.filter(filtro_periodo))
     
-    # Obter todas as ordens e filtrar
-    todas_ordens = OrdemServicoCorretiva.objects.all()
-    ordens_filtradas = filtrar_ordens_por_data(todas_ordens, ano_filtro, meses_filtro_int if meses_filtro_int else None)
+    # Contagens por setor, tipo de OS e mês a partir do resumo diário (evento de abertura)
+    resumo_periodo = ResumoDiarioOrdem.objects.filter(filtro_resumo, evento='abertura').order_by()
     
     # Estatísticas básicas (filtradas)
     total_count = len(ordens_filtradas)
@@ -8487,11 +7608,10 @@ def analise_corretiva_outros(request):
     maquinas_count = Maquina.objects.count()
     
     # Ordens por setor (top 10) - filtradas
-    ordens_por_setor_dict = defaultdict(int)
-    for ordem in ordens_filtradas:
-        if ordem.descr_setormanut:
-            ordens_por_setor_dict[ordem.descr_setormanut] += 1
-    ordens_por_setor = sorted(ordens_por_setor_dict.items(), key=lambda x: x[1], reverse=True)[:10]
+    ordens_por_setor = list(
+        resumo_periodo.exclude(descr_setormanut__isnull=True).exclude(descr_setormanut='')
+        .values_list('descr_setormanut').annotate(qtd=Sum('total')).order_by('-qtd', 'descr_setormanut')[:10]
+    )
     setores_labels = [item[0][:30] for item in ordens_por_setor]
     setores_data = [item[1] for item in ordens_por_setor]
     
@@ -8504,96 +7624,6 @@ def analise_corretiva_outros(request):
     unidades_labels = [item[0][:30] for item in ordens_por_unidade]
     unidades_data = [item[1] for item in ordens_por_unidade]
     
-    # Função para fazer parse de dt_abertura_solicita
-    def parse_dt_abertura_solicita(date_str):
-        """Tenta fazer parse de dt_abertura_solicita em vários formatos diferentes."""
-        if not date_str:
-            return None
-        
-        date_str = str(date_str).strip()
-        if not date_str:
-            return None
-        
-        # Remover hora se existir (formato: "dd/mm/yyyy hh:mm" ou "dd/mm/yyyy hh:mm:ss")
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-        else:
-            date_part = date_str
-        
-        # Tentar diferentes formatos de data
-        date_formats = [
-            '%d/%m/%Y',      # 26/09/2025
-            '%d-%m-%Y',      # 26-09-2025
-            '%d.%m.%Y',      # 26.09.2025
-            '%Y-%m-%d',      # 2025-09-26
-            '%Y/%m/%d',      # 2025/09/26
-            '%d/%m/%y',      # 26/09/25
-            '%d-%m-%y',      # 26-09-25
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_part, fmt)
-            except (ValueError, TypeError):
-                continue
-        
-        # Se nenhum formato funcionou, tentar parse manual para formato brasileiro comum
-        if '/' in date_part:
-            parts = date_part.split('/')
-            if len(parts) == 3:
-                try:
-                    day, month, year = parts
-                    # Se ano tem 2 dígitos, assumir 2000+
-                    if len(year) == 2:
-                        year = '20' + year
-                    return datetime(int(year), int(month), int(day))
-                except (ValueError, TypeError):
-                    pass
-        
-        return None
-    
-    # Função para fazer parse de dt_encordmanu (mesma lógica)
-    def parse_dt_encordmanu(date_str):
-        """Tenta fazer parse de dt_encordmanu em vários formatos diferentes."""
-        if not date_str:
-            return None
-        
-        date_str = str(date_str).strip()
-        if not date_str:
-            return None
-        
-        # Remover hora se existir
-        if ' ' in date_str:
-            date_part = date_str.split(' ')[0]
-        else:
-            date_part = date_str
-        
-        # Tentar diferentes formatos de data
-        date_formats = [
-            '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%Y/%m/%d',
-            '%d/%m/%y', '%d-%m-%y',
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_part, fmt)
-            except (ValueError, TypeError):
-                continue
-        
-        # Parse manual para formato brasileiro
-        if '/' in date_part:
-            parts = date_part.split('/')
-            if len(parts) == 3:
-                try:
-                    day, month, year = parts
-                    if len(year) == 2:
-                        year = '20' + year
-                    return datetime(int(year), int(month), int(day))
-                except (ValueError, TypeError):
-                    pass
-        
-        return None
-    
     # Ordens por mês do ano filtrado baseado em dt_abertura_solicita
     ordens_por_mes = defaultdict(int)
     
@@ -8607,20 +7637,17 @@ def analise_corretiva_outros(request):
     else:
         meses_para_mostrar = list(range(1, 13))
     
-    # Contar ordens abertas e fechadas por mês
+    # Contar ordens abertas por mês (resumo diário)
+    for mes_resumo, qtd in resumo_periodo.annotate(mes=TruncMonth('dia')).values_list('mes').annotate(qtd=Sum('total')):
+        mes_ano = mes_resumo.strftime('%Y-%m')
+        ordens_por_mes[mes_ano] += qtd
+        ordens_abertas_por_mes[mes_ano] += qtd
+    
+    # Contar fechadas (dt_encordmanu) entre as ordens abertas no período
     for ordem in ordens_filtradas:
-        # Contar abertas (dt_abertura_solicita)
-        if ordem.dt_abertura_solicita:
-            data_abertura = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-            if data_abertura and data_abertura.year == ano_filtro:
-                mes_ano = data_abertura.strftime('%Y-%m')
-                ordens_por_mes[mes_ano] += 1
-                ordens_abertas_por_mes[mes_ano] += 1
-        
-        # Contar fechadas (dt_encordmanu)
-        if ordem.dt_encordmanu:
-            data_fechamento = parse_dt_encordmanu(ordem.dt_encordmanu)
-            if data_fechamento and data_fechamento.year == ano_filtro:
+        if ordem.dt_encordmanu_dt:
+            data_fechamento = timezone.localtime(ordem.dt_encordmanu_dt)
+            if data_fechamento.year == ano_filtro:
                 mes_ano = data_fechamento.strftime('%Y-%m')
                 ordens_fechadas_por_mes[mes_ano] += 1
     
@@ -8679,11 +7706,10 @@ def analise_corretiva_outros(request):
     executores_data = [item['total'] for item in top_executores]
     
     # Distribuição por tipo de ordem de serviço - filtradas
-    tipos_dict = defaultdict(int)
-    for ordem in ordens_filtradas:
-        if ordem.descr_tpordservtv:
-            tipos_dict[ordem.descr_tpordservtv] += 1
-    ordens_por_tipo = sorted(tipos_dict.items(), key=lambda x: x[1], reverse=True)[:8]
+    ordens_por_tipo = list(
+        resumo_periodo.exclude(descr_tpordservtv__isnull=True).exclude(descr_tpordservtv='')
+        .values_list('descr_tpordservtv').annotate(qtd=Sum('total')).order_by('-qtd', 'descr_tpordservtv')[:8]
+    )
     tipos_labels = [item[0][:30] for item in ordens_por_tipo]
     tipos_data = [item[1] for item in ordens_por_tipo]
     
@@ -8727,25 +7753,21 @@ def analise_corretiva_outros(request):
     # Estatística 3: Ordens que foram abertas e fechadas no mesmo mês (regra do gráfico comparativo)
     ordens_mesmo_mes = 0
     for ordem in ordens_filtradas:
-        if ordem.dt_abertura_solicita and ordem.dt_encordmanu:
-            data_abertura = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-            data_fechamento = parse_dt_encordmanu(ordem.dt_encordmanu)
-            if data_abertura and data_fechamento:
-                # Verificar se foram abertas e fechadas no mesmo mês e ano
-                if data_abertura.year == data_fechamento.year and data_abertura.month == data_fechamento.month:
-                    ordens_mesmo_mes += 1
+        if ordem.dt_abertura_solicita_dt and ordem.dt_encordmanu_dt:
+            data_abertura = timezone.localtime(ordem.dt_abertura_solicita_dt)
+            data_fechamento = timezone.localtime(ordem.dt_encordmanu_dt)
+            # Verificar se foram abertas e fechadas no mesmo mês e ano
+            if data_abertura.year == data_fechamento.year and data_abertura.month == data_fechamento.month:
+                ordens_mesmo_mes += 1
     ordens_mes_diferente = total_count - ordens_mesmo_mes
     percentual_mesmo_mes = (ordens_mesmo_mes / total_count * 100) if total_count > 0 else 0
     percentual_mes_diferente = (ordens_mes_diferente / total_count * 100) if total_count > 0 else 0
     
     # Obter lista de anos disponíveis (baseado nas ordens)
-    anos_disponiveis = set()
-    for ordem in todas_ordens:
-        if ordem.dt_abertura_solicita:
-            data_parseada = parse_dt_abertura_solicita(ordem.dt_abertura_solicita)
-            if data_parseada:
-                anos_disponiveis.add(data_parseada.year)
-    anos_disponiveis = sorted(anos_disponiveis, reverse=True)
+    anos_disponiveis = sorted(
+        {dia.year for dia in ResumoDiarioOrdem.objects.filter(evento='abertura').dates('dia', 'year')},
+        reverse=True
+    )
     if not anos_disponiveis:
         anos_disponiveis = [hoje.year]
     
@@ -9073,57 +8095,17 @@ def analise_ordens_preventivas(request):
 
 def analise_corretiva_outros_com_parada(request):
     """Análise de Ordens Corretivas com informações de parada"""
-    from app.models import OrdemServicoCorretiva, Maquina, CentroAtividade
+    from app.models import OrdemServicoCorretiva, Maquina, CentroAtividade, intervalo_datas_ordem
+    from app.utils import indicadores_parada, janela_indicadores_parada
     from django.db.models import Count, Q
+    from django.utils import timezone
     from datetime import datetime, timedelta
     from collections import defaultdict
     import json
-    import re
     
-    # Filtrar apenas ordens com dt_iniparmanu preenchido (não nulo e não vazio)
-    ordens_com_parada_qs = OrdemServicoCorretiva.objects.filter(
-        Q(dt_iniparmanu__isnull=False) & ~Q(dt_iniparmanu='')
-    )
-    
-    # Validar que dt_iniparmanu contém uma data válida
-    # Tentar parsear as datas para garantir que são válidas
-    def is_valid_date(date_str):
-        """Verifica se a string contém uma data válida"""
-        if not date_str or not isinstance(date_str, str):
-            return False
-        
-        date_str = date_str.strip()
-        if not date_str:
-            return False
-        
-        # Tentar diferentes formatos de data comuns
-        formatos_data = [
-            '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S',
-            '%d-%m-%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d/%m/%y', '%d-%m-%y',
-            '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M'
-        ]
-        for formato in formatos_data:
-            try:
-                datetime.strptime(date_str, formato)
-                return True
-            except (ValueError, AttributeError):
-                continue
-        
-        # Se não encontrou formato padrão, verificar se contém padrão de data
-        if re.search(r'\d{1,2}[\s\-/]\d{1,2}[\s\-/]\d{2,4}', date_str):
-            return True
-        
-        return False
-    
-    # Filtrar apenas ordens com datas válidas usando values_list para eficiência
-    ordens_validas_ids = [
-        ordem_id for ordem_id, dt_iniparmanu in 
-        ordens_com_parada_qs.values_list('id', 'dt_iniparmanu')
-        if is_valid_date(dt_iniparmanu)
-    ]
-    
-    # Filtrar apenas ordens com datas válidas
-    ordens_com_parada_qs = OrdemServicoCorretiva.objects.filter(id__in=ordens_validas_ids)
+    # Ordens com parada: dt_iniparmanu preenchido com uma data válida
+    # (a coluna tipada só é preenchida quando o texto é uma data reconhecida)
+    ordens_com_parada_qs = OrdemServicoCorretiva.objects.filter(dt_iniparmanu_dt__isnull=False)
     
     total_com_parada = ordens_com_parada_qs.count()
     total_geral = OrdemServicoCorretiva.objects.count()
@@ -9160,10 +8142,9 @@ def analise_corretiva_outros_com_parada(request):
     
     # Ordens por mês (últimos 12 meses)
     ordens_por_mes = defaultdict(int)
-    ordens = ordens_com_parada_qs.all().order_by('created_at')
-    for ordem in ordens:
-        if ordem.created_at:
-            mes_ano = ordem.created_at.strftime('%Y-%m')
+    for created_at in ordens_com_parada_qs.order_by('created_at').values_list('created_at', flat=True):
+        if created_at:
+            mes_ano = created_at.strftime('%Y-%m')
             ordens_por_mes[mes_ano] += 1
     
     # Ordenar por data e pegar últimos 12 meses
@@ -9205,52 +8186,19 @@ def analise_corretiva_outros_com_parada(request):
     for dia in range(1, ultimo_dia_mes.day + 1):
         ordens_por_dia[dia] = 0
     
-    # Função para parsear dt_entrada e extrair a data
-    def parse_dt_entrada(dt_entrada_str):
-        """Tenta parsear dt_entrada e retornar o dia do mês se for do mês atual"""
-        if not dt_entrada_str:
-            return None
-        
-        dt_entrada_str = dt_entrada_str.strip()
-        formatos_data = [
-            '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S',
-            '%d-%m-%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d/%m/%y', '%d-%m-%y',
-            '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M'
-        ]
-        
-        for formato in formatos_data:
-            try:
-                data_parseada = datetime.strptime(dt_entrada_str, formato)
-                # Verificar se é do mês atual
-                if data_parseada.year == hoje.year and data_parseada.month == hoje.month:
-                    return data_parseada.day
-            except (ValueError, AttributeError):
-                continue
-        
-        # Tentar extrair dia usando regex se os formatos padrão não funcionarem
-        match = re.search(r'(\d{1,2})[/\-](\d{1,2})[/\-](\d{2,4})', dt_entrada_str)
-        if match:
-            dia_str, mes_str, ano_str = match.groups()
-            try:
-                dia = int(dia_str)
-                mes = int(mes_str)
-                ano = int(ano_str)
-                if ano < 100:
-                    ano += 2000 if ano < 50 else 1900
-                
-                if ano == hoje.year and mes == hoje.month:
-                    return dia
-            except (ValueError, TypeError):
-                pass
-        
-        return None
+    # Contar ordens por dia do mês atual (filtro indexado em dt_entrada_dt)
+    inicio_mes_dt, fim_mes_dt = intervalo_datas_ordem(primeiro_dia_mes.date(), ultimo_dia_mes.date())
+    
+    def contar_por_dia(queryset, contador):
+        """Soma em contador as ordens do queryset por dia (fuso local) de dt_entrada no mês atual"""
+        datas_entrada = queryset.filter(
+            dt_entrada_dt__gte=inicio_mes_dt,
+            dt_entrada_dt__lt=fim_mes_dt
+        ).values_list('dt_entrada_dt', flat=True)
+        for dt_entrada in datas_entrada:
+            contador[timezone.localtime(dt_entrada).day] += 1
     
-    # Contar ordens por dia do mês atual
-    for ordem in ordens_com_parada_qs:
-        if ordem.dt_entrada:
-            dia = parse_dt_entrada(ordem.dt_entrada)
-            if dia and 1 <= dia <= ultimo_dia_mes.day:
-                ordens_por_dia[dia] += 1
+    contar_por_dia(ordens_com_parada_qs, ordens_por_dia)
     
     # Preparar dados para o gráfico
     daily_labels = [f"{dia:02d}/{hoje.month:02d}" for dia in sorted(ordens_por_dia.keys())]
@@ -9327,17 +8275,8 @@ def analise_corretiva_outros_com_parada(request):
         ordens_por_dia_frigorifico[dia] = 0
         ordens_por_dia_industria[dia] = 0
     
-    for ordem in ordens_frigorifico:
-        if ordem.dt_entrada:
-            dia = parse_dt_entrada(ordem.dt_entrada)
-            if dia and 1 <= dia <= ultimo_dia_mes.day:
-                ordens_por_dia_frigorifico[dia] += 1
-    
-    for ordem in ordens_industria:
-        if ordem.dt_entrada:
-            dia = parse_dt_entrada(ordem.dt_entrada)
-            if dia and 1 <= dia <= ultimo_dia_mes.day:
-                ordens_por_dia_industria[dia] += 1
+    contar_por_dia(ordens_frigorifico, ordens_por_dia_frigorifico)
+    contar_por_dia(ordens_industria, ordens_por_dia_industria)
     
     daily_labels_classificacao = [f"{dia:02d}/{hoje.month:02d}" for dia in sorted(ordens_por_dia.keys())]
     daily_data_frigorifico = [ordens_por_dia_frigorifico[dia] for dia in sorted(ordens_por_dia.keys())]
@@ -9347,14 +8286,14 @@ def analise_corretiva_outros_com_parada(request):
     ordens_por_mes_frigorifico = defaultdict(int)
     ordens_por_mes_industria = defaultdict(int)
     
-    for ordem in ordens_frigorifico:
-        if ordem.created_at:
-            mes_ano = ordem.created_at.strftime('%Y-%m')
+    for created_at in ordens_frigorifico.values_list('created_at', flat=True):
+        if created_at:
+            mes_ano = created_at.strftime('%Y-%m')
             ordens_por_mes_frigorifico[mes_ano] += 1
     
-    for ordem in ordens_industria:
-        if ordem.created_at:
-            mes_ano = ordem.created_at.strftime('%Y-%m')
+    for created_at in ordens_industria.values_list('created_at', flat=True):
+        if created_at:
+            mes_ano = created_at.strftime('%Y-%m')
             ordens_por_mes_industria[mes_ano] += 1
     
     # Garantir que todos os meses tenham dados
@@ -9364,6 +8303,12 @@ def analise_corretiva_outros_com_parada(request):
     meses_data_frigorifico = [ordens_por_mes_frigorifico.get(m, 0) for m in meses_ordenados_classificacao]
     meses_data_industria = [ordens_por_mes_industria.get(m, 0) for m in meses_ordenados_classificacao]
     
+    # Indicadores de parada (MTTR, MTBF e disponibilidade) no período filtrado (padrão: últimos 90 dias)
+    inicio_janela, fim_janela, parada_data_inicio, parada_data_fim = janela_indicadores_parada(
+        request.GET.get('data_inicio'), request.GET.get('data_fim'),
+    )
+    indicadores = indicadores_parada(inicio_janela, fim_janela)
+    
     context = {
         'page_title': 'Análise Corretiva com Parada',
         'active_page': 'analise_corretiva_parada',
@@ -9403,6 +8348,13 @@ def analise_corretiva_outros_com_parada(request):
         'meses_labels_classificacao': json.dumps(meses_labels_classificacao),
         'meses_data_frigorifico': json.dumps(meses_data_frigorifico),
         'meses_data_industria': json.dumps(meses_data_industria),
+        # Indicadores de parada (MTTR / MTBF / disponibilidade)
+        'parada_data_inicio': parada_data_inicio,
+        'parada_data_fim': parada_data_fim,
+        'indicadores_geral': indicadores['geral'],
+        'indicadores_maquinas': indicadores['maquinas'][:15],
+        'indicadores_setores': indicadores['setores'][:10],
+        'indicadores_centros': indicadores['centros_atividade'][:10],
     }
     return render(request, 'ordens_de_servico/analise_corretiva_outros_com_parada.html', context)
 
@@ -9630,12 +8582,15 @@ def cadastrar_manutentor(request):
     """Cadastrar novo manutentor"""
     from app.forms import ManutentorForm
     from app.models import ManutentorMaquina, Maquina
+    from app.utils import reconstruir_execucoes_manutentores
     
     if request.method == 'POST':
         form = ManutentorForm(request.POST)
         if form.is_valid():
             try:
                 manutentor = form.save()
+                # Ordens e fichas executadas pelo novo manutentor (código ou nome)
+                reconstruir_execucoes_manutentores()
                 
                 # Processar máquinas selecionadas
                 maquinas_ids = request.POST.getlist('maquinas_selecionadas')
@@ -9699,8 +8654,8 @@ def cadastrar_manutentor(request):
 
 def analise_manutentores(request):
     """Análise de Manutentores - Dashboard com estatísticas"""
-    from app.models import Manutentor, ManutentorMaquina, OrdemServicoCorretiva, OrdemServicoCorretivaFicha
-    from django.db.models import Count, Q
+    from app.models import ExecucaoManutentor, Manutentor, ManutentorMaquina
+    from django.db.models import Count
     from datetime import datetime, timedelta
     from collections import defaultdict
     import json
@@ -9729,22 +8684,15 @@ def analise_manutentores(request):
     # Total de máquinas relacionadas
     total_maquinas_relacionadas = ManutentorMaquina.objects.count()
     
-    # Manutentores com manutenções (via OrdemServicoCorretiva ou Fichas)
-    # Buscar nomes de manutentores e contar ordens/fichas que correspondem
-    manutentores_nomes = Manutentor.objects.values_list('Nome', flat=True).exclude(Nome__isnull=True).exclude(Nome='')
-    manutentores_com_manutencoes = 0
-    total_manutencoes_relacionadas = 0
-    
-    for nome in manutentores_nomes:
-        ordens_count = OrdemServicoCorretiva.objects.filter(
-            Q(nm_func_exec__icontains=nome) | Q(nm_func_exec_os__icontains=nome)
-        ).count()
-        fichas_count = OrdemServicoCorretivaFicha.objects.filter(
-            nm_func_exec_os__icontains=nome
-        ).count()
-        if ordens_count > 0 or fichas_count > 0:
-            manutentores_com_manutencoes += 1
-        total_manutencoes_relacionadas += ordens_count + fichas_count
+    # Manutentores com manutenções (ordens ou fichas), pela tabela de resolução dos executores
+    manutentores_manutencoes = Manutentor.objects.annotate(
+        total_manutencoes=Count('execucoes'),
+    ).filter(total_manutencoes__gt=0)
+    manutentores_com_manutencoes = manutentores_manutencoes.count()
+    total_manutencoes_relacionadas = ExecucaoManutentor.objects.count()
+    
+    # Quantidade de máquinas de cada manutentor (uma consulta)
+    manutentores_maquinas = Manutentor.objects.annotate(qtd_maquinas=Count('maquinas'))
     
     # Distribuição por Turno
     turnos_data_dict = Manutentor.objects.values('turno').annotate(total=Count('Matricula')).order_by('-total')
@@ -9772,8 +8720,7 @@ def analise_manutentores(request):
     distribuicao_maquinas_labels = ['0 máquinas', '1-5 máquinas', '6-10 máquinas', '11+ máquinas']
     distribuicao_maquinas_data = [0, 0, 0, 0]
     
-    for manutentor in Manutentor.objects.all():
-        qtd_maquinas = ManutentorMaquina.objects.filter(manutentor=manutentor).count()
+    for qtd_maquinas in manutentores_maquinas.values_list('qtd_maquinas', flat=True):
         if qtd_maquinas == 0:
             distribuicao_maquinas_data[0] += 1
         elif qtd_maquinas <= 5:
@@ -9791,33 +8738,16 @@ def analise_manutentores(request):
     cargos_data = [item['total'] for item in cargos_data_dict]
     
     # Top 10 Manutentores por Quantidade de Máquinas
-    top_manutentores_maquinas = []
-    for manutentor in Manutentor.objects.all():
-        qtd_maquinas = ManutentorMaquina.objects.filter(manutentor=manutentor).count()
-        if qtd_maquinas > 0:
-            top_manutentores_maquinas.append({
-                'manutentor': manutentor,
-                'total': qtd_maquinas
-            })
-    top_manutentores_maquinas = sorted(top_manutentores_maquinas, key=lambda x: x['total'], reverse=True)[:10]
+    top_manutentores_maquinas = [
+        {'manutentor': manutentor, 'total': manutentor.qtd_maquinas}
+        for manutentor in manutentores_maquinas.filter(qtd_maquinas__gt=0).order_by('-qtd_maquinas', 'Nome', 'Matricula')[:10]
+    ]
     
     # Top 10 Manutentores por Quantidade de Manutenções
-    top_manutentores_manutencoes = []
-    for manutentor in Manutentor.objects.all():
-        if manutentor.Nome:
-            ordens_count = OrdemServicoCorretiva.objects.filter(
-                Q(nm_func_exec__icontains=manutentor.Nome) | Q(nm_func_exec_os__icontains=manutentor.Nome)
-            ).count()
-            fichas_count = OrdemServicoCorretivaFicha.objects.filter(
-                nm_func_exec_os__icontains=manutentor.Nome
-            ).count()
-            total_manut = ordens_count + fichas_count
-            if total_manut > 0:
-                top_manutentores_manutencoes.append({
-                    'manutentor': manutentor,
-                    'total': total_manut
-                })
-    top_manutentores_manutencoes = sorted(top_manutentores_manutencoes, key=lambda x: x['total'], reverse=True)[:10]
+    top_manutentores_manutencoes = [
+        {'manutentor': manutentor, 'total': manutentor.total_manutencoes}
+        for manutentor in manutentores_manutencoes.order_by('-total_manutencoes', 'Nome', 'Matricula')[:10]
+    ]
     
     context = {
         'page_title': 'Análise de Manutentores',
@@ -9879,6 +8809,7 @@ def editar_manutentor(request, matricula):
     """Editar um manutentor existente"""
     from app.forms import ManutentorForm
     from app.models import Manutentor
+    from app.utils import reconstruir_execucoes_manutentores
     
     try:
         manutentor = Manutentor.objects.get(Matricula=matricula)
@@ -9896,6 +8827,9 @@ def editar_manutentor(request, matricula):
         if form.is_valid():
             try:
                 manutentor = form.save()
+                if 'Nome' in form.changed_data:
+                    # Executores resolvidos pelo nome antigo/novo
+                    reconstruir_execucoes_manutentores()
                 messages.success(request, f'Manutentor {manutentor.Matricula} atualizado com sucesso!')
                 return redirect('visualizar_manutentor', matricula=manutentor.Matricula)
             except Exception as e:
@@ -9997,15 +8931,18 @@ def consultar_manutentores(request):
 
 def consultar_agendamentos(request):
     """Consultar/listar agendamentos de cronograma cadastrados com visitas"""
-    from app.models import AgendamentoCronograma, Visitas
+    from app.models import AgendamentoCronograma, RecorrenciaAgendamento, Visitas
+    from app.utils import AgendaCronograma
     from django.db.models import Q
     from django.core.paginator import Paginator
     from datetime import datetime
     
-    # Buscar todos os agendamentos com visitas relacionadas
-    agendamentos_list = AgendamentoCronograma.objects.select_related('maquina', 'plano_preventiva', 'semana').prefetch_related('visitas').all()
+    # Buscar todos os agendamentos (Visitas não tem relação com AgendamentoCronograma)
+    agendamentos_list = AgendamentoCronograma.objects.select_related('maquina', 'plano_preventiva', 'semana').all()
+    # Recorrências: as ocorrências são geradas apenas para a página exibida
+    recorrencias_list = RecorrenciaAgendamento.objects.all()
     
-    # Filtro de busca geral (incluindo campos de visitas)
+    # Filtro de busca geral
     search_query = request.GET.get('search', '').strip()
     if search_query:
         agendamentos_list = agendamentos_list.filter(
@@ -10014,17 +8951,25 @@ def consultar_agendamentos(request):
             Q(maquina__descr_maquina__icontains=search_query) |
             Q(plano_preventiva__numero_plano__icontains=search_query) |
             Q(plano_preventiva__descr_plano__icontains=search_query) |
-            Q(observacoes__icontains=search_query) |
-            Q(visitas__titulo__icontains=search_query) |
-            Q(visitas__descricao__icontains=search_query) |
-            Q(visitas__nome_contato__icontains=search_query)
-        ).distinct()
+            Q(observacoes__icontains=search_query)
+        )
+        recorrencias_list = recorrencias_list.filter(
+            Q(nome_grupo__icontains=search_query) |
+            Q(maquina__cd_maquina__icontains=search_query) |
+            Q(maquina__descr_maquina__icontains=search_query) |
+            Q(plano_preventiva__numero_plano__icontains=search_query) |
+            Q(plano_preventiva__descr_plano__icontains=search_query) |
+            Q(observacoes__icontains=search_query)
+        )
     
     # Filtros específicos
     filtro_tipo = request.GET.get('filtro_tipo', '')
     if filtro_tipo:
         agendamentos_list = agendamentos_list.filter(tipo_agendamento=filtro_tipo)
+        recorrencias_list = recorrencias_list.filter(tipo_agendamento=filtro_tipo)
     
+    data_ini = None
+    data_f = None
     filtro_data_inicio = request.GET.get('filtro_data_inicio', '')
     if filtro_data_inicio:
         try:
@@ -10041,8 +8986,8 @@ def consultar_agendamentos(request):
         except ValueError:
             pass
     
-    # Ordenar por data planejada
-    agendamentos_list = agendamentos_list.order_by('data_planejada', 'tipo_agendamento')
+    # Ordenar por data planejada (agendamentos gravados e ocorrências das recorrências)
+    agendamentos_list = AgendaCronograma(agendamentos_list, recorrencias_list, data_ini, data_f)
     
     # Paginação
     paginator = Paginator(agendamentos_list, 50)  # 50 itens por página
@@ -10050,9 +8995,15 @@ def consultar_agendamentos(request):
     agendamentos = paginator.get_page(page_number)
     
     # Estatísticas
-    total_count = AgendamentoCronograma.objects.count()
-    tipo_maquina_count = AgendamentoCronograma.objects.filter(tipo_agendamento='maquina').count()
-    tipo_plano_count = AgendamentoCronograma.objects.filter(tipo_agendamento='plano').count()
+    total_count = AgendaCronograma(AgendamentoCronograma.objects.all()).count()
+    tipo_maquina_count = AgendaCronograma(
+        AgendamentoCronograma.objects.filter(tipo_agendamento='maquina'),
+        RecorrenciaAgendamento.objects.filter(tipo_agendamento='maquina'),
+    ).count()
+    tipo_plano_count = AgendaCronograma(
+        AgendamentoCronograma.objects.filter(tipo_agendamento='plano'),
+        RecorrenciaAgendamento.objects.filter(tipo_agendamento='plano'),
+    ).count()
     visitas_count = Visitas.objects.count()
     
     context = {
@@ -10422,6 +9373,7 @@ def limpar_tabela(request):
         MeuPlanoPreventiva, MeuPlanoPreventivaDocumento, AgendamentoCronograma,
         RoteiroPreventiva, RequisicaoAlmoxarifado
     )
+    from app.utils import excluir_todos_registros
     
     # Mapeamento de tabelas para modelos
     tabelas_map = {
@@ -10458,7 +9410,7 @@ def limpar_tabela(request):
             for key, info in tabelas_map.items():
                 count = info['modelo'].objects.count()
                 if count > 0:
-                    info['modelo'].objects.all().delete()
+                    excluir_todos_registros(info['modelo'])
                     total_removido += count
                     detalhes.append(f"{info['nome']} ({count})")
             
@@ -10475,7 +9427,7 @@ def limpar_tabela(request):
             
             if count > 0:
                 try:
-                    deleted_count, deleted_details = info['modelo'].objects.all().delete()
+                    excluir_todos_registros(info['modelo'])
                     messages.success(request, f'{count} registro(s) de {info["nome"]} foram removidos com sucesso.')
                 except Exception as delete_error:
                     import traceback
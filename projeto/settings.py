@@ -49,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.PerfilRequisicaoMiddleware',
 ]
 
 # Disable caching in development
@@ -59,7 +60,8 @@ ROOT_URLCONF = 'projeto.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com a medição do tempo de renderização do perfil das requisições
+        'BACKEND': 'app.template_backends.DjangoTemplatesMedidos',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,10 +84,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # As importações gravam em segundo plano (app.importacoes): espera o lock de
+        # escrita em vez de falhar logo com "database is locked"
+        'OPTIONS': {
+            'timeout': 30,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'dashboards' guarda os resultados dos dashboards e as versões dos modelos;
+# precisa ser compartilhado entre os processos do servidor (por isso em arquivo).
+# 'importacoes' guarda o progresso parcial das importações em segundo plano
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboards': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'dashboards'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    'importacoes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'importacoes'),
+        'TIMEOUT': 60 * 60 * 24,
+    },
+}
+
+# Importações em segundo plano: quantas rodam ao mesmo tempo em cada processo do servidor
+# (com SQLite, mais de uma só disputaria o lock de escrita)
+IMPORTACOES_WORKERS = 1
+
+# Perfil das requisições (app.middleware.PerfilRequisicaoMiddleware): com True, todas as
+# requisições são medidas; com False, apenas as de usuários staff com ?_perfil=1.
+# O resumo por view e dia (ResumoDiarioPerfilView) mantém os últimos PERFIL_REQUISICOES_DIAS dias
+# (descarte diário agendado fora do servidor: python manage.py limpar_perfil_views)
+PERFIL_REQUISICOES = False
+PERFIL_REQUISICOES_DIAS = 30
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 